@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from stats import scheduler, versions
+        from . import warming
+
+        # 응답 캐시 예열 (WARM_CACHES_ON_STARTUP, 서버 시작은 기다리지 않음)
+        if warming.should_warm_on_startup():
+            warming.warm_in_background()
+        # 데이터가 바뀌면 run_scheduler가 주기적으로 다시 예열 (다른 프로세스와 공유되는 캐시일 때만)
+        if warming.uses_shared_cache():
+            scheduler.register('warm-caches', interval=300,
+                               datasets=(versions.USAGE, versions.USERS, versions.STATS))(warming.scheduled_warm)
@@ -0,0 +1,71 @@
+"""집계 API 응답 캐시
+
+키는 (데이터 버전, 경로, 정렬된 쿼리 파라미터)라서 데이터가 바뀌면 이전 응답을 지우지 않아도
+새 키로 다시 계산됩니다. 200 응답만 저장하고 X-Cache 헤더(HIT/MISS)로 적중 여부를 알립니다.
+ETag도 같은 키에서 만들어, If-None-Match가 맞으면 캐시도 읽지 않고 본문 없는 304를 돌려줍니다
+(프런트 requestCache.js의 재검증 요청).
+get_payloads/set_payloads는 같은 방식으로 객체(유저 등)별 응답을 캐시합니다 (배치 조회용).
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from stats import versions
+
+KEY_PREFIX = 'api-response'
+
+
+def response_key(path, query_params):
+    token = versions.digest()
+    query = urlencode(sorted((key, value) for key in query_params for value in query_params.getlist(key)))
+    # memcached 키 길이 제한 대비 해시
+    digest = hashlib.md5(f'{path}?{query}'.encode()).hexdigest()
+    return f'{KEY_PREFIX}:{token}:{digest}'
+
+
+def cache_response(view):
+    """GET 액션 응답 캐시 데코레이터 (RESPONSE_CACHE_SECONDS가 0이면 그대로 실행)"""
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        seconds = settings.RESPONSE_CACHE_SECONDS
+        # 프로파일링 요청은 캐시를 건너뛰어 실제 계산을 측정 (api/profiling.py)
+        if not seconds or request.method != 'GET' or getattr(request, 'profiling', False):
+            return view(self, request, *args, **kwargs)
+
+        key = response_key(request.path, request.query_params)
+        etag = f'"{key.split(":", 1)[1]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers={'ETag': etag, 'X-Cache': 'HIT'})
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT', 'ETag': etag})
+
+        response = view(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, seconds)
+            response['X-Cache'] = 'MISS'
+            response['ETag'] = etag
+        return response
+    return wrapper
+
+
+def get_payloads(prefix, ids):
+    """객체별 캐시 응답 조회 → {id: 응답} (RESPONSE_CACHE_SECONDS가 0이면 빈 dict)"""
+    if not settings.RESPONSE_CACHE_SECONDS or not ids:
+        return {}
+    token = versions.digest()
+    keys = {f'{KEY_PREFIX}:{prefix}:{token}:{object_id}': object_id for object_id in ids}
+    return {keys[key]: data for key, data in cache.get_many(list(keys)).items()}
+
+
+def set_payloads(prefix, payloads):
+    """{id: 응답} 객체별 캐시 저장"""
+    if not settings.RESPONSE_CACHE_SECONDS or not payloads:
+        return
+    token = versions.digest()
+    cache.set_many({f'{KEY_PREFIX}:{prefix}:{token}:{object_id}': data for object_id, data in payloads.items()},
+                   settings.RESPONSE_CACHE_SECONDS)
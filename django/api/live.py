@@ -0,0 +1,206 @@
+"""실시간 랭킹 (Server-Sent Events, ASGI 전용)
+
+RankingTable이 top_rankers 전체를 다시 받지 않도록 상위 N명의 변화만 흘려보냅니다.
+(티어, N)마다 피드 하나가 프로세스 안에서 POLL_SECONDS마다 유저/통계 데이터 버전만 확인하고,
+바뀌었을 때만 상위 N을 한 번 읽어 직전 스냅샷과 비교(leaderboard.diff_top)합니다. 계산한 diff는
+한 번만 직렬화해 모든 구독자 큐에 같은 바이트로 넣으므로 DB/계산 비용은 구독자 수와 무관합니다.
+- 이벤트: snapshot(접속 시 상위 N 전체), diff(entered/exited/moved/updated)
+- id: <피드 epoch>:<순번>, 재접속 시 Last-Event-ID가 최근 HISTORY 안이면 놓친 diff만 다시 보냄
+  (서버 재시작 등으로 이어갈 수 없으면 snapshot)
+- HEARTBEAT_SECONDS 동안 보낼 것이 없으면 주석 줄로 연결 유지, 따라가지 못하는 구독자는 snapshot으로 재동기화
+- 마지막 구독자가 떠나고 IDLE_SECONDS가 지나면 피드 정리
+WSGI(runserver, gunicorn 동기 워커)에서는 스트림을 붙잡을 수 없어 501을 돌려줍니다.
+uvicorn gamestats.asgi:application 처럼 ASGI 서버로 띄워야 합니다.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from stats import leaderboard, versions
+
+POLL_SECONDS = 1.0
+HEARTBEAT_SECONDS = 15.0
+IDLE_SECONDS = 30.0
+HISTORY = 256
+QUEUE_SIZE = 64
+MAX_LIMIT = 500
+RETRY_MS = 3000
+# 구독자 큐가 넘쳤을 때 넣는 표시 (snapshot으로 재동기화)
+RESYNC = object()
+
+
+def format_event(event_id, event, payload):
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'.encode()
+
+
+class LeaderboardFeed:
+    """(티어, N) 하나의 상위 N 변화 피드"""
+
+    def __init__(self, tier, limit):
+        self.tier = tier
+        self.limit = limit
+        self.epoch = format(time.time_ns(), 'x')
+        self.sequence = 0
+        self.history = deque(maxlen=HISTORY)
+        self.rows = None
+        self.version = None
+        self._snapshot = None
+        self.subscribers = set()
+        self.task = None
+        self.idle_since = time.monotonic()
+
+    def event_id(self, sequence=None):
+        return f'{self.epoch}:{self.sequence if sequence is None else sequence}'
+
+    def refresh(self):
+        """데이터 버전이 바뀌었으면 상위 N을 다시 읽어 diff 이벤트 생성 → (순번, 바이트) 또는 None"""
+        version = versions.digest(tuple(
+            row for row in versions.token(fresh=True) if row[0] in (versions.USERS, versions.STATS)
+        ))
+        if version == self.version:
+            return None
+        rows = leaderboard.live_top(self.tier, self.limit)
+        previous, self.rows, self.version = self.rows, rows, version
+        if previous is None or previous == rows:
+            return None
+        self.sequence += 1
+        self._snapshot = None
+        event = (self.sequence, format_event(self.event_id(), 'diff', leaderboard.diff_top(previous, rows)))
+        self.history.append(event)
+        return event
+
+    def snapshot(self):
+        """현재 상위 N 전체 이벤트 (바뀔 때까지 한 번만 직렬화) → (순번, 바이트)"""
+        if self._snapshot is None:
+            self._snapshot = (self.sequence, format_event(self.event_id(), 'snapshot', {
+                'tier': self.tier or 'ALL',
+                'limit': self.limit,
+                'users': [leaderboard.live_row(row, rank) for rank, row in enumerate(self.rows, start=1)],
+            }))
+        return self._snapshot
+
+    def replay(self, last_event_id):
+        """Last-Event-ID 이후 diff 목록 (이어갈 수 없으면 None)"""
+        epoch, _, sequence = (last_event_id or '').partition(':')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence == self.sequence:
+            return []
+        oldest = self.history[0][0] if self.history else self.sequence + 1
+        if sequence > self.sequence or sequence + 1 < oldest:
+            return None
+        return [event for event in self.history if event[0] > sequence]
+
+    def publish(self, event):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            self.idle_since = time.monotonic()
+
+    async def run(self):
+        """데이터 버전 확인 → 바뀌었으면 diff 한 번 계산해 모든 구독자에게"""
+        try:
+            while self.subscribers or time.monotonic() - self.idle_since < IDLE_SECONDS:
+                event = await sync_to_async(self.refresh)()
+                if event is not None:
+                    self.publish(event)
+                await asyncio.sleep(POLL_SECONDS)
+        finally:
+            if _feeds.get((self.tier, self.limit)) is self:
+                del _feeds[(self.tier, self.limit)]
+
+
+_feeds = {}
+
+
+def get_feed(tier, limit):
+    """(티어, N) 피드 (없거나 끝났으면 새로 만들어 현재 이벤트 루프에서 시작)"""
+    feed = _feeds.get((tier, limit))
+    if feed is None or feed.task is None or feed.task.done():
+        feed = _feeds[(tier, limit)] = LeaderboardFeed(tier, limit)
+        feed.task = asyncio.get_running_loop().create_task(feed.run())
+    return feed
+
+
+async def shutdown():
+    """모든 피드 중지 (테스트/종료용)"""
+    feeds = list(_feeds.values())
+    _feeds.clear()
+    for feed in feeds:
+        feed.task.cancel()
+    await asyncio.gather(*(feed.task for feed in feeds), return_exceptions=True)
+
+
+async def stream(feed, last_event_id):
+    """구독자 한 명의 이벤트 스트림"""
+    # 첫 이벤트를 만들기 전에 구독해야 그 사이 diff를 놓치지 않음
+    queue = feed.subscribe()
+    try:
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+        if feed.rows is None:
+            await sync_to_async(feed.refresh)()
+        events = feed.replay(last_event_id)
+        if events is None:
+            events = [feed.snapshot()]
+        sent = feed.sequence
+        for _, event in events:
+            yield event
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b': heartbeat\n\n'
+                continue
+            if event is RESYNC:
+                event = feed.snapshot()
+            elif event[0] <= sent:
+                # snapshot/replay에 이미 포함된 diff
+                continue
+            sent = event[0]
+            yield event[1]
+    finally:
+        feed.unsubscribe(queue)
+
+
+async def leaderboard_stream(request):
+    """GET /api/live/leaderboard/?tier=GOLD&limit=100 — 상위 N 변화 (text/event-stream)"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': '실시간 랭킹은 ASGI 서버(gamestats.asgi)에서만 제공합니다.'}, status=501)
+
+    tier = request.GET.get('tier') or None
+    if tier == 'ALL':
+        tier = None
+    if tier is not None and tier not in leaderboard.TIER_INDEX:
+        return JsonResponse({'detail': f'알 수 없는 티어: {tier}'}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 100)), 1), MAX_LIMIT)
+    except ValueError:
+        return JsonResponse({'detail': 'limit은 정수여야 합니다.'}, status=400)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    response = StreamingHttpResponse(stream(get_feed(tier, limit), last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx 등 프록시 버퍼링 끄기
+    response['X-Accel-Buffering'] = 'no'
+    return response
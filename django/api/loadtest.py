@@ -0,0 +1,303 @@
+"""API 부하 테스트 도구 (loadtest 커맨드)
+
+여러 대시보드가 동시에 폴링할 때의 처리량/지연을 재기 위해 asyncio HTTP 클라이언트(httpx)로
+실행 중인(또는 커맨드가 띄운) 서버에 요청을 보냅니다.
+- 혼합 부하: MIXES의 라우트 가중치대로 요청 생성, 동시성 고정(closed loop) 또는 목표 RPS(open loop)
+- 로그 재생: runserver/gunicorn(combined) 접근 로그의 GET 요청을 원래 시간 간격대로 재전송
+SQLite 잠금은 500 응답 본문과 (커맨드가 띄운 서버라면) 서버 로그의 'database is locked'로 셉니다.
+"""
+import asyncio
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+import httpx
+import numpy as np
+from django.urls import Resolver404, resolve, reverse
+from rest_framework.settings import api_settings
+
+from stats.models import GameUser, Item, Skill
+
+# 라우트 이름 → 가중치
+MIXES = {
+    'dashboard': {
+        'user-tier-stats': 2, 'item-popular-items': 3, 'skill-popular-skills': 3, 'item-impact': 1,
+        'skill-impact': 1, 'stats-top-players-items': 1, 'stats-top-players-skills': 1,
+        'stats-percentiles': 1, 'stats-cube': 1, 'stats-usage': 1,
+    },
+    'ranking': {
+        'user-list': 2, 'user-top-rankers': 3, 'user-rank-changes': 3, 'user-rank-movers': 1,
+        'user-search': 2, 'user-detail': 2, 'user-batch': 1,
+    },
+}
+MIXES['all'] = {**MIXES['dashboard'], **MIXES['ranking']}
+
+LOCK_MARKERS = (b'database is locked', b'database table is locked')
+
+_LOG_LINE = re.compile(r'\[(?P<time>[^\]]+)\]\s+"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+"\s+(?P<status>\d{3})')
+_LOG_TIME_FORMATS = ('%d/%b/%Y %H:%M:%S', '%d/%b/%Y:%H:%M:%S %z')
+
+
+@dataclass
+class Planned:
+    """보낼 요청 하나 (offset이 None이면 closed loop에서 바로 전송)"""
+    label: str
+    path: str
+    offset: float = None
+
+
+@dataclass
+class Sample:
+    label: str
+    status: int
+    seconds: float
+    locked: bool = False
+    error: str = None
+
+
+# ---------------------------------------------------------------- 요청 계획
+
+class MixGenerator:
+    """가중치 mix에서 파라미터까지 채운 요청 경로를 무작위로 생성"""
+
+    def __init__(self, mix, seed=0):
+        unknown = set(mix) - set(self._builders())
+        if unknown:
+            raise ValueError(f'알 수 없는 라우트: {", ".join(sorted(unknown))}')
+        self.rng = random.Random(seed)
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+
+        # 같은 seed면 같은 요청 mix가 재생되도록 DB 순서가 아닌 self.rng로 표본 추출
+        users = list(GameUser.objects.order_by('id').values_list('id', 'nickname'))
+        # 없는 페이지(404)로 에러율이 부풀지 않도록 실제 페이지 수까지만
+        self.pages = max(1, math.ceil(len(users) / api_settings.PAGE_SIZE))
+        users = self.rng.sample(users, min(1000, len(users)))
+        self.user_ids = [user_id for user_id, _ in users]
+        self.nicknames = [nickname for _, nickname in users[:200]]
+        self.tiers = [None] + [code for code, _ in GameUser.TIER_CHOICES]
+        self.item_types = [None] + [code for code, _ in Item.ITEM_TYPE_CHOICES]
+        self.skill_types = [None] + [code for code, _ in Skill.SKILL_TYPE_CHOICES]
+
+    def _builders(self):
+        """라우트 이름 → () -> (kwargs, params)"""
+        def pick(values):
+            return self.rng.choice(values)
+
+        def params(**values):
+            return {key: value for key, value in values.items() if value is not None}
+
+        return {
+            'user-tier-stats': lambda: ({}, params(tier=pick(self.tiers))),
+            'item-popular-items': lambda: ({}, params(tier=pick(self.tiers), type=pick(self.item_types))),
+            'skill-popular-skills': lambda: ({}, params(tier=pick(self.tiers), type=pick(self.skill_types))),
+            'item-impact': lambda: ({}, params(tier=pick(self.tiers))),
+            'skill-impact': lambda: ({}, params(tier=pick(self.tiers))),
+            'stats-top-players-items': lambda: ({}, {'top_percent': pick([1, 5, 10, 20])}),
+            'stats-top-players-skills': lambda: ({}, {'top_percent': pick([1, 5, 10, 20])}),
+            'stats-percentiles': lambda: ({}, params(tier=pick(self.tiers))),
+            'stats-cube': lambda: ({}, params(entity=pick(['item', 'skill']), tier=pick(self.tiers))),
+            'stats-usage': lambda: ({}, params(entity=pick(['item', 'skill']), group_by=pick(['tier', 'type', None]))),
+            'user-list': lambda: ({}, {'page': self.rng.randint(1, self.pages)}),
+            'user-top-rankers': lambda: ({}, params(tier=pick(self.tiers), limit=100)),
+            'user-rank-changes': lambda: ({}, {'limit': 50, 'offset': 50 * self.rng.randint(0, 10)}),
+            'user-rank-movers': lambda: ({}, {'direction': pick(['up', 'down']), 'limit': 20}),
+            'user-search': lambda: ({}, {'q': pick(self.nicknames or ['a'])[:self.rng.randint(2, 4)]}),
+            'user-detail': lambda: ({'pk': pick(self.user_ids or [1])}, {}),
+            'user-batch': lambda: ({}, {'ids': ','.join(map(str, self.rng.sample(
+                self.user_ids, min(50, len(self.user_ids)))))}),
+        }
+
+    def __iter__(self):
+        builders = self._builders()
+        while True:
+            name = self.rng.choices(self.names, self.weights)[0]
+            kwargs, query = builders[name]()
+            path = reverse(name, kwargs=kwargs)
+            yield Planned(name, f'{path}?{urlencode(query)}' if query else path)
+
+
+def parse_mix(value):
+    """'dashboard' 또는 'user-list=2,item-popular-items=3' → {라우트: 가중치}"""
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def parse_log_line(line):
+    """접근 로그 한 줄 → (시각, 메서드, 경로, 상태) (형식이 다르면 None)"""
+    match = _LOG_LINE.search(line)
+    if not match:
+        return None
+    for fmt in _LOG_TIME_FORMATS:
+        try:
+            moment = datetime.strptime(match['time'], fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+    return moment.replace(tzinfo=None), match['method'], match['path'], int(match['status'])
+
+
+def replay_plan(lines, speed=1.0, prefix='/api/'):
+    """접근 로그 → 원래 간격(speed배 빠르게)의 Planned 리스트, 건너뛴 줄 수
+
+    로그 시각은 초 단위라 같은 초의 요청은 그 1초 안에 고르게 나눕니다.
+    GET이 아니거나 prefix 밖의 경로는 재생하지 않습니다.
+    """
+    entries, skipped = [], 0
+    for line in lines:
+        parsed = parse_log_line(line)
+        if parsed is None or parsed[1] != 'GET' or not parsed[2].startswith(prefix):
+            skipped += 1
+            continue
+        entries.append(parsed)
+    if not entries:
+        return [], skipped
+
+    entries.sort(key=lambda entry: entry[0])
+    start = entries[0][0]
+    per_second = {}
+    for moment, _, _, _ in entries:
+        per_second[moment] = per_second.get(moment, 0) + 1
+
+    plan, seen = [], {}
+    for moment, _, path, _ in entries:
+        index = seen[moment] = seen.get(moment, -1) + 1
+        offset = (moment - start).total_seconds() + index / per_second[moment]
+        plan.append(Planned(route_label(path), path, offset / speed))
+    return plan, skipped
+
+
+def route_label(path):
+    """경로 → 라우트 이름 (모르는 경로는 경로 그대로)"""
+    path = urlsplit(path).path
+    try:
+        return resolve(path).url_name or path
+    except Resolver404:
+        return path
+
+
+def rate_plan(generator, rps, duration):
+    """목표 RPS로 duration초 동안 고르게 배치한 Planned 리스트"""
+    iterator = iter(generator)
+    count = int(rps * duration)
+    plan = []
+    for i in range(count):
+        planned = next(iterator)
+        planned.offset = i / rps
+        plan.append(planned)
+    return plan
+
+
+# ---------------------------------------------------------------- 실행
+
+async def _send(client, planned):
+    start = time.perf_counter()
+    try:
+        response = await client.get(planned.path)
+        body = response.content
+        locked = response.status_code >= 500 and any(marker in body for marker in LOCK_MARKERS)
+        return Sample(planned.label, response.status_code, time.perf_counter() - start, locked)
+    except Exception as e:
+        return Sample(planned.label, 0, time.perf_counter() - start, error=type(e).__name__)
+
+
+async def run_closed(base_url, generator, concurrency, duration=None, total=None, timeout=30.0):
+    """동시성 고정: concurrency개 작업자가 응답을 받는 즉시 다음 요청 (duration초 또는 total건)"""
+    iterator = iter(generator)
+    samples = []
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [total]
+
+    def next_request():
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        if remaining[0] is not None:
+            if remaining[0] <= 0:
+                return None
+            remaining[0] -= 1
+        return next(iterator, None)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            while (planned := next_request()) is not None:
+                samples.append(await _send(client, planned))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def run_open(base_url, plan, max_in_flight=256, timeout=30.0):
+    """예약 시각(offset)에 맞춰 전송 — 서버가 느려도 보내는 속도는 유지 (동시 요청은 max_in_flight까지)"""
+    samples = []
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+
+        async def fire(planned):
+            async with semaphore:
+                samples.append(await _send(client, planned))
+
+        tasks = []
+        for planned in plan:
+            delay = planned.offset - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(planned)))
+        await asyncio.gather(*tasks)
+    return samples
+
+
+# ---------------------------------------------------------------- 요약
+
+def summarize(samples, elapsed):
+    """라우트별 + 전체(ALL) 요약 행 리스트 (지연은 ms)"""
+    groups = {'ALL': samples}
+    for sample in samples:
+        groups.setdefault(sample.label, []).append(sample)
+
+    rows = []
+    for label, group in groups.items():
+        latencies = np.array([sample.seconds for sample in group]) * 1000
+        errors = sum(1 for sample in group if sample.status == 0 or sample.status >= 400)
+        p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99]) if group else (0, 0, 0, 0)
+        rows.append({
+            'route': label,
+            'requests': len(group),
+            'rps': round(len(group) / elapsed, 2) if elapsed else 0.0,
+            'errors': errors,
+            'error_rate': round(errors / len(group), 4) if group else 0.0,
+            'locked': sum(sample.locked for sample in group),
+            'p50_ms': round(float(p50), 2),
+            'p90_ms': round(float(p90), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(latencies.max()), 2) if group else 0.0,
+        })
+    return rows
+
+
+def count_lock_errors(text):
+    """서버 로그 안의 SQLite 잠금/busy 오류 수"""
+    return sum(text.count(marker.decode()) for marker in LOCK_MARKERS)
+
+
+def compare(current, previous):
+    """라우트별 (route, 이전 p95, 현재 p95, 이전 rps, 현재 rps) — 두 실행 모두에 있는 라우트만"""
+    before = {row['route']: row for row in previous}
+    return [
+        (row['route'], before[row['route']]['p95_ms'], row['p95_ms'], before[row['route']]['rps'], row['rps'])
+        for row in current if row['route'] in before
+    ]
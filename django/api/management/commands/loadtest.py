@@ -0,0 +1,171 @@
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import loadtest
+from stats.benchmarking import write_results
+
+SERVER_COMMANDS = {
+    'runserver': lambda port, workers: [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+    # gunicorn 접근 로그(combined)는 --replay 입력으로 다시 쓸 수 있음
+    'gunicorn': lambda port, workers: [sys.executable, '-m', 'gunicorn', 'gamestats.wsgi', '-w', str(workers),
+                                       '-b', f'127.0.0.1:{port}', '--access-logfile', '-'],
+}
+READY_TIMEOUT = 30.0
+
+
+class Command(BaseCommand):
+    help = 'asyncio HTTP 클라이언트로 API 라우트 혼합 부하 또는 접근 로그 재생을 실행하고 처리량/지연/오류를 기록합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default=None, help='대상 서버 (기본 http://127.0.0.1:8000, --start-server면 자동)')
+        parser.add_argument('--start-server', choices=sorted(SERVER_COMMANDS), help='측정용 서버를 직접 띄움')
+        parser.add_argument('--port', type=int, default=8765, help='--start-server 포트')
+        parser.add_argument('--server-workers', type=int, default=4, help='gunicorn 워커 수')
+        parser.add_argument('--mix', default='all',
+                            help=f'라우트 mix ({", ".join(loadtest.MIXES)} 또는 "user-list=2,stats-cube=1")')
+        parser.add_argument('--concurrency', type=int, default=16, help='동시 요청 수 (closed loop)')
+        parser.add_argument('--rps', type=float, default=None, help='목표 초당 요청 수 (open loop)')
+        parser.add_argument('--duration', type=float, default=10.0, help='측정 시간(초)')
+        parser.add_argument('--requests', type=int, default=None, help='요청 수 (closed loop, duration 대신)')
+        parser.add_argument('--replay', default=None, help='재생할 접근 로그 파일 (runserver/combined 형식)')
+        parser.add_argument('--speed', type=float, default=1.0, help='재생 배속')
+        parser.add_argument('--seed', type=int, default=0, help='요청 생성 시드')
+        parser.add_argument('--label', default='', help='결과 파일 이름에 붙일 설명')
+        parser.add_argument('--output-dir', default='benchmark_results', help='결과 저장 디렉터리')
+        parser.add_argument('--compare', default=None, help='비교할 이전 결과 JSON')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency는 1 이상이어야 합니다.')
+
+        plan, description = self.build_plan(options)
+        server, log_file = None, None
+        base_url = options['base_url'] or 'http://127.0.0.1:8000'
+        if options['start_server']:
+            base_url = f'http://127.0.0.1:{options["port"]}'
+            server, log_file = self.start_server(options, base_url)
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'부하 테스트: {description} → {base_url}'))
+        self.stdout.write('=' * 80)
+
+        try:
+            start_time = time.perf_counter()
+            if plan is None:
+                samples = asyncio.run(loadtest.run_closed(
+                    base_url, loadtest.MixGenerator(loadtest.parse_mix(options['mix']), options['seed']),
+                    options['concurrency'], duration=None if options['requests'] else options['duration'],
+                    total=options['requests'],
+                ))
+            else:
+                samples = asyncio.run(loadtest.run_open(base_url, plan))
+            elapsed = time.perf_counter() - start_time
+        finally:
+            server_locks = self.stop_server(server, log_file)
+
+        if not samples:
+            raise CommandError('보낸 요청이 없습니다.')
+        rows = loadtest.summarize(samples, elapsed)
+        self.print_rows(rows, elapsed, server_locks)
+
+        run = {
+            'label': options['label'], 'description': description, 'base_url': base_url,
+            'server': options['start_server'] or '', 'elapsed_seconds': round(elapsed, 3),
+            'server_lock_errors': '' if server_locks is None else server_locks,
+        }
+        name = f'loadtest_{timezone.now():%Y%m%d_%H%M%S}' + (f'_{options["label"]}' if options['label'] else '')
+        _, json_path = write_results([{**run, **row} for row in rows], options['output_dir'], name)
+        self.stdout.write(self.style.SUCCESS(f'\n결과 저장: {json_path}'))
+
+        if options['compare']:
+            self.print_comparison(rows, options['compare'])
+
+    def build_plan(self, options):
+        """(Planned 리스트 또는 closed loop면 None, 설명)"""
+        if options['replay']:
+            lines = Path(options['replay']).read_text(encoding='utf-8', errors='replace').splitlines()
+            plan, skipped = loadtest.replay_plan(lines, speed=options['speed'])
+            if not plan:
+                raise CommandError(f'{options["replay"]}에서 재생할 GET /api/ 요청을 찾지 못했습니다.')
+            return plan, (f'로그 재생 {len(plan)}건 (건너뜀 {skipped}줄), '
+                          f'{plan[-1].offset:.1f}초, {options["speed"]}배속')
+
+        try:
+            generator = loadtest.MixGenerator(loadtest.parse_mix(options['mix']), options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['rps']:
+            plan = loadtest.rate_plan(generator, options['rps'], options['duration'])
+            return plan, f'mix={options["mix"]}, 목표 {options["rps"]} RPS × {options["duration"]}초'
+        amount = f'{options["requests"]}건' if options['requests'] else f'{options["duration"]}초'
+        return None, f'mix={options["mix"]}, 동시성 {options["concurrency"]}, {amount}'
+
+    def start_server(self, options, base_url):
+        log_file = tempfile.NamedTemporaryFile('w+', prefix='loadtest-server-', suffix='.log', delete=False)
+        command = SERVER_COMMANDS[options['start_server']](options['port'], options['server_workers'])
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=log_file, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log_file.seek(0)
+                raise CommandError(f'서버가 종료되었습니다:\n{log_file.read()[-2000:]}')
+            try:
+                if httpx.get(f'{base_url}/api/', timeout=1.0).status_code == 200:
+                    self.stdout.write(f'서버 시작: {" ".join(command)} (로그: {log_file.name})')
+                    return server, log_file
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'서버가 {READY_TIMEOUT:.0f}초 안에 응답하지 않습니다.')
+
+    def stop_server(self, server, log_file):
+        """서버 종료 후 로그의 SQLite 잠금 오류 수 (직접 띄운 서버가 아니면 None)"""
+        if server is None:
+            return None
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        log_file.seek(0)
+        return loadtest.count_lock_errors(log_file.read())
+
+    def print_rows(self, rows, elapsed, server_locks):
+        self.stdout.write(f'\n{"라우트":<26} {"요청":>6} {"RPS":>8} {"오류율":>7} {"잠금":>5} '
+                          f'{"p50":>8} {"p95":>8} {"p99":>8} {"최대":>8} (ms)')
+        self.stdout.write('-' * 80)
+        for row in rows[1:] + rows[:1]:
+            line = (f'{row["route"]:<26} {row["requests"]:>6} {row["rps"]:>8.1f} {row["error_rate"]:>7.1%} '
+                    f'{row["locked"]:>5} {row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f} '
+                    f'{row["max_ms"]:>8.1f}')
+            self.stdout.write(self.style.HTTP_INFO(line) if row['route'] == 'ALL' else line)
+        self.stdout.write('-' * 80)
+        total = rows[0]
+        style = self.style.SUCCESS if not total['errors'] else self.style.ERROR
+        self.stdout.write(style(f'실행시간: {elapsed:.2f}초, 처리량: {total["rps"]:.1f} RPS, '
+                                f'오류 {total["errors"]}건 ({total["error_rate"]:.2%})'))
+        if server_locks is not None:
+            self.stdout.write(f'서버 로그의 SQLite 잠금 오류: {server_locks}건')
+
+    def print_comparison(self, rows, path):
+        previous = json.loads(Path(path).read_text(encoding='utf-8'))
+        self.stdout.write(f'\n이전 결과와 비교: {path}')
+        self.stdout.write(f'{"라우트":<26} {"p95 이전":>10} {"p95 현재":>10} {"RPS 이전":>10} {"RPS 현재":>10}')
+        self.stdout.write('-' * 80)
+        for route, before_p95, after_p95, before_rps, after_rps in loadtest.compare(rows, previous):
+            style = self.style.ERROR if after_p95 > before_p95 * 1.2 else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{route:<26} {before_p95:>10.1f} {after_p95:>10.1f} {before_rps:>10.1f} {after_rps:>10.1f}'
+            ))
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import warming
+
+
+class Command(BaseCommand):
+    help = '대시보드 기본 파라미터 조합의 집계 API 응답을 미리 계산해 응답 캐시를 채웁니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='동시에 계산할 스레드 수')
+
+    def handle(self, *args, **options):
+        if not settings.RESPONSE_CACHE_SECONDS:
+            self.stdout.write(self.style.WARNING('RESPONSE_CACHE_SECONDS=0: 응답 캐시가 꺼져 있어 프로세스 캐시만 데웁니다.'))
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            self.stdout.write(self.style.WARNING(
+                '로컬 메모리 캐시는 이 프로세스에만 남습니다. 서버와 공유하려면 CACHE_URL을 설정하세요.'
+            ))
+
+        targets = warming.targets()
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'응답 캐시 예열: {len(targets)}개 요청, 스레드 {options["workers"]}개'))
+        self.stdout.write('=' * 80)
+
+        start_time = time.time()
+        results = warming.warm(workers=options['workers'], target_list=targets)
+        elapsed = time.time() - start_time
+        summary = warming.summarize(results)
+
+        self.stdout.write(f'\n{"엔드포인트":<28} {"요청":>6} {"성공":>6} {"새로 계산":>10} {"최장(초)":>10}')
+        self.stdout.write('-' * 80)
+        for name, entry in summary['endpoints'].items():
+            self.stdout.write(
+                f'{name:<28} {entry["requests"]:>6} {entry["ok"]:>6} {entry["computed"]:>10} {entry["slowest"]:>10.3f}'
+            )
+        self.stdout.write('-' * 80)
+        style = self.style.SUCCESS if summary['ok'] == summary['requests'] else self.style.ERROR
+        self.stdout.write(style(
+            f'예열 시간: {elapsed:.2f}초, 커버리지: {summary["ok"]}/{summary["requests"]} ({summary["coverage"]:.0%})'
+        ))
@@ -0,0 +1,69 @@
+"""API 요청 프로파일링 (stats/profiling.py)
+
+X-Profile 헤더나 ?profile=1이 붙은 요청을 Profile 안에서 실행하고 저장된 이름을 X-Profile 응답
+헤더로 돌려줍니다. 스태프 또는 INTERNAL_IPS에서 온 요청만 허용하고, 그 외에는 조용히 무시합니다.
+리버스 프록시 뒤에서는 모든 요청의 REMOTE_ADDR이 프록시(보통 127.0.0.1)라서, 프록시 전달 헤더가
+붙은 요청은 IP로 허용하지 않습니다. 전달 헤더를 붙이지 않는 프록시라면 PROFILE_STAFF_ONLY를 켜세요.
+프로파일링 요청은 응답 캐시를 건너뛰어 실제 계산을 측정합니다 (api/caching.py).
+/api/profiles/에서 최근 프로파일과 쿼리 로그를 보고 .prof 파일을 받습니다.
+"""
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+
+from stats import profiling
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_FLAG = 'profile'
+# 프록시를 거친 요청의 표시 — REMOTE_ADDR이 실제 클라이언트가 아님
+FORWARDED_HEADERS = ('HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP', 'HTTP_FORWARDED')
+
+
+def is_allowed(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    if settings.PROFILE_STAFF_ONLY or any(header in request.META for header in FORWARDED_HEADERS):
+        return False
+    return request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+
+
+def is_requested(request):
+    value = request.META.get(HEADER) or request.GET.get(QUERY_FLAG)
+    return value not in (None, '', '0', 'false')
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_requested(request) or not is_allowed(request):
+            return self.get_response(request)
+
+        request.profiling = True
+        with profiling.Profile(f'{request.method} {request.get_full_path()}', kind='request') as profile:
+            response = self.get_response(request)
+        summary = profile.summary
+        response['X-Profile'] = profile.name
+        print(f"프로파일 저장: {profile.name} (실행시간: {summary['elapsed']:.4f}초, "
+              f"최대 메모리: {summary['peak_memory'] / 1024:.0f}KB, 쿼리: {summary['query_count']}개)")
+        return response
+
+
+def profile_index(request):
+    """최근 프로파일 목록 (함수/할당/쿼리 로그 펼쳐 보기)"""
+    if not is_allowed(request):
+        raise Http404
+    return render(request, 'api/profiles.html', {
+        'profiles': profiling.recent(),
+        'directory': profiling.profile_dir(),
+    })
+
+
+def profile_download(request, name):
+    """pstats 원본 (.prof) 내려받기"""
+    path = profiling.prof_path(name) if is_allowed(request) else None
+    if path is None:
+        raise Http404
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
@@ -68,4 +68,20 @@ class GameUserDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = GameUser
         fields = ['id', 'nickname', 'level', 'tier', 'ranking_score', 'created_at', 'stats']
-        
\ No newline at end of file
+        
+
+class BatchPlayerStatsSerializer(PlayerStatsSerializer):
+    """사용 기록을 context에 미리 묶어 둔 dict(player_stats_id → 리스트)에서 읽음 (배치 상세 조회)"""
+    item_usages = serializers.SerializerMethodField()
+    skill_usages = serializers.SerializerMethodField()
+
+    def get_item_usages(self, obj):
+        return ItemUsageSerializer(self.context['item_usages'].get(obj.pk, []), many=True).data
+
+    def get_skill_usages(self, obj):
+        return SkillUsageSerializer(self.context['skill_usages'].get(obj.pk, []), many=True).data
+
+
+class BatchUserDetailSerializer(GameUserDetailSerializer):
+    """GameUserDetailSerializer와 같은 응답, 사용 기록은 context에서"""
+    stats = BatchPlayerStatsSerializer(read_only=True)
@@ -1,3 +1,552 @@
-from django.test import TestCase
+"""API 쿼리 예산 / 쿼리 플랜 회귀 테스트
 
-# Create your tests here.
+라우트마다 정확한 쿼리 수를 고정하고, 실행된 SQL마다 EXPLAIN QUERY PLAN을 떠서
+대형 테이블(유저/통계/사용 기록) 풀 스캔이 없는지, 필요한 인덱스를 타는지 확인합니다.
+새 라우트를 추가하면 ROUTES에 예산을 추가해야 test_every_route_has_budget이 통과합니다.
+"""
+import asyncio
+import json
+import re
+import tempfile
+import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from stats import datasets, impact, leaderboard, olap, profiling, quantiles, similarity, sketches, versions
+from stats.models import GameUser, Item, Skill
+
+from . import live, loadtest, warming
+from .urls import router
+
+DATASET_USERS = 3000
+
+BIG_TABLES = {'stats_gameuser', 'stats_playerstats', 'stats_itemusage', 'stats_skillusage'}
+
+RANKING_INDEX = 'stats_gameu_ranking_19f0d1_idx'
+TIER_INDEX = 'stats_gameu_tier_6820cd_idx'
+NICKNAME_INDEX = 'sqlite_autoindex_stats_gameuser_1'
+ITEM_USAGE_INDEX = 'stats_itemu_item_id_9e590e_idx'
+SKILL_USAGE_INDEX = 'stats_skill_skill_i_208399_idx'
+
+_SQL_KEYWORDS = {'ON', 'WHERE', 'LEFT', 'INNER', 'OUTER', 'JOIN', 'GROUP', 'ORDER', 'LIMIT', 'AS', 'USING'}
+_TABLE_ALIAS = re.compile(r'"?\b(stats_\w+)"?\s+(?:AS\s+)?"?([A-Za-z_]\w*)"?')
+_SCAN = re.compile(r'^SCAN (\S+)(?: USING (?:COVERING )?INDEX (\S+))?')
+
+
+@dataclass
+class Route:
+    """라우트 하나의 쿼리 예산"""
+    name: str
+    queries: int
+    # 문자열 값은 픽스처 값으로 format (예: '{nickname}')
+    params: dict = field(default_factory=dict)
+    # 'user' / 'item' / 'skill' — 상세 라우트의 pk
+    detail: str = None
+    # 플랜에 반드시 등장해야 하는 인덱스
+    indexes: tuple = ()
+    # 허용하는 인덱스 스캔 (LIMIT으로 끊기는 정렬 스캔, 의도된 전체 집계 등)
+    scans: tuple = ()
+
+
+ROUTES = [
+    # 목록: 정확한 COUNT(*) (랭킹 커버링 인덱스 스캔) + 랭킹 인덱스 순서 페이지
+    Route('user-list', 2, indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    Route('user-list', 2, params={'page': 3}, indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    # 상세: 유저+통계, 아이템 사용, 스킬 사용
+    Route('user-detail', 3, detail='user'),
+    # 배치 상세: 데이터 버전(유저별 캐시 키), 유저+통계, 아이템 사용, 스킬 사용 — 유저 수와 무관
+    Route('user-batch', 4, params={'ids': '{batch_ids}'}),
+    Route('user-top-rankers', 1, indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    Route('user-top-rankers', 1, params={'tier': 'GOLD', 'limit': 20}, scans=(RANKING_INDEX,)),
+    # 응답 캐시 대상 라우트는 데이터 버전 확인(캐시 키) 한 번이 더 듦
+    # 티어 전체 집계는 tier 인덱스 전체를 훑는 것이 정상
+    Route('user-tier-stats', 2, params={'source': 'sql'}, indexes=(TIER_INDEX,), scans=(TIER_INDEX,)),
+    Route('user-tier-stats', 2, params={'tier': 'GOLD', 'source': 'sql'}, indexes=(TIER_INDEX,)),
+    # OLAP 큐브: 데이터 버전 확인 한 번
+    Route('user-tier-stats', 1),
+    # 짧은 검색어: 접두어 범위 스캔, LIKE (랭킹 순으로 훑다가 limit에서 멈춤), 닉네임 조회, 유저 조회
+    Route('user-search', 4, params={'q': '{nickname:.2}'}, indexes=(NICKNAME_INDEX,), scans=(RANKING_INDEX,)),
+    # 접두어 + FTS 구문 검색으로 limit이 채워지면 오타 허용 검색은 생략
+    Route('user-search', 4, params={'q': '{nickname}', 'limit': 1}, indexes=(NICKNAME_INDEX,)),
+    # 페이지, 스냅샷 pk, 스냅샷 로드
+    Route('user-rank-changes', 3, params={'limit': 50}, indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    # 현재/이전 스냅샷 pk + 로드, 유저 정보
+    Route('user-rank-movers', 5, params={'limit': 10}),
+    # 비슷한 유저: 데이터 버전(인덱스 확인), 이웃 유저+통계 — 검색 자체는 메모리 행렬
+    Route('user-similar', 2, detail='user'),
+    Route('user-similar', 2, detail='user', params={'k': 5, 'metric': 'l2', 'tier': 'same'}),
+    Route('item-list', 2),
+    Route('item-detail', 1, detail='item'),
+    Route('item-popular-items', 2, params={'source': 'sql'}, indexes=(ITEM_USAGE_INDEX,)),
+    Route('item-popular-items', 2, params={'tier': 'GOLD', 'type': 'WEAPON', 'source': 'sql'}, indexes=(TIER_INDEX,)),
+    Route('item-popular-items', 1, params={'tier': 'GOLD', 'type': 'WEAPON'}),
+    # 근사 모드: 데이터 버전, 스케치 한 행, 아이템 목록 (이후 요청은 프로세스 캐시)
+    Route('item-popular-items', 3, params={'tier': 'GOLD', 'approx': 1}),
+    # 영향 분석: 데이터 버전 확인 한 번 (배열은 버전별 캐시)
+    Route('item-impact', 1, params={'tier': 'GOLD', 'min_users': 10}),
+    Route('skill-list', 2),
+    Route('skill-detail', 1, detail='skill'),
+    Route('skill-popular-skills', 2, params={'source': 'sql'}, indexes=(SKILL_USAGE_INDEX,)),
+    Route('skill-popular-skills', 2, params={'tier': 'GOLD', 'source': 'sql'}, indexes=(TIER_INDEX,)),
+    Route('skill-popular-skills', 1),
+    Route('skill-popular-skills', 3, params={'approx': 1}),
+    Route('skill-impact', 1, params={'order_by': '-usage_weighted_level'}),
+    # 데이터 버전, 점수 컷은 분위수 스케치 한 행, 유저 수는 COUNT(*), 본 쿼리는 상위 N명 서브쿼리에서 출발
+    Route('stats-top-players-items', 4, indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    Route('stats-top-players-skills', 4, indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    # 집계 엔진: 필요한 조인만 붙인 쿼리 한 번 (+ 데이터 버전)
+    Route('stats-usage', 2, indexes=(ITEM_USAGE_INDEX,)),
+    Route('stats-usage', 2, params={'entity': 'skill', 'tier': 'GOLD,DIAMOND', 'metric': 'users',
+                                    'group_by': 'tier,type'}, indexes=(TIER_INDEX,)),
+    Route('stats-usage', 2, params={'top_count': 100, 'metric': 'avg_per_user', 'group_by': 'type'},
+          indexes=(RANKING_INDEX,), scans=(RANKING_INDEX,)),
+    Route('stats-cube', 1, params={'entity': 'skill', 'tier': 'GOLD', 'type': 'ACTIVE'}),
+    # 스케치 한 행 (이후 요청은 프로세스 캐시)
+    Route('stats-percentiles', 1),
+    Route('stats-percentiles', 1, params={'metric': 'win_rate', 'tier': 'GOLD', 'q': '0.5', 'value': '50'}),
+]
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # 캐시된 데이터셋 파일을 테스트 DB에 복사 (행 삽입 없이), 클래스가 끝나면 원래 테스트 DB로
+        cls.enterClassContext(datasets.loaded(DATASET_USERS, seed=1))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        today = timezone.localdate()
+        leaderboard.take_snapshot(today - timedelta(days=1))
+        # 하루 사이 순위 변동
+        for user in GameUser.objects.order_by('id')[:200]:
+            user.ranking_score += (user.id * 37) % 900
+            user.save(update_fields=['ranking_score'])
+        leaderboard.take_snapshot(today)
+        sketches.rebuild_topk('item')
+        sketches.rebuild_topk('skill')
+        quantiles.rebuild_quantiles()
+        olap.reload()
+        similarity.reload()
+        impact.get_table('item')
+        impact.get_table('skill')
+
+        cls.pks = {
+            'user': GameUser.objects.order_by('id').values_list('id', flat=True).first(),
+            'item': Item.objects.order_by('id').values_list('id', flat=True).first(),
+            'skill': Skill.objects.order_by('id').values_list('id', flat=True).first(),
+        }
+        cls.batch_ids = list(GameUser.objects.order_by('-ranking_score').values_list('id', flat=True)[:200])
+        cls.fixture_values = {
+            'nickname': GameUser.objects.get(pk=cls.pks['user']).nickname,
+            'batch_ids': ','.join(map(str, cls.batch_ids)),
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def explain(self, sql, params):
+        """EXPLAIN QUERY PLAN → detail 문자열 리스트"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    @staticmethod
+    def aliases(sql):
+        """SQL 안의 별칭 → 테이블 이름"""
+        mapping = {}
+        for table, alias in _TABLE_ALIAS.findall(sql):
+            mapping[table] = table
+            if alias.upper() not in _SQL_KEYWORDS:
+                mapping[alias] = table
+        return mapping
+
+    def check_route(self, route):
+        kwargs = {'pk': self.pks[route.detail]} if route.detail else {}
+        url = reverse(route.name, kwargs=kwargs)
+        params = {
+            key: value.format(**self.fixture_values) if isinstance(value, str) else value
+            for key, value in route.params.items()
+        }
+
+        # 프로세스 캐시가 쿼리 수에 영향을 주지 않도록 매번 비움
+        leaderboard.clear_cache()
+        sketches.clear_cache()
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content[:200])
+
+        statements = [query['sql'] for query in captured.captured_queries]
+        self.assertEqual(
+            len(statements), route.queries,
+            f'{url} {params}: 쿼리 {len(statements)}개 (예산 {route.queries})\n' + '\n'.join(statements),
+        )
+
+        details = []
+        for query in captured.captured_queries:
+            # captured SQL은 파라미터가 치환된 문자열이므로 그대로 EXPLAIN
+            plan = self.explain(query['sql'], None)
+            tables = self.aliases(query['sql'])
+            for detail in plan:
+                match = _SCAN.match(detail)
+                if not match:
+                    continue
+                table = tables.get(match.group(1), match.group(1))
+                if table not in BIG_TABLES:
+                    continue
+                index = match.group(2)
+                self.assertIsNotNone(index, f'{url}: {table} 풀 스캔\n{query["sql"]}\n{plan}')
+                self.assertIn(index, route.scans, f'{url}: 허용되지 않은 인덱스 스캔 {detail}\n{query["sql"]}')
+            details += plan
+
+        for index in route.indexes:
+            self.assertTrue(
+                any(index in detail for detail in details),
+                f'{url} {params}: {index} 미사용\n' + '\n'.join(details),
+            )
+
+    def test_query_budgets(self):
+        for route in ROUTES:
+            with self.subTest(route=route.name, params=route.params):
+                self.check_route(route)
+
+    def test_every_route_has_budget(self):
+        names = {url.name for url in router.urls if url.name and url.name != 'api-root'}
+        self.assertEqual(names - {route.name for route in ROUTES}, set())
+
+    def test_cached_response_skips_queries(self):
+        cache.clear()
+        url = reverse('item-popular-items')
+        self.assertEqual(self.client.get(url, {'source': 'sql'})['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {'source': 'sql'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(captured), 0)
+
+    def test_matching_etag_returns_not_modified(self):
+        cache.clear()
+        url = reverse('item-popular-items')
+        etag = self.client.get(url, {'tier': 'GOLD'})['ETag']
+        self.assertEqual(self.client.get(url, {'tier': 'GOLD'})['ETag'], etag)
+        self.assertNotEqual(self.client.get(url, {'tier': 'SILVER'})['ETag'], etag)
+
+        response = self.client.get(url, {'tier': 'GOLD'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        # 데이터가 바뀌면 새 ETag
+        versions.bump(versions.USAGE)
+        self.assertEqual(self.client.get(url, {'tier': 'GOLD'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_batch_matches_user_detail(self):
+        cache.clear()
+        ids = self.batch_ids[:5] + [0]
+        response = self.client.post(reverse('user-batch'), {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['not_found'], [0])
+        self.assertEqual([row['id'] for row in response.data['results']], ids[:5])
+        for row in response.data['results'][:2]:
+            self.assertEqual(row, self.client.get(reverse('user-detail', kwargs={'pk': row['id']})).data)
+
+        # 유저별 응답 캐시: 데이터 버전 확인만 (없는 id는 캐시하지 않음)
+        sketches.clear_cache()
+        with self.assertNumQueries(1):
+            cached = self.client.get(reverse('user-batch'), {'ids': ','.join(map(str, ids[:5]))})
+        self.assertEqual(cached.data['results'], response.data['results'])
+
+        too_many = self.client.post(reverse('user-batch'), {'ids': list(range(501))}, format='json')
+        self.assertEqual(too_many.status_code, 400)
+        self.assertEqual(self.client.get(reverse('user-batch'), {'ids': '1,x'}).status_code, 400)
+
+    def test_warm_caches_fills_response_cache(self):
+        cache.clear()
+        summary = warming.summarize(warming.warm(workers=1))
+        self.assertEqual(summary['coverage'], 1.0)
+        self.assertEqual(summary['requests'], len(warming.targets()))
+
+        response = self.client.get(reverse('skill-popular-skills'), {'tier': 'GOLD', 'type': 'ACTIVE'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.client.get(reverse('stats-top-players-items'), {'top_percent': 5})
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_startup_warmup_only_in_server_processes(self):
+        with override_settings(WARM_CACHES_ON_STARTUP=True):
+            self.assertFalse(warming.should_warm_on_startup(['manage.py', 'migrate']))
+            self.assertTrue(warming.should_warm_on_startup(['gunicorn', 'gamestats.wsgi']))
+        self.assertFalse(warming.should_warm_on_startup(['gunicorn', 'gamestats.wsgi']))
+
+    def test_api_root_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('api-root'))
+        self.assertEqual(response.status_code, 200)
+
+
+class InputValidationTests(TestCase):
+    """잘못된 쿼리 파라미터는 500이 아니라 400"""
+
+    def test_unknown_tier_is_rejected(self):
+        response = self.client.get(reverse('user-rank-changes'), {'tier': 'FOO'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rank_params_are_rejected(self):
+        for name, params in [('user-rank-changes', {'limit': 'x'}), ('user-rank-changes', {'offset': -1}),
+                             ('user-rank-changes', {'days': 'x'}), ('user-rank-movers', {'limit': 'x'}),
+                             ('user-rank-movers', {'days': -1})]:
+            self.assertEqual(self.client.get(reverse(name), params).status_code, 400, (name, params))
+        # limit은 범위 안으로
+        self.assertEqual(self.client.get(reverse('user-rank-changes'), {'limit': -5}).status_code, 200)
+
+    def test_rank_changes_pages_tied_scores_like_snapshot(self):
+        users = [GameUser.objects.create(nickname=f'tie{i}', level=1, tier='GOLD', ranking_score=50) for i in range(6)]
+        leaderboard.take_snapshot(timezone.localdate() - timedelta(days=1))
+        leaderboard.clear_cache()
+        pages = [self.client.get(reverse('user-rank-changes'), {'limit': 2, 'offset': offset}).json()['results']
+                 for offset in (0, 2, 4)]
+        rows = [row for page in pages for row in page]
+        self.assertEqual([row['id'] for row in rows], [user.id for user in users])
+        self.assertEqual({row['rank_change'] for row in rows}, {0})
+
+    def test_popular_unknown_tier_is_empty_on_every_path(self):
+        Item.objects.create(name='검증 검', item_type='WEAPON')
+        Skill.objects.create(name='검증 스킬', skill_type='ACTIVE')
+        olap.reload()
+        self.addCleanup(olap.clear)
+        for name in ('item-popular-items', 'skill-popular-skills'):
+            for params in ({}, {'approx': 1}, {'source': 'sql'}):
+                response = self.client.get(reverse(name), {'tier': 'FOO', **params})
+                self.assertEqual((response.status_code, response.data), (200, []), (name, params))
+
+    def test_search_limit_is_validated(self):
+        GameUser.objects.create(nickname='limitcheck', level=1, tier='GOLD', ranking_score=0)
+        for limit in ('x', 0, -3):
+            self.assertEqual(self.client.get(reverse('user-search'), {'q': 'limit', 'limit': limit}).status_code,
+                             400, limit)
+        response = self.client.get(reverse('user-search'), {'q': 'limit', 'limit': 5000})
+        self.assertEqual((response.status_code, len(response.data)), (200, 1))
+
+    def test_usage_bad_integers_are_rejected(self):
+        for params in ({'level_min': '--5'}, {'limit': 0}, {'limit': 'x'}, {'top_count': '1.5'}):
+            self.assertEqual(self.client.get(reverse('stats-usage'), params).status_code, 400, params)
+
+    def test_popular_limit_out_of_range_is_rejected(self):
+        for name in ('item-popular-items', 'skill-popular-skills'):
+            for params in ({'limit': 0}, {'limit': 5000}, {'limit': 'x'}, {'limit': 0, 'source': 'sql'}):
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 400, (name, params))
+            self.assertEqual(self.client.get(reverse(name), {'limit': 5, 'source': 'sql'}).status_code, 200)
+
+
+class UserListPaginationTests(TestCase):
+    def test_count_is_exact_with_id_gaps(self):
+        users = [GameUser.objects.create(nickname=f'page{i}', level=1, tier='GOLD', ranking_score=i) for i in range(25)]
+        GameUser.objects.filter(id__in=[user.id for user in users[5:10]]).delete()
+
+        response = self.client.get(reverse('user-list'), {'page': 1})
+        self.assertEqual(response.data['count'], 20)
+        self.assertIsNone(response.data['next'])
+
+
+class TopPlayersTests(TestCase):
+    def test_top_count_uses_exact_user_count(self):
+        GameUser.objects.bulk_create([GameUser(nickname=f'top{i}', level=1, tier='GOLD', ranking_score=i) for i in range(10)])
+        quantiles.rebuild_quantiles()
+        sketches.clear_cache()
+        # 신호 없는 대량 추가 뒤에도 스케치 count가 아닌 실제 유저 수로
+        GameUser.objects.bulk_create([GameUser(nickname=f'new{i}', level=1, tier='GOLD', ranking_score=0) for i in range(30)])
+
+        cache.clear()
+        response = self.client.get(reverse('stats-top-players-items'), {'top_percent': 50})
+        self.assertEqual(response.data['top_user_count'], 20)
+        self.assertIsNotNone(response.data['score_cutoff'])
+
+
+class LoadTestPlanTests(SimpleTestCase):
+    def test_replay_keeps_original_timing(self):
+        lines = [
+            '[19/Oct/2026 12:54:01] "GET /api/users/tier_stats/ HTTP/1.1" 200 812',
+            '[19/Oct/2026 12:54:01] "GET /api/items/popular_items/?tier=GOLD HTTP/1.1" 200 90',
+            '127.0.0.1 - - [19/Oct/2026:12:54:03 +0000] "GET /api/users/?page=2 HTTP/1.1" 200 1234 "-" "curl"',
+            '[19/Oct/2026 12:54:03] "POST /api/users/batch/ HTTP/1.1" 200 812',
+            'garbage',
+        ]
+        plan, skipped = loadtest.replay_plan(lines, speed=2.0)
+        self.assertEqual(skipped, 2)
+        self.assertEqual([(planned.label, planned.offset) for planned in plan],
+                         [('user-tier-stats', 0.0), ('item-popular-items', 0.25), ('user-list', 1.0)])
+
+    def test_summarize_reports_percentiles_and_errors(self):
+        samples = [loadtest.Sample('user-list', 200, seconds / 1000) for seconds in range(1, 101)]
+        samples.append(loadtest.Sample('user-list', 500, 0.5, locked=True))
+        total, route = loadtest.summarize(samples, elapsed=2.0)
+        self.assertEqual((total['route'], route['route']), ('ALL', 'user-list'))
+        self.assertEqual((route['requests'], route['errors'], route['locked']), (101, 1, 1))
+        self.assertEqual(route['rps'], 50.5)
+        self.assertEqual(route['p50_ms'], 51.0)
+
+
+class LoadTestMixTests(TestCase):
+    def test_same_seed_replays_same_mix(self):
+        GameUser.objects.bulk_create([GameUser(nickname=f'mix{i}', level=1, tier='GOLD', ranking_score=i) for i in range(45)])
+        mix = {'user-detail': 1, 'user-search': 1, 'user-batch': 1, 'user-list': 1}
+
+        def paths(seed):
+            generator = iter(loadtest.MixGenerator(mix, seed=seed))
+            return [next(generator).path for _ in range(50)]
+
+        self.assertEqual(paths(7), paths(7))
+        self.assertNotEqual(paths(7), paths(8))
+
+    def test_user_list_pages_stay_in_range(self):
+        GameUser.objects.bulk_create([GameUser(nickname=f'mix{i}', level=1, tier='GOLD', ranking_score=i) for i in range(45)])
+        generator = iter(loadtest.MixGenerator({'user-list': 1}, seed=0))
+        pages = {int(next(generator).path.rsplit('=', 1)[1]) for _ in range(100)}
+        self.assertEqual(pages, {1, 2, 3})
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_override = override_settings(PROFILE_DIR=directory.name, RESPONSE_CACHE_SECONDS=300)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(cache.clear)
+        Item.objects.create(name='프로파일 단검', item_type='WEAPON')
+
+    def test_local_request_is_profiled_and_listed(self):
+        url = reverse('item-popular-items')
+        # 캐시된 응답이 있어도 프로파일링 요청은 실제로 계산
+        self.client.get(url)
+        self.assertNotIn('X-Cache', self.client.get(url, {'profile': '1'}))
+
+        response = self.client.get(reverse('item-list'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile']
+        summary = json.loads((Path(settings.PROFILE_DIR) / f'{name}.json').read_text())
+        self.assertEqual(summary['kind'], 'request')
+        self.assertGreater(summary['query_count'], 0)
+        self.assertTrue(summary['functions'] and summary['queries'])
+
+        index = self.client.get(reverse('profile-index'))
+        self.assertContains(index, name)
+        self.assertContains(index, 'stats_item')
+        download = self.client.get(reverse('profile-download', kwargs={'name': name}))
+        self.assertEqual(download.status_code, 200)
+
+    def test_remote_request_is_not_profiled(self):
+        with override_settings(INTERNAL_IPS=[]):
+            response = self.client.get(reverse('item-popular-items'), HTTP_X_PROFILE='1')
+            self.assertNotIn('X-Profile', response)
+            self.assertEqual(self.client.get(reverse('profile-index')).status_code, 404)
+        self.assertEqual(self.client.get(reverse('profile-download', kwargs={'name': '..'})).status_code, 404)
+
+    def test_proxied_request_needs_staff(self):
+        url = reverse('item-popular-items')
+        # 프록시 뒤에서는 REMOTE_ADDR이 127.0.0.1이어도 실제 클라이언트가 아님
+        self.assertNotIn('X-Profile', self.client.get(url, HTTP_X_PROFILE='1', HTTP_X_FORWARDED_FOR='203.0.113.7'))
+        with override_settings(PROFILE_STAFF_ONLY=True):
+            self.assertNotIn('X-Profile', self.client.get(url, HTTP_X_PROFILE='1'))
+            self.assertEqual(self.client.get(reverse('profile-index')).status_code, 404)
+            self.client.force_login(User.objects.create_user('profiler', is_staff=True))
+            self.assertIn('X-Profile', self.client.get(url, HTTP_X_PROFILE='1', HTTP_X_FORWARDED_FOR='203.0.113.7'))
+
+    def test_overlapping_profiles_share_tracemalloc(self):
+        # 먼저 시작한 프로파일이 먼저 끝나도 나중 프로파일의 스냅샷이 실패하지 않음
+        entered, first_done, errors = threading.Event(), threading.Event(), []
+
+        def second():
+            try:
+                with profiling.Profile('second'):
+                    entered.set()
+                    first_done.wait(5)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=second)
+        with profiling.Profile('first'):
+            thread.start()
+            self.assertTrue(entered.wait(5))
+        first_done.set()
+        thread.join(5)
+        self.assertEqual(errors, [])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_old_profiles_are_pruned(self):
+        with override_settings(PROFILE_KEEP=2):
+            names = []
+            for i in range(3):
+                with profiling.Profile(f'prune {i}', kind='command') as profile:
+                    pass
+                names.append(profile.name)
+        directory = Path(settings.PROFILE_DIR)
+        self.assertEqual(sorted(path.name for path in directory.iterdir()),
+                         sorted(f'{name}{suffix}' for name in names[1:] for suffix in ('.json', '.prof')))
+
+
+class LiveLeaderboardTests(TestCase):
+    def setUp(self):
+        self.users = [GameUser.objects.create(nickname=f'live{i}', level=10, tier='GOLD', ranking_score=100 - i * 10)
+                      for i in range(4)]
+
+    def promote(self, user, score):
+        user.ranking_score = score
+        user.save(update_fields=['ranking_score'])
+
+    def test_feed_diff_and_resume(self):
+        feed = live.LeaderboardFeed(None, 3)
+        self.assertIsNone(feed.refresh())
+        first_id = feed.event_id()
+        snapshot = json.loads(feed.snapshot()[1].decode().split('data: ', 1)[1])
+        self.assertEqual([user['nickname'] for user in snapshot['users']], ['live0', 'live1', 'live2'])
+        # 데이터 버전이 그대로면 상위 N을 다시 읽지 않음
+        with self.assertNumQueries(1):
+            self.assertIsNone(feed.refresh())
+
+        self.promote(self.users[3], 95)
+        sequence, event = feed.refresh()
+        diff = json.loads(event.decode().split('data: ', 1)[1])
+        self.assertEqual([user['id'] for user in diff['entered']], [self.users[3].id])
+        self.assertEqual(diff['entered'][0]['rank'], 2)
+        self.assertEqual(diff['exited'], [self.users[2].id])
+        self.assertEqual(diff['moved'], [[self.users[1].id, 3]])
+        self.assertEqual(diff['updated'], [])
+
+        self.assertEqual(feed.replay(first_id), [(sequence, event)])
+        self.assertEqual(feed.replay(feed.event_id()), [])
+        self.assertIsNone(feed.replay(f'other:{sequence}'))
+        self.assertIsNone(feed.replay(None))
+
+    def test_wsgi_request_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('live-leaderboard')).status_code, 501)
+
+    async def test_stream_sends_snapshot_then_diff(self):
+        response = await self.async_client.get(reverse('live-leaderboard'), {'tier': 'GOLD', 'limit': 2})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+            self.assertIn(b'event: snapshot', await anext(chunks))
+            await sync_to_async(self.promote)(self.users[2], 200)
+            diff = await asyncio.wait_for(anext(chunks), 5)
+            self.assertIn(b'event: diff', diff)
+            self.assertIn(b'"entered":[{"id":%d' % self.users[2].id, diff)
+        finally:
+            await chunks.aclose()
+            await live.shutdown()
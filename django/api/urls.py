@@ -1,5 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .live import leaderboard_stream
+from .profiling import profile_download, profile_index
 from .views import GameUserViewSet, ItemViewSet, SkillViewSet, StatsViewSet
 
 router = DefaultRouter()
@@ -9,5 +11,8 @@ router.register('skills', SkillViewSet, basename='skill')
 router.register('stats', StatsViewSet, basename='stats')
 
 urlpatterns = [
+    path('live/leaderboard/', leaderboard_stream, name='live-leaderboard'),
+    path('profiles/', profile_index, name='profile-index'),
+    path('profiles/<str:name>.prof', profile_download, name='profile-download'),
     path('', include(router.urls)),
 ]
@@ -1,10 +1,14 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Avg, Q
-from django.db import connection
+from django.db.models import Count, Avg, Q, Prefetch
 from stats.models import GameUser, PlayerStats, Item, Skill, ItemUsage, SkillUsage
+from stats import (aggregation, archive, impact, leaderboard, olap, packed, quantiles, queries, sharding, similarity,
+                   sketches)
+from stats.search import search_user_ids
+from .caching import cache_response, get_payloads, set_payloads
 from .serializers import(
+    BatchUserDetailSerializer,
     GameUserSerializer,
     GameUserDetailSerializer,
     ItemSerializer,
@@ -12,20 +16,190 @@ from .serializers import(
     PlayerStatsSerializer
 )
 import time
+from datetime import timedelta
+
+BATCH_LIMIT = 500
+# 순위 변동 API 한 번에 돌려주는 최대 유저 수
+RANK_LIMIT = 500
+
+
+def impact_response(entity, request):
+    """아이템/스킬 승률·레벨 영향 분석 응답 (ItemViewSet/SkillViewSet.impact 공용)"""
+    start = time.time()
+    tier = request.query_params.get('tier', None)
+    order_by = request.query_params.get('order_by', '-lift')
+    try:
+        min_users = int(request.query_params.get('min_users', 30))
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({'detail': 'min_users와 limit은 정수여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+    if tier and tier != 'ALL' and tier not in impact.TIERS:
+        return Response({'detail': f'알 수 없는 티어: {tier}'}, status=status.HTTP_400_BAD_REQUEST)
+    if order_by.lstrip('-') not in impact.ORDER_FIELDS:
+        return Response({'detail': f'order_by는 {", ".join(impact.ORDER_FIELDS)} 중 하나여야 합니다.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    data = impact.get_table(entity).rows(tier, min_users=min_users, order_by=order_by, limit=limit)
+
+    elapsed = time.time() - start
+    print(f"{entity} impact 실행시간: {elapsed:.3f}초, 결과: {len(data['results'])}개")
+    return Response(data)
+
+
+def parse_limit(request, default=10):
+    """limit 쿼리 파라미터 → 1~aggregation.MAX_LIMIT 정수 (벗어나면 AggregationError, API에서 400)"""
+    value = request.query_params.get('limit', default)
+    if not str(value).isdigit() or not 1 <= int(value) <= aggregation.MAX_LIMIT:
+        raise aggregation.AggregationError(f'limit은 1~{aggregation.MAX_LIMIT} 사이의 정수여야 합니다.')
+    return int(value)
+
+
+def parse_int(request, name, default, minimum=None):
+    """정수 쿼리 파라미터 (정수가 아니거나 minimum보다 작으면 ValueError, API에서 400)"""
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise ValueError(f'{name}은 정수여야 합니다.')
+    if minimum is not None and value < minimum:
+        raise ValueError(f'{name}은 {minimum} 이상이어야 합니다.')
+    return value
+
+
+def parse_ids(values):
+    """['1,2', '3', 4] → 중복 제거된 정수 id 리스트 (입력 순서 유지, 잘못된 값은 ValueError)"""
+    ids = []
+    for value in values:
+        parts = value.split(',') if isinstance(value, str) else [value]
+        ids += [int(part) for part in parts if str(part).strip()]
+    return list(dict.fromkeys(ids))
+
+
+def usages_by_stats(model, related, stats_ids):
+    """player_stats_id별 사용 기록 리스트 — 샤드(또는 default)당 쿼리 한 번"""
+    by_alias = {}
+    for stats_id in stats_ids:
+        by_alias.setdefault(sharding.shard_for(stats_id), []).append(stats_id)
+
+    grouped = {}
+    for alias, ids in by_alias.items():
+        queryset = model.objects.using(alias).filter(player_stats_id__in=ids).select_related(related).order_by('id')
+        for usage in queryset:
+            grouped.setdefault(usage.player_stats_id, []).append(usage)
+    return grouped
+
+
+def add_stored_usages(stats_list, context):
+    """보관(archive)/사용량 벡터(packed)로 저장된 사용 기록을 context의 유저별 리스트로
+
+    한 유저의 사용 기록은 행, 벡터, 보관 중 한 곳에만 있으므로 그대로 채움.
+    stats_list는 archived_usage, packed_usage를 select_related로 읽어 둔 PlayerStats
+    """
+    stored = []
+    for player_stats in stats_list:
+        if hasattr(player_stats, 'archived_usage'):
+            stored.append((player_stats.pk, archive.archived_usage_objects, player_stats.archived_usage))
+        if hasattr(player_stats, 'packed_usage'):
+            stored.append((player_stats.pk, packed.usage_objects, player_stats.packed_usage))
+    if not stored:
+        return
+    items, skills = Item.objects.in_bulk(), Skill.objects.in_bulk()
+    for stats_id, to_objects, value in stored:
+        item_usages, skill_usages = to_objects(value, items, skills)
+        context['item_usages'][stats_id] = item_usages
+        context['skill_usages'][stats_id] = skill_usages
 
 
 # Create your views here.
 class GameUserViewSet(viewsets.ReadOnlyModelViewSet):
     """게임 유저 API"""
-    queryset = GameUser.objects.all()
+    queryset = GameUser.objects.select_related('stats')
     serializer_class = GameUserSerializer
 
+    def get_queryset(self):
+        """상세 조회시 사용 기록까지 한 번에 로드 (N+1 방지)"""
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('stats__archived_usage', 'stats__packed_usage').prefetch_related(
+                Prefetch('stats__item_usages', queryset=ItemUsage.objects.select_related('item')),
+                Prefetch('stats__skill_usages', queryset=SkillUsage.objects.select_related('skill')),
+            )
+        return queryset
+
     def get_serializer_class(self):
         """상세 조회시 다른 Serializer 사용"""
         if self.action == 'retrieve':
             return GameUserDetailSerializer
         return GameUserSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        """상세 조회 — 보관된(비활성) 유저면 사용 기록을 복원한 뒤 다시 로드
+
+        사용량 벡터(packed)로 저장된 유저는 벡터를 같은 응답 형태로 풀어 보여 줌
+        """
+        user = self.get_object()
+        archived = getattr(getattr(user, 'stats', None), 'archived_usage', None)
+        if archived is not None:
+            restored = archive.rehydrate(archived)
+            print(f"보관 사용 기록 복원: user={user.pk}, {restored}행")
+            user = self.get_object()
+
+        stats = getattr(user, 'stats', None)
+        if getattr(stats, 'packed_usage', None) is None:
+            return Response(self.get_serializer(user).data)
+        context = {
+            **self.get_serializer_context(),
+            'item_usages': {stats.pk: list(stats.item_usages.all())},
+            'skill_usages': {stats.pk: list(stats.skill_usages.all())},
+        }
+        add_stored_usages([stats], context)
+        return Response(BatchUserDetailSerializer(user, context=context).data)
     
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """여러 유저 상세 한 번에 조회 (GET ?ids=1,2,3 / 긴 목록은 POST {"ids": [...]})
+
+        유저+통계, 아이템 사용, 스킬 사용 쿼리 세 번으로 끝내고 유저별 응답은 캐시합니다.
+        """
+        start = time.time()
+        if request.method == 'POST':
+            values = request.data.get('ids', [])
+            values = values if isinstance(values, list) else [values]
+        else:
+            values = request.query_params.getlist('ids')
+        try:
+            ids = parse_ids(values)
+        except (TypeError, ValueError):
+            return Response({'detail': 'ids는 정수 목록이어야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > BATCH_LIMIT:
+            return Response({'detail': f'한 번에 최대 {BATCH_LIMIT}명까지 조회할 수 있습니다.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        payloads = get_payloads('user-detail', ids)
+        missing = [user_id for user_id in ids if user_id not in payloads]
+        if missing:
+            users = GameUser.objects.select_related(
+                'stats__archived_usage', 'stats__packed_usage').order_by().in_bulk(missing)
+            stats = [user.stats for user in users.values() if hasattr(user, 'stats')]
+            stats_ids = [player_stats.pk for player_stats in stats]
+            context = {
+                'request': request,
+                'item_usages': usages_by_stats(ItemUsage, 'item', stats_ids),
+                'skill_usages': usages_by_stats(SkillUsage, 'skill', stats_ids),
+            }
+            # 보관된 유저는 복원하지 않고 보관 데이터로 응답 (배치 조회는 읽기 전용)
+            add_stored_usages(stats, context)
+            computed = {user_id: BatchUserDetailSerializer(user, context=context).data
+                        for user_id, user in users.items()}
+            set_payloads('user-detail', computed)
+            payloads.update(computed)
+
+        results = [payloads[user_id] for user_id in ids if user_id in payloads]
+        not_found = [user_id for user_id in ids if user_id not in payloads]
+
+        elapsed = time.time() - start
+        print(f"users batch 실행시간: {elapsed:.3f}초, 요청: {len(ids)}명, 계산: {len(missing)}명")
+        return Response({'results': results, 'not_found': not_found})
+
     @action(detail=False, methods=['get'])
     def top_rankers(self, request):
         """상위 랭킹 유저 조회"""
@@ -41,102 +215,230 @@ class GameUserViewSet(viewsets.ReadOnlyModelViewSet):
         serializer = self.get_serializer(top_users, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """닉네임 검색 (접두어 / 부분 문자열 / 오타 허용)"""
+        query = request.query_params.get('q', '').strip()
+        fuzzy = request.query_params.get('fuzzy', '1') != '0'
+        try:
+            # 100명 넘게 요청하면 100명까지
+            limit = min(parse_int(request, 'limit', 20, minimum=1), 100)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not query:
+            return Response({'detail': '검색어(q)를 입력하세요.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = search_user_ids(query, limit=limit, fuzzy=fuzzy)
+        users = GameUser.objects.select_related('stats').in_bulk([user_id for user_id, _, _ in matches])
+
+        results = []
+        for user_id, kind, score in matches:
+            if user_id not in users:
+                continue
+            row = self.get_serializer(users[user_id]).data
+            row['match'] = kind
+            row['score'] = score
+            results.append(row)
+        return Response(results)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """비슷한 플레이어 (레벨/랭킹 점수/승률/아이템·스킬 사용 비율 특징 벡터의 최근접 이웃)
+
+        ?k=10&metric=cosine|l2&tier=ALL|same|<티어> — same은 기준 유저와 같은 티어 안에서만
+        """
+        start = time.time()
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 1), similarity.MAX_K)
+        except ValueError:
+            return Response({'detail': 'k는 정수여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+        metric = request.query_params.get('metric', 'cosine')
+        if metric not in similarity.METRICS:
+            return Response({'detail': f'metric은 {", ".join(similarity.METRICS)} 중 하나여야 합니다.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        tier = request.query_params.get('tier', 'ALL')
+        if tier not in ('ALL', 'same') and tier not in leaderboard.TIER_INDEX:
+            return Response({'detail': f'알 수 없는 티어: {tier}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        index = similarity.get_index()
+        position = index.position(int(pk)) if pk.isdigit() else None
+        if position is None:
+            # 인덱스 갱신 전에 생긴 유저는 다음 갱신부터
+            return Response({'detail': '유저를 찾을 수 없습니다.'}, status=status.HTTP_404_NOT_FOUND)
+        if tier == 'same':
+            tier = index.tier_of(position) or 'ALL'
+
+        neighbours = index.similar(int(pk), k=k, metric=metric, tier=None if tier == 'ALL' else tier)
+        users = GameUser.objects.select_related('stats').in_bulk([user_id for user_id, _ in neighbours])
+        score_name = 'similarity' if metric == 'cosine' else 'distance'
+        results = []
+        for user_id, score in neighbours:
+            if user_id not in users:
+                continue
+            row = self.get_serializer(users[user_id]).data
+            row[score_name] = round(score, 6)
+            results.append(row)
+
+        elapsed = time.time() - start
+        print(f"similar 실행시간: {elapsed:.3f}초, 인덱스: {len(index)}명 × {index.dims}차원, 결과: {len(results)}명")
+        return Response({'user_id': int(pk), 'metric': metric, 'tier': tier, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def rank_changes(self, request):
+        """랭킹 페이지의 순위 변동 (N일 전 스냅샷 대비)"""
+        try:
+            limit = min(max(parse_int(request, 'limit', 100), 1), RANK_LIMIT)
+            offset = parse_int(request, 'offset', 0, minimum=0)
+            days = parse_int(request, 'days', 1, minimum=0)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        tier = request.query_params.get('tier', None)
+        if tier == 'ALL':
+            tier = None
+        if tier and tier not in leaderboard.TIER_INDEX:
+            return Response({'detail': f'알 수 없는 티어: {tier}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = GameUser.objects.select_related('stats')
+        if tier:
+            queryset = queryset.filter(tier=tier)
+
+        # 스냅샷/실시간 순위와 같은 순서 (동점은 id 순, 페이지 사이 중복/누락 방지)
+        page = queryset.order_by('-ranking_score', 'id')[offset:offset + limit]
+        results = self.get_serializer(page, many=True).data
+
+        snapshot = leaderboard.get_snapshot_days_ago(days)
+        previous_ranks = snapshot.ranks_for([row['id'] for row in results], tier) if snapshot else []
+
+        for index, row in enumerate(results):
+            row['rank'] = offset + index + 1
+            previous_rank = int(previous_ranks[index]) if snapshot and previous_ranks[index] else None
+            row['previous_rank'] = previous_rank
+            row['rank_change'] = previous_rank - row['rank'] if previous_rank else None
+
+        return Response({
+            'compared_to': snapshot.snapshot_date if snapshot else None,
+            'results': results,
+        })
+
+    @action(detail=False, methods=['get'])
+    def rank_movers(self, request):
+        """최근 스냅샷과 N일 전 스냅샷 사이 순위 변동이 큰 유저"""
+        try:
+            limit = min(max(parse_int(request, 'limit', 20), 1), RANK_LIMIT)
+            days = parse_int(request, 'days', 1, minimum=0)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        direction = request.query_params.get('direction', 'up')
+        tier = request.query_params.get('tier', None)
+        if tier == 'ALL':
+            tier = None
+
+        if direction not in ('up', 'down'):
+            return Response({'detail': "direction은 'up' 또는 'down'이어야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+        if tier and tier not in leaderboard.TIER_INDEX:
+            return Response({'detail': f'알 수 없는 티어: {tier}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        current = leaderboard.get_snapshot()
+        if current is None:
+            return Response({'detail': '저장된 랭킹 스냅샷이 없습니다.'}, status=status.HTTP_404_NOT_FOUND)
+        previous = leaderboard.get_snapshot(current.snapshot_date - timedelta(days=days))
+        if previous is None or previous.snapshot_date == current.snapshot_date:
+            return Response({'detail': f'{days}일 전 비교 스냅샷이 없습니다.'}, status=status.HTTP_404_NOT_FOUND)
+
+        movers = leaderboard.biggest_movers(current, previous, limit=limit, direction=direction, tier=tier)
+        users = GameUser.objects.filter(id__in=[mover['id'] for mover in movers]).values('id', 'nickname', 'tier', 'level')
+        users = {user['id']: user for user in users}
+        for mover in movers:
+            mover.update(users.get(mover['id'], {'nickname': None, 'tier': None, 'level': None}))
+
+        return Response({
+            'snapshot_date': current.snapshot_date,
+            'compared_to': previous.snapshot_date,
+            'direction': direction,
+            'results': movers,
+        })
+
     @action(detail=False, methods = ['get'])
+    @cache_response
     def tier_stats(self, request):
         """티어별 통계"""
         tier = request.query_params.get('tier', None)
 
+        # OLAP 큐브가 현재 데이터 버전이면 배열 조회 (source=sql이면 항상 SQL)
+        cube = olap.get_cube() if request.query_params.get('source') != 'sql' else None
+        if cube is not None:
+            return Response(cube.tier_stats(tier))
+
         if tier:
             users = GameUser.objects.filter(tier=tier)
         else:
             users = GameUser.objects.all()
 
-        # 티어별 집계
-        tier_data = {}
-        for tier_choice in GameUser.TIER_CHOICES:
-            tier_code = tier_choice[0]
-            tier_users = users.filter(tier = tier_code)
+        # 티어별 집계 (GROUP BY 한 번)
+        rows = users.order_by().values('tier').annotate(
+            count=Count('id'),
+            avg_level=Avg('level'),
+            avg_ranking_score=Avg('ranking_score'),
+        )
+        rows = {row['tier']: row for row in rows}
 
+        tier_data = {}
+        for tier_code, _ in GameUser.TIER_CHOICES:
+            row = rows.get(tier_code, {})
             tier_data[tier_code] = {
-                'count': tier_users.count(),
-                'avg_level' : tier_users.aggregate(Avg('level'))['level__avg'] or 0,
-                'avg_ranking_score' : tier_users.aggregate(Avg('ranking_score'))['ranking_score__avg'] or 0,
+                'count': row.get('count', 0),
+                'avg_level' : row.get('avg_level') or 0,
+                'avg_ranking_score' : row.get('avg_ranking_score') or 0,
             }
         
         return Response(tier_data)
     
 class ItemViewSet(viewsets.ReadOnlyModelViewSet):
     """아이템 API"""
-    queryset = Item.objects.all()
+    queryset = Item.objects.order_by('id')
     serializer_class = ItemSerializer
 
     @action(detail=False, methods=['get'])
+    @cache_response
+    def impact(self, request):
+        """아이템 사용자 vs 미사용자 승률, 사용량 가중 레벨, 티어 기준 대비 lift (tier로 구분)
+
+        min_users(기본값 30)보다 사용자가 적은 아이템은 표본이 작아 제외합니다.
+        """
+        return impact_response('item', request)
+
+    @action(detail=False, methods=['get'])
+    @cache_response
     def popular_items(self, request):
         """인기 아이템 (사용 빈도 기준)"""
         start = time.time()
 
         item_type = request.query_params.get('type', None)
         tier = request.query_params.get('tier', None)
-        limit = int(request.query_params.get('limit', 10))
-
-        with connection.cursor() as cursor:
-            if tier and tier != 'ALL':
-                sql = """
-                    SELECT 
-                        i.id,
-                        i.name,
-                        i.item_type,
-                        i.description,
-                        i.price,
-                        SUM(iu.usage_count) as total_usage
-                    FROM stats_item i
-                    INNER JOIN stats_itemusage iu ON i.id = iu.item_id
-                    INNER JOIN stats_playerstats ps ON iu.player_stats_id = ps.id
-                    INNER JOIN stats_gameuser u ON ps.user_id = u.id
-                    WHERE u.tier = %s
-                """
-                params = [tier]
-                
-                if item_type:
-                    sql += " AND i.item_type = %s"
-                    params.append(item_type)
-                
-                sql += """
-                    GROUP BY i.id, i.name, i.item_type, i.description, i.price
-                    ORDER BY total_usage DESC
-                    LIMIT %s
-                """
-                params.append(limit)
-            else:
-                # 전체 조회
-                sql = """
-                    SELECT 
-                        i.id,
-                        i.name,
-                        i.item_type,
-                        i.description,
-                        i.price,
-                        SUM(iu.usage_count) as total_usage
-                    FROM stats_item i
-                    LEFT JOIN stats_itemusage iu ON i.id = iu.item_id
-                """
-                params = []
-                
-                if item_type:
-                    sql += " WHERE i.item_type = %s"
-                    params.append(item_type)
-                
-                sql += """
-                    GROUP BY i.id, i.name, i.item_type, i.description, i.price
-                    ORDER BY total_usage DESC
-                    LIMIT %s
-                """
-                params.append(limit)
-            
-            cursor.execute(sql, params)
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+        try:
+            limit = parse_limit(request)
+        except aggregation.AggregationError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 대시보드용 근사 모드: Top-K 스케치 (total_usage는 추정값, error는 최대 오차)
+        if request.query_params.get('approx') in ('1', 'true'):
+            results = sketches.approx_popular('item', tier, item_type, limit)
+            if results is not None:
+                elapsed = time.time() - start
+                print(f"popular_items(approx) 실행시간: {elapsed * 1e6:.0f}µs, 결과: {len(results)}개")
+                return Response(results)
+
+        # OLAP 큐브가 현재 데이터 버전이면 배열 조회 (source=sql이면 항상 SQL)
+        cube = olap.get_cube() if request.query_params.get('source') != 'sql' else None
+        if cube is not None:
+            results = cube['item'].popular(tier, item_type, limit)
+            elapsed = time.time() - start
+            print(f"popular_items(cube) 실행시간: {elapsed * 1e6:.0f}µs, 결과: {len(results)}개")
+            return Response(results)
+
+        results = queries.popular_items(tier, item_type, limit)
+
         elapsed = time.time() - start
         print(f"popular_items 실행시간: {elapsed:.3f}초, 결과: {len(results)}개")
         
@@ -145,75 +447,49 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
 
 class SkillViewSet(viewsets.ReadOnlyModelViewSet):
     """스킬 API"""
-    queryset = Skill.objects.all()
+    queryset = Skill.objects.order_by('id')
     serializer_class = SkillSerializer
 
     @action(detail=False, methods=['get'])
+    @cache_response
+    def impact(self, request):
+        """스킬 사용자 vs 미사용자 승률, 사용량 가중 레벨, 티어 기준 대비 lift (tier로 구분)
+
+        min_users(기본값 30)보다 사용자가 적은 스킬은 표본이 작아 제외합니다.
+        """
+        return impact_response('skill', request)
+
+    @action(detail=False, methods=['get'])
+    @cache_response
     def popular_skills(self, request):
         """인기 스킬 (사용 빈도 기준)"""
         start = time.time()
 
         skill_type = request.query_params.get('type', None)
         tier = request.query_params.get('tier', None)
-        limit = int(request.query_params.get('limit', 10))
-
-        with connection.cursor() as cursor:
-            if tier and tier != 'ALL':
-                sql = """
-                    SELECT 
-                        s.id,
-                        s.name,
-                        s.skill_type,
-                        s.description,
-                        s.cooldown,
-                        SUM(su.usage_count) as total_usage
-                    FROM stats_skill s
-                    INNER JOIN stats_skillusage su ON s.id = su.skill_id
-                    INNER JOIN stats_playerstats ps ON su.player_stats_id = ps.id
-                    INNER JOIN stats_gameuser u ON ps.user_id = u.id
-                    WHERE u.tier = %s
-                """
-                params = [tier]
-                
-                if skill_type:
-                    sql += " AND s.skill_type = %s"
-                    params.append(skill_type)
-                
-                sql += """
-                    GROUP BY s.id, s.name, s.skill_type, s.description, s.cooldown
-                    ORDER BY total_usage DESC
-                    LIMIT %s
-                """
-                params.append(limit)
-            else:
-                sql = """
-                    SELECT 
-                        s.id,
-                        s.name,
-                        s.skill_type,
-                        s.description,
-                        s.cooldown,
-                        SUM(su.usage_count) as total_usage
-                    FROM stats_skill s
-                    LEFT JOIN stats_skillusage su ON s.id = su.skill_id
-                """
-                params = []
-                
-                if skill_type:
-                    sql += " WHERE s.skill_type = %s"
-                    params.append(skill_type)
-                
-                sql += """
-                    GROUP BY s.id, s.name, s.skill_type, s.description, s.cooldown
-                    ORDER BY total_usage DESC
-                    LIMIT %s
-                """
-                params.append(limit)
-            
-            cursor.execute(sql, params)
-            columns = [col[0] for col in cursor.description]
-            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+        try:
+            limit = parse_limit(request)
+        except aggregation.AggregationError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 대시보드용 근사 모드: Top-K 스케치 (total_usage는 추정값, error는 최대 오차)
+        if request.query_params.get('approx') in ('1', 'true'):
+            results = sketches.approx_popular('skill', tier, skill_type, limit)
+            if results is not None:
+                elapsed = time.time() - start
+                print(f"popular_skills(approx) 실행시간: {elapsed * 1e6:.0f}µs, 결과: {len(results)}개")
+                return Response(results)
+
+        # OLAP 큐브가 현재 데이터 버전이면 배열 조회 (source=sql이면 항상 SQL)
+        cube = olap.get_cube() if request.query_params.get('source') != 'sql' else None
+        if cube is not None:
+            results = cube['skill'].popular(tier, skill_type, limit)
+            elapsed = time.time() - start
+            print(f"popular_skills(cube) 실행시간: {elapsed * 1e6:.0f}µs, 결과: {len(results)}개")
+            return Response(results)
+
+        results = queries.popular_skills(tier, skill_type, limit)
+
         elapsed = time.time() - start
         print(f"popular_skills 실행시간: {elapsed:.3f}초, 결과: {len(results)}개")
         
@@ -222,94 +498,192 @@ class SkillViewSet(viewsets.ReadOnlyModelViewSet):
 class StatsViewSet(viewsets.ViewSet):
     """통계 분석 API"""
 
+    @staticmethod
+    def top_cutoff(top_percent):
+        """(전체 유저 수, 상위 N% 랭킹 점수 컷) — 유저 수는 정확한 COUNT(*), 컷만 스케치 (없으면 None)
+
+        스케치의 count는 bulk_create/update() 뒤 재생성 전까지 어긋나므로 top_count에 쓰지 않음
+        """
+        summary = quantiles.get_summary('ranking_score')
+        cutoff = summary.quantile(1 - top_percent / 100) if summary is not None else None
+        return GameUser.objects.count(), cutoff
+
     @action(detail=False, methods=['get'])
+    def percentiles(self, request):
+        """랭킹 점수/레벨/승률 분위수와 백분위 (KLL 스케치, 상수 시간)
+
+        - q: 분위수 목록 (0~1, 예: 0.5,0.9,0.99) → 값
+        - value: 값 목록 → 그 값 이하 비율 (백분위)
+        """
+        start = time.time()
+        metric = request.query_params.get('metric', 'ranking_score')
+        tier = request.query_params.get('tier', None)
+        if tier == 'ALL':
+            tier = None
+
+        if metric not in quantiles.METRICS:
+            return Response({'detail': f'metric은 {", ".join(quantiles.METRICS)} 중 하나여야 합니다.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if tier and tier not in quantiles.TIERS:
+            return Response({'detail': f'알 수 없는 티어: {tier}'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            qs = [float(q) for q in request.query_params.get('q', '').split(',') if q]
+            values = [float(v) for v in request.query_params.get('value', '').split(',') if v]
+        except ValueError:
+            return Response({'detail': 'q와 value는 숫자 목록이어야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+        if any(q < 0 or q > 1 for q in qs):
+            return Response({'detail': 'q는 0~1 사이여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not qs and not values:
+            qs = [0.5, 0.9, 0.99]
+
+        summary = quantiles.get_summary(metric, tier)
+        if summary is None:
+            return Response({'detail': '분위수 스케치가 없습니다. rebuild_sketches --kind kll을 실행하세요.'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        elapsed = time.time() - start
+        print(f"percentiles 실행시간: {elapsed * 1e6:.0f}µs")
+
+        return Response({
+            'metric': metric,
+            'tier': tier or 'ALL',
+            'count': summary.count,
+            'rank_error': round(summary.rank_error(), 6),
+            'quantiles': [{'q': q, 'value': summary.quantile(q)} for q in qs],
+            'ranks': [{'value': v, 'percentile': summary.rank(v)} for v in values],
+        })
+
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def usage(self, request):
+        """아이템/스킬 사용량 다차원 집계
+
+        - entity: item | skill
+        - tier, type: 쉼표 목록 필터
+        - level_min, level_max, score_min, score_max, min_games, top_count: 유저 범위 필터
+        - metric: total_usage | users | avg_per_user | tier_share
+        - group_by: object, tier, type 쉼표 조합 / order_by: 지표 또는 그룹 차원 ('-'는 내림차순)
+        """
+        start = time.time()
+        params = request.query_params
+
+        def as_list(name):
+            return tuple(value for value in params.get(name, '').split(',') if value)
+
+        def as_int(name):
+            value = params.get(name)
+            if value in (None, ''):
+                return None
+            try:
+                return int(value)
+            except ValueError:
+                raise aggregation.AggregationError(f'{name}은 정수여야 합니다.')
+
+        try:
+            # limit=0도 UsageQuery의 범위 검사를 받도록 None일 때만 기본값
+            limit = as_int('limit')
+            query = aggregation.UsageQuery(
+                params.get('entity', 'item'),
+                tiers=tuple(tier for tier in as_list('tier') if tier != 'ALL'),
+                types=as_list('type'),
+                level_min=as_int('level_min'),
+                level_max=as_int('level_max'),
+                score_min=as_int('score_min'),
+                score_max=as_int('score_max'),
+                min_games=as_int('min_games'),
+                top_count=as_int('top_count'),
+                metric=params.get('metric', 'total_usage'),
+                group_by=as_list('group_by') or ('object',),
+                order_by=params.get('order_by') or None,
+                limit=10 if limit is None else limit,
+            )
+        except aggregation.AggregationError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = aggregation.run(query)
+
+        elapsed = time.time() - start
+        print(f"usage 실행시간: {elapsed:.3f}초, 결과: {len(results)}개")
+
+        return Response({
+            'entity': query.entity,
+            'metric': query.metric,
+            'group_by': list(query.group_by),
+            'results': results,
+        })
+
+    @action(detail=False, methods=['get'])
+    def cube(self, request):
+        """대시보드 조각: (티어, 타입) 선택의 합계/유저 수와 티어별, 타입별, 대상별 분해 (OLAP 큐브)"""
+        start = time.time()
+        entity = request.query_params.get('entity', 'item')
+        tier = request.query_params.get('tier', None)
+        type_value = request.query_params.get('type', None)
+
+        if entity not in olap.TYPES:
+            return Response({'detail': f'entity는 {", ".join(olap.TYPES)} 중 하나여야 합니다.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if tier and tier != 'ALL' and tier not in olap.TIERS:
+            return Response({'detail': f'알 수 없는 티어: {tier}'}, status=status.HTTP_400_BAD_REQUEST)
+        if type_value and type_value not in olap.TYPES[entity]:
+            return Response({'detail': f'알 수 없는 타입: {type_value}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        cube = olap.get_cube()
+        if cube is None:
+            # 다른 요청이 재생성 중이거나 재생성 간격 안에 데이터가 바뀜
+            return Response({'detail': '큐브를 재생성하는 중입니다. 잠시 후 다시 시도하세요.'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+        data = cube[entity].slice(tier, type_value)
+
+        elapsed = time.time() - start
+        print(f"cube 실행시간: {elapsed * 1e6:.0f}µs")
+
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    @cache_response
     def top_players_items(self, request):
         """상위 랭커들이 많이 사용하는 아이템"""
         start = time.time()
         top_percent = int(request.query_params.get('top_percent', 10))
 
-        # 상위 N% 유저 계산
-        total_users = GameUser.objects.count()
+        # 상위 N% 유저 계산 (유저 수는 COUNT(*), 점수 컷은 분위수 스케치)
+        total_users, score_cutoff = self.top_cutoff(top_percent)
         top_count = int(total_users * top_percent / 100)
 
-        with connection.cursor() as cursor:
-            sql = """
-                SELECT
-                    i.id,
-                    i.name,
-                    i.item_type,
-                    i.description,
-                    i.price,
-                    COUNT(iu.id) as usage_count
-                FROM stats_item i
-                LEFT JOIN stats_itemusage iu ON i.id = iu.item_id
-                LEFT JOIN stats_playerstats ps ON iu.player_stats_id = ps.id
-                LEFT JOIN stats_gameuser u ON ps.user_id = u.id
-                WHERE u.id IN (
-                    SELECT id FROM stats_gameuser
-                    ORDER BY ranking_score DESC
-                    LIMIT %s
-                )
-                GROUP BY i.id, i.name, i.item_type, i.description, i.price
-                ORDER BY usage_count DESC
-                LIMIT 20
-            """
-            cursor.execute(sql, [top_count])
-            columns = [col[0] for col in cursor.description]
-            items = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+        items = queries.top_players_items(top_count)
+
         elapsed = time.time() - start
         print(f"top_players_items 실행시간: {elapsed:.3f}초")
 
         return Response({
             'top_percent': top_percent,
             'top_user_count' : top_count,
+            'score_cutoff': score_cutoff,
             'items' : items
         })
     
     @action(detail=False, methods=['get'])
+    @cache_response
     def top_players_skills(self, request):
         """상위 랭커들이 가장 많이 사용하는 스킬"""
         start = time.time()
         top_percent = int(request.query_params.get('top_percent', 10))
 
-        # 상위 N% 유저 계산
-        total_users = GameUser.objects.count()
+        # 상위 N% 유저 계산 (유저 수는 COUNT(*), 점수 컷은 분위수 스케치)
+        total_users, score_cutoff = self.top_cutoff(top_percent)
         top_count = int(total_users * top_percent / 100)
 
-        with connection.cursor() as cursor:
-            sql = """
-                SELECT
-                    s.id,
-                    s.name,
-                    s.skill_type,
-                    s.description,
-                    s.cooldown,
-                    COUNT(su.id) as usage_count
-                FROM stats_skill s
-                LEFT JOIN stats_skillusage su ON s.id = su.skill_id
-                LEFT JOIN stats_playerstats ps ON su.player_stats_id = ps.id
-                LEFT JOIN stats_gameuser u ON ps.user_id = u.id
-                WHERE u.id IN(
-                    SELECT id FROM stats_gameuser
-                    ORDER BY ranking_score DESC
-                    LIMIT %s
-                )
-                GROUP BY s.id, s.name, s.skill_type, s.description, s.cooldown
-                ORDER BY usage_count DESC
-                LIMIT 20
-            """
-
-            cursor.execute(sql, [top_count])
-            columns = [col[0] for col in cursor.description]
-            skills = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
+        skills = queries.top_players_skills(top_count)
+
         elapsed = time.time() - start
         print(f"top_players_skills 실행시간: {elapsed:.3f}초")
 
         return Response({
             'top_percent' : top_percent,
             'top_user_count' : top_count,
+            'score_cutoff': score_cutoff,
             'skills' : skills
         })
 
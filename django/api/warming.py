@@ -0,0 +1,135 @@
+"""응답 캐시 예열
+
+배포나 데이터 재생성 직후 첫 방문자가 집계 쿼리를 모두 떠안지 않도록 대시보드가 기본값으로
+요청하는 파라미터 조합(티어 ALL 포함 전 티어 × 아이템/스킬 타입, 기본 limit, top_percent 1/5/10/20)을
+미리 호출해 응답 캐시를 채웁니다. 뷰를 그대로 호출하므로 OLAP 큐브, 영향 분석 배열 같은
+프로세스 캐시도 함께 데워집니다.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory
+
+from stats.models import GameUser, Item, Skill
+
+TOP_PERCENTS = [1, 5, 10, 20]
+STARTUP_DELAY = 2.0
+
+
+@dataclass
+class WarmResult:
+    name: str
+    params: dict
+    status: int
+    seconds: float
+    # 'HIT'(이미 캐시됨) / 'MISS'(이번에 계산) / None(캐시 대상 아님)
+    cache: str = None
+
+
+def targets():
+    """(URL 이름, 파라미터) 목록 — 티어 None은 ALL (파라미터 없음)"""
+    tiers = [None] + [code for code, _ in GameUser.TIER_CHOICES]
+    item_types = [None] + [code for code, _ in Item.ITEM_TYPE_CHOICES]
+    skill_types = [None] + [code for code, _ in Skill.SKILL_TYPE_CHOICES]
+
+    def params(**values):
+        return {key: value for key, value in values.items() if value is not None}
+
+    result = []
+    for tier in tiers:
+        result.append(('user-tier-stats', params(tier=tier)))
+        result += [('item-popular-items', params(tier=tier, type=value)) for value in item_types]
+        result += [('skill-popular-skills', params(tier=tier, type=value)) for value in skill_types]
+        result.append(('item-impact', params(tier=tier)))
+        result.append(('skill-impact', params(tier=tier)))
+    for top_percent in TOP_PERCENTS:
+        result.append(('stats-top-players-items', {'top_percent': top_percent}))
+        result.append(('stats-top-players-skills', {'top_percent': top_percent}))
+    return result
+
+
+def _fetch(factory, name, params, close_connections):
+    path = reverse(name)
+    match = resolve(path)
+    start = time.perf_counter()
+    try:
+        response = match.func(factory.get(path, params), *match.args, **match.kwargs)
+        return WarmResult(name, params, response.status_code, time.perf_counter() - start, response.get('X-Cache'))
+    except Exception as e:
+        print(f'[warm_caches] {name} {params} 실패: {e!r}')
+        return WarmResult(name, params, 500, time.perf_counter() - start)
+    finally:
+        if close_connections:
+            # 작업 스레드의 DB 연결은 스레드와 함께 정리
+            connections.close_all()
+
+
+def warm(workers=4, target_list=None):
+    """응답 계산 (workers개 스레드, 1이면 현재 스레드에서 순서대로) → WarmResult 리스트"""
+    factory = APIRequestFactory()
+    target_list = targets() if target_list is None else target_list
+    if workers <= 1:
+        return [_fetch(factory, name, params, False) for name, params in target_list]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda target: _fetch(factory, *target, True), target_list))
+
+
+def summarize(results):
+    """엔드포인트별 (요청 수, 성공 수, 새로 계산한 수, 가장 느린 응답 초)와 전체 커버리지"""
+    by_name = {}
+    for result in results:
+        entry = by_name.setdefault(result.name, {'requests': 0, 'ok': 0, 'computed': 0, 'slowest': 0.0})
+        entry['requests'] += 1
+        entry['ok'] += result.status == 200
+        entry['computed'] += result.cache == 'MISS'
+        entry['slowest'] = max(entry['slowest'], result.seconds)
+    ok = sum(entry['ok'] for entry in by_name.values())
+    return {
+        'requests': len(results),
+        'ok': ok,
+        'coverage': ok / len(results) if results else 0.0,
+        'endpoints': by_name,
+    }
+
+
+def should_warm_on_startup(argv=None):
+    """WARM_CACHES_ON_STARTUP이 켜져 있고 서버 프로세스일 때만 (migrate/test 등 커맨드 제외)"""
+    if not settings.WARM_CACHES_ON_STARTUP:
+        return False
+    argv = sys.argv if argv is None else argv
+    if argv and os.path.basename(argv[0]) == 'manage.py':
+        # runserver 자동 리로더는 부모/자식 두 번 ready()를 부르므로 자식(RUN_MAIN)에서만
+        return len(argv) > 1 and argv[1] == 'runserver' and os.environ.get('RUN_MAIN') == 'true'
+    return True
+
+
+def warm_in_background(delay=STARTUP_DELAY, workers=2):
+    """서버 시작을 막지 않도록 데몬 스레드에서 예열 후 결과 한 줄 출력"""
+    def run():
+        start = time.time()
+        summary = summarize(warm(workers=workers))
+        print(f"[warm_caches] 시작 예열 실행시간: {time.time() - start:.2f}초, "
+              f"커버리지: {summary['ok']}/{summary['requests']} ({summary['coverage']:.0%})")
+        connections.close_all()
+
+    timer = threading.Timer(delay, run)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def uses_shared_cache():
+    """프로세스 밖에서 보이는 캐시 백엔드인지 (locmem은 예열한 프로세스 안에서만 보임)"""
+    return not settings.CACHES['default']['BACKEND'].endswith('LocMemCache')
+
+
+def scheduled_warm(since):
+    """응답 캐시 예열 (스케줄러 작업, 공유 캐시 백엔드일 때만 등록) → 새로 계산한 응답 수"""
+    return sum(result.cache == 'MISS' for result in warm(workers=1))
@@ -3,6 +3,11 @@ ASGI config for gamestats project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+실시간 랭킹 SSE(/api/live/leaderboard/, api/live.py)는 ASGI에서만 동작합니다:
+    uvicorn gamestats.asgi:application --workers 4
+    gunicorn gamestats.asgi:application -k uvicorn.workers.UvicornWorker
+피드는 워커 프로세스마다 하나씩이라 데이터 버전 확인 쿼리는 워커 수에만 비례합니다.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import environ
 import os
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -59,6 +60,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,10 +92,48 @@ WSGI_APPLICATION = 'gamestats.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        # 데이터셋 생성(stats/datasets.py)은 별도 프로세스에서 이 경로를 임시 파일로 돌려 씀
+        'NAME': Path(env('DATABASE_PATH', default=str(BASE_DIR / 'db.sqlite3'))),
     }
 }
 
+# 사용 기록(ItemUsage/SkillUsage) 해시 샤딩 — 0이면 비활성 (stats/sharding.py)
+USAGE_SHARDS = env.int('USAGE_SHARDS', default=0)
+USAGE_SHARD_DIR = Path(env('USAGE_SHARD_DIR', default=str(BASE_DIR)))
+
+for shard in range(USAGE_SHARDS):
+    DATABASES[f'usage_{shard}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': USAGE_SHARD_DIR / f'usage_{shard}.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['stats.sharding.UsageShardRouter']
+
+# 집계 API 응답 캐시 — 여러 프로세스(warm_caches 커맨드 포함)가 공유하려면
+# CACHE_URL=filecache:///tmp/gamestats-cache 또는 redis://... 처럼 공유 백엔드 사용
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# 0이면 응답 캐시 비활성 (키에 데이터 버전이 들어가므로 데이터가 바뀌면 자동으로 새 키)
+RESPONSE_CACHE_SECONDS = env.int('RESPONSE_CACHE_SECONDS', default=300)
+# 서버 시작 시 백그라운드에서 응답 캐시 예열 (api/apps.py)
+WARM_CACHES_ON_STARTUP = env.bool('WARM_CACHES_ON_STARTUP', default=False)
+# 워커 간 공유 집계 스냅샷(mmap) 디렉터리 — 비어 있으면 비활성 (stats/shared.py), 예: /dev/shm/gamestats
+SHARED_SNAPSHOT_DIR = env('SHARED_SNAPSHOT_DIR', default='')
+# 사용 기록 저장 방식 — rows: ItemUsage/SkillUsage 행, packed: 플레이어별 사용량 벡터 (stats/packed.py)
+USAGE_STORAGE = env('USAGE_STORAGE', default='rows')
+# 비슷한 플레이어 검색 인덱스(.npy, mmap) 저장 디렉터리 — 비어 있으면 워커마다 메모리에서 생성 (stats/similarity.py)
+SIMILARITY_DIR = env('SIMILARITY_DIR', default='')
+# 테스트/벤치마크용 시드 고정 데이터셋(SQLite 파일) 캐시 디렉터리 (stats/datasets.py)
+DATASET_DIR = Path(env('DATASET_DIR', default=str(BASE_DIR / 'datasets')))
+# 요청/커맨드 프로파일 저장 위치와 보관 개수 (stats/profiling.py) — X-Profile 헤더/?profile=1은 스태프나
+# INTERNAL_IPS만. 프록시 전달 헤더(X-Forwarded-For 등)가 붙은 요청은 IP로 허용하지 않고, 전달 헤더를 붙이지
+# 않는 리버스 프록시 뒤라면 PROFILE_STAFF_ONLY로 스태프만 허용 (모든 요청이 로컬로 보이므로)
+PROFILE_DIR = Path(env('PROFILE_DIR', default=str(BASE_DIR / 'profiles')))
+PROFILE_KEEP = env.int('PROFILE_KEEP', default=200)
+PROFILE_STAFF_ONLY = env.bool('PROFILE_STAFF_ONLY', default=False)
+INTERNAL_IPS = env.list('INTERNAL_IPS', default=['127.0.0.1', '::1'])
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,4 +194,7 @@ REST_FRAMEWORK = {
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
-]
\ No newline at end of file
+]
+# 프런트 요청 캐시(requestCache.js)의 ETag 재검증
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Cache']
@@ -1,20 +1,204 @@
 from django.contrib import admin
-from .models import GameUser, PlayerStats, Item, Skill
+from django.http import QueryDict
+from . import sharding
+from .models import GameUser, PlayerStats, Item, Skill, ItemUsage, SkillUsage, LeaderboardSnapshot, StatSketch, DataVersion
+from .pagination import EstimatedCountPaginator
+from .search import search_user_ids
 # Register your models here.
 
+ADMIN_SEARCH_LIMIT = 1000
+
+
+class ScaleReadyAdmin(admin.ModelAdmin):
+    """수백만 행 테이블용 기본 설정"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class RangeListFilter(admin.SimpleListFilter):
+    """고정 구간 필터 (DISTINCT 값 조회 없이 구간 목록 표시)"""
+    field_name = None
+    # (파라미터 값, 표시 이름, 하한 포함, 상한 미포함)
+    buckets = []
+
+    def lookups(self, request, model_admin):
+        return [(value, label) for value, label, _, _ in self.buckets]
+
+    def queryset(self, request, queryset):
+        for value, _, low, high in self.buckets:
+            if self.value() == value:
+                if low is not None:
+                    queryset = queryset.filter(**{f'{self.field_name}__gte': low})
+                if high is not None:
+                    queryset = queryset.filter(**{f'{self.field_name}__lt': high})
+                return queryset
+        return queryset
+
+
+class LevelRangeFilter(RangeListFilter):
+    title = '레벨 구간'
+    parameter_name = 'level_range'
+    field_name = 'level'
+    buckets = [
+        ('1-19', '1 ~ 19', 1, 20),
+        ('20-39', '20 ~ 39', 20, 40),
+        ('40-59', '40 ~ 59', 40, 60),
+        ('60-79', '60 ~ 79', 60, 80),
+        ('80-100', '80 ~ 100', 80, None),
+    ]
+
+
+class RankingScoreRangeFilter(RangeListFilter):
+    title = '랭킹 점수 구간'
+    parameter_name = 'score_range'
+    field_name = 'ranking_score'
+    buckets = [
+        ('0-1999', '0 ~ 1,999', None, 2000),
+        ('2000-3999', '2,000 ~ 3,999', 2000, 4000),
+        ('4000-5999', '4,000 ~ 5,999', 4000, 6000),
+        ('6000-7999', '6,000 ~ 7,999', 6000, 8000),
+        ('8000-', '8,000 이상', 8000, None),
+    ]
+
+
+class TotalGamesRangeFilter(RangeListFilter):
+    title = '총 게임 수 구간'
+    parameter_name = 'games_range'
+    field_name = 'total_games'
+    buckets = [
+        ('0-99', '100판 미만', None, 100),
+        ('100-249', '100 ~ 249판', 100, 250),
+        ('250-499', '250 ~ 499판', 250, 500),
+        ('500-', '500판 이상', 500, None),
+    ]
+
+
+class WinRateRangeFilter(RangeListFilter):
+    title = '승률 구간'
+    parameter_name = 'win_rate_range'
+    field_name = 'win_rate'
+    buckets = [
+        ('0-40', '40% 미만', None, 40),
+        ('40-50', '40 ~ 50%', 40, 50),
+        ('50-60', '50 ~ 60%', 50, 60),
+        ('60-', '60% 이상', 60, None),
+    ]
+
+
+def request_shard(request):
+    """요청이 보는 샤드 (?shard= 또는 목록에서 넘어온 _changelist_filters, 없으면 첫 샤드)"""
+    aliases = sharding.shard_aliases()
+    shard = request.GET.get('shard') or QueryDict(request.GET.get('_changelist_filters', '')).get('shard')
+    return shard if shard in aliases else aliases[0]
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """샤딩 중 사용 기록 목록은 샤드 하나씩 (샤드 간 정렬/페이지는 합치지 않음)"""
+    title = '샤드'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.shard_aliases()]
+
+    def queryset(self, request, queryset):
+        # get_queryset()에서 이미 using(샤드)
+        return queryset
+
+    def choices(self, changelist):
+        current = self.value() or sharding.shard_aliases()[0]
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': lookup == current,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+
+class UsageCountRangeFilter(RangeListFilter):
+    title = '사용 횟수 구간'
+    parameter_name = 'usage_range'
+    field_name = 'usage_count'
+    buckets = [
+        ('0-99', '100회 미만', None, 100),
+        ('100-299', '100 ~ 299회', 100, 300),
+        ('300-599', '300 ~ 599회', 300, 600),
+        ('600-', '600회 이상', 600, None),
+    ]
+
+
+class ItemUsageInline(admin.TabularInline):
+    """아이템 사용 기록 (읽기 전용)"""
+    model = ItemUsage
+    fields = ['item', 'usage_count', 'last_used']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('item', 'player_stats__user')
+
+
+class SkillUsageInline(admin.TabularInline):
+    """스킬 사용 기록 (읽기 전용)"""
+    model = SkillUsage
+    fields = ['skill', 'usage_count', 'last_used']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('skill', 'player_stats__user')
+
+
 @admin.register(GameUser)
-class GameUserAdmin(admin.ModelAdmin):
+class GameUserAdmin(ScaleReadyAdmin):
     list_display = ['nickname',  'level', 'tier', 'ranking_score', 'created_at']
-    list_filter = ['tier', 'level']
+    list_filter = ['tier', LevelRangeFilter, RankingScoreRangeFilter]
     search_fields = ['nickname']
     ordering = ['-ranking_score']
+    search_help_text = '닉네임 접두어/부분 문자열 검색 (검색 인덱스 사용)'
+
+    def get_search_results(self, request, queryset, search_term):
+        """LIKE '%x%' 전체 스캔 대신 닉네임 검색 인덱스 사용"""
+        if not search_term.strip():
+            return queryset, False
+        ids = [user_id for user_id, _, _ in search_user_ids(search_term, limit=ADMIN_SEARCH_LIMIT, fuzzy=False)]
+        return queryset.filter(id__in=ids), False
 
 @admin.register(PlayerStats)
-class PlayerStatsAdmin(admin.ModelAdmin):
+class PlayerStatsAdmin(ScaleReadyAdmin):
     list_display = ['user', 'total_games', 'wins', 'losses', 'win_rate']
-    list_filter = ['total_games']
+    list_select_related = ['user']
+    list_filter = [TotalGamesRangeFilter, WinRateRangeFilter]
     search_fields = ['user__nickname']
     readonly_fields = ['win_rate']
+    raw_id_fields = ['user']
+    inlines = [ItemUsageInline, SkillUsageInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        """유저 닉네임 검색 인덱스 사용"""
+        if not search_term.strip():
+            return queryset, False
+        ids = [user_id for user_id, _, _ in search_user_ids(search_term, limit=ADMIN_SEARCH_LIMIT, fuzzy=False)]
+        return queryset.filter(user_id__in=ids), False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+    def get_formset_kwargs(self, request, obj, inline, prefix):
+        """사용 기록 인라인은 통계가 있는 샤드에서 읽기"""
+        kwargs = super().get_formset_kwargs(request, obj, inline, prefix)
+        if sharding.is_enabled():
+            alias = sharding.shard_for(obj.pk) if obj is not None and obj.pk else sharding.shard_aliases()[0]
+            kwargs['queryset'] = kwargs['queryset'].using(alias)
+        return kwargs
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
@@ -28,3 +212,58 @@ class SkillAdmin(admin.ModelAdmin):
     list_filter = ['skill_type']
     search_fields = ['name']
 
+class UsageAdmin(ScaleReadyAdmin):
+    """사용 기록 목록 — 샤딩 중에는 샤드 하나씩 보기 전용 (쓰기는 ingest/reshard_usage)"""
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return [ShardListFilter, *list_filter] if sharding.is_enabled() else list_filter
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.using(request_shard(request)) if sharding.is_enabled() else queryset
+
+    def has_add_permission(self, request):
+        return not sharding.is_enabled() and super().has_add_permission(request)
+
+    def has_change_permission(self, request, obj=None):
+        return not sharding.is_enabled() and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return not sharding.is_enabled() and super().has_delete_permission(request, obj)
+
+@admin.register(ItemUsage)
+class ItemUsageAdmin(UsageAdmin):
+    list_display = ['player_stats', 'item', 'usage_count', 'last_used']
+    list_select_related = ['player_stats__user', 'item']
+    list_filter = ['item__item_type', 'item', UsageCountRangeFilter]
+    raw_id_fields = ['player_stats']
+    autocomplete_fields = ['item']
+
+@admin.register(SkillUsage)
+class SkillUsageAdmin(UsageAdmin):
+    list_display = ['player_stats', 'skill', 'usage_count', 'last_used']
+    list_select_related = ['player_stats__user', 'skill']
+    list_filter = ['skill__skill_type', 'skill', UsageCountRangeFilter]
+    raw_id_fields = ['player_stats']
+    autocomplete_fields = ['skill']
+
+@admin.register(LeaderboardSnapshot)
+class LeaderboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['snapshot_date', 'user_count', 'created_at']
+    date_hierarchy = 'snapshot_date'
+
+
+@admin.register(StatSketch)
+class StatSketchAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'key', 'total', 'updated_at']
+    list_filter = ['kind']
+    search_fields = ['key']
+    readonly_fields = ['kind', 'key', 'total', 'updated_at']
+    exclude = ['data']
+
+
+@admin.register(DataVersion)
+class DataVersionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'version', 'updated_at']
+    readonly_fields = ['name', 'version', 'updated_at']
@@ -0,0 +1,344 @@
+"""아이템/스킬 사용량 다차원 집계 엔진
+
+UsageQuery(대상, 차원 필터, 지표, 그룹, 정렬)를 SQL 한 개로 컴파일합니다.
+- 필요한 조인만 붙입니다: 유저 필터/티어 그룹이 없으면 통계/유저 조인 생략,
+  타입 필터/그룹이 없고 대상별 그룹도 아니면 아이템/스킬 조인 생략.
+- top_count가 있으면 랭킹 인덱스 LIMIT 서브쿼리(상위 N명)에서 출발합니다.
+- 컴파일된 SQL은 쿼리 모양(필터 종류, IN 목록 길이, 지표, 그룹, 정렬)별로 캐시합니다.
+- 사용 기록이 샤딩되어 있으면 샤드마다 (합계, 유저 수) 부분 집계 후 합쳐 지표를 계산합니다.
+  유저는 player_stats_id로 샤드가 정해지므로 샤드 간 유저 수를 그대로 더해도 중복이 없습니다.
+- 사용량 벡터 저장 방식(USAGE_STORAGE=packed)이면 벡터 부분 집계(packed.usage_partials)도 같은 식으로
+  더합니다. 한 유저는 행과 벡터 중 한쪽에만 있으므로 유저 수도 그대로 더합니다.
+
+지표:
+- total_usage: 사용 횟수 합계
+- users: 사용 유저 수
+- avg_per_user: 사용 유저당 평균 사용 횟수
+- tier_share: 같은 티어(티어로 묶지 않으면 필터된 전체) 사용량 중 비율
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.db import connection
+
+from . import sharding
+
+# entity → (대상 테이블, 사용 기록 테이블, 대상 컬럼, 타입 컬럼, 응답 컬럼)
+ENTITIES = {
+    'item': ('stats_item', 'stats_itemusage', 'item_id', 'item_type',
+             ('id', 'name', 'item_type', 'description', 'price')),
+    'skill': ('stats_skill', 'stats_skillusage', 'skill_id', 'skill_type',
+              ('id', 'name', 'skill_type', 'description', 'cooldown')),
+}
+
+METRICS = ('total_usage', 'users', 'avg_per_user', 'tier_share')
+GROUPS = ('object', 'tier', 'type')
+MAX_LIMIT = 1000
+
+
+class AggregationError(ValueError):
+    """잘못된 집계 요청 (API에서 400으로 응답)"""
+
+
+@dataclass(frozen=True)
+class UsageQuery:
+    entity: str
+    tiers: tuple = ()
+    types: tuple = ()
+    level_min: int = None
+    level_max: int = None
+    score_min: int = None
+    score_max: int = None
+    min_games: int = None
+    # 랭킹 상위 N명으로 제한 (다른 유저 필터 적용 후 상위 N명)
+    top_count: int = None
+    metric: str = 'total_usage'
+    group_by: tuple = ('object',)
+    # 지표 또는 그룹 차원, '-' 접두어는 내림차순 (기본값: 지표 내림차순)
+    order_by: str = None
+    limit: int = 10
+
+    def __post_init__(self):
+        if self.entity not in ENTITIES:
+            raise AggregationError(f'entity는 {", ".join(ENTITIES)} 중 하나여야 합니다.')
+        if self.metric not in METRICS:
+            raise AggregationError(f'metric은 {", ".join(METRICS)} 중 하나여야 합니다.')
+        if not self.group_by or any(group not in GROUPS for group in self.group_by):
+            raise AggregationError(f'group_by는 {", ".join(GROUPS)}의 조합이어야 합니다.')
+        if len(set(self.group_by)) != len(self.group_by):
+            raise AggregationError('group_by에 같은 차원이 중복되었습니다.')
+        if self.order_field not in (self.metric,) + self.group_by:
+            raise AggregationError('order_by는 지표 또는 group_by 차원이어야 합니다.')
+        if not 1 <= self.limit <= MAX_LIMIT:
+            raise AggregationError(f'limit은 1~{MAX_LIMIT} 사이여야 합니다.')
+
+    @property
+    def order_field(self):
+        return (self.order_by or self.metric).lstrip('-')
+
+    @property
+    def descending(self):
+        return self.order_by is None or self.order_by.startswith('-')
+
+    @property
+    def has_user_filter(self):
+        return bool(self.tiers) or self.top_count is not None or any(
+            value is not None for value in (self.level_min, self.level_max, self.score_min, self.score_max)
+        )
+
+    @property
+    def include_unused(self):
+        """대상별 전체 집계는 사용 기록 없는 대상도 포함 (기존 인기 순위 API와 동일)"""
+        return self.group_by == ('object',) and not self.has_user_filter and self.min_games is None
+
+    def shape(self):
+        """컴파일 캐시 키: 값이 아닌 쿼리 모양"""
+        return (
+            self.entity, len(self.tiers), len(self.types),
+            tuple(value is not None for value in (self.level_min, self.level_max, self.score_min,
+                                                  self.score_max, self.min_games, self.top_count)),
+            self.metric, self.group_by, self.order_field, self.descending,
+        )
+
+    def params(self):
+        """_compile()이 만든 자리표시자 순서대로 값 나열"""
+        user = [value for value in (self.level_min, self.level_max, self.score_min, self.score_max)
+                if value is not None]
+        params = []
+        if self.top_count is not None:
+            params += [*self.tiers, *user, self.top_count]
+        if self.min_games is not None:
+            params.append(self.min_games)
+        if self.top_count is None:
+            params += [*self.tiers, *user]
+        return params + list(self.types)
+
+
+# ---------------------------------------------------------------- 컴파일
+
+def _user_conditions(shape_flags, tier_count, alias):
+    level_min, level_max, score_min, score_max = shape_flags[:4]
+    conditions = []
+    if tier_count:
+        conditions.append(f"{alias}.tier IN ({', '.join(['%s'] * tier_count)})")
+    for present, condition in ((level_min, 'level >= %s'), (level_max, 'level <= %s'),
+                               (score_min, 'ranking_score >= %s'), (score_max, 'ranking_score <= %s')):
+        if present:
+            conditions.append(f'{alias}.{condition}')
+    return conditions
+
+
+def _from_clause(shape, partial):
+    """(FROM/JOIN 절, WHERE 조건, 그룹 컬럼) — 필요한 조인만"""
+    entity, tier_count, type_count, flags, metric, group_by, order_field, _ = shape
+    table, usage_table, column, type_column, columns = ENTITIES[entity]
+    min_games, top_count = flags[4], flags[5]
+    hub = sharding.hub_table if partial else (lambda name: name)
+
+    needs_user = bool(tier_count) or any(flags[:4]) or top_count or 'tier' in group_by
+    needs_stats = needs_user or min_games
+    # 부분 집계는 허브에서 대상 정보를 붙이므로 타입이 필요할 때만 조인
+    needs_object = bool(type_count) or 'type' in group_by or ('object' in group_by and not partial)
+    include_unused = group_by == ('object',) and not needs_stats and not partial
+
+    where = []
+    if top_count:
+        # 상위 N명 서브쿼리에서 출발 (랭킹 인덱스 LIMIT)
+        select = 'id, tier' if 'tier' in group_by else 'id'
+        conditions = _user_conditions(flags, tier_count, 'stats_gameuser')
+        sub_where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = (
+            f"FROM (SELECT {select} FROM {hub('stats_gameuser')}{sub_where} "
+            f"ORDER BY ranking_score DESC LIMIT %s) u"
+            f" INNER JOIN {hub('stats_playerstats')} ps ON ps.user_id = u.id"
+            f" INNER JOIN {usage_table} usage ON usage.player_stats_id = ps.id"
+        )
+        if needs_object:
+            sql += f" INNER JOIN {hub(table)} t ON t.id = usage.{column}"
+    elif include_unused:
+        # 사용 기록 없는 대상도 NULL 합계로 포함
+        sql = f"FROM {table} t LEFT JOIN {usage_table} usage ON t.id = usage.{column}"
+    else:
+        sql = f"FROM {usage_table} usage"
+        if needs_stats:
+            sql += f" INNER JOIN {hub('stats_playerstats')} ps ON usage.player_stats_id = ps.id"
+        if needs_user:
+            sql += f" INNER JOIN {hub('stats_gameuser')} u ON ps.user_id = u.id"
+        if needs_object:
+            sql += f" INNER JOIN {hub(table)} t ON usage.{column} = t.id"
+
+    if min_games:
+        where.append('ps.total_games >= %s')
+    if not top_count:
+        where += _user_conditions(flags, tier_count, 'u')
+    if type_count:
+        where.append(f"t.{type_column} IN ({', '.join(['%s'] * type_count)})")
+
+    groups = []
+    for group in group_by:
+        if group == 'object':
+            groups.append('t.id' if needs_object else f'usage.{column}')
+        elif group == 'tier':
+            groups.append('u.tier')
+        else:
+            groups.append(f't.{type_column}')
+    return sql, where, groups
+
+
+def _users_expression(group_by):
+    # 대상별 그룹은 (유저, 대상) 유니크 키라 행 수 = 유저 수
+    return 'COUNT(usage.id)' if 'object' in group_by else 'COUNT(DISTINCT usage.player_stats_id)'
+
+
+@lru_cache(maxsize=256)
+def _compile(shape):
+    """단일 DB 쿼리: 지표, 정렬, LIMIT까지 SQL에서 처리"""
+    entity, _, _, _, metric, group_by, order_field, descending = shape
+    _, _, _, type_column, columns = ENTITIES[entity]
+    sql, where, groups = _from_clause(shape, partial=False)
+
+    total = 'SUM(usage.usage_count)'
+    partition = 'PARTITION BY u.tier' if 'tier' in group_by else ''
+    value = {
+        'total_usage': total,
+        'users': _users_expression(group_by),
+        'avg_per_user': f'{total} * 1.0 / {_users_expression(group_by)}',
+        'tier_share': f'{total} * 1.0 / SUM({total}) OVER ({partition})',
+    }[metric]
+
+    select = []
+    for group, expression in zip(group_by, groups):
+        if group == 'object':
+            select += [f't.{name}' for name in columns]
+        elif group == 'tier':
+            select.append('u.tier AS tier')
+        elif 'object' not in group_by:
+            select.append(f'{expression} AS {type_column}')
+    select.append(f'{value} AS {metric}')
+
+    order_column = metric if order_field == metric else groups[group_by.index(order_field)]
+    direction = 'DESC' if descending else 'ASC'
+    tiebreak = ', '.join(group for group in groups if group != order_column)
+    return (
+        f"SELECT {', '.join(select)} {sql}"
+        + (f" WHERE {' AND '.join(where)}" if where else '')
+        + f" GROUP BY {', '.join(groups)}"
+        + f" ORDER BY {order_column} {direction} NULLS LAST" + (f', {tiebreak}' if tiebreak else '')
+        + " LIMIT %s"
+    )
+
+
+@lru_cache(maxsize=256)
+def _compile_partial(shape):
+    """샤드 부분 집계 쿼리: 그룹 키, 합계, 유저 수"""
+    _, _, _, _, _, group_by, _, _ = shape
+    sql, where, groups = _from_clause(shape, partial=True)
+    return (
+        f"SELECT {', '.join(groups)}, SUM(usage.usage_count), {_users_expression(group_by)} {sql}"
+        + (f" WHERE {' AND '.join(where)}" if where else '')
+        + f" GROUP BY {', '.join(groups)}"
+    )
+
+
+def compiled_sql(query):
+    """디버깅/벤치마크용: 이 쿼리가 실행할 SQL"""
+    if sharding.is_enabled():
+        return _compile_partial(query.shape())
+    return _compile(query.shape())
+
+
+# ---------------------------------------------------------------- 실행
+
+def run(query):
+    """집계 실행 → 응답 행 리스트 (벡터 저장 방식이면 벡터와 남은 사용 기록 행을 함께)"""
+    # packed → aggregation 순환 import를 피해 함수 안에서 import
+    from . import packed
+
+    if packed.enabled():
+        return _run_partial(query, packed.usage_partials(query))
+    return run_rows(query)
+
+
+def run_rows(query):
+    """사용 기록 행만 집계 → 응답 행 리스트"""
+    if sharding.is_enabled():
+        return _run_partial(query)
+    with connection.cursor() as cursor:
+        cursor.execute(_compile(query.shape()), query.params() + [query.limit])
+        names = [col[0] for col in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def _details(query):
+    """허브의 대상 정보 (타입 필터 적용)"""
+    table, _, _, type_column, columns = ENTITIES[query.entity]
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if query.types:
+        sql += f" WHERE {type_column} IN ({', '.join(['%s'] * len(query.types))})"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(query.types))
+        return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+
+def _run_partial(query, extra=None):
+    """샤드(비샤딩이면 DB 하나) 부분 집계 + extra({그룹 키: [합계, 유저 수]}) → 합산 → 지표 계산/정렬
+
+    단일 DB SQL과 같은 결과
+    """
+    _, _, _, type_column, _ = ENTITIES[query.entity]
+    width = len(query.group_by)
+    partials = {}
+    for rows in sharding.scatter(_compile_partial(query.shape()), query.params()):
+        for row in rows:
+            entry = partials.setdefault(tuple(row[:width]), [0, 0])
+            entry[0] += row[width] or 0
+            entry[1] += row[width + 1] or 0
+    for key, (total, users) in (extra or {}).items():
+        entry = partials.setdefault(key, [0, 0])
+        entry[0] += total
+        entry[1] += users
+
+    details = _details(query) if 'object' in query.group_by else {}
+    if query.include_unused:
+        for object_id in details:
+            partials.setdefault((object_id,), [None, 0])
+
+    partition_totals = {}
+    tier_at = query.group_by.index('tier') if 'tier' in query.group_by else None
+    for key, (total, _) in partials.items():
+        partition = key[tier_at] if tier_at is not None else None
+        partition_totals[partition] = partition_totals.get(partition, 0) + (total or 0)
+
+    results = []
+    for key, (total, users) in partials.items():
+        row = {}
+        for group, value in zip(query.group_by, key):
+            if group == 'object':
+                if value not in details:
+                    break
+                row.update(details[value])
+            elif group == 'tier':
+                row['tier'] = value
+            else:
+                row[type_column] = value
+        else:
+            partition_total = partition_totals[key[tier_at] if tier_at is not None else None]
+            row[query.metric] = {
+                'total_usage': total,
+                'users': users,
+                'avg_per_user': total / users if users else None,
+                'tier_share': total / partition_total if total is not None and partition_total else None,
+            }[query.metric]
+            row['_key'] = key
+            results.append(row)
+
+    # SQL과 같은 순서: 정렬 값 (NULL은 마지막), 동점은 그룹 키 오름차순
+    at = None if query.order_field == query.metric else query.group_by.index(query.order_field)
+    results.sort(key=lambda row: row['_key'])
+    present = [row for row in results if (row[query.metric] if at is None else row['_key'][at]) is not None]
+    missing = [row for row in results if (row[query.metric] if at is None else row['_key'][at]) is None]
+    present.sort(key=lambda row: row[query.metric] if at is None else row['_key'][at], reverse=query.descending)
+    results = present + missing
+    for row in results:
+        del row['_key']
+    return results[:query.limit]
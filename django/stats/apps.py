@@ -1,6 +1,42 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """마이그레이션 후 닉네임 검색 인덱스(FTS5)와 트리거 확인"""
+    from django.db import connections, router
+    from .models import GameUser
+    from .search import install_search_index
+
+    # 사용 기록 샤드에는 유저 테이블이 없음
+    if router.allow_migrate_model(using, GameUser):
+        install_search_index(connections[using])
 
 
 class StatsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stats'
+
+    def ready(self):
+        from . import quantiles, rollups, sharding, versions
+
+        post_migrate.connect(ensure_search_index, sender=self)
+        # 분위수 스케치 증분 갱신 (bulk_create/update()는 신호가 없으므로 재생성 필요)
+        post_save.connect(quantiles.track_user_save, sender='stats.GameUser')
+        post_delete.connect(quantiles.track_user_delete, sender='stats.GameUser')
+        post_save.connect(quantiles.track_stats_save, sender='stats.PlayerStats')
+        post_delete.connect(quantiles.track_stats_delete, sender='stats.PlayerStats')
+        # 파생 캐시(OLAP 큐브) 무효화용 데이터 버전
+        for model in ('stats.ItemUsage', 'stats.SkillUsage'):
+            post_save.connect(versions.bump_usage, sender=model)
+            post_delete.connect(versions.bump_usage, sender=model)
+        post_save.connect(versions.bump_users, sender='stats.GameUser')
+        post_delete.connect(versions.bump_users, sender='stats.GameUser')
+        post_save.connect(versions.bump_stats, sender='stats.PlayerStats')
+        post_delete.connect(versions.bump_stats, sender='stats.PlayerStats')
+        # 삭제는 증분 롤업이 찾지 못하므로 다음 롤업 작업은 전체 재계산
+        for model in ('stats.GameUser', 'stats.PlayerStats', 'stats.ItemUsage', 'stats.SkillUsage'):
+            post_delete.connect(rollups.invalidate_incremental, sender=model)
+        # 샤딩이 꺼져 있으면 연결하지 않음 (수신자가 있으면 PlayerStats 삭제가 fast delete를 못 탐)
+        if sharding.is_enabled():
+            post_delete.connect(sharding.delete_sharded_usages, sender='stats.PlayerStats')
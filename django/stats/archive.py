@@ -0,0 +1,275 @@
+"""비활성 유저 사용 기록 보관(콜드 스토리지)과 복원
+
+오래 플레이하지 않은 유저의 ItemUsage/SkillUsage 행을 유저당 ArchivedUsage 한 행(압축 배열)으로
+옮겨 사용 기록 테이블과 인덱스를 작게 유지합니다. 인기/상위 유저 집계는 사용 기록 테이블만
+읽으므로 보관된 유저는 자동으로 빠지고(활성 유저 기준 통계), 보관 후에는 데이터 버전을 올리고
+Top-K 스케치와 롤업을 다시 계산합니다.
+- 비활성 기준: GameUser.updated_at과 모든 사용 기록의 last_used가 cutoff 이전
+- 보관은 청크 단위로 default + 해당 샤드 트랜잭션 안에서 (보관 행 생성 → 사용 기록 삭제)
+- 상세 페이지 조회 시 rehydrate()로 원래 테이블에 되돌림 (이미 있는 행은 그대로 둠)
+
+blob 형식: 대상(item, skill)마다 [대상 id(델타), 사용 횟수, last_used(epoch µs)] 배열을
+leaderboard.encode_array로 압축해 각각 길이(uint32)를 앞에 붙여 이어 붙임.
+"""
+import struct
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connections
+from django.utils import timezone
+
+from . import sharding, sketches, versions
+from .ingest import USAGE_TABLES
+from .leaderboard import decode_array, encode_array
+from .models import ArchivedUsage, GameUser, ItemUsage, PlayerStats, SkillUsage
+from .rollups import invalidate_incremental, rebuild_rollups
+
+MODELS = {'item': ItemUsage, 'skill': SkillUsage}
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_LENGTH = struct.Struct('<I')
+
+
+# ---------------------------------------------------------------- 인코딩
+
+def to_micros(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def encode_usages(usages):
+    """{entity: [(대상 id, 사용 횟수, last_used)]} → bytes"""
+    parts = []
+    for entity in USAGE_TABLES:
+        rows = sorted(usages.get(entity, []))
+        columns = [
+            encode_array([row[0] for row in rows], delta=True),
+            encode_array([row[1] for row in rows]),
+            encode_array([to_micros(row[2]) for row in rows]),
+        ]
+        parts += [_LENGTH.pack(len(column)) + column for column in columns]
+    return b''.join(parts)
+
+
+def decode_usages(blob):
+    """encode_usages의 역변환"""
+    blob, offset, usages = bytes(blob), 0, {}
+    for entity in USAGE_TABLES:
+        columns = []
+        for delta in (True, False, False):
+            (length,) = _LENGTH.unpack_from(blob, offset)
+            offset += _LENGTH.size
+            columns.append(decode_array(blob[offset:offset + length], delta=delta))
+            offset += length
+        object_ids, counts, micros = columns
+        usages[entity] = [
+            (int(object_id), int(count), EPOCH + timedelta(microseconds=int(value)))
+            for object_id, count, value in zip(object_ids, counts, micros)
+        ]
+    return usages
+
+
+# ---------------------------------------------------------------- 보관
+
+def load_usages(stats_ids):
+    """{player_stats_id: {entity: [(대상 id, 사용 횟수, last_used)]}} — 샤드별 쿼리"""
+    result = {stats_id: {entity: [] for entity in USAGE_TABLES} for stats_id in stats_ids}
+    for alias, ids in sharding.group_by_shard(stats_ids).items():
+        for entity, (_, column) in USAGE_TABLES.items():
+            rows = MODELS[entity].objects.using(alias).filter(player_stats_id__in=ids).values_list(
+                'player_stats_id', column, 'usage_count', 'last_used')
+            for stats_id, object_id, usage_count, last_used in rows:
+                result[stats_id][entity].append((object_id, usage_count, last_used))
+    return result
+
+
+def delete_usages(stats_ids):
+    """player_stats_id들의 사용 기록 행 삭제 (샤드별, 호출한 쪽 트랜잭션 안에서)"""
+    for alias, ids in sharding.group_by_shard(stats_ids).items():
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connections[alias].cursor() as cursor:
+            for table, _ in USAGE_TABLES.values():
+                cursor.execute(f'DELETE FROM {table} WHERE player_stats_id IN ({placeholders})', ids)
+
+
+def take_usages(stats_ids):
+    """player_stats_id들의 사용 기록 행을 지우면서 읽기 (DELETE ... RETURNING, 호출한 쪽 트랜잭션 안에서)
+
+    읽은 내용과 지운 내용이 같으므로 그 사이 들어온 증가분도 빠짐없이 옮겨짐
+    """
+    result = {stats_id: {entity: [] for entity in USAGE_TABLES} for stats_id in stats_ids}
+    for alias, ids in sharding.group_by_shard(stats_ids).items():
+        connection = connections[alias]
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            for entity, (table, column) in USAGE_TABLES.items():
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE player_stats_id IN ({placeholders}) '
+                    f'RETURNING player_stats_id, {column}, usage_count, last_used', ids)
+                for stats_id, object_id, usage_count, last_used in cursor.fetchall():
+                    last_used = connection.ops.convert_datetimefield_value(last_used, None, connection)
+                    result[stats_id][entity].append((object_id, usage_count, last_used))
+    return result
+
+
+def insert_usages(usages, merge=False):
+    """{player_stats_id: {entity: [(대상 id, 사용 횟수, last_used)]}}를 사용 기록 테이블에 삽입
+
+    이미 있는 (유저, 대상) 행은 그대로 두거나, merge=True면 사용 횟수를 더하고 최근 시각으로 갱신.
+    """
+    for alias, ids in sharding.group_by_shard(usages).items():
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            for entity, (table, column) in USAGE_TABLES.items():
+                conflict = (
+                    f'DO UPDATE SET usage_count = {table}.usage_count + excluded.usage_count, '
+                    f'last_used = MAX({table}.last_used, excluded.last_used)' if merge else 'DO NOTHING'
+                )
+                cursor.executemany(
+                    f'INSERT INTO {table} (player_stats_id, {column}, usage_count, last_used) '
+                    f'VALUES (%s, %s, %s, %s) ON CONFLICT (player_stats_id, {column}) {conflict}',
+                    [(stats_id, object_id, count, connection.ops.adapt_datetimefield_value(last_used))
+                     for stats_id in ids for object_id, count, last_used in usages[stats_id].get(entity, [])],
+                )
+
+
+def usage_row_counts():
+    """사용 기록 테이블별 행 수 (모든 샤드 합계)"""
+    return {
+        table: sum(rows[0][0] for rows in sharding.scatter(f'SELECT COUNT(*) FROM {table}'))
+        for table, _ in USAGE_TABLES.values()
+    }
+
+
+def candidates(cutoff, limit, after_id=0):
+    """updated_at이 cutoff 이전이고 아직 보관되지 않은 player_stats_id (id 순, after_id 이후)
+
+    사용량 벡터(packed)로 저장된 유저는 행이 없으므로 제외
+    """
+    return list(
+        PlayerStats.objects.filter(id__gt=after_id, user__updated_at__lt=cutoff,
+                                   archived_usage__isnull=True, packed_usage__isnull=True)
+        .order_by('id').values_list('id', flat=True)[:limit]
+    )
+
+
+def archive_players(stats_ids, cutoff):
+    """사용 기록이 모두 cutoff 이전인 유저만 보관 → (보관 유저 수, 옮긴 행 수)
+
+    먼저 트랜잭션 밖에서 후보를 거르고, 트랜잭션 안에서 지운 행을 그대로 보관.
+    그 사이 최근 사용이 생긴 유저는 지운 행을 되돌려 놓음.
+    """
+    usages = load_usages(stats_ids)
+    eligible = [
+        stats_id for stats_id, entities in usages.items()
+        if all(row[2] < cutoff for rows in entities.values() for row in rows)
+    ]
+    if not eligible:
+        return 0, 0
+
+    with sharding.atomic({'default'} | set(sharding.group_by_shard(eligible))):
+        taken = take_usages(eligible)
+        archived, recent = {}, {}
+        for stats_id, entities in taken.items():
+            inactive = all(row[2] < cutoff for rows in entities.values() for row in rows)
+            (archived if inactive else recent)[stats_id] = entities
+        if recent:
+            insert_usages(recent)
+        ArchivedUsage.objects.bulk_create([
+            ArchivedUsage(player_stats_id=stats_id, data=encode_usages(entities),
+                          item_rows=len(entities['item']), skill_rows=len(entities['skill']))
+            for stats_id, entities in archived.items()
+        ])
+    rows = sum(len(rows) for entities in archived.values() for rows in entities.values())
+    return len(archived), rows
+
+
+def archive_inactive(days=90, chunk_size=500, max_chunks=None, pause=0.0):
+    """비활성 유저를 청크 단위로 보관 — 청크마다 (청크 번호, 확인 유저 수, 보관 유저 수, 옮긴 행 수)를 yield
+
+    청크 사이 pause초 쉬어 다른 쓰기에 잠금을 양보하고, 끝나면 파생 집계를 갱신합니다.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    after_id, chunk, moved = 0, 0, 0
+    try:
+        while max_chunks is None or chunk < max_chunks:
+            stats_ids = candidates(cutoff, chunk_size, after_id)
+            if not stats_ids:
+                break
+            players, rows = archive_players(stats_ids, cutoff)
+            moved += rows
+            chunk += 1
+            after_id = stats_ids[-1]
+            yield chunk, len(stats_ids), players, rows
+            if pause:
+                time.sleep(pause)
+    finally:
+        if moved:
+            refresh_derived()
+
+
+def refresh_derived():
+    """사용 기록이 크게 바뀐 뒤: 데이터 버전(큐브/영향 분석/응답 캐시), Top-K 스케치, 롤업"""
+    versions.bump(versions.USAGE)
+    for entity in USAGE_TABLES:
+        sketches.rebuild_topk(entity)
+        rebuild_rollups(entity)
+
+
+# ---------------------------------------------------------------- 복원
+
+def rehydrate(archived, refresh=True):
+    """보관된 사용 기록을 원래 테이블로 복원 후 보관 행 삭제 → 복원한 행 수
+
+    보관 뒤 새로 쌓인 행이 있으면 사용 횟수를 합침. 보관 행을 먼저 지운 쪽만 복원하므로
+    동시에 복원해도 두 번 더해지지 않음.
+    refresh=False면 데이터 버전/스케치 갱신을 호출한 쪽에 맡김 (대량 복원)
+    """
+    stats_id = archived.player_stats_id
+    usages = decode_usages(archived.data)
+    with sharding.atomic({'default', sharding.shard_for(stats_id)}):
+        deleted, _ = ArchivedUsage.objects.filter(pk=archived.pk).delete()
+        if not deleted:
+            return 0
+        insert_usages({stats_id: usages}, merge=True)
+    if not refresh:
+        return sum(len(rows) for rows in usages.values())
+
+    versions.bump(versions.USAGE)
+    # 복원한 행은 예전 last_used 그대로라 증분 롤업이 찾지 못함
+    invalidate_incremental()
+    tier = GameUser.objects.filter(stats__id=stats_id).values_list('tier', flat=True).first()
+    for entity, rows in usages.items():
+        catalog = sketches.catalog(entity)
+        type_column = sketches.ENTITIES[entity][3]
+        sketches.observe(entity, [
+            (tier, catalog.get(object_id, {}).get(type_column), object_id, count) for object_id, count, _ in rows
+        ])
+    return sum(len(rows) for rows in usages.values())
+
+
+def rehydrate_all(chunk_size=500):
+    """보관된 유저 모두 복원 (청크 단위) → 복원한 행 수"""
+    restored = 0
+    while True:
+        chunk = list(ArchivedUsage.objects.order_by('id')[:chunk_size])
+        if not chunk:
+            break
+        restored += sum(rehydrate(archived, refresh=False) for archived in chunk)
+    if restored:
+        refresh_derived()
+    return restored
+
+
+def archived_usage_objects(archived, items, skills):
+    """보관 데이터를 저장하지 않은 ItemUsage/SkillUsage 객체로 (읽기 전용 응답용)
+
+    items/skills: {id: Item/Skill}
+    """
+    usages = decode_usages(archived.data)
+    return (
+        [ItemUsage(player_stats_id=archived.player_stats_id, item=items[object_id], usage_count=count,
+                   last_used=last_used)
+         for object_id, count, last_used in usages['item'] if object_id in items],
+        [SkillUsage(player_stats_id=archived.player_stats_id, skill=skills[object_id], usage_count=count,
+                    last_used=last_used)
+         for object_id, count, last_used in usages['skill'] if object_id in skills],
+    )
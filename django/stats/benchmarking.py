@@ -0,0 +1,135 @@
+"""벤치마크 커맨드 공용 도구
+
+빠른 테이블 초기화, SQLite PRAGMA 프로필, 결과 저장(CSV/JSON)을 제공합니다.
+"""
+import csv
+import json
+import math
+import statistics
+from pathlib import Path
+
+from django.db import connection, connections, transaction
+
+from . import sharding, versions
+from .search import FTS_TABLE, install_search_index, is_supported
+
+# 자식 테이블부터 (FK 순서)
+DATA_TABLES = [
+    'stats_archivedusage',
+    'stats_packedusage',
+    'stats_itemusage',
+    'stats_skillusage',
+    'stats_playerstats',
+    'stats_gameuser',
+]
+
+PRAGMA_PROFILES = {
+    # SQLite 기본값
+    'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+    # 내구성 포기 (벤치마크/일회성 적재 전용)
+    'fast': {'journal_mode': 'MEMORY', 'synchronous': 'OFF', 'temp_store': 'MEMORY', 'cache_size': '-65536'},
+}
+
+
+def fast_reset(tables=DATA_TABLES):
+    """ORM cascade collector 없이 테이블 비우기
+
+    WHERE 없는 DELETE는 SQLite의 truncate 최적화를 타지만 트리거가 있으면 행 단위로
+    떨어지므로, 닉네임 검색 트리거를 잠시 내렸다가 인덱스를 비운 뒤 다시 설치합니다.
+    사용 기록이 샤딩되어 있으면 샤드의 테이블도 비웁니다.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_supported():
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_%'],
+            )
+            for (name,) in cursor.fetchall():
+                cursor.execute(f'DROP TRIGGER {name}')
+
+        for table in tables:
+            cursor.execute(f'DELETE FROM {table}')
+
+        if is_supported():
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+            install_search_index()
+
+    for alias in sharding.shard_aliases():
+        with connections[alias].cursor() as cursor:
+            for table in tables:
+                if table in sharding.SHARDED_TABLES:
+                    cursor.execute(f'DELETE FROM {table}')
+
+    versions.bump(versions.USAGE, versions.USERS, versions.STATS)
+
+
+def read_pragmas(names):
+    """현재 PRAGMA 값 조회"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = str(row[0]) if row else None
+    return values
+
+
+def apply_pragmas(pragmas):
+    """PRAGMA 적용 (프로필 이름 또는 dict), 적용 전 값을 반환"""
+    if isinstance(pragmas, str):
+        pragmas = PRAGMA_PROFILES[pragmas]
+    if connection.vendor != 'sqlite':
+        return {}
+
+    previous = read_pragmas(pragmas)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    return previous
+
+
+# 스튜던트 t 분포 양측 95% 임계값 (자유도 → t)
+_T_975 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+          8: 2.306, 9: 2.262, 10: 2.228, 15: 2.131, 20: 2.086, 30: 2.042}
+
+
+def t_critical(df):
+    """95% 신뢰구간용 t 값 (표에 없는 자유도는 보수적으로 더 작은 자유도 값 사용)"""
+    if df > 30:
+        return 1.96
+    return _T_975[max(key for key in _T_975 if key <= df)]
+
+
+def summarize(samples):
+    """반복 측정값 요약 (평균, 표준편차, 95% 신뢰구간)"""
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    margin = t_critical(len(samples) - 1) * stdev / math.sqrt(len(samples)) if len(samples) > 1 else 0.0
+    return {
+        'runs': len(samples),
+        'mean': mean,
+        'stdev': stdev,
+        'min': min(samples),
+        'max': max(samples),
+        'ci_low': mean - margin,
+        'ci_high': mean + margin,
+    }
+
+
+def write_results(rows, output_dir, name):
+    """결과 행(dict 리스트)을 CSV와 JSON으로 저장, 저장 경로 반환"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    json_path = output_dir / f'{name}.json'
+    json_path.write_text(json.dumps(rows, ensure_ascii=False, indent=2, default=str), encoding='utf-8')
+
+    csv_path = output_dir / f'{name}.csv'
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with csv_path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return csv_path, json_path
@@ -0,0 +1,397 @@
+"""테스트/벤치마크용 데이터셋 파일 (미리 만든 SQLite DB를 복사해 쓰기)
+
+벤치마크마다 generate_fake_data_bulk_version으로 같은 데이터를 다시 넣으면 측정보다 준비가 더 오래
+걸립니다. 규모(유저 수)와 시드마다 데이터를 한 번만 만들어 DATASET_DIR에 SQLite 파일로 캐시하고,
+쓰는 쪽은 그 파일을 작업 DB로 복사해 행 삽입 없이 같은 상태에서 시작합니다.
+- 이름 붙은 규모: SCALES (small / 100k / 1M), 그 밖의 유저 수도 그대로 사용 가능
+- 데이터셋 디렉터리 <유저 수>u-seed<시드>[-shards<n>]: db.sqlite3 (+ 사용 기록 샤드 파일) + manifest.json
+- 생성은 별도 프로세스에서 (DATABASE_PATH/USAGE_SHARD_DIR를 임시 디렉터리로 돌려) migrate →
+  generate_fake_data_bulk_version → rebuild_sketches → ANALYZE/VACUUM 후 디렉터리 이름을 붙여 공개
+- manifest: 행 수, 파일별 크기와 sha256, 전체 내용 해시, 스키마 버전(마이그레이션 leaf 노드 해시),
+  생성기 버전(generate_fake_data_bulk_version 소스 해시) — 스키마/생성기가 바뀌면 다시 만들고,
+  평소에는 파일 크기만, verify면 내용 해시까지 확인
+- 적재: copy는 연결을 닫고 파일 복사 (작업 DB가 파일일 때 기본), backup은 열린 연결에 SQLite
+  backup API로 덮어쓰기 (테스트의 메모리 DB) — 둘 다 트랜잭션 밖에서만
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.utils import timezone
+
+from . import leaderboard, olap, sharding, shared, similarity, sketches
+
+SCALES = {'small': 3000, '100k': 100_000, '1M': 1_000_000}
+DEFAULT_SEED = 42
+FORMAT = 1
+MANIFEST = 'manifest.json'
+GENERATOR = Path(__file__).parent / 'management' / 'commands' / 'generate_fake_data_bulk_version.py'
+COUNTED_TABLES = ['stats_gameuser', 'stats_playerstats', 'stats_item', 'stats_skill',
+                  'stats_itemusage', 'stats_skillusage']
+HASH_CHUNK = 1 << 20
+METHODS = ('auto', 'copy', 'backup')
+
+
+def resolve(scale):
+    """'small' / '100k' / '1M' / 유저 수 → 유저 수"""
+    if isinstance(scale, int):
+        return scale
+    if scale in SCALES:
+        return SCALES[scale]
+    if str(scale).isdigit():
+        return int(scale)
+    raise ValueError(f'알 수 없는 데이터셋 규모: {scale} ({", ".join(SCALES)} 또는 유저 수)')
+
+
+def dataset_dir():
+    return Path(settings.DATASET_DIR)
+
+
+def key(users, seed):
+    shards = sharding.shard_count()
+    return f'{users}u-seed{seed}' + (f'-shards{shards}' if shards else '')
+
+
+def db_files():
+    """[(DB alias, 데이터셋 안 파일 이름)] — 샤드 파일 이름은 settings의 usage_<n>.sqlite3와 같음"""
+    return [('default', 'db.sqlite3')] + [(alias, f'{alias}.sqlite3') for alias in sharding.shard_aliases()]
+
+
+def schema_version():
+    """코드의 마이그레이션 leaf 노드 해시 (모델/마이그레이션이 바뀌면 달라짐)"""
+    nodes = sorted(MigrationLoader(None, ignore_no_migrations=True).graph.leaf_nodes())
+    return hashlib.sha256(repr(nodes).encode()).hexdigest()[:12]
+
+
+def generator_version():
+    return hashlib.sha256(GENERATOR.read_bytes()).hexdigest()[:12]
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(file_hashes):
+    """파일별 해시 → 데이터셋 전체 내용 해시 (alias 순)"""
+    return hashlib.sha256(''.join(file_hashes[alias] for alias in sorted(file_hashes)).encode()).hexdigest()
+
+
+@dataclass
+class Dataset:
+    path: Path
+    manifest: dict
+
+    @property
+    def name(self):
+        return self.path.name
+
+    @property
+    def users(self):
+        return self.manifest['users']
+
+    @property
+    def content_hash(self):
+        return self.manifest['content_hash']
+
+    @property
+    def size(self):
+        return sum(spec['size'] for spec in self.manifest['files'].values())
+
+    def file(self, alias):
+        return self.path / self.manifest['files'][alias]['name']
+
+    def problems(self, verify=False):
+        """그대로 쓸 수 없는 이유 목록 (비어 있으면 정상) — verify면 내용 해시까지 다시 계산"""
+        manifest = self.manifest
+        problems = []
+        if manifest.get('format') != FORMAT:
+            problems.append(f'형식 {manifest.get("format")} != {FORMAT}')
+        if manifest.get('schema_version') != schema_version():
+            problems.append('스키마 버전 불일치 (마이그레이션이 바뀜)')
+        if manifest.get('generator_version') != generator_version():
+            problems.append('생성기(generate_fake_data_bulk_version) 변경')
+        files = manifest.get('files', {})
+        if sorted(files) != sorted(alias for alias, _ in db_files()):
+            problems.append('샤드 구성 불일치')
+            return problems
+
+        hashes = {}
+        for alias, spec in files.items():
+            path = self.path / spec['name']
+            if not path.is_file():
+                problems.append(f'{spec["name"]} 없음')
+            elif path.stat().st_size != spec['size']:
+                problems.append(f'{spec["name"]} 크기 불일치')
+            elif verify:
+                hashes[alias] = file_hash(path)
+                if hashes[alias] != spec['sha256']:
+                    problems.append(f'{spec["name"]} 내용 해시 불일치')
+        if verify and not problems and content_hash(hashes) != self.content_hash:
+            problems.append('내용 해시 불일치')
+        return problems
+
+
+def find(scale, seed=DEFAULT_SEED):
+    """캐시된 데이터셋 (없으면 None, 검사하지 않음)"""
+    path = dataset_dir() / key(resolve(scale), seed)
+    try:
+        return Dataset(path, json.loads((path / MANIFEST).read_text()))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def available():
+    """캐시된 데이터셋 전체 (유저 수, 시드 순)"""
+    datasets = []
+    for manifest in dataset_dir().glob(f'*/{MANIFEST}'):
+        try:
+            datasets.append(Dataset(manifest.parent, json.loads(manifest.read_text())))
+        except ValueError:
+            continue
+    return sorted(datasets, key=lambda dataset: (dataset.users, dataset.manifest['seed']))
+
+
+# ---------------------------------------------------------------- 생성
+
+@contextmanager
+def _locked(name):
+    """같은 데이터셋을 여러 프로세스가 동시에 만들지 않도록"""
+    directory = dataset_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f'.{name}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _manage(args, env):
+    result = subprocess.run([sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+                            env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f'데이터셋 생성 실패 (manage.py {" ".join(args)}):\n{result.stderr[-2000:]}')
+
+
+def _count_rows(paths):
+    counts = dict.fromkeys(COUNTED_TABLES, 0)
+    for path in paths:
+        with closing(sqlite3.connect(path)) as db:
+            tables = {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table in COUNTED_TABLES:
+                if table in tables:
+                    counts[table] += db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    return counts
+
+
+def build(scale, seed=DEFAULT_SEED, log=None):
+    """데이터셋 새로 생성 (이미 있으면 교체) → Dataset"""
+    log = log or (lambda message: None)
+    users = resolve(scale)
+    name = key(users, seed)
+    directory = dataset_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    temp = Path(tempfile.mkdtemp(prefix=f'.{name}.', dir=directory))
+    try:
+        env = {
+            **os.environ,
+            'DATABASE_PATH': str(temp / 'db.sqlite3'),
+            'USAGE_SHARD_DIR': str(temp),
+            'USAGE_SHARDS': str(sharding.shard_count()),
+        }
+        start_time = time.perf_counter()
+        log(f'데이터셋 {name} 생성 중 (유저 {users:,}명, 시드 {seed})...')
+        for alias, _ in db_files():
+            _manage(['migrate', '--database', alias, '--verbosity', '0'], env)
+        _manage(['generate_fake_data_bulk_version', '--users', str(users), '--seed', str(seed)], env)
+        _manage(['rebuild_sketches'], env)
+
+        files = {}
+        for alias, filename in db_files():
+            path = temp / filename
+            # 복사본이 -wal 파일 없이 완전하도록 DELETE 저널로 바꾸고 압축
+            with closing(sqlite3.connect(path, isolation_level=None)) as db:
+                db.execute('PRAGMA journal_mode = DELETE')
+                db.execute('ANALYZE')
+                db.execute('VACUUM')
+            files[alias] = {'name': filename, 'size': path.stat().st_size, 'sha256': file_hash(path)}
+
+        manifest = {
+            'format': FORMAT,
+            'name': name,
+            'users': users,
+            'seed': seed,
+            'shards': sharding.shard_count(),
+            'schema_version': schema_version(),
+            'generator_version': generator_version(),
+            'created_at': timezone.now().isoformat(),
+            'build_seconds': round(time.perf_counter() - start_time, 3),
+            'rows': _count_rows([temp / spec['name'] for spec in files.values()]),
+            'files': files,
+            'content_hash': content_hash({alias: spec['sha256'] for alias, spec in files.items()}),
+        }
+        (temp / MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+        temp.chmod(0o755)
+        final = directory / name
+        if final.exists():
+            shutil.rmtree(final)
+        os.replace(temp, final)
+    except BaseException:
+        shutil.rmtree(temp, ignore_errors=True)
+        raise
+    log(f'데이터셋 {name} 생성 완료: {manifest["build_seconds"]:.1f}초, '
+        f'{sum(spec["size"] for spec in files.values()) / 1024 / 1024:.1f}MB')
+    return Dataset(final, manifest)
+
+
+def get(scale, seed=DEFAULT_SEED, rebuild=False, verify=False, log=None):
+    """데이터셋 (없거나 스키마/생성기가 바뀌었거나 손상되었으면 새로 생성)"""
+    log = log or (lambda message: None)
+    users = resolve(scale)
+    if not rebuild:
+        dataset = find(users, seed)
+        if dataset is not None and not dataset.problems(verify):
+            return dataset
+    with _locked(key(users, seed)):
+        # 기다리는 동안 다른 프로세스가 만들었으면 그대로
+        dataset = find(users, seed)
+        if dataset is not None and not rebuild:
+            problems = dataset.problems(verify)
+            if not problems:
+                return dataset
+            log(f'데이터셋 {dataset.name}을 다시 만듭니다: {"; ".join(problems)}')
+        return build(users, seed, log)
+
+
+def remove(dataset):
+    shutil.rmtree(dataset.path)
+
+
+# ---------------------------------------------------------------- 적재
+
+def forget_process_state():
+    """작업 DB를 통째로 바꾼 뒤 이 프로세스의 파생 캐시가 이전 데이터를 보지 않도록"""
+    sketches.clear_cache()
+    leaderboard.clear_cache()
+    olap.clear()
+    similarity.clear()
+    shared.clear()
+
+
+def _check_outside_transaction(connection):
+    if connection.in_atomic_block:
+        raise RuntimeError('트랜잭션 안에서는 작업 DB를 교체할 수 없습니다 (TestCase는 setUpClass에서 적재).')
+
+
+def _copy_file(source, connection):
+    """연결을 닫고 작업 DB 파일을 데이터셋 사본으로 교체 (같은 디렉터리 임시 파일 → 이름 교체)"""
+    target = Path(connection.settings_dict['NAME'])
+    temp = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+    shutil.copyfile(source, temp)
+    for suffix in ('-wal', '-shm', '-journal'):
+        Path(f'{target}{suffix}').unlink(missing_ok=True)
+    os.replace(temp, target)
+
+
+def _backup(source, connection):
+    """열린 연결에 SQLite backup API로 덮어쓰기 (메모리 DB 포함)"""
+    connection.ensure_connection()
+    with closing(sqlite3.connect(f'file:{source}?mode=ro', uri=True)) as db:
+        db.backup(connection.connection)
+
+
+def load(dataset, method='auto'):
+    """데이터셋을 작업 DB(샤드 포함)로 복사 → 걸린 시간(초)
+
+    auto: 작업 DB가 파일이면 copy, 메모리 DB(테스트)면 backup
+    """
+    if method not in METHODS:
+        raise ValueError(f'method는 {", ".join(METHODS)} 중 하나여야 합니다.')
+    start_time = time.perf_counter()
+    aliases = [alias for alias, _ in db_files()]
+    for alias in aliases:
+        _check_outside_transaction(connections[alias])
+
+    use_copy = {
+        alias: method == 'copy' or (method == 'auto' and not connections[alias].is_in_memory_db())
+        for alias in aliases
+    }
+    # 샤드 연결은 default 파일을 ATTACH하므로 복사 전에 모두 닫음
+    if any(use_copy.values()):
+        for alias in aliases:
+            connections[alias].close()
+    for alias in aliases:
+        if use_copy[alias]:
+            _copy_file(dataset.file(alias), connections[alias])
+        else:
+            _backup(dataset.file(alias), connections[alias])
+    forget_process_state()
+    return time.perf_counter() - start_time
+
+
+def checkout(scale, seed=DEFAULT_SEED, method='auto', verify=False, log=None):
+    """데이터셋을 (없으면 만들어) 작업 DB로 적재 → Dataset"""
+    dataset = get(scale, seed, verify=verify, log=log)
+    seconds = load(dataset, method)
+    if log:
+        log(f'데이터셋 {dataset.name} 적재: {seconds:.3f}초 ({dataset.size / 1024 / 1024:.1f}MB)')
+    return dataset
+
+
+# ---------------------------------------------------------------- 스냅샷/복원
+
+def snapshot(alias='default', path=None):
+    """작업 DB 현재 상태를 backup API로 복사 → sqlite3 연결 (path가 없으면 메모리)"""
+    connection = connections[alias]
+    _check_outside_transaction(connection)
+    connection.ensure_connection()
+    copy = sqlite3.connect(str(path) if path else ':memory:', check_same_thread=False)
+    connection.connection.backup(copy)
+    return copy
+
+
+def restore(copy, alias='default'):
+    """snapshot()으로 떠 둔 상태로 작업 DB 되돌리기"""
+    connection = connections[alias]
+    _check_outside_transaction(connection)
+    connection.ensure_connection()
+    copy.backup(connection.connection)
+    forget_process_state()
+
+
+@contextmanager
+def preserved(path=None):
+    """with 블록이 끝나면 작업 DB(샤드 포함)를 블록 시작 때 상태로 (path: 스냅샷을 둘 디렉터리, 없으면 메모리)"""
+    copies = {
+        alias: snapshot(alias, Path(path) / filename if path else None) for alias, filename in db_files()
+    }
+    try:
+        yield
+    finally:
+        for alias, copy in copies.items():
+            restore(copy, alias)
+            copy.close()
+
+
+@contextmanager
+def loaded(scale, seed=DEFAULT_SEED, method='auto'):
+    """with 블록 동안 데이터셋을 작업 DB에 적재하고 끝나면 원래 상태로 (테스트 클래스용)"""
+    dataset = get(scale, seed)
+    with preserved():
+        load(dataset, method)
+        yield dataset
@@ -0,0 +1,198 @@
+"""아이템/스킬 승률·레벨 영향 분석
+
+유저(티어, 레벨, 승리, 게임 수)를 한 번, 사용 기록(행과 사용량 벡터)을 한 번 읽어 배열로 만든 뒤
+(티어, 대상)별 합계를 bincount로 한 번에 구합니다. 대상마다 쿼리를 돌리지 않습니다.
+- 사용자 평균 승률: 유저별 승률(wins / total_games)의 평균
+- 사용자 가중 승률: 승리 합 / 게임 수 합
+- 미사용자 승률: 티어 전체 합계에서 사용자 합계를 뺀 나머지
+- 사용량 가중 레벨: Σ(레벨 × 사용 횟수) / Σ사용 횟수
+- lift: 사용자 가중 승률 / 티어 기준 가중 승률
+승률은 PlayerStats.calculate_win_rate()와 같은 백분율이고, 게임 수 0인 유저는 승률 계산에서 빠집니다.
+결과는 데이터 버전(versions.token())별로 캐시합니다.
+"""
+import threading
+
+import numpy as np
+from django.db import connection
+
+from . import packed, sharding, versions
+from .aggregation import ENTITIES
+from .models import GameUser
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+ORDER_FIELDS = ('lift', 'weighted_win_rate', 'avg_win_rate', 'win_rate_delta', 'users', 'total_usage',
+                'usage_weighted_level')
+
+
+class ImpactTable:
+    """한 대상(item/skill)의 (티어, 대상)별 합계 배열 — 마지막 티어 인덱스는 ALL"""
+
+    def __init__(self, entity, details, sums, baseline):
+        self.entity = entity
+        self.details = details
+        # name → [T + 1, O] 배열
+        self.sums = sums
+        # name → [T + 1] 배열
+        self.baseline = baseline
+
+    def rows(self, tier=None, min_users=1, order_by='-lift', limit=None):
+        t = TIERS.index(tier) if tier and tier != 'ALL' else len(TIERS)
+        s = {name: values[t] for name, values in self.sums.items()}
+        b = {name: values[t] for name, values in self.baseline.items()}
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics = {
+                'users': s['users'],
+                'total_usage': s['usage'],
+                'avg_win_rate': s['rate_sum'] / s['rated'] * 100,
+                'weighted_win_rate': s['wins'] / s['games'] * 100,
+                'non_user_avg_win_rate': (b['rate_sum'] - s['rate_sum']) / (b['rated'] - s['rated']) * 100,
+                'non_user_weighted_win_rate': (b['wins'] - s['wins']) / (b['games'] - s['games']) * 100,
+                'usage_weighted_level': s['level_usage'] / s['usage'],
+            }
+            baseline = b['wins'] / b['games'] * 100 if b['games'] else np.nan
+            metrics['win_rate_delta'] = metrics['avg_win_rate'] - metrics['non_user_avg_win_rate']
+            metrics['lift'] = metrics['weighted_win_rate'] / baseline
+
+        field = order_by.lstrip('-')
+        keys = np.nan_to_num(metrics[field].astype(np.float64), nan=-np.inf if order_by.startswith('-') else np.inf)
+        order = np.argsort(-keys if order_by.startswith('-') else keys, kind='stable')
+        order = order[s['users'][order] >= min_users]
+        if limit is not None:
+            order = order[:limit]
+
+        results = []
+        for code in order:
+            row = dict(self.details[code])
+            for name, values in metrics.items():
+                value = values[code]
+                if name in ('users', 'total_usage'):
+                    row[name] = int(value)
+                else:
+                    row[name] = round(float(value), 4) if np.isfinite(value) else None
+            results.append(row)
+        return {
+            'tier': TIERS[t] if t < len(TIERS) else 'ALL',
+            'baseline_win_rate': round(float(baseline), 4) if np.isfinite(baseline) else None,
+            'baseline_users': int(b['users']),
+            'results': results,
+        }
+
+
+def _load_players():
+    """player_stats_id 순 (id, 티어 코드, 레벨, 승리, 게임 수) 배열 — 쿼리 한 번"""
+    tier_index = {code: i for i, code in enumerate(TIERS)}
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT ps.id, u.tier, u.level, ps.wins, ps.total_games
+            FROM stats_playerstats ps
+            INNER JOIN stats_gameuser u ON ps.user_id = u.id
+            ORDER BY ps.id
+        """)
+        rows = cursor.fetchall()
+    if not rows:
+        return [np.zeros(0, dtype=np.int64) for _ in range(5)]
+    ids, tiers, levels, wins, games = (np.array(column) for column in zip(*rows))
+    tiers = np.array([tier_index.get(tier, len(TIERS)) for tier in tiers], dtype=np.int64)
+    return (ids.astype(np.int64), tiers, levels.astype(np.int64),
+            wins.astype(np.int64), games.astype(np.int64))
+
+
+def _load_usage(entity):
+    """(player_stats_id, 대상 id, 사용 횟수) 배열 — 사용 기록 행(샤드별 스트리밍) + 사용량 벡터"""
+    _, usage_table, column, _, _ = ENTITIES[entity]
+    rows = list(sharding.stream(f'SELECT player_stats_id, {column}, usage_count FROM {usage_table}'))
+    columns = [np.array(column, dtype=np.int64) for column in zip(*rows)] if rows else [
+        np.zeros(0, dtype=np.int64) for _ in range(3)]
+    _, packed_players, packed_objects, packed_counts = packed.entries(entity)
+    # build()가 searchsorted로 유저 위치를 찾으므로 순서는 상관없음
+    return [np.concatenate([values, extra.astype(np.int64)])
+            for values, extra in zip(columns, (packed_players, packed_objects, packed_counts))]
+
+
+def _details(entity):
+    table, _, _, _, columns = ENTITIES[entity]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _with_all(per_tier):
+    """[T, ...] 티어별 합계 → [T + 1, ...] (마지막 = ALL)"""
+    return np.concatenate([per_tier, per_tier.sum(axis=0, keepdims=True)])
+
+
+def build(entity, players=None):
+    """한 번의 벡터 연산으로 ImpactTable 생성"""
+    ids, tiers, levels, wins, games = players if players is not None else _load_players()
+    details = _details(entity)
+    object_ids = np.array([row['id'] for row in details], dtype=np.int64)
+    T, O = len(TIERS), len(details)
+
+    rated = games > 0
+    rates = np.divide(wins, games, out=np.zeros(len(games), dtype=np.float64), where=rated)
+    known = tiers < T
+    baseline = {
+        'users': np.bincount(tiers[known], minlength=T),
+        'rated': np.bincount(tiers[known], weights=rated[known], minlength=T),
+        'rate_sum': np.bincount(tiers[known], weights=rates[known], minlength=T),
+        'wins': np.bincount(tiers[known], weights=wins[known], minlength=T),
+        'games': np.bincount(tiers[known], weights=games[known], minlength=T),
+    }
+
+    player_ids, usage_object_ids, counts = _load_usage(entity)
+    # 사용 기록 → 유저/대상 위치 (모르는 유저/대상은 제외)
+    players_at = np.minimum(np.searchsorted(ids, player_ids), max(len(ids) - 1, 0))
+    objects_at = np.minimum(np.searchsorted(object_ids, usage_object_ids), max(O - 1, 0))
+    valid = np.zeros(len(player_ids), dtype=bool)
+    if len(ids) and O:
+        valid = (ids[players_at] == player_ids) & (object_ids[objects_at] == usage_object_ids)
+        valid &= tiers[players_at] < T
+    players_at, objects_at, counts = players_at[valid], objects_at[valid], counts[valid]
+
+    key = tiers[players_at] * O + objects_at
+    size = T * O
+
+    def per_tier(weights=None):
+        return np.bincount(key, weights=weights, minlength=size).reshape(T, O) if O else np.zeros((T, 0))
+
+    # (유저, 대상)은 유니크라 행 하나 = 사용자 한 명
+    sums = {
+        'users': per_tier(),
+        'usage': per_tier(counts),
+        'rated': per_tier(rated[players_at]),
+        'rate_sum': per_tier(rates[players_at]),
+        'wins': per_tier(wins[players_at]),
+        'games': per_tier(games[players_at]),
+        'level_usage': per_tier(levels[players_at] * counts),
+    }
+    return ImpactTable(
+        entity, details,
+        {name: _with_all(values) for name, values in sums.items()},
+        {name: _with_all(values) for name, values in baseline.items()},
+    )
+
+
+# ---------------------------------------------------------------- 데이터 버전별 캐시
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_table(entity):
+    """현재 데이터 버전의 ImpactTable (버전이 바뀌었으면 다시 계산)"""
+    token = versions.token()
+    entry = _cache.get(entity)
+    if entry is not None and entry[0] == token:
+        return entry[1]
+    with _lock:
+        entry = _cache.get(entity)
+        if entry is None or entry[0] != token:
+            token = versions.token(fresh=True)
+            entry = _cache[entity] = (token, build(entity))
+    return entry[1]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
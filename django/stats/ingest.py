@@ -0,0 +1,85 @@
+"""아이템/스킬 사용량 증가 적재
+
+게임 서버가 보내는 (player_stats_id, 대상 id, 증가량) 이벤트를 배치로 받아
+사용 기록 테이블(샤딩 시 해당 샤드)에 upsert 하고 Top-K 스케치를 함께 갱신합니다.
+USAGE_STORAGE=packed면 행 대신 플레이어별 사용량 벡터를 갱신합니다 (stats/packed.py).
+한 유저의 사용 기록은 행, 벡터, 보관 중 한 곳에만 있도록 보관된 유저는 먼저 복원하고,
+벡터 방식이면 남은 행도 벡터로 옮긴 뒤 더합니다.
+"""
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import sharding, sketches, versions
+from .models import ArchivedUsage, PlayerStats
+
+# entity → (사용 기록 테이블, 대상 컬럼)
+USAGE_TABLES = {
+    'item': ('stats_itemusage', 'item_id'),
+    'skill': ('stats_skillusage', 'skill_id'),
+}
+
+
+def ingest_usage(entity, events):
+    """사용량 증가 이벤트 적재 — events: [(player_stats_id, 대상 id, 증가량)] → 적재 건수"""
+    table, column = USAGE_TABLES[entity]
+
+    # 같은 (유저, 대상) 이벤트는 미리 합산
+    merged = {}
+    for player_stats_id, object_id, delta in events:
+        if delta > 0:
+            key = (int(player_stats_id), int(object_id))
+            merged[key] = merged.get(key, 0) + int(delta)
+    if not merged:
+        return 0
+
+    now = timezone.now()
+    # packed → archive → ingest 순환 import를 피해 함수 안에서 import
+    from . import archive, packed
+
+    # 한 유저의 사용 기록은 한 저장 방식에만: 보관된 유저는 먼저 복원
+    for archived in ArchivedUsage.objects.filter(player_stats_id__in={p for p, _ in merged}):
+        archive.rehydrate(archived)
+    if packed.enabled():
+        packed.increment(entity, merged, now)
+    else:
+        _upsert_rows(table, column, merged, now)
+
+    versions.bump(versions.USAGE)
+
+    # 스케치 키에 필요한 티어/타입
+    tiers = dict(
+        PlayerStats.objects.filter(id__in={p for p, _ in merged}).values_list('id', 'user__tier')
+    )
+    catalog = sketches.catalog(entity)
+    type_column = sketches.ENTITIES[entity][3]
+    sketches.observe(entity, [
+        (tiers.get(player_stats_id), catalog.get(object_id, {}).get(type_column), object_id, delta)
+        for (player_stats_id, object_id), delta in merged.items()
+    ])
+    return len(merged)
+
+
+def _upsert_rows(table, column, merged, now):
+    """사용 기록 행 upsert (샤드별 트랜잭션)"""
+    groups = {}
+    for (player_stats_id, object_id), delta in merged.items():
+        alias = sharding.shard_for(player_stats_id)
+        groups.setdefault(alias, []).append((player_stats_id, object_id, delta, now))
+
+    for alias, rows in groups.items():
+        connection = connections[alias]
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (player_stats_id, {column}, usage_count, last_used) VALUES (%s, %s, %s, %s) '
+                f'ON CONFLICT (player_stats_id, {column}) DO UPDATE SET '
+                f'usage_count = {table}.usage_count + excluded.usage_count, last_used = excluded.last_used',
+                [(p, o, d, connection.ops.adapt_datetimefield_value(t)) for p, o, d, t in rows],
+            )
+
+
+def ingest_item_usage(events):
+    return ingest_usage('item', events)
+
+
+def ingest_skill_usage(events):
+    return ingest_usage('skill', events)
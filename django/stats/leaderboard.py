@@ -0,0 +1,281 @@
+"""일별 랭킹 스냅샷 저장/조회
+
+하루의 랭킹 순서(-ranking_score)를 유저 ID 배열, 점수 배열, 티어 코드 배열로
+압축해 LeaderboardSnapshot 한 행에 저장합니다. 로드할 때 id → 순위 조회 구조를
+만들어 두므로, 순위 변동 계산에 stats_gameuser 이력을 스캔할 필요가 없습니다.
+"""
+import struct
+import threading
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GameUser, LeaderboardSnapshot
+
+TIER_CODES = [code for code, _ in GameUser.TIER_CHOICES]
+TIER_INDEX = {code: index for index, code in enumerate(TIER_CODES)}
+
+# 헤더: dtype 문자열(3바이트) + 원소 개수
+_HEADER = struct.Struct('<3sI')
+_CACHE_SIZE = 8
+
+
+def encode_array(values, delta=False):
+    """정수 배열을 (선택적으로 델타 변환 후) 가장 작은 dtype + zlib으로 압축"""
+    arr = np.asarray(values, dtype=np.int64)
+    if delta and arr.size:
+        arr = np.diff(arr, prepend=0)
+
+    dtype = np.dtype('<i8')
+    if arr.size:
+        low, high = int(arr.min()), int(arr.max())
+        for candidate in ('<i1', '<i2', '<i4'):
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                dtype = np.dtype(candidate)
+                break
+
+    header = _HEADER.pack(dtype.str.encode(), arr.size)
+    return header + zlib.compress(arr.astype(dtype).tobytes(), 6)
+
+
+def decode_array(blob, delta=False):
+    """encode_array의 역변환 (int64 배열 반환)"""
+    blob = bytes(blob)
+    dtype_str, count = _HEADER.unpack_from(blob)
+    arr = np.frombuffer(zlib.decompress(blob[_HEADER.size:]), dtype=np.dtype(dtype_str.decode()))
+    arr = arr.astype(np.int64)
+    if arr.size != count:
+        raise ValueError(f'스냅샷 배열 길이 불일치: {arr.size} != {count}')
+    if delta:
+        arr = np.cumsum(arr)
+    return arr
+
+
+class RankSnapshot:
+    """메모리에 로드된 스냅샷 (id → 순위 조회 구조 포함)"""
+
+    # 공유 스냅샷(stats/shared.py)으로 내보내는 배열 — 조회 구조까지 포함해 워커가 다시 만들지 않음
+    ARRAYS = ('ids', 'scores', 'tiers', 'ranks', 'tier_ranks', 'sorted_ids', 'sorted_positions')
+
+    def __init__(self, snapshot_date, ids, scores, tiers, index=None):
+        self.snapshot_date = snapshot_date
+        self.ids = ids
+        self.scores = scores
+        self.tiers = tiers
+        if index is not None:
+            self.ranks, self.tier_ranks, self._sorted_ids, self._sorted_positions = index
+            return
+        self.ranks = np.arange(1, ids.size + 1, dtype=np.int64)
+
+        # id 정렬 배열 + 원래 위치 → searchsorted로 id → 위치 조회
+        order = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[order]
+        self._sorted_positions = order
+
+        # 티어 내 순위
+        self.tier_ranks = np.zeros(ids.size, dtype=np.int64)
+        for code in np.unique(tiers):
+            mask = tiers == code
+            self.tier_ranks[mask] = np.arange(1, int(mask.sum()) + 1)
+
+    def arrays(self):
+        """ARRAYS 이름 → 배열"""
+        return {
+            'ids': self.ids, 'scores': self.scores, 'tiers': self.tiers,
+            'ranks': self.ranks, 'tier_ranks': self.tier_ranks,
+            'sorted_ids': self._sorted_ids, 'sorted_positions': self._sorted_positions,
+        }
+
+    @classmethod
+    def from_arrays(cls, snapshot_date, arrays):
+        """arrays()로 내보낸 배열로 복원 (조회 구조를 다시 계산하지 않음)"""
+        return cls(snapshot_date, arrays['ids'], arrays['scores'], arrays['tiers'], index=(
+            arrays['ranks'], arrays['tier_ranks'], arrays['sorted_ids'], arrays['sorted_positions']))
+
+    def __len__(self):
+        return int(self.ids.size)
+
+    def positions(self, user_ids):
+        """유저 ID 배열 → 스냅샷 내 위치 (없으면 -1)"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if not self._sorted_ids.size:
+            return np.full(user_ids.size, -1, dtype=np.int64)
+        idx = np.searchsorted(self._sorted_ids, user_ids)
+        idx = np.minimum(idx, self._sorted_ids.size - 1)
+        found = self._sorted_ids[idx] == user_ids
+        return np.where(found, self._sorted_positions[idx], -1)
+
+    def ranks_for(self, user_ids, tier=None):
+        """유저 ID 배열 → 순위 (전체 또는 티어 내, 없으면 0)"""
+        positions = self.positions(user_ids)
+        found = positions >= 0
+        safe = np.where(found, positions, 0)
+        if tier:
+            found &= self.tiers[safe] == TIER_INDEX[tier]
+            ranks = self.tier_ranks[safe]
+        else:
+            ranks = self.ranks[safe]
+        return np.where(found, ranks, 0)
+
+    def tier_slice(self, tier=None):
+        """(ids, scores, ranks) — 티어 지정 시 해당 티어만"""
+        if not tier:
+            return self.ids, self.scores, self.ranks
+        mask = self.tiers == TIER_INDEX[tier]
+        return self.ids[mask], self.scores[mask], self.tier_ranks[mask]
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _load(pk):
+    """스냅샷 로드 (pk 기준 프로세스 캐시)"""
+    with _cache_lock:
+        snapshot = _cache.get(pk)
+    if snapshot is not None:
+        return snapshot
+
+    # 다른 워커가 내보낸 공유 스냅샷에 있으면 복사 없이 매핑 (프로세스 캐시에는 넣지 않음)
+    # shared → sketches → leaderboard 순환 import를 피해 함수 안에서 import
+    from . import shared
+    snapshot = shared.load_rank_snapshot(pk)
+    if snapshot is not None:
+        return snapshot
+
+    row = LeaderboardSnapshot.objects.get(pk=pk)
+    snapshot = RankSnapshot(
+        row.snapshot_date,
+        decode_array(row.user_ids, delta=True),
+        decode_array(row.scores, delta=True),
+        decode_array(row.tiers),
+    )
+
+    with _cache_lock:
+        if len(_cache) >= _CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[pk] = snapshot
+    return snapshot
+
+
+def clear_cache():
+    """프로세스 스냅샷 캐시 비우기"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def get_snapshot(on_or_before=None):
+    """지정 날짜 이전(포함) 가장 최근 스냅샷 (없으면 None)"""
+    queryset = LeaderboardSnapshot.objects.all()
+    if on_or_before is not None:
+        queryset = queryset.filter(snapshot_date__lte=on_or_before)
+    pk = queryset.order_by('-snapshot_date').values_list('pk', flat=True).first()
+    return _load(pk) if pk is not None else None
+
+
+def get_snapshot_days_ago(days):
+    """오늘 기준 N일 전(포함 이전) 스냅샷"""
+    return get_snapshot(timezone.localdate() - timedelta(days=days))
+
+
+@transaction.atomic
+def take_snapshot(snapshot_date=None):
+    """현재 랭킹 순서를 스냅샷으로 저장 (같은 날짜는 덮어씀)"""
+    snapshot_date = snapshot_date or timezone.localdate()
+
+    rows = GameUser.objects.order_by('-ranking_score', 'id').values_list('id', 'ranking_score', 'tier')
+    ids, scores, tiers = [], [], []
+    for user_id, score, tier in rows.iterator(chunk_size=10000):
+        ids.append(user_id)
+        scores.append(score)
+        tiers.append(TIER_INDEX.get(tier, -1))
+
+    # 같은 날짜 재생성 시 pk가 바뀌도록 삭제 후 생성 (프로세스 캐시 무효화)
+    LeaderboardSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+    return LeaderboardSnapshot.objects.create(
+        snapshot_date=snapshot_date,
+        user_count=len(ids),
+        user_ids=encode_array(ids, delta=True),
+        scores=encode_array(scores, delta=True),
+        tiers=encode_array(tiers),
+    )
+
+
+def biggest_movers(current, previous, limit=20, direction='up', tier=None):
+    """두 스냅샷 사이 순위 변동이 가장 큰 유저 (양수 = 상승)"""
+    ids, scores, ranks = current.tier_slice(tier)
+    previous_ranks = previous.ranks_for(ids, tier)
+
+    changes = previous_ranks - ranks
+    valid = (previous_ranks > 0) & ((changes > 0) if direction == 'up' else (changes < 0))
+    ids, scores, ranks = ids[valid], scores[valid], ranks[valid]
+    previous_ranks, changes = previous_ranks[valid], changes[valid]
+
+    keys = -changes if direction == 'up' else changes
+    limit = min(limit, keys.size)
+    if limit <= 0:
+        return []
+    top = np.argpartition(keys, limit - 1)[:limit]
+    top = top[np.argsort(keys[top], kind='stable')]
+
+    previous_positions = previous.positions(ids[top])
+    return [
+        {
+            'id': int(ids[i]),
+            'rank': int(ranks[i]),
+            'previous_rank': int(previous_ranks[i]),
+            'rank_change': int(changes[i]),
+            'ranking_score': int(scores[i]),
+            'previous_ranking_score': int(previous.scores[position]),
+        }
+        for i, position in zip(top, previous_positions)
+    ]
+
+
+# ---------------------------------------------------------------- 실시간 상위 N (api/live.py)
+
+LIVE_FIELDS = ('id', 'nickname', 'level', 'tier', 'ranking_score', 'win_rate')
+
+
+def live_top(tier=None, limit=100):
+    """현재 상위 N명 [(id, 닉네임, 레벨, 티어, 점수, 승률)] — 순위 순, 쿼리 1번"""
+    queryset = GameUser.objects.all()
+    if tier:
+        queryset = queryset.filter(tier=tier)
+    rows = queryset.order_by('-ranking_score', 'id').values_list(
+        'id', 'nickname', 'level', 'tier', 'ranking_score', 'stats__wins', 'stats__total_games')[:limit]
+    return [
+        (user_id, nickname, level, user_tier, score, round(wins / games * 100, 2) if games else 0.0)
+        for user_id, nickname, level, user_tier, score, wins, games in rows
+    ]
+
+
+def live_row(row, rank):
+    return dict(zip(LIVE_FIELDS, row), rank=rank)
+
+
+def diff_top(previous, current):
+    """두 live_top 결과 비교 → 새로 들어온 유저(전체 행), 빠진 유저 id, 순위 이동 [id, 순위], 값이 바뀐 유저 행"""
+    previous_rows = {row[0]: (rank, row) for rank, row in enumerate(previous, start=1)}
+    current_ids = {row[0] for row in current}
+    diff = {
+        'entered': [],
+        'exited': [row[0] for row in previous if row[0] not in current_ids],
+        'moved': [],
+        'updated': [],
+    }
+    for rank, row in enumerate(current, start=1):
+        before = previous_rows.get(row[0])
+        if before is None:
+            diff['entered'].append(live_row(row, rank))
+            continue
+        previous_rank, previous_row = before
+        if previous_rank != rank:
+            diff['moved'].append([row[0], rank])
+        if previous_row != row:
+            diff['updated'].append(dict(zip(LIVE_FIELDS, row)))
+    return diff
@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from stats import archive
+from stats.models import ArchivedUsage
+
+
+class Command(BaseCommand):
+    help = '오래 플레이하지 않은 유저의 아이템/스킬 사용 기록을 압축 보관(콜드 스토리지)하거나 복원합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='이 기간(일) 동안 활동이 없으면 보관')
+        parser.add_argument('--chunk-size', type=int, default=500, help='청크(트랜잭션)당 확인할 유저 수')
+        parser.add_argument('--max-chunks', type=int, default=None, help='이번 실행에서 처리할 최대 청크 수')
+        parser.add_argument('--pause', type=float, default=0.0, help='청크 사이 대기(초), 다른 쓰기에 잠금 양보')
+        parser.add_argument('--dry-run', action='store_true', help='보관 대상 유저 수만 출력')
+        parser.add_argument('--restore', action='store_true', help='보관된 사용 기록을 모두 원래 테이블로 복원')
+        parser.add_argument('--user', type=int, default=None, help='--restore: 이 유저(GameUser id)만 복원')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size는 1 이상이어야 합니다.')
+
+        self.stdout.write('\n' + '=' * 80)
+        action = '복원' if options['restore'] else f'보관 ({options["days"]}일 이상 비활성)'
+        self.stdout.write(self.style.WARNING(f'사용 기록 {action}'))
+        self.stdout.write('=' * 80)
+
+        before = archive.usage_row_counts()
+        start_time = time.time()
+        if options['restore']:
+            self.restore(options)
+        elif options['dry_run']:
+            cutoff = timezone.now() - timedelta(days=options['days'])
+            count = len(archive.candidates(cutoff, limit=None))
+            self.stdout.write(f'updated_at 기준 후보 유저: {count}명 (사용 기록 last_used는 보관 시 다시 확인)')
+            return
+        else:
+            self.archive(options)
+        elapsed = time.time() - start_time
+
+        after = archive.usage_row_counts()
+        self.stdout.write('-' * 80)
+        for table in before:
+            self.stdout.write(f'{table:<24} {before[table]:>10,}행 → {after[table]:>10,}행')
+        stored = ArchivedUsage.objects.aggregate(users=Count('id'), size=Sum(Length('data')))
+        self.stdout.write(f'보관 중: {stored["users"]:,}명, {stored["size"] or 0:,}바이트')
+        self.stdout.write(self.style.SUCCESS(f'실행시간: {elapsed:.2f}초'))
+
+    def archive(self, options):
+        self.stdout.write(f'{"청크":>6} {"확인":>8} {"보관":>8} {"옮긴 행":>10} {"누적 시간":>10}')
+        start_time = time.time()
+        totals = [0, 0, 0]
+        for chunk, checked, players, rows in archive.archive_inactive(
+            days=options['days'], chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'], pause=options['pause'],
+        ):
+            totals = [totals[0] + checked, totals[1] + players, totals[2] + rows]
+            self.stdout.write(f'{chunk:>6} {checked:>8} {players:>8} {rows:>10} {time.time() - start_time:>9.2f}초')
+        self.stdout.write(f'확인 {totals[0]:,}명, 보관 {totals[1]:,}명, 옮긴 행 {totals[2]:,}개')
+
+    def restore(self, options):
+        if options['user'] is None:
+            restored = archive.rehydrate_all(chunk_size=options['chunk_size'])
+        else:
+            archived = ArchivedUsage.objects.filter(player_stats__user_id=options['user']).first()
+            if archived is None:
+                raise CommandError(f'유저 {options["user"]}의 보관된 사용 기록이 없습니다.')
+            restored = archive.rehydrate(archived)
+        self.stdout.write(f'복원한 행: {restored:,}개')
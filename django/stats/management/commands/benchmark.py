@@ -1,97 +1,213 @@
 import time
-import matplotlib.pyplot as plt
-from django.core.management.base import BaseCommand
-from django.db.models import Count
-from stats.models import Item, ItemUsage, PlayerStats, GameUser
-import random
-
-class Command(BaseCommand):
-    help = 'Python 연산 vs DB Aggregation 성능 비교 및 시각화'
-
-    def handle(self, *args, **kwargs):
-        self.stdout.write("데이터 확인 중...")
-        
-        # 1. 데이터가 너무 적으면 차이가 안 나므로 더미 데이터 생성 (없을 경우)
-        if Item.objects.count() < 1000:
-            self.stdout.write("테스트를 위한 대량의 더미 데이터를 생성합니다... (시간이 좀 걸립니다)")
-            self.create_dummy_data()
-        else:
-            self.stdout.write(f"기존 데이터 사용 (Items: {Item.objects.count()}개)")
-
-        self.stdout.write("-" * 50)
-        self.stdout.write("벤치마크 시작!")
-
-        # --- [CASE 1] 비효율적인 방식 (Python Level) ---
-        self.stdout.write("1. Python 레벨 연산 (Sorted + Loop) 실행 중...")
-        start_time = time.time()
-        
-        # 모든 객체를 메모리에 가져옴
-        items = Item.objects.all()
-        # Python 리스트로 변환 후, lambda를 통해 각 아이템마다 count() 쿼리 발생 (N+1 문제 재현)
-        # 주의: 이 방식은 아이템 1000개면 1001번의 쿼리가 나갑니다.
-        sorted_items = sorted(items, key=lambda x: x.item_usages.count(), reverse=True)
-        
-        python_duration = time.time() - start_time
-        self.stdout.write(f"   -> 소요 시간: {python_duration:.4f}초")
-
-        # --- [CASE 2] 효율적인 방식 (DB Aggregation) ---
-        self.stdout.write("2. DB Aggregation (Annotate) 실행 중...")
-        start_time = time.time()
-        
-        # DB에서 계산을 끝내고 결과만 가져옴 (쿼리 1방)
-        queryset = Item.objects.annotate(
-            usage_count=Count('item_usages')
-        ).order_by('-usage_count')
-        # 평가를 강제하기 위해 list로 변환
-        result_list = list(queryset)
-        
-        db_duration = time.time() - start_time
-        self.stdout.write(f"   -> 소요 시간: {db_duration:.4f}초")
-
-        # --- [결과 시각화] ---
-        self.stdout.write("-" * 50)
-        self.create_graph(python_duration, db_duration)
-        
-        ratio = python_duration / db_duration
-        self.stdout.write(self.style.SUCCESS(f"결과: DB 연산이 Python 연산보다 약 {ratio:.1f}배 빠릅니다!"))
-        self.stdout.write(self.style.SUCCESS("결과 그래프가 'benchmark_result.png'로 저장되었습니다."))
-
-    def create_graph(self, py_time, db_time):
-        """matplotlib을 이용해 비교 그래프 생성"""
-        methods = ['Python Logic\n(N+1 Problem)', 'DB Aggregation\n(Annotate)']
-        times = [py_time, db_time]
-        colors = ['#ff9999', '#66b3ff'] # 빨강(느림), 파랑(빠름)
-
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(methods, times, color=colors)
-        
+import numpy as np
+from django.core.management.base import CommandError
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from stats import datasets, queries, sharding
+from stats.benchmarking import summarize, write_results
+from stats.models import GameUser, Item
+from stats.profiling import ProfiledCommand
+from stats.rollups import read_rollup, rebuild_rollups
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+TOP_N = 10
+
+STRATEGY_LABELS = {
+    'n_plus_one': 'ORM N+1\n(per item query)',
+    'annotate': 'ORM annotate\n(GROUP BY)',
+    'raw_sql': 'Raw SQL\n(popular_items)',
+    'rollup': 'Rollup table\nread',
+    'numpy': 'NumPy\n(load + bincount)',
+    'numpy_cached': 'NumPy\n(preloaded arrays)',
+}
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+class Command(ProfiledCommand):
+    help = '"티어별 인기 아이템" 집계 전략 벤치마크 (N+1 / annotate / raw SQL / 롤업 / NumPy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=int_list, default=[1000, 10000], help='유저 수 목록 (예: 1000,10000)')
+        parser.add_argument('--use-existing', action='store_true', help='데이터를 재생성하지 않고 현재 DB로 한 번만 측정')
+        parser.add_argument('--warmup', type=int, default=2, help='측정 전 워밍업 실행 횟수')
+        parser.add_argument('--repeat', type=int, default=10, help='측정 반복 횟수')
+        parser.add_argument('--seed', type=int, default=42, help='데이터 생성 시드')
+        parser.add_argument('--output-dir', default='benchmark_results', help='결과 저장 디렉터리')
+        parser.add_argument('--no-chart', action='store_true', help='차트 생성 생략')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat는 1 이상이어야 합니다.')
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING('집계 전략 벤치마크: 티어별 인기 아이템 TOP 10'))
+        self.stdout.write('=' * 80)
+
+        results = []
+        scales = [None] if options['use_existing'] else options['scales']
+        for scale in scales:
+            if scale is not None:
+                self.stdout.write(f'\n{scale}명 데이터셋 준비 중... (현재 DB는 데이터셋 사본으로 교체됩니다)')
+                datasets.checkout(scale, options['seed'], log=self.stdout.write)
+            scale = GameUser.objects.count()
+
+            start_time = time.perf_counter()
+            rebuild_rollups('item')
+            rollup_build = time.perf_counter() - start_time
+            usage_rows = sharding.count('stats_itemusage')
+            self.stdout.write(self.style.HTTP_INFO(
+                f'\n[{scale}명 / 사용 기록 {usage_rows}행] 롤업 재계산 {rollup_build:.4f}초'
+            ))
+
+            arrays = self.load_arrays()
+            strategies = {
+                'n_plus_one': self.run_n_plus_one,
+                'annotate': self.run_annotate,
+                'raw_sql': self.run_raw_sql,
+                'rollup': self.run_rollup,
+                'numpy': lambda: self.aggregate_arrays(*self.load_arrays()),
+                'numpy_cached': lambda: self.aggregate_arrays(*arrays),
+            }
+            if sharding.is_enabled():
+                # ORM 조인은 허브 DB 하나에서만 실행되므로 샤드의 사용 기록을 보지 못함
+                self.stdout.write(self.style.WARNING('  샤딩 중: ORM 전략(n_plus_one, annotate) 생략'))
+                del strategies['n_plus_one'], strategies['annotate']
+
+            reference = None
+            for name, run in strategies.items():
+                answer, samples = self.measure(run, options['warmup'], options['repeat'])
+                reference = reference or answer
+                summary = summarize(samples)
+                results.append({
+                    'users': scale,
+                    'usage_rows': usage_rows,
+                    'strategy': name,
+                    'consistent': answer == reference,
+                    'rollup_build_seconds': round(rollup_build, 6) if name == 'rollup' else '',
+                    **{key: round(value, 6) if isinstance(value, float) else value for key, value in summary.items()},
+                })
+                marker = '' if answer == reference else self.style.ERROR('  (결과 불일치!)')
+                self.stdout.write(
+                    f'  {name:<13} 평균 {summary["mean"] * 1000:9.3f}ms '
+                    f'(95% CI {summary["ci_low"] * 1000:.3f} ~ {summary["ci_high"] * 1000:.3f}ms, {summary["runs"]}회){marker}'
+                )
+
+        name = f'benchmark_{timezone.now():%Y%m%d_%H%M%S}'
+        csv_path, json_path = write_results(results, options['output_dir'], name)
+        self.stdout.write(self.style.SUCCESS(f'\n결과 저장: {csv_path}, {json_path}'))
+
+        if not options['no_chart']:
+            chart_path = self.create_graph(results, options['output_dir'], name)
+            self.stdout.write(self.style.SUCCESS(f"결과 그래프가 '{chart_path}'로 저장되었습니다."))
+
+    def measure(self, run, warmup, repeat):
+        """워밍업 후 반복 측정 → (마지막 결과, 측정값 리스트)"""
+        for _ in range(warmup):
+            run()
+        samples = []
+        answer = None
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            answer = run()
+            samples.append(time.perf_counter() - start_time)
+        return answer, samples
+
+    @staticmethod
+    def top_n(totals):
+        """{item_id: total} → 사용량 내림차순 (동점은 id 순) 상위 TOP_N"""
+        ranked = sorted(((item_id, total) for item_id, total in totals.items() if total), key=lambda x: (-x[1], x[0]))
+        return ranked[:TOP_N]
+
+    def run_n_plus_one(self):
+        """아이템 x 티어마다 집계 쿼리 (N+1)"""
+        answer = {}
+        for tier in TIERS:
+            totals = {}
+            for item in Item.objects.all():
+                totals[item.id] = item.item_usages.filter(player_stats__user__tier=tier).aggregate(
+                    total=Sum('usage_count'))['total'] or 0
+            answer[tier] = self.top_n(totals)
+        return answer
+
+    def run_annotate(self):
+        """티어마다 annotate(Sum) 쿼리 한 번"""
+        answer = {}
+        for tier in TIERS:
+            queryset = Item.objects.annotate(
+                total=Coalesce(Sum('item_usages__usage_count', filter=Q(item_usages__player_stats__user__tier=tier)), 0)
+            )
+            answer[tier] = self.top_n(dict(queryset.values_list('id', 'total')))
+        return answer
+
+    def run_raw_sql(self):
+        """ItemViewSet.popular_items와 같은 SQL"""
+        return {
+            tier: self.top_n({row['id']: row['total_usage'] for row in queries.popular_items(tier, None, TOP_N)})
+            for tier in TIERS
+        }
+
+    def run_rollup(self):
+        """미리 계산된 롤업 테이블 읽기"""
+        return {tier: self.top_n(dict(read_rollup('item', tier, TOP_N))) for tier in TIERS}
+
+    def load_arrays(self):
+        """(티어 코드, 아이템 ID, 사용 횟수) 배열 로드 — 샤드(또는 default)당 쿼리 1번"""
+        rows = sharding.stream(
+            'SELECT u.tier, iu.item_id, iu.usage_count FROM stats_itemusage iu '
+            f'JOIN {sharding.hub_table("stats_playerstats")} ps ON ps.id = iu.player_stats_id '
+            f'JOIN {sharding.hub_table("stats_gameuser")} u ON u.id = ps.user_id',
+            chunk_size=20000,
+        )
+        tier_index = {tier: i for i, tier in enumerate(TIERS)}
+        tiers, items, counts = [], [], []
+        for tier, item_id, usage_count in rows:
+            tiers.append(tier_index[tier])
+            items.append(item_id)
+            counts.append(usage_count)
+        return np.array(tiers, dtype=np.int64), np.array(items, dtype=np.int64), np.array(counts, dtype=np.int64)
+
+    def aggregate_arrays(self, tiers, items, counts):
+        """(티어, 아이템) 결합 키로 bincount"""
+        answer = {tier: [] for tier in TIERS}
+        if not items.size:
+            return answer
+        width = int(items.max()) + 1
+        totals = np.bincount(tiers * width + items, weights=counts, minlength=len(TIERS) * width)
+        totals = totals.reshape(len(TIERS), width)
+        for i, tier in enumerate(TIERS):
+            answer[tier] = self.top_n({item_id: int(total) for item_id, total in enumerate(totals[i]) if total})
+        return answer
+
+    def create_graph(self, results, output_dir, name):
+        """matplotlib을 이용해 규모별 전략 비교 그래프 생성 (평균 + 95% 신뢰구간)"""
+        import matplotlib.pyplot as plt
+
+        scales = list(dict.fromkeys(r['users'] for r in results))
+        strategies = list(dict.fromkeys(r['strategy'] for r in results))
+        width = 0.8 / len(scales)
+
+        plt.figure(figsize=(12, 6))
+        for i, scale in enumerate(scales):
+            rows = {r['strategy']: r for r in results if r['users'] == scale}
+            means = [rows[s]['mean'] for s in strategies]
+            errors = [rows[s]['mean'] - rows[s]['ci_low'] for s in strategies]
+            positions = [x + i * width for x in range(len(strategies))]
+            plt.bar(positions, means, width=width, yerr=errors, capsize=3, label=f'{scale} users')
+
         # 그래프 꾸미기
-        plt.title('Performance Comparison: Python vs DB Aggregation', fontsize=16)
-        plt.ylabel('Execution Time (Seconds)', fontsize=12)
-        
-        # 막대 위에 시간 표시
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2.0, height,
-                     f'{height:.4f} sec', ha='center', va='bottom', fontsize=12, fontweight='bold')
-
-        plt.savefig('benchmark_result.png')
-        plt.close()
+        plt.xticks([x + width * (len(scales) - 1) / 2 for x in range(len(strategies))],
+                   [STRATEGY_LABELS[s] for s in strategies])
+        plt.yscale('log')
+        plt.title('Popular items per tier: aggregation strategies', fontsize=16)
+        plt.ylabel('Execution Time (Seconds, log)', fontsize=12)
+        plt.legend()
+        plt.tight_layout()
 
-    def create_dummy_data(self):
-        """테스트용 데이터 대량 생성"""
-        # 아이템 1000개 생성
-        items = [Item(name=f'Test Item {i}', item_type='sword') for i in range(1000)]
-        Item.objects.bulk_create(items)
-        
-        # 유저 및 스탯 생성
-        user = GameUser.objects.create(user='bench_tester', tier='GOLD')
-        stats = PlayerStats.objects.create(user=user)
-        
-        # 아이템 사용 기록 20,000개 생성 (랜덤 분배)
-        all_items = list(Item.objects.all())
-        usages = []
-        for _ in range(20000):
-            usages.append(ItemUsage(player_stats=stats, item=random.choice(all_items)))
-        
-        ItemUsage.objects.bulk_create(usages)
\ No newline at end of file
+        path = f'{output_dir}/{name}.png'
+        plt.savefig(path)
+        plt.close()
+        return path
@@ -0,0 +1,348 @@
+import multiprocessing
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+import numpy as np
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.utils import timezone
+
+from stats import datasets, quantiles, queries, sharding, sketches, versions
+from stats.benchmarking import PRAGMA_PROFILES, apply_pragmas, read_pragmas, write_results
+from stats.ingest import ingest_item_usage, ingest_skill_usage
+from stats.models import GameUser, Item, ItemUsage, PlayerStats, Skill, SkillUsage
+from stats.profiling import ProfiledCommand
+
+STRATEGIES = ['save', 'f_update', 'upsert']
+# 저널 모드별 PRAGMA 프로필 (stats/benchmarking.py)
+JOURNALS = {'delete': 'default', 'wal': 'wal'}
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+RETRY_BACKOFF = 0.005
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def str_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def apply_profile(profile):
+    """현재 스레드의 default/샤드 연결에 PRAGMA 프로필 적용 (synchronous 등은 연결마다 설정)"""
+    apply_pragmas(profile)
+    for alias in sharding.shard_aliases():
+        with connections[alias].cursor() as cursor:
+            for name, value in PRAGMA_PROFILES[profile].items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def atomic_all(events):
+    """배치가 닿는 모든 DB(default + 해당 샤드)에 트랜잭션"""
+    stack = ExitStack()
+    for alias in {'default'} | {sharding.shard_for(event[0]) for event in events}:
+        stack.enter_context(transaction.atomic(using=alias))
+    return stack
+
+
+# ---------------------------------------------------------------- 적재 전략 (events: 한 판 결과 리스트)
+# event = (player_stats_id, item_id, item_delta, skill_id, skill_delta, win, minutes)
+
+def apply_save(events):
+    """행 단위 ORM save() — 신호(데이터 버전, 분위수 스케치)까지 실행"""
+    now = timezone.now()
+    with atomic_all(events):
+        for player_stats_id, item_id, item_delta, skill_id, skill_delta, win, minutes in events:
+            stats = PlayerStats.objects.get(pk=player_stats_id)
+            stats.total_games += 1
+            stats.wins += win
+            stats.losses += 1 - win
+            stats.play_time += minutes
+            stats.save()
+            for manager, field, object_id, delta in ((stats.item_usages, 'item_id', item_id, item_delta),
+                                                     (stats.skill_usages, 'skill_id', skill_id, skill_delta)):
+                usage, _ = manager.get_or_create(**{field: object_id}, defaults={'usage_count': 0, 'last_used': now})
+                usage.usage_count += delta
+                usage.last_used = now
+                usage.save()
+
+
+def apply_f_update(events):
+    """F() 식 UPDATE (없는 사용 기록만 INSERT), 데이터 버전은 배치마다 한 번"""
+    now = timezone.now()
+    with atomic_all(events):
+        for player_stats_id, item_id, item_delta, skill_id, skill_delta, win, minutes in events:
+            PlayerStats.objects.filter(pk=player_stats_id).update(
+                total_games=F('total_games') + 1,
+                wins=F('wins') + win,
+                losses=F('losses') + (1 - win),
+                play_time=F('play_time') + minutes,
+                win_rate=ExpressionWrapper((F('wins') + win) * 100.0 / (F('total_games') + 1), output_field=FloatField()),
+            )
+            alias = sharding.shard_for(player_stats_id)
+            for model, field, object_id, delta in ((ItemUsage, 'item_id', item_id, item_delta),
+                                                   (SkillUsage, 'skill_id', skill_id, skill_delta)):
+                queryset = model.objects.using(alias).filter(player_stats_id=player_stats_id, **{field: object_id})
+                if not queryset.update(usage_count=F('usage_count') + delta, last_used=now):
+                    model.objects.using(alias).create(
+                        player_stats_id=player_stats_id, **{field: object_id}, usage_count=delta, last_used=now)
+        versions.bump(versions.USAGE, versions.STATS)
+
+
+def apply_upsert(events):
+    """stats/ingest.py 배치 upsert + 전적 executemany UPDATE"""
+    with atomic_all(events):
+        ingest_item_usage([(event[0], event[1], event[2]) for event in events])
+        ingest_skill_usage([(event[0], event[3], event[4]) for event in events])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'UPDATE stats_playerstats SET total_games = total_games + 1, wins = wins + %s, '
+                'losses = losses + %s, play_time = play_time + %s, '
+                'win_rate = (wins + %s) * 100.0 / (total_games + 1) WHERE id = %s',
+                [(win, 1 - win, minutes, win, player_stats_id)
+                 for player_stats_id, _, _, _, _, win, minutes in events],
+            )
+        versions.bump(versions.STATS)
+
+
+APPLY = {'save': apply_save, 'f_update': apply_f_update, 'upsert': apply_upsert}
+
+
+# ---------------------------------------------------------------- 작업자
+
+def run_writer(strategy, batches, profile, start_at, duration, retries, seed):
+    """deadline까지 배치를 반복 적용 → 측정값 dict (스레드/프로세스 공용)"""
+    rng = random.Random(seed)
+    result = {'events': 0, 'commits': 0, 'lock_errors': 0, 'retries': 0, 'failed': 0, 'latencies': []}
+    try:
+        apply_profile(profile)
+        time.sleep(max(0.0, start_at - time.time()))
+        deadline = start_at + duration
+        index = 0
+        while time.time() < deadline:
+            batch = batches[index % len(batches)]
+            index += 1
+            for attempt in range(retries + 1):
+                started = time.perf_counter()
+                try:
+                    APPLY[strategy](batch)
+                except OperationalError as e:
+                    if not is_lock_error(e):
+                        raise
+                    result['lock_errors'] += 1
+                    if attempt == retries:
+                        result['failed'] += 1
+                        break
+                    result['retries'] += 1
+                    time.sleep(RETRY_BACKOFF * (2 ** attempt) * rng.random())
+                    continue
+                result['latencies'].append(time.perf_counter() - started)
+                result['commits'] += 1
+                result['events'] += len(batch)
+                break
+    finally:
+        connections.close_all()
+    return result
+
+
+def _writer_process(queue, *args):
+    queue.put(run_writer(*args))
+
+
+def run_reader(profile, start_at, duration, seed, result):
+    """deadline까지 대시보드 읽기(티어별 인기 아이템) 반복 → result에 지연/잠금 오류 기록"""
+    rng = random.Random(seed)
+    try:
+        apply_profile(profile)
+        time.sleep(max(0.0, start_at - time.time()))
+        while time.time() < start_at + duration:
+            started = time.perf_counter()
+            try:
+                queries.popular_items(rng.choice(TIERS))
+            except OperationalError as e:
+                if not is_lock_error(e):
+                    raise
+                result['lock_errors'] += 1
+                continue
+            result['latencies'].append(time.perf_counter() - started)
+    finally:
+        connections.close_all()
+
+
+def percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 3) if values else 0.0
+
+
+class Command(ProfiledCommand):
+    help = '동시 적재 경합 벤치마크: 작성자 N개 × 적재 전략 × 트랜잭션 크기 × 저널 모드 (동시 읽기 지연 포함)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int_list, default=[1, 4], help='동시 작성자 수 목록')
+        parser.add_argument('--readers', type=int, default=2, help='동시 읽기 스레드 수')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread', help='작성자 실행 방식')
+        parser.add_argument('--strategies', type=str_list, default=STRATEGIES, help=f'적재 전략 ({",".join(STRATEGIES)})')
+        parser.add_argument('--batch-sizes', type=int_list, default=[1, 10, 100], help='트랜잭션당 게임 결과 수')
+        parser.add_argument('--journals', type=str_list, default=list(JOURNALS), help=f'저널 모드 ({",".join(JOURNALS)})')
+        parser.add_argument('--duration', type=float, default=5.0, help='케이스당 측정 시간(초)')
+        parser.add_argument('--retries', type=int, default=5, help='잠금 오류 시 재시도 횟수')
+        parser.add_argument('--users', type=int, default=None, help='지정 시 이 규모의 데이터셋 사본으로 현재 DB를 교체')
+        parser.add_argument('--seed', type=int, default=42, help='이벤트 생성 시드')
+        parser.add_argument('--output-dir', default='benchmark_results', help='결과 저장 디렉터리')
+
+    def handle(self, *args, **options):
+        for key, allowed in (('strategies', STRATEGIES), ('journals', JOURNALS)):
+            unknown = set(options[key]) - set(allowed)
+            if unknown:
+                raise CommandError(f'알 수 없는 {key}: {", ".join(sorted(unknown))}')
+        if connection.vendor != 'sqlite':
+            raise CommandError('이 벤치마크는 SQLite 전용입니다.')
+
+        if options['users']:
+            datasets.checkout(options['users'], options['seed'], log=self.stdout.write)
+        stats_ids = list(PlayerStats.objects.values_list('id', flat=True))
+        item_ids = list(Item.objects.values_list('id', flat=True))
+        skill_ids = list(Skill.objects.values_list('id', flat=True))
+        if not (stats_ids and item_ids and skill_ids):
+            raise CommandError('유저/아이템/스킬 데이터가 없습니다. --users로 생성하세요.')
+
+        cases = [(journal, strategy, batch_size, writers)
+                 for journal in options['journals'] for strategy in options['strategies']
+                 for batch_size in options['batch_sizes'] for writers in options['writers']]
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING('동시 적재 경합 벤치마크 (사용 기록/전적이 실제로 증가합니다)'))
+        self.stdout.write('=' * 80)
+        self.stdout.write(f'유저 {len(stats_ids)}명, 작성자 {options["writers"]} ({options["mode"]}), '
+                          f'읽기 {options["readers"]}개, 케이스당 {options["duration"]}초')
+        self.stdout.write(f'총 {len(cases)}개 케이스\n')
+
+        results = []
+        original = read_pragmas(PRAGMA_PROFILES['default'])
+        try:
+            for journal, strategy, batch_size, writers in cases:
+                rng = random.Random(f'{options["seed"]}-{strategy}-{batch_size}-{writers}')
+                result = self.run_case(options, JOURNALS[journal], strategy, batch_size, writers,
+                                       stats_ids, item_ids, skill_ids, rng)
+                result = {'journal': journal, 'strategy': strategy, 'batch_size': batch_size,
+                          'writers': writers, 'mode': options['mode'], **result}
+                results.append(result)
+                line = (
+                    f'[{journal:<6}] {strategy:<8} batch={batch_size:<4} writers={writers:<2} -> '
+                    f'{result["events_per_second"]:>8.1f}건/초, 커밋 {result["commits_per_second"]:>7.1f}/초, '
+                    f'잠금 {result["lock_errors"]} (재시도 {result["retries"]}, 실패 {result["failed_batches"]}), '
+                    f'커밋 p99 {result["commit_p99_ms"]:.1f}ms, 읽기 p99 {result["reader_p99_ms"]:.1f}ms'
+                )
+                self.stdout.write(self.style.ERROR(line) if result['failed_batches'] else line)
+        finally:
+            connections.close_all()
+            apply_pragmas(original)
+            # F()/raw UPDATE는 신호를 거치지 않으므로 파생 상태를 다시 계산
+            sketches.rebuild_topk('item')
+            sketches.rebuild_topk('skill')
+            quantiles.rebuild_quantiles()
+            versions.bump(versions.USAGE, versions.STATS)
+
+        name = f'benchmark_ingest_{timezone.now():%Y%m%d_%H%M%S}'
+        csv_path, json_path = write_results(results, options['output_dir'], name)
+        self.print_summary(results)
+        self.stdout.write(self.style.SUCCESS(f'\n결과 저장: {csv_path}, {json_path}'))
+
+    def make_batches(self, rng, batch_size, stats_ids, item_ids, skill_ids, count=50):
+        """작성자 하나가 돌려 쓸 배치들 — 인기 대상에 몰리는 분포 (1/순위 가중치)"""
+        item_weights = [1 / (rank + 1) for rank in range(len(item_ids))]
+        skill_weights = [1 / (rank + 1) for rank in range(len(skill_ids))]
+        return [
+            [(rng.choice(stats_ids), rng.choices(item_ids, item_weights)[0], rng.randint(1, 5),
+              rng.choices(skill_ids, skill_weights)[0], rng.randint(1, 20), int(rng.random() < 0.5),
+              rng.randint(10, 40))
+             for _ in range(batch_size)]
+            for _ in range(count)
+        ]
+
+    def run_case(self, options, profile, strategy, batch_size, writers, stats_ids, item_ids, skill_ids, rng):
+        duration, retries = options['duration'], options['retries']
+        # 연결을 정리한 뒤 저널 모드 전환 (WAL은 파일에 남음), 작성자/읽기는 각자 연결
+        connections.close_all()
+        apply_profile(profile)
+        connections.close_all()
+
+        start_at = time.time() + 0.5
+        writer_args = [
+            (strategy, self.make_batches(rng, batch_size, stats_ids, item_ids, skill_ids), profile,
+             start_at, duration, retries, rng.random())
+            for _ in range(writers)
+        ]
+
+        writer_results = []
+        if options['mode'] == 'process':
+            context = multiprocessing.get_context('fork')
+            queue = context.Queue()
+            processes = [context.Process(target=_writer_process, args=(queue, *args)) for args in writer_args]
+            for process in processes:
+                process.start()
+        else:
+            threads = [threading.Thread(target=lambda args=args: writer_results.append(run_writer(*args)))
+                       for args in writer_args]
+            for thread in threads:
+                thread.start()
+
+        reader_result = {'latencies': [], 'lock_errors': 0}
+        readers = [threading.Thread(target=run_reader, args=(profile, start_at, duration, rng.random(), reader_result))
+                   for _ in range(options['readers'])]
+        for reader in readers:
+            reader.start()
+
+        if options['mode'] == 'process':
+            writer_results = [queue.get() for _ in processes]
+            for process in processes:
+                process.join()
+        else:
+            for thread in threads:
+                thread.join()
+        for reader in readers:
+            reader.join()
+
+        latencies = [value for result in writer_results for value in result['latencies']]
+        events = sum(result['events'] for result in writer_results)
+        commits = sum(result['commits'] for result in writer_results)
+        return {
+            'seconds': duration,
+            'events': events,
+            'commits': commits,
+            'events_per_second': round(events / duration, 1),
+            'commits_per_second': round(commits / duration, 1),
+            'lock_errors': sum(result['lock_errors'] for result in writer_results),
+            'retries': sum(result['retries'] for result in writer_results),
+            'failed_batches': sum(result['failed'] for result in writer_results),
+            'commit_p50_ms': percentile_ms(latencies, 50),
+            'commit_p99_ms': percentile_ms(latencies, 99),
+            'reader_queries': len(reader_result['latencies']),
+            'reader_lock_errors': reader_result['lock_errors'],
+            'reader_p50_ms': percentile_ms(reader_result['latencies'], 50),
+            'reader_p95_ms': percentile_ms(reader_result['latencies'], 95),
+            'reader_p99_ms': percentile_ms(reader_result['latencies'], 99),
+        }
+
+    def print_summary(self, results):
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.SUCCESS(' 저널 모드 × 작성자 수별 처리량 상위 3개 (실패 배치 없는 케이스)'))
+        self.stdout.write('=' * 80)
+        groups = {}
+        for result in results:
+            groups.setdefault((result['journal'], result['writers']), []).append(result)
+        for (journal, writers), group in groups.items():
+            self.stdout.write(f'\n[{journal} | 작성자 {writers}]')
+            safe = sorted((r for r in group if not r['failed_batches']), key=lambda r: -r['events_per_second'])
+            for r in safe[:3]:
+                self.stdout.write(f'  {r["strategy"]:<8} batch={r["batch_size"]:<4} {r["events_per_second"]:>8.1f}건/초 '
+                                  f'잠금 {r["lock_errors"]}, 읽기 p99 {r["reader_p99_ms"]:.1f}ms')
+            if not safe:
+                self.stdout.write(self.style.ERROR('  모든 케이스에서 재시도 후에도 실패한 배치가 있습니다.'))
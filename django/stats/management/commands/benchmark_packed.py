@@ -0,0 +1,161 @@
+import time
+
+import numpy as np
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from stats import datasets, olap, packed
+from stats.aggregation import UsageQuery, run
+from stats.benchmarking import summarize, write_results
+from stats.models import GameUser
+from stats.profiling import ProfiledCommand
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+TOP_N = 10
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def top_n(pairs):
+    """[(id, 합계)] → 합계 내림차순(동점은 id 순) 상위 TOP_N, 사용 기록 없는 대상 제외"""
+    return sorted(((int(object_id), int(total)) for object_id, total in pairs if total),
+                  key=lambda pair: (-pair[1], pair[0]))[:TOP_N]
+
+
+class Command(ProfiledCommand):
+    help = '사용 기록 행 방식과 플레이어별 사용량 벡터(packed) 방식의 저장 크기/집계 속도 비교'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entity', choices=['item', 'skill'], default='item', help='집계 대상')
+        parser.add_argument('--scales', type=int_list, default=[1000, 10000], help='유저 수 목록 (예: 1000,10000)')
+        parser.add_argument('--use-existing', action='store_true', help='데이터를 재생성하지 않고 현재 DB로 측정')
+        parser.add_argument('--warmup', type=int, default=1, help='측정 전 워밍업 실행 횟수')
+        parser.add_argument('--repeat', type=int, default=5, help='측정 반복 횟수')
+        parser.add_argument('--seed', type=int, default=42, help='데이터 생성 시드')
+        parser.add_argument('--keep-packed', action='store_true', help='측정 후 행 방식으로 되돌리지 않음')
+        parser.add_argument('--output-dir', default='benchmark_results', help='결과 저장 디렉터리')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat는 1 이상이어야 합니다.')
+        entity = options['entity']
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'저장 방식 벤치마크: 행 vs 사용량 벡터 ({entity}, 티어별 TOP {TOP_N})'))
+        self.stdout.write('=' * 80)
+
+        results = []
+        scales = [None] if options['use_existing'] else options['scales']
+        for scale in scales:
+            if scale is not None:
+                self.stdout.write(f'\n{scale}명 데이터셋 준비 중... (현재 DB는 데이터셋 사본으로 교체됩니다)')
+                datasets.checkout(scale, options['seed'], log=self.stdout.write)
+            # 행 방식에서 시작
+            for _ in packed.convert('rows'):
+                pass
+            scale = GameUser.objects.count()
+            results += self.run_scale(entity, scale, options)
+
+        name = f'benchmark_packed_{timezone.now():%Y%m%d_%H%M%S}'
+        csv_path, json_path = write_results(results, options['output_dir'], name)
+        self.stdout.write(self.style.SUCCESS(f'\n결과 저장: {csv_path}, {json_path}'))
+
+    def run_scale(self, entity, scale, options):
+        row_size = packed.storage_bytes()
+        self.stdout.write(self.style.HTTP_INFO(f'\n[{scale}명]'))
+        measured = self.measure_layout('rows', {
+            'rows_sql': lambda: self.sql_answer(entity),
+            'rows_cube_scan': lambda: self.cube_answer(entity),
+        }, options)
+
+        start_time = time.perf_counter()
+        moved = sum(rows for _, _, rows in packed.convert('packed'))
+        convert_seconds = time.perf_counter() - start_time
+        packed_size = packed.storage_bytes()
+        self.stdout.write(f'  행 → 벡터 전환: {moved:,}행, {convert_seconds:.3f}초')
+
+        measured += self.measure_layout('packed', {
+            'packed_numpy': lambda: self.vector_answer(entity),
+            'packed_popular': lambda: self.popular_answer(entity),
+            'packed_cube_scan': lambda: self.cube_answer(entity),
+        }, options)
+
+        if not options['keep_packed']:
+            for _ in packed.convert('rows'):
+                pass
+
+        reference = measured[0][2]
+        rows = []
+        for layout, strategy, answer, summary in measured:
+            size = (row_size or {}).get('rows') if layout == 'rows' else (packed_size or {}).get('packed')
+            rows.append({
+                'users': scale,
+                'layout': layout,
+                'strategy': strategy,
+                'storage_bytes': size if size is not None else '',
+                'bytes_per_user': round(size / scale, 1) if size and scale else '',
+                'convert_seconds': round(convert_seconds, 6) if layout == 'packed' else '',
+                'consistent': answer == reference,
+                **{key: round(value, 6) if isinstance(value, float) else value for key, value in summary.items()},
+            })
+
+        if row_size and packed_size:
+            ratio = row_size['rows'] / packed_size['packed'] if packed_size['packed'] else float('inf')
+            self.stdout.write(
+                f'  저장 크기(테이블+인덱스): 행 {row_size["rows"]:,}바이트 → 벡터 {packed_size["packed"]:,}바이트 '
+                f'({ratio:.1f}배 작음), 유저당 {row_size["rows"] / scale:.0f} → {packed_size["packed"] / scale:.0f}바이트'
+            )
+        for row in rows:
+            marker = '' if row['consistent'] else self.style.ERROR('  (결과 불일치!)')
+            self.stdout.write(
+                f'  {row["strategy"]:<17} 평균 {row["mean"] * 1000:9.3f}ms '
+                f'(95% CI {row["ci_low"] * 1000:.3f} ~ {row["ci_high"] * 1000:.3f}ms, {row["runs"]}회){marker}'
+            )
+        return rows
+
+    def measure_layout(self, layout, strategies, options):
+        """[(저장 방식, 전략, 마지막 결과, 요약)]"""
+        measured = []
+        for strategy, run_once in strategies.items():
+            for _ in range(options['warmup']):
+                run_once()
+            samples, answer = [], None
+            for _ in range(options['repeat']):
+                start_time = time.perf_counter()
+                answer = run_once()
+                samples.append(time.perf_counter() - start_time)
+            measured.append((layout, strategy, answer, summarize(samples)))
+        return measured
+
+    def sql_answer(self, entity):
+        """행 방식 SQL 경로 (aggregation 엔진, 티어마다 쿼리 한 번)"""
+        return {
+            tier or 'ALL': top_n((row['id'], row['total_usage'])
+                                 for row in run(UsageQuery(entity, tiers=(tier,) if tier else (), limit=TOP_N)))
+            for tier in TIERS + [None]
+        }
+
+    def cube_answer(self, entity):
+        """OLAP 큐브 스캔 (두 방식 모두 읽음) 후 티어별 순위"""
+        cube = olap.build_entity(entity)
+        return {
+            tier or 'ALL': top_n((row['id'], row['total_usage']) for row in cube.popular(tier, limit=TOP_N))
+            for tier in TIERS + [None]
+        }
+
+    def vector_answer(self, entity):
+        """사용량 벡터 행렬을 bincount로 티어별 합산 (쿼리 1번)"""
+        total, _ = packed.tier_totals(entity)
+        ids = np.arange(1, total.shape[1] + 1)
+        answer = {tier: top_n(zip(ids, total[i])) for i, tier in enumerate(TIERS)}
+        answer['ALL'] = top_n(zip(ids, total[-1]))
+        return answer
+
+    def popular_answer(self, entity):
+        """API SQL 경로와 같은 packed.popular (벡터 합산 + 남은 행, 대상 정보 포함)"""
+        return {
+            tier or 'ALL': top_n((row['id'], row['total_usage']) for row in packed.popular(entity, tier, limit=TOP_N))
+            for tier in TIERS + [None]
+        }
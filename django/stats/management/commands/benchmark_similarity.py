@@ -0,0 +1,204 @@
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from stats import datasets, similarity
+from stats.benchmarking import summarize, write_results
+from stats.ingest import ingest_item_usage
+from stats.models import Item, PlayerStats
+from stats.profiling import ProfiledCommand
+
+# 기본 카탈로그(아이템 12개, 스킬 10개) + 수치 특징 3개
+DEFAULT_DIMS = len(similarity.NUMERIC_FIELDS) + 12 + 10
+PARTITION_TIER = 'GOLD'
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def synthetic_index(users, dims, seed):
+    """DB 없이 같은 모양의 인덱스 (수치 특징 표준정규, 사용 비율은 절반쯤 비어 있는 행별 합 1 벡터)"""
+    rng = np.random.default_rng(seed)
+    numeric = len(similarity.NUMERIC_FIELDS)
+    matrix = np.empty((users, dims), dtype=np.float32)
+    matrix[:, :numeric] = rng.standard_normal((users, numeric), dtype=np.float32)
+    usage = rng.exponential(size=(users, dims - numeric)).astype(np.float32)
+    usage *= rng.random((users, dims - numeric), dtype=np.float32) < 0.5
+    usage /= np.maximum(usage.sum(axis=1, keepdims=True), 1e-6)
+    matrix[:, numeric:] = usage * similarity.USAGE_WEIGHT
+    tiers = np.sort(rng.integers(0, len(similarity.TIERS), users)).astype(np.int8)
+    ids = np.arange(1, users + 1, dtype=np.int64)
+    now = timezone.now()
+    return similarity.SimilarityIndex(None, ids, tiers, ids, matrix, {}, np.zeros(numeric), np.ones(numeric), now, now)
+
+
+def full_sort(index, query, k):
+    """비교 기준: 전체 점수 계산 후 argsort (블록/argpartition 없음, 코사인)"""
+    query = query / max(np.linalg.norm(query), similarity.EPSILON)
+    scores = index.matrix @ query / np.maximum(index.norms, similarity.EPSILON)
+    return np.argsort(-scores, kind='stable')[:k]
+
+
+class Command(ProfiledCommand):
+    help = '비슷한 플레이어 검색(특징 행렬 최근접 이웃) 지연 시간 측정 — 합성 인덱스(기본 100만 명)와 DB 인덱스 생성/증분 갱신'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help='합성 인덱스 유저 수 (0이면 생략)')
+        parser.add_argument('--dims', type=int, default=DEFAULT_DIMS, help='합성 인덱스 차원')
+        parser.add_argument('--scales', type=int_list, default=[], help='DB 인덱스 측정 유저 수 목록 (예: 10000,100000)')
+        parser.add_argument('--use-existing', action='store_true', help='데이터를 재생성하지 않고 현재 DB로 측정')
+        parser.add_argument('--batch-sizes', type=int_list, default=[1, 64], help='한 번에 검색할 질의 수 목록')
+        parser.add_argument('--k', type=int, default=10, help='이웃 수')
+        parser.add_argument('--changed', type=float, default=0.01, help='증분 갱신 측정 때 사용 기록을 바꿀 유저 비율')
+        parser.add_argument('--warmup', type=int, default=1, help='측정 전 워밍업 실행 횟수')
+        parser.add_argument('--repeat', type=int, default=5, help='측정 반복 횟수')
+        parser.add_argument('--seed', type=int, default=42, help='데이터/질의 생성 시드')
+        parser.add_argument('--output-dir', default='benchmark_results', help='결과 저장 디렉터리')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat는 1 이상이어야 합니다.')
+        if options['dims'] <= len(similarity.NUMERIC_FIELDS):
+            raise CommandError(f'--dims는 {len(similarity.NUMERIC_FIELDS)}보다 커야 합니다.')
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'비슷한 플레이어 검색 벤치마크 (top {options["k"]})'))
+        self.stdout.write('=' * 80)
+        self.rng = np.random.default_rng(options['seed'])
+
+        results = []
+        if options['users']:
+            start_time = time.perf_counter()
+            index = synthetic_index(options['users'], options['dims'], options['seed'])
+            self.stdout.write(self.style.HTTP_INFO(
+                f'\n[합성 {len(index):,}명 × {index.dims}차원, {index.matrix.nbytes / 1024 / 1024:.0f}MB] '
+                f'생성 {time.perf_counter() - start_time:.2f}초'
+            ))
+            results += self.measure_queries(index, 'synthetic', options, mmap=True)
+
+        scales = [None] if options['use_existing'] else options['scales']
+        for scale in scales:
+            results += self.run_database(scale, options)
+
+        if not results:
+            raise CommandError('측정할 대상이 없습니다 (--users, --scales, --use-existing).')
+        name = f'benchmark_similarity_{timezone.now():%Y%m%d_%H%M%S}'
+        csv_path, json_path = write_results(results, options['output_dir'], name)
+        self.stdout.write(self.style.SUCCESS(f'\n결과 저장: {csv_path}, {json_path}'))
+
+    def run_database(self, scale, options):
+        """DB에서 인덱스 생성/증분 갱신 시간 + 검색 지연"""
+        if scale is not None:
+            self.stdout.write(f'\n{scale}명 데이터셋 준비 중... (현재 DB는 데이터셋 사본으로 교체됩니다)')
+            datasets.checkout(scale, options['seed'], log=self.stdout.write)
+
+        build = self.time_runs(similarity.build, options)
+        index = build['answer']
+        self.stdout.write(self.style.HTTP_INFO(f'\n[DB {len(index):,}명 × {index.dims}차원]'))
+        self.stdout.write(f'  전체 생성: 평균 {build["mean"]:.3f}초')
+
+        # 일부 유저의 사용 기록을 바꾼 뒤 증분 갱신 (매 반복 같은 기준 인덱스에서)
+        stats_ids = list(PlayerStats.objects.values_list('id', flat=True))
+        item_ids = list(Item.objects.values_list('id', flat=True))
+        changed = self.rng.choice(stats_ids, size=max(1, int(len(stats_ids) * options['changed'])), replace=False)
+        if item_ids:
+            ingest_item_usage([(int(stats_id), int(self.rng.choice(item_ids)), 1) for stats_id in changed])
+        refresh = self.time_runs(lambda: similarity.refresh(index), options)
+        self.stdout.write(f'  증분 갱신 ({len(changed):,}명 변경): 평균 {refresh["mean"]:.3f}초 '
+                          f'(전체 생성 대비 {build["mean"] / max(refresh["mean"], 1e-9):.1f}배)')
+
+        rows = []
+        for strategy, summary in (('db_build', build), ('db_refresh', refresh)):
+            rows.append({
+                'source': 'database',
+                'users': len(index),
+                'dims': index.dims,
+                'strategy': strategy,
+                'changed_users': len(changed) if strategy == 'db_refresh' else '',
+                **{key: round(value, 6) if isinstance(value, float) else value
+                   for key, value in summary.items() if key != 'answer'},
+            })
+        return rows + self.measure_queries(refresh['answer'], 'database', options, mmap=False)
+
+    def measure_queries(self, index, source, options, mmap):
+        """(지표 × 티어 구간 × 배치 크기) 검색 지연, mmap이면 저장 후 매핑한 인덱스로도"""
+        k = options['k']
+        layouts = [('memory', index)]
+        directory = None
+        if mmap:
+            directory = tempfile.TemporaryDirectory()
+            path = similarity.save(index, directory.name)
+            layouts.append(('mmap', similarity.open_index(path)))
+
+        rows = []
+        try:
+            # 기준: 전체 정렬 (질의 1개)
+            position = int(self.rng.integers(len(index)))
+            summary = self.time_runs(lambda: full_sort(index, index.matrix[position], k + 1), options)
+            expected = [row for row in summary.pop('answer').tolist() if row != position][:k]
+            rows.append(self.query_row(index, source, 'memory', 'full_sort', 'cosine', 'ALL', 1, summary))
+            blocked = index.search(index.matrix[position], k, 'cosine', exclude=[position])[0][0].tolist()
+            rows[-1]['consistent'] = blocked == expected
+
+            for layout, target in layouts:
+                for metric in similarity.METRICS:
+                    for tier in ('ALL', PARTITION_TIER):
+                        for batch in options['batch_sizes']:
+                            start, stop = target.bounds(None if tier == 'ALL' else tier)
+                            if stop <= start:
+                                continue
+                            positions = self.rng.integers(start, stop, batch)
+                            queries = np.asarray(target.matrix[positions])
+                            summary = self.time_runs(lambda: target.search(
+                                queries, k, metric, None if tier == 'ALL' else tier, exclude=positions), options)
+                            answer = summary.pop('answer')
+                            row = self.query_row(target, source, layout, 'blocked', metric, tier, batch, summary)
+                            if layout != 'memory':
+                                reference = index.search(queries, k, metric, None if tier == 'ALL' else tier,
+                                                         exclude=positions)
+                                row['consistent'] = np.array_equal(answer[0], reference[0])
+                            rows.append(row)
+        finally:
+            if directory is not None:
+                directory.cleanup()
+
+        for row in rows:
+            marker = '' if row.get('consistent', True) else self.style.ERROR('  (결과 불일치!)')
+            self.stdout.write(
+                f'  {row["layout"]:<6} {row["strategy"]:<9} {row["metric"]:<6} {row["tier"]:<4} 배치 {row["batch"]:>4}: '
+                f'질의당 {row["per_query_ms"]:8.3f}ms, {row["queries_per_second"]:>9,.0f}질의/초 '
+                f'(배치 95% CI {row["ci_low"] * 1000:.2f} ~ {row["ci_high"] * 1000:.2f}ms){marker}'
+            )
+        return rows
+
+    def query_row(self, index, source, layout, strategy, metric, tier, batch, summary):
+        start, stop = index.bounds(None if tier == 'ALL' else tier)
+        return {
+            'source': source,
+            'users': len(index),
+            'dims': index.dims,
+            'scanned_rows': stop - start,
+            'layout': layout,
+            'strategy': strategy,
+            'metric': metric,
+            'tier': tier,
+            'batch': batch,
+            'per_query_ms': round(summary['mean'] / batch * 1000, 4),
+            'queries_per_second': round(batch / summary['mean'], 1) if summary['mean'] else '',
+            **{key: round(value, 6) if isinstance(value, float) else value for key, value in summary.items()},
+        }
+
+    def time_runs(self, run_once, options):
+        """워밍업 후 repeat번 측정 → summarize() + 마지막 결과('answer')"""
+        for _ in range(options['warmup']):
+            run_once()
+        samples, answer = [], None
+        for _ in range(options['repeat']):
+            start_time = time.perf_counter()
+            answer = run_once()
+            samples.append(time.perf_counter() - start_time)
+        return {**summarize(samples), 'answer': answer}
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stats import olap
+
+
+class Command(BaseCommand):
+    help = 'OLAP 큐브를 만들어 크기/생성 시간을 출력하고 SQL 경로(집계 엔진)와 결과를 비교합니다'
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        cube = olap.build()
+        build_seconds = time.time() - start_time
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'OLAP 큐브 생성: {build_seconds:.3f}초'))
+        self.stdout.write('=' * 80)
+        for entity, entity_cube in cube.entities.items():
+            nbytes = entity_cube.total.nbytes + entity_cube.users.nbytes
+            self.stdout.write(f'{entity:<6} 셀 {entity_cube.total.size}개 × 2, {nbytes}바이트 (shape {entity_cube.total.shape})')
+
+        start_time = time.time()
+        problems = olap.check_consistency(cube)
+        self.stdout.write(f'정합성 검사: {time.time() - start_time:.3f}초')
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(problem))
+        if problems:
+            raise CommandError(f'큐브와 SQL 결과가 {len(problems)}건 다릅니다.')
+        self.stdout.write(self.style.SUCCESS('큐브와 SQL 결과가 모두 일치합니다.'))
@@ -1,115 +1,246 @@
-from django.core.management.base import BaseCommand
-from django.core.management import call_command
-from django.conf import settings
-from django.db import connection
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+import random
 import time
-from stats.models import GameUser, PlayerStats
+from stats import datasets
+from stats.benchmarking import PRAGMA_PROFILES, apply_pragmas, fast_reset, write_results
+from stats.models import GameUser
+from stats.profiling import ProfiledCommand
 
-class Command(BaseCommand):
-    help = '두 방식의 성능을 비교합니다'
+STRATEGIES = ['create', 'bulk_create', 'executemany', 'multi_values']
+TRANSACTIONS = ['row', 'batch', 'single']
+COLUMNS = ['nickname', 'level', 'tier', 'ranking_score', 'created_at', 'updated_at']
+TIERS = ['BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'DIAMOND', 'MASTER', 'GRANDMASTER']
+TIER_WEIGHTS = [30, 25, 20, 15, 7, 2.5, 0.5]
 
-    def add_arguments(self, parser):
-        parser.add_argument('--users', type=int, default=5000, help='테스트할 유저 수')
-        parser.add_argument('--batch-size', type=int, default=500, help='bulk_create에 사용할 batch_size')
-
-    def handle(self, *args, **options):
-        num_users = options['users']
-        batch_size = options['batch_size']
-
-        self.stdout.write('\n' + '=' * 80)
-        self.stdout.write(self.style.WARNING('Django ORM 성능 비교 테스트'))
-        self.stdout.write('=' * 80)
-        self.stdout.write(f'테스트 규모: {num_users}명의 유저 생성')
-        self.stdout.write(f'비교 커맨드: generate_fake_data_old_way vs. generate_fake_data_bulk_version')
-        self.stdout.write('=' * 80 + '\n')
-
-        results = {}
-
-        # 기존 방식 테스트
-        self.stdout.write(self.style.HTTP_INFO('\n[TEST 1] 기존 방식 (하나씩 create) 시작'))
-        self.stdout.write('-' * 80)
-
-        # 기존 데이터 삭제
-        GameUser.objects.all().delete()
-
-        start_time = time.time()
-        start_queries = len(connection.queries) if settings.DEBUG else 0
-        call_command('generate_fake_data_old_way', users=num_users)
-        end_time = time.time()
-        end_queries = len(connection.queries) if settings.DEBUG else 0
+# SQLite 바인딩 변수 한도 (3.32+ 기본값 32766)
+SQLITE_MAX_VARIABLES = 32766
 
-        old_way_time = end_time - start_time
-        old_way_count = GameUser.objects.count()
-        old_queries = end_queries - start_queries if settings.DEBUG else 'N/A'
 
-        results['old'] = {
-            'time' : old_way_time,
-            'count' : old_way_count,
-            'per_second': old_way_count / old_way_time if old_way_time > 0 else 0,
-            'queries' : old_queries
-        }
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
 
-        #  개선된 방식 테스트
-        self.stdout.write(self.style.HTTP_INFO('\n[TEST 2] 개선된 방식 (bulk_create) 시작'))
-        self.stdout.write('-' * 80)
-        
-        # 기존 데이터 삭제
-        GameUser.objects.all().delete()
 
-        start_time = time.time()
-        start_queries = len(connection.queries) if settings.DEBUG else 0
-        call_command('generate_fake_data_bulk_version', users=num_users, batch_size=batch_size)
-        end_time = time.time()
-        end_queries = len(connection.queries) if settings.DEBUG else 0
+def str_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
 
-        bulk_way_time = end_time - start_time
-        bulk_way_count = GameUser.objects.count()
-        bulk_queries = end_queries - start_queries if settings.DEBUG else 'N/A'
 
-        results['bulk'] = {
+class Command(ProfiledCommand):
+    help = '삽입 전략 x 트랜잭션 단위 x PRAGMA 프로필 x 데이터 규모 매트릭스 성능 비교'
 
-            'time': bulk_way_time,
-            'count': bulk_way_count,
-            'per_second' : bulk_way_count / bulk_way_time if bulk_way_time > 0 else 0,
-            'queries' : bulk_queries
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int_list, default=[1000, 5000], help='유저 수 목록 (예: 1000,5000)')
+        parser.add_argument('--strategies', type=str_list, default=STRATEGIES, help=f'삽입 전략 ({",".join(STRATEGIES)})')
+        parser.add_argument('--batch-sizes', type=int_list, default=[100, 500, 1000, 2000], help='배치 크기 목록')
+        parser.add_argument('--transactions', type=str_list, default=TRANSACTIONS, help=f'트랜잭션 단위 ({",".join(TRANSACTIONS)})')
+        parser.add_argument('--pragmas', type=str_list, default=list(PRAGMA_PROFILES), help=f'PRAGMA 프로필 ({",".join(PRAGMA_PROFILES)})')
+        parser.add_argument('--output-dir', default='benchmark_results', help='결과 저장 디렉터리')
+        parser.add_argument('--seed', type=int, default=42, help='데이터 생성 시드')
+        parser.add_argument('--no-chart', action='store_true', help='차트 생성 생략')
 
-        }
+    def handle(self, *args, **options):
+        for key, allowed in (('strategies', STRATEGIES), ('transactions', TRANSACTIONS), ('pragmas', PRAGMA_PROFILES)):
+            unknown = set(options[key]) - set(allowed)
+            if unknown:
+                raise CommandError(f'알 수 없는 {key}: {", ".join(sorted(unknown))}')
+        if connection.vendor != 'sqlite':
+            raise CommandError('이 벤치마크는 SQLite 전용입니다.')
 
-        # 최종 결과 비교
-        self.print_final_comparison(results, num_users)
+        cases = list(self.build_cases(options))
 
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING('Django ORM 삽입 전략 매트릭스 벤치마크'))
+        self.stdout.write('=' * 80)
+        self.stdout.write(f'데이터 규모: {options["sizes"]}')
+        self.stdout.write(f'전략: {options["strategies"]} / 트랜잭션: {options["transactions"]} / PRAGMA: {options["pragmas"]}')
+        self.stdout.write(f'총 {len(cases)}개 케이스 (끝나면 현재 데이터로 되돌립니다)')
+        self.stdout.write('=' * 80 + '\n')
 
-    def print_final_comparison(self, results, num_users):
+        results = []
+        original_pragmas = None
+        # 끝나면 원래 데이터로 되돌리고, 모든 케이스는 같은 빈 DB 사본에서 시작
+        # (DELETE로 비우면 케이스마다 빈 페이지/id 시퀀스가 달라짐)
+        with datasets.preserved():
+            fast_reset()
+            baseline = datasets.snapshot()
+            try:
+                for size in options['sizes']:
+                    rows = self.build_rows(size, options['seed'])
+                    for pragma in options['pragmas']:
+                        previous = apply_pragmas(pragma)
+                        original_pragmas = original_pragmas or previous
+
+                        for strategy, txn, batch_size in cases:
+                            datasets.restore(baseline)
+                            elapsed = self.run_case(strategy, txn, batch_size, rows)
+                            inserted = GameUser.objects.count()
+
+                            result = {
+                                'size': size,
+                                'pragma': pragma,
+                                'strategy': strategy,
+                                'transaction': txn,
+                                'batch_size': batch_size or '',
+                                'seconds': round(elapsed, 4),
+                                'rows_per_second': round(inserted / elapsed, 1) if elapsed > 0 else 0,
+                                'inserted': inserted,
+                            }
+                            results.append(result)
+                            self.stdout.write(
+                                f'[{size:>7}명 | {pragma:<7}] {strategy:<12} {txn:<6} '
+                                f'batch={str(batch_size or "-"):<5} -> {elapsed:.3f}초, {result["rows_per_second"]:.1f}개/초'
+                            )
+            finally:
+                baseline.close()
+                if original_pragmas:
+                    apply_pragmas(original_pragmas)
+
+        name = f'compare_performance_{timezone.now():%Y%m%d_%H%M%S}'
+        csv_path, json_path = write_results(results, options['output_dir'], name)
+        self.print_final_comparison(results)
+        self.stdout.write(self.style.SUCCESS(f'\n결과 저장: {csv_path}, {json_path}'))
+
+        if not options['no_chart']:
+            chart_paths = self.create_charts(results, options['output_dir'], name)
+            for path in chart_paths:
+                self.stdout.write(self.style.SUCCESS(f'차트 저장: {path}'))
+
+    def build_cases(self, options):
+        """(전략, 트랜잭션 단위, 배치 크기) 조합 — 의미 없는 조합은 제외"""
+        for strategy in options['strategies']:
+            for txn in options['transactions']:
+                if strategy == 'create':
+                    # 행 단위 create는 'batch' 트랜잭션일 때만 배치 크기가 의미 있음
+                    if txn == 'batch':
+                        for batch_size in options['batch_sizes']:
+                            yield strategy, txn, batch_size
+                    else:
+                        yield strategy, txn, None
+                elif txn != 'row':
+                    # 배치 전략은 문장 하나가 곧 배치이므로 'row' 단위는 없음
+                    for batch_size in options['batch_sizes']:
+                        yield strategy, txn, batch_size
+
+    def build_rows(self, size, seed):
+        """삽입할 GameUser 행 (시드 고정, 모든 케이스 동일 데이터)"""
+        rng = random.Random(seed)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        rows = []
+        for i in range(size):
+            tier = rng.choices(TIERS, weights=TIER_WEIGHTS)[0]
+            tier_index = TIERS.index(tier)
+            rows.append((
+                f'bench{i:07d}',
+                rng.randint(max(1, tier_index * 10), min(100, (tier_index + 1) * 15)),
+                tier,
+                rng.randint(tier_index * 1000, (tier_index + 1) * 1500),
+                now,
+                now,
+            ))
+        return rows
+
+    def run_case(self, strategy, txn, batch_size, rows):
+        """케이스 하나 실행 후 소요 시간(초) 반환"""
+        insert = getattr(self, f'insert_{strategy}')
+        if strategy == 'create' and txn != 'batch':
+            batch_size = 1 if txn == 'row' else len(rows)
+        if strategy == 'multi_values':
+            batch_size = min(batch_size, SQLITE_MAX_VARIABLES // len(COLUMNS))
+
+        start_time = time.perf_counter()
+        if txn == 'single':
+            with transaction.atomic():
+                for i in range(0, len(rows), batch_size):
+                    insert(rows[i:i + batch_size])
+        elif txn == 'batch':
+            for i in range(0, len(rows), batch_size):
+                with transaction.atomic():
+                    insert(rows[i:i + batch_size])
+        else:
+            # autocommit: 문장마다 커밋
+            for i in range(0, len(rows), batch_size):
+                insert(rows[i:i + batch_size])
+        return time.perf_counter() - start_time
+
+    def insert_create(self, rows):
+        for row in rows:
+            GameUser.objects.create(**dict(zip(COLUMNS, row)))
+
+    def insert_bulk_create(self, rows):
+        GameUser.objects.bulk_create([GameUser(**dict(zip(COLUMNS, row))) for row in rows], batch_size=len(rows))
+
+    def insert_executemany(self, rows):
+        placeholders = ', '.join(['%s'] * len(COLUMNS))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO stats_gameuser ({", ".join(COLUMNS)}) VALUES ({placeholders})',
+                rows,
+            )
+
+    def insert_multi_values(self, rows):
+        placeholder = '(' + ', '.join(['%s'] * len(COLUMNS)) + ')'
+        values = ', '.join([placeholder] * len(rows))
+        params = [value for row in rows for value in row]
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO stats_gameuser ({", ".join(COLUMNS)}) VALUES {values}', params)
+
+    def print_final_comparison(self, results):
         self.stdout.write('\n' + '=' * 80)
-        self.stdout.write(self.style.SUCCESS(' 최종 비교 결과'))
+        self.stdout.write(self.style.SUCCESS(' 최종 비교 결과 (규모/PRAGMA별 처리량 상위 5개)'))
         self.stdout.write('=' * 80)
-        
-        # 성능 향상 계산
-        if results['old']['time'] > 0 and results['bulk']['time'] > 0:
-            improvement = results['old']['time'] / results['bulk']['time']
-            time_saved = results['old']['time'] - results['bulk']['time']
-            
-            # 테이블 형식 출력
-            data = [
-                ['방식', ' 실행 시간 (초)', ' 처리량 (개/초)', ' 쿼리 수'],
-                [' 기존 (create)', f'{results["old"]["time"]:.3f}', f'{results["old"]["per_second"]:.1f}', f'{results["old"]["queries"]}'],
-                [' Bulk (bulk_create)', f'{results["bulk"]["time"]:.3f}', f'{results["bulk"]["per_second"]:.1f}', f'{results["bulk"]["queries"]}']
-            ]
-            
-            # 테이블 출력 로직 (간단화)
+
+        groups = {}
+        for result in results:
+            groups.setdefault((result['size'], result['pragma']), []).append(result)
+
+        for (size, pragma), group in groups.items():
+            group = sorted(group, key=lambda r: r['rows_per_second'], reverse=True)
+            slowest = group[-1]['rows_per_second'] or 1
+            self.stdout.write(f'\n[{size}명 | {pragma}]')
+            data = [['전략', '트랜잭션', '배치', '실행 시간 (초)', '처리량 (개/초)', '최저 대비']]
+            for r in group[:5]:
+                data.append([
+                    r['strategy'], r['transaction'], str(r['batch_size'] or '-'),
+                    f'{r["seconds"]:.3f}', f'{r["rows_per_second"]:.1f}', f'{r["rows_per_second"] / slowest:.1f}배',
+                ])
+
             col_widths = [max(len(str(item)) for item in col) for col in zip(*data)]
             format_str = ' | '.join(['{:<' + str(width) + '}' for width in col_widths])
-            
-            self.stdout.write('\n' + format_str.format(*data[0]))
-            self.stdout.write('-' * 80)
-            self.stdout.write(format_str.format(*data[1]))
-            self.stdout.write(format_str.format(*data[2]))
+            self.stdout.write(format_str.format(*data[0]))
             self.stdout.write('-' * 80)
-            
-            # 요약
-            self.stdout.write(f'\n' + self.style.WARNING(' 성능 향상 요약:'))
-            self.stdout.write(f'  **Bulk Create 방식**이 기존 방식 대비 **{improvement:.1f}배** 빠름!')
-            self.stdout.write(f'  총 **{time_saved:.3f}초** 절약 (유저 {num_users}명 기준)')
-
-        else:
-            self.stdout.write(self.style.ERROR("시간 측정이 제대로 되지 않았습니다. 유저 수를 늘려보세요."))
\ No newline at end of file
+            for row in data[1:]:
+                self.stdout.write(format_str.format(*row))
+
+    def create_charts(self, results, output_dir, name):
+        """규모별로 PRAGMA 프로필마다 배치 크기 대비 처리량 차트 생성"""
+        import matplotlib.pyplot as plt
+
+        paths = []
+        for size in sorted({r['size'] for r in results}):
+            size_results = [r for r in results if r['size'] == size]
+            pragmas = list(dict.fromkeys(r['pragma'] for r in size_results))
+
+            fig, axes = plt.subplots(1, len(pragmas), figsize=(6 * len(pragmas), 5), squeeze=False)
+            for ax, pragma in zip(axes[0], pragmas):
+                series = {}
+                for r in size_results:
+                    if r['pragma'] == pragma and r['batch_size']:
+                        series.setdefault(f'{r["strategy"]} / {r["transaction"]}', []).append((r['batch_size'], r['rows_per_second']))
+                for label, points in series.items():
+                    points.sort()
+                    ax.plot([p[0] for p in points], [p[1] for p in points], marker='o', label=label)
+                ax.set_xscale('log')
+                ax.set_title(f'PRAGMA: {pragma}')
+                ax.set_xlabel('Batch size')
+                ax.set_ylabel('Rows / sec')
+                ax.grid(True, alpha=0.3)
+                ax.legend(fontsize=8)
+
+            fig.suptitle(f'Insert throughput vs batch size ({size} users)', fontsize=14)
+            fig.tight_layout()
+            path = f'{output_dir}/{name}_{size}.png'
+            fig.savefig(path)
+            plt.close(fig)
+            paths.append(path)
+        return paths
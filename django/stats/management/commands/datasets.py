@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stats import datasets
+
+ACTIONS = ['list', 'build', 'load', 'verify', 'remove']
+
+
+class Command(BaseCommand):
+    help = '미리 만든 데이터셋 파일 관리 (목록/생성/작업 DB로 적재/검증/삭제)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=ACTIONS, help='list: 캐시 목록, build: 생성, load: 작업 DB를 사본으로 교체, '
+                                                            'verify: 내용 해시 검사, remove: 삭제')
+        parser.add_argument('scales', nargs='*', help=f'규모 ({", ".join(datasets.SCALES)} 또는 유저 수)')
+        parser.add_argument('--seed', type=int, default=datasets.DEFAULT_SEED, help='데이터 생성 시드')
+        parser.add_argument('--rebuild', action='store_true', help='build: 캐시가 있어도 다시 생성')
+        parser.add_argument('--method', choices=datasets.METHODS, default='auto', help='load: 적재 방식')
+        parser.add_argument('--verify', action='store_true', help='build/load: 쓰기 전에 내용 해시까지 검사')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        if action == 'list':
+            self.list()
+            return
+        if not options['scales']:
+            raise CommandError(f'{action}: 규모를 하나 이상 지정하세요.')
+        if action == 'load' and len(options['scales']) > 1:
+            raise CommandError('load: 규모는 하나만 지정할 수 있습니다.')
+        try:
+            users = [datasets.resolve(scale) for scale in options['scales']]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for scale in users:
+            getattr(self, action)(scale, options)
+
+    def list(self):
+        found = datasets.available()
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'데이터셋 ({datasets.dataset_dir()})'))
+        self.stdout.write('=' * 80)
+        if not found:
+            self.stdout.write('캐시된 데이터셋이 없습니다.')
+            return
+        for dataset in found:
+            problems = dataset.problems()
+            status = self.style.ERROR('; '.join(problems)) if problems else self.style.SUCCESS('정상')
+            self.stdout.write(
+                f'{dataset.name:<28} 유저 {dataset.users:>9,}명 {dataset.size / 1024 / 1024:>8.1f}MB '
+                f'해시 {dataset.content_hash[:12]}  {status}'
+            )
+
+    def build(self, scale, options):
+        dataset = datasets.get(scale, options['seed'], rebuild=options['rebuild'], verify=options['verify'],
+                               log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'{dataset.name}: {dataset.path} (해시 {dataset.content_hash[:12]})'))
+
+    def load(self, scale, options):
+        self.stdout.write(f'{scale:,}명 데이터셋 적재 중... (현재 DB는 데이터셋 사본으로 교체됩니다)')
+        dataset = datasets.checkout(scale, options['seed'], method=options['method'], verify=options['verify'],
+                                    log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'{dataset.name} 적재 완료'))
+
+    def verify(self, scale, options):
+        dataset = self.find(scale, options)
+        problems = dataset.problems(verify=True)
+        if problems:
+            raise CommandError(f'{dataset.name}: {"; ".join(problems)}')
+        self.stdout.write(self.style.SUCCESS(f'{dataset.name}: 정상 (해시 {dataset.content_hash[:12]})'))
+
+    def remove(self, scale, options):
+        dataset = self.find(scale, options)
+        datasets.remove(dataset)
+        self.stdout.write(self.style.SUCCESS(f'{dataset.name} 삭제'))
+
+    def find(self, scale, options):
+        dataset = datasets.find(scale, options['seed'])
+        if dataset is None:
+            raise CommandError(f'캐시된 데이터셋이 없습니다: {datasets.key(scale, options["seed"])}')
+        return dataset
@@ -1,15 +1,16 @@
-from django.core.management.base import BaseCommand
 from django.db import transaction, connection
 from django.conf import settings
 import random
 import time
+from stats import sharding, versions
+from stats.profiling import ProfiledCommand
 from stats.models import GameUser, PlayerStats, Item, Skill, ItemUsage, SkillUsage
 from faker import Faker
 
 BATCH_SIZE = 500
 USER_SIZE = 5000
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = '테스트용 게임 데이터를 생성합니다'
 
     def add_arguments(self, parser):
@@ -25,12 +26,22 @@ class Command(BaseCommand):
             default=BATCH_SIZE,
             help='bulk_create에 사용할 배치 크기 (기본값: BATCH_SIZE)'
         )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='난수 시드 (지정 시 같은 데이터 재생성)'
+        )
     
     def handle(self, *args, **options):
         fake = Faker('ko_KR')
         num_users = options['users']
         batch_size = options['batch_size']
 
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+            fake.seed_instance(options['seed'])
+
         self.stdout.write('게임 데이터 생성을 시작합니다.')
 
         # 성능 측정 시작
@@ -52,6 +63,8 @@ class Command(BaseCommand):
         # 아이템/스킬 사용 기록 생성
         self.stdout.write('아이템/스킬 사용 기록 생성 중.....')
         self.create_usage_records(created_users, items, skills, batch_size)
+        # bulk_create는 신호가 없으므로 파생 캐시(OLAP 큐브) 무효화를 직접
+        versions.bump(versions.USAGE, versions.USERS, versions.STATS)
 
         # 성능 측정 종료
         end_time = time.time()
@@ -279,11 +292,11 @@ class Command(BaseCommand):
                         )
                     )
             
-            # 배치 단위로 DB 삽입
+            # 배치 단위로 DB 삽입 (샤딩 중이면 샤드별로 나눠 삽입)
             if batch_item_usages:
-                ItemUsage.objects.bulk_create(batch_item_usages, batch_size=batch_size)
+                sharding.bulk_create(ItemUsage, batch_item_usages, batch_size=batch_size)
             if batch_skill_usages:
-                SkillUsage.objects.bulk_create(batch_skill_usages, batch_size=batch_size)
+                sharding.bulk_create(SkillUsage, batch_skill_usages, batch_size=batch_size)
             
             self.stdout.write(f'진행: {min(i + batch_size, len(users))}/{len(users)} 유저 처리 완료')
         
@@ -1,10 +1,10 @@
-from django.core.management.base import BaseCommand
 from django.db import transaction
 import random
 from stats.models import GameUser, PlayerStats, Item, Skill
+from stats.profiling import ProfiledCommand
 from faker import Faker
 
-class Command(BaseCommand):
+class Command(ProfiledCommand):
     help = '테스트용 게임 데이터를 생성합니다'
 
     def add_arguments(self, parser):
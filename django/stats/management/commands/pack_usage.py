@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stats import archive, packed
+from stats.models import PackedUsage
+
+
+class Command(BaseCommand):
+    help = '아이템/스킬 사용 기록을 플레이어별 사용량 벡터(packed)로 옮기거나 행(rows)으로 되돌립니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=['packed', 'rows'], default='packed', help='전환할 저장 방식')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='청크(트랜잭션)당 유저 수')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size는 1 이상이어야 합니다.')
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'사용 기록 저장 방식 전환 → {options["to"]}'))
+        self.stdout.write('=' * 80)
+
+        before, size_before = archive.usage_row_counts(), packed.storage_bytes()
+        start_time = time.time()
+        self.stdout.write(f'{"청크":>6} {"유저":>8} {"옮긴 행":>10} {"누적 시간":>10}')
+        players = rows = 0
+        for chunk, count, moved in packed.convert(options['to'], options['chunk_size']):
+            players, rows = players + count, rows + moved
+            self.stdout.write(f'{chunk:>6} {count:>8} {moved:>10} {time.time() - start_time:>9.2f}초')
+        elapsed = time.time() - start_time
+
+        after, size_after = archive.usage_row_counts(), packed.storage_bytes()
+        self.stdout.write('-' * 80)
+        for table in before:
+            self.stdout.write(f'{table:<24} {before[table]:>10,}행 → {after[table]:>10,}행')
+        self.stdout.write(f'사용량 벡터: {PackedUsage.objects.count():,}명')
+        if size_before and size_after:
+            for layout in ('rows', 'packed'):
+                self.stdout.write(f'{layout} 저장 크기: {size_before[layout]:>12,}바이트 → {size_after[layout]:>12,}바이트')
+        self.stdout.write(self.style.SUCCESS(f'전환 {players:,}명, {rows:,}행, 실행시간: {elapsed:.2f}초'))
+
+        if settings.USAGE_STORAGE != options['to']:
+            self.stdout.write(self.style.WARNING(
+                f'USAGE_STORAGE={settings.USAGE_STORAGE} — 새 사용량 적재도 {options["to"]}로 쓰려면 '
+                f'USAGE_STORAGE={options["to"]}로 설정하세요.'
+            ))
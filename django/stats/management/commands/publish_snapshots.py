@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stats import olap, shared
+
+
+class Command(BaseCommand):
+    help = 'OLAP 큐브와 최근 랭킹 스냅샷을 워커 공유 스냅샷(mmap 파일)으로 내보냅니다'
+
+    def handle(self, *args, **options):
+        if not shared.enabled():
+            raise CommandError('SHARED_SNAPSHOT_DIR가 설정되어 있지 않습니다.')
+
+        start_time = time.time()
+        cube = olap.build()
+        build_seconds = time.time() - start_time
+
+        start_time = time.time()
+        path = shared.publish(cube)
+        if path is None:
+            raise CommandError('다른 프로세스가 스냅샷을 내보내는 중입니다.')
+        publish_seconds = time.time() - start_time
+
+        shared.clear()
+        snapshot = shared.current()
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'공유 스냅샷: {path}'))
+        self.stdout.write('=' * 80)
+        self.stdout.write(f'큐브 생성: {build_seconds:.3f}초, 내보내기: {publish_seconds:.3f}초')
+        self.stdout.write(f'파일 크기: {snapshot.nbytes}바이트, 데이터 버전: {snapshot.token}')
+        for entry in snapshot.meta['leaderboard']:
+            ids = snapshot.array(f"leaderboard.{entry['pk']}.ids")
+            self.stdout.write(f"랭킹 스냅샷 {entry['snapshot_date']}: 유저 {ids.size}명")
+        self.stdout.write(self.style.SUCCESS('워커는 다음 포인터 확인 때 새 스냅샷으로 교체합니다.'))
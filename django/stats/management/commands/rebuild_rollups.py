@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from stats.rollups import ROLLUPS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = '티어별 아이템/스킬 사용량 롤업 테이블을 다시 계산합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entity', choices=list(ROLLUPS), default=None, help='하나만 재계산 (기본값: 전체)')
+
+    def handle(self, *args, **options):
+        entities = [options['entity']] if options['entity'] else list(ROLLUPS)
+        for entity in entities:
+            start_time = time.time()
+            rows = rebuild_rollups(entity)
+            self.stdout.write(self.style.SUCCESS(f'{entity} 롤업 {rows}행 재계산: {time.time() - start_time:.3f}초'))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stats.search import FTS_TABLE, install_search_index, is_supported
+
+
+class Command(BaseCommand):
+    help = '닉네임 검색 인덱스(FTS5 trigram)를 다시 구성합니다'
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError('닉네임 검색 인덱스는 SQLite에서만 지원됩니다.')
+
+        start_time = time.time()
+        install_search_index(rebuild=True)
+        self.stdout.write(self.style.SUCCESS(f'{FTS_TABLE} 재구성 완료: {time.time() - start_time:.2f}초'))
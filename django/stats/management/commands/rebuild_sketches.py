@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from stats.quantiles import DEFAULT_K, rebuild_quantiles
+from stats.sketches import DEFAULT_CAPACITY, ENTITIES, rebuild_topk, sketch_sizes
+
+KINDS = ['topk', 'kll']
+
+
+class Command(BaseCommand):
+    help = '인기 아이템/스킬 Top-K 스케치와 점수/레벨/승률 분위수(KLL) 스케치를 다시 만듭니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=KINDS, default=None, help='한 종류만 재생성 (기본값: 전체)')
+        parser.add_argument('--entity', choices=list(ENTITIES), default=None, help='Top-K: 하나만 재생성 (기본값: 전체)')
+        parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='Top-K 스케치 용량 (추적 대상 수)')
+        parser.add_argument('--k', type=int, default=DEFAULT_K, help='KLL 정확도 파라미터 (클수록 정확, 큼)')
+
+    def handle(self, *args, **options):
+        kinds = [options['kind']] if options['kind'] else KINDS
+
+        if 'topk' in kinds:
+            entities = [options['entity']] if options['entity'] else list(ENTITIES)
+            for entity in entities:
+                start_time = time.time()
+                count = rebuild_topk(entity, capacity=options['capacity'])
+                self.stdout.write(self.style.SUCCESS(f'{entity} Top-K 스케치 {count}개 재생성: {time.time() - start_time:.3f}초'))
+
+        if 'kll' in kinds:
+            start_time = time.time()
+            count = rebuild_quantiles(k=options['k'])
+            self.stdout.write(self.style.SUCCESS(f'분위수 스케치 {count}개 재생성: {time.time() - start_time:.3f}초'))
+
+        for kind in kinds:
+            sizes = sketch_sizes(kind)
+            if sizes:
+                self.stdout.write(
+                    f'{kind} 저장 크기: 총 {sum(sizes.values())}바이트 (스케치당 평균 {sum(sizes.values()) // len(sizes)}바이트)'
+                )
@@ -0,0 +1,122 @@
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from stats import sharding
+
+# 사용 기록 테이블 → 대상 컬럼
+USAGE_TABLES = {
+    'stats_itemusage': 'item_id',
+    'stats_skillusage': 'skill_id',
+}
+DRAIN_SCHEMA = 'drain'
+
+
+class Command(BaseCommand):
+    help = '사용 기록(ItemUsage/SkillUsage)을 현재 USAGE_SHARDS 설정에 맞게 샤드로 재배치합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='한 번에 옮길 행 수')
+        parser.add_argument(
+            '--drain', nargs='*', default=[],
+            help='설정에서 빠진 이전 샤드 파일 (샤드 수를 줄이거나 샤딩을 끌 때 비울 파일)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='옮길 행 수만 계산')
+        parser.add_argument('--vacuum', action='store_true', help='재배치 후 원본 DB VACUUM')
+
+    def handle(self, *args, **options):
+        drains = [Path(path) for path in options['drain']]
+        for path in drains:
+            if not path.exists():
+                raise CommandError(f'파일이 없습니다: {path}')
+
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'사용 기록 재샤딩: 샤드 {sharding.shard_count()}개'))
+        self.stdout.write('=' * 80)
+
+        # 샤드 스키마 준비 (라우터가 사용 기록 테이블만 허용)
+        for alias in sharding.shard_aliases():
+            call_command('migrate', database=alias, verbosity=0)
+            # 마이그레이션이 외래 키 검사를 다시 켜므로 새 연결(허브 ATTACH)로 교체
+            connections[alias].close()
+
+        sources = [('default', '')] + [(alias, '') for alias in sharding.shard_aliases()]
+        moved = {}
+        start_time = time.time()
+        for alias, prefix in sources:
+            self.drain_source(alias, prefix, options, moved)
+
+        for path in drains:
+            # 샤드 파일에는 부모 테이블이 없으므로 외래 키 검사를 끄고 ATTACH
+            with connections['default'].cursor() as cursor:
+                cursor.execute('PRAGMA foreign_keys = OFF')
+                cursor.execute(f'ATTACH DATABASE %s AS {DRAIN_SCHEMA}', [str(path)])
+            try:
+                self.drain_source('default', f'{DRAIN_SCHEMA}.', options, moved, label=path.name)
+            finally:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute(f'DETACH DATABASE {DRAIN_SCHEMA}')
+                    cursor.execute('PRAGMA foreign_keys = ON')
+
+        self.stdout.write('\n' + '-' * 80)
+        for (table, target), count in sorted(moved.items()):
+            self.stdout.write(f'{table:<18} → {target:<10} {count}행')
+        verb = '이동 예정' if options['dry_run'] else '이동'
+        self.stdout.write(self.style.SUCCESS(
+            f'총 {sum(moved.values())}행 {verb}: {time.time() - start_time:.2f}초'
+        ))
+
+        if not options['dry_run']:
+            for alias in sharding.shard_aliases() + ['default']:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                    if options['vacuum']:
+                        cursor.execute('VACUUM')
+
+    def drain_source(self, alias, prefix, options, moved, label=None):
+        """원본에서 다른 샤드에 속한 행을 배치 단위로 옮김 (대상에 upsert 후 원본 삭제)"""
+        label = label or alias
+        for table, column in USAGE_TABLES.items():
+            last_id, source_moved = 0, 0
+            while True:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT id, player_stats_id, {column}, usage_count, last_used FROM {prefix}{table} '
+                        f'WHERE id > %s ORDER BY id LIMIT %s',
+                        [last_id, options['batch_size']],
+                    )
+                    rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                groups = {}
+                for row in rows:
+                    target = sharding.shard_for(row[1])
+                    if target != alias or prefix:
+                        groups.setdefault(target, []).append(row)
+
+                for target, group in groups.items():
+                    moved[(table, target)] = moved.get((table, target), 0) + len(group)
+                    source_moved += len(group)
+                    if not options['dry_run']:
+                        self.move(alias, prefix, target, table, column, group)
+
+            if source_moved:
+                self.stdout.write(f'[{label}] {table}: {source_moved}행')
+
+    def move(self, source, prefix, target, table, column, rows):
+        # 중단 후 재실행해도 안전하도록 (player_stats, 대상) 유니크 키로 upsert
+        with transaction.atomic(using=target), connections[target].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (player_stats_id, {column}, usage_count, last_used) VALUES (%s, %s, %s, %s) '
+                f'ON CONFLICT (player_stats_id, {column}) DO UPDATE SET '
+                f'usage_count = excluded.usage_count, last_used = excluded.last_used',
+                [row[1:] for row in rows],
+            )
+        with transaction.atomic(using=source), connections[source].cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(rows))
+            cursor.execute(f'DELETE FROM {prefix}{table} WHERE id IN ({placeholders})', [row[0] for row in rows])
@@ -0,0 +1,106 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from stats import scheduler
+from stats.models import JobState
+
+
+class Command(BaseCommand):
+    help = '등록된 재계산 작업(롤업, 스케치, 랭킹/공유 스냅샷, 캐시 예열)을 주기적으로 실행합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='예정된 작업을 한 번만 실행하고 종료')
+        parser.add_argument('--job', action='append', default=None,
+                            help='이 작업만 바로 실행 (데이터 버전이 같아도 실행, 여러 번 지정 가능)')
+        parser.add_argument('--full', action='store_true', help='--job: 증분 작업도 전체 재계산')
+        parser.add_argument('--duration', type=float, default=None, help='이 시간(초)이 지나면 종료')
+        parser.add_argument('--max-sleep', type=float, default=30.0, help='예정 시각 확인 최대 간격(초)')
+        parser.add_argument('--status', action='store_true', help='작업별 상태/지표 출력')
+        parser.add_argument('--list', action='store_true', help='등록된 작업 목록 출력')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            return self.list_jobs()
+        if options['status']:
+            return self.show_status()
+
+        names = options['job']
+        unknown = sorted(set(names or []) - set(scheduler.JOBS))
+        if unknown:
+            raise CommandError(f'등록되지 않은 작업: {", ".join(unknown)} (--list로 확인)')
+
+        owner = scheduler.owner_name()
+        self.stdout.write('\n' + '=' * 80)
+        self.stdout.write(self.style.WARNING(f'스케줄러 시작: {owner}, 작업 {len(names or scheduler.JOBS)}개'))
+        self.stdout.write('=' * 80)
+
+        if names:
+            for name in names:
+                self.report(scheduler.run_job(scheduler.JOBS[name], owner, force=True, full=options['full']))
+            return
+
+        deadline = None if options['duration'] is None else time.monotonic() + options['duration']
+        try:
+            while True:
+                for result in scheduler.run_due(owner):
+                    self.report(result)
+                if options['once'] or (deadline is not None and time.monotonic() >= deadline):
+                    break
+                wait = min(scheduler.seconds_until_next(), options['max_sleep'])
+                if deadline is not None:
+                    wait = min(wait, max(deadline - time.monotonic(), 0.0))
+                # 대기 중에는 연결을 닫아 DB 잠금/파일 핸들을 잡고 있지 않도록
+                connections.close_all()
+                time.sleep(max(wait, 0.1))
+        except KeyboardInterrupt:
+            self.stdout.write('\n중단')
+
+    def report(self, result):
+        moment = timezone.localtime().strftime('%H:%M:%S')
+        if result.status == 'ok':
+            mode = '증분' if result.incremental else '전체'
+            processed = '' if result.processed is None else f', 처리 {result.processed:,}건'
+            self.stdout.write(self.style.SUCCESS(
+                f'[{moment}] {result.name}: 실행시간 {result.duration:.3f}초 ({mode}), 지연 {result.lag:.1f}초{processed}'
+            ))
+        elif result.status == 'skipped':
+            self.stdout.write(f'[{moment}] {result.name}: 데이터 변경 없음, 건너뜀')
+        elif result.status == 'locked':
+            self.stdout.write(self.style.WARNING(f'[{moment}] {result.name}: 다른 프로세스가 실행 중'))
+        else:
+            self.stdout.write(self.style.ERROR(f'[{moment}] {result.name}: 실패 {result.error}'))
+
+    def list_jobs(self):
+        self.stdout.write(f'{"작업":<22} {"간격(초)":>9} {"지터":>6} {"증분":>4}  {"데이터셋":<20} 설명')
+        for job in scheduler.JOBS.values():
+            self.stdout.write(
+                f'{job.name:<22} {job.interval:>9.0f} {job.jitter:>6.0%} {"예" if job.incremental else "":>4}  '
+                f'{",".join(job.datasets):<20} {job.description}'
+            )
+
+    def show_status(self):
+        states = {state.name: state for state in JobState.objects.all()}
+        now = timezone.now()
+        self.stdout.write(
+            f'{"작업":<22} {"상태":<8} {"실행":>6} {"건너뜀":>6} {"실패":>5} {"실행시간":>9} {"지연":>8} '
+            f'{"처리":>10} {"다음 실행":>10}  잠금'
+        )
+        for name in list(scheduler.JOBS) + sorted(set(states) - set(scheduler.JOBS)):
+            state = states.get(name)
+            if state is None:
+                self.stdout.write(f'{name:<22} {"-":<8}')
+                continue
+            duration = '' if state.last_duration is None else f'{state.last_duration:.3f}초'
+            lag = '' if state.last_lag is None else f'{state.last_lag:.1f}초'
+            processed = '' if state.last_processed is None else f'{state.last_processed:,}'
+            upcoming = '' if state.next_run_at is None else f'{(state.next_run_at - now).total_seconds():.0f}초 후'
+            lock = state.locked_by if state.locked_until and state.locked_until > now else ''
+            self.stdout.write(
+                f'{name:<22} {state.last_status or "-":<8} {state.runs:>6} {state.skips:>6} {state.failures:>5} '
+                f'{duration:>9} {lag:>8} {processed:>10} {upcoming:>10}  {lock}'
+            )
+            if state.last_status == 'error':
+                self.stdout.write(self.style.ERROR(f'    {state.last_error.strip().splitlines()[-1]}'))
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from stats.leaderboard import take_snapshot
+from stats.models import LeaderboardSnapshot
+
+
+class Command(BaseCommand):
+    help = '오늘의 랭킹 순서를 압축 스냅샷으로 저장합니다'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None, help='스냅샷 날짜 (YYYY-MM-DD, 기본값: 오늘)')
+        parser.add_argument('--keep-days', type=int, default=0, help='이 일수보다 오래된 스냅샷 삭제 (0이면 유지)')
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        snapshot = take_snapshot(options['date'])
+        elapsed = time.time() - start_time
+
+        size = len(snapshot.user_ids) + len(snapshot.scores) + len(snapshot.tiers)
+        self.stdout.write(self.style.SUCCESS(
+            f'{snapshot.snapshot_date} 스냅샷 저장 완료: {snapshot.user_count}명, '
+            f'{size / 1024:.1f}KB, {elapsed:.2f}초'
+        ))
+
+        if options['keep_days'] > 0:
+            cutoff = timezone.localdate() - timedelta(days=options['keep_days'])
+            deleted, _ = LeaderboardSnapshot.objects.filter(snapshot_date__lt=cutoff).delete()
+            self.stdout.write(f'오래된 스냅샷 {deleted}개 삭제')
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0002_itemusage_skillusage_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(unique=True, verbose_name='스냅샷 날짜')),
+                ('user_count', models.IntegerField(default=0, verbose_name='유저 수')),
+                ('user_ids', models.BinaryField(verbose_name='유저 ID 배열')),
+                ('scores', models.BinaryField(verbose_name='랭킹 점수 배열')),
+                ('tiers', models.BinaryField(verbose_name='티어 코드 배열')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': '랭킹 스냅샷',
+                'verbose_name_plural': '랭킹 스냅샷',
+                'ordering': ['-snapshot_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0003_leaderboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('BRONZE', '브론즈'), ('SILVER', '실버'), ('GOLD', '골드'), ('PLATINUM', '플래티넘'), ('DIAMOND', '다이아몬드'), ('MASTER', '마스터'), ('GRANDMASTER', '그랜드마스터')], max_length=20, verbose_name='티어')),
+                ('total_usage', models.BigIntegerField(default=0, verbose_name='총 사용 횟수')),
+                ('user_count', models.IntegerField(default=0, verbose_name='사용 유저 수')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='stats.item')),
+            ],
+            options={
+                'verbose_name': '아이템 사용 롤업',
+                'verbose_name_plural': '아이템 사용 롤업',
+                'indexes': [models.Index(fields=['tier', '-total_usage'], name='stats_itemu_tier_4c8824_idx')],
+                'unique_together': {('tier', 'item')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('BRONZE', '브론즈'), ('SILVER', '실버'), ('GOLD', '골드'), ('PLATINUM', '플래티넘'), ('DIAMOND', '다이아몬드'), ('MASTER', '마스터'), ('GRANDMASTER', '그랜드마스터')], max_length=20, verbose_name='티어')),
+                ('total_usage', models.BigIntegerField(default=0, verbose_name='총 사용 횟수')),
+                ('user_count', models.IntegerField(default=0, verbose_name='사용 유저 수')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='stats.skill')),
+            ],
+            options={
+                'verbose_name': '스킬 사용 롤업',
+                'verbose_name_plural': '스킬 사용 롤업',
+                'indexes': [models.Index(fields=['tier', '-total_usage'], name='stats_skill_tier_8fde76_idx')],
+                'unique_together': {('tier', 'skill')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0004_usage_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('topk', 'Top-K (Space-Saving)')], max_length=20, verbose_name='종류')),
+                ('key', models.CharField(max_length=100, verbose_name='키')),
+                ('data', models.BinaryField(verbose_name='스케치 데이터')),
+                ('total', models.BigIntegerField(default=0, verbose_name='관측 합계')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '통계 스케치',
+                'verbose_name_plural': '통계 스케치',
+                'unique_together': {('kind', 'key')},
+            },
+        ),
+    ]
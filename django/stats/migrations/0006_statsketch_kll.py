@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0005_statsketch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='statsketch',
+            name='kind',
+            field=models.CharField(choices=[('topk', 'Top-K (Space-Saving)'), ('kll', '분위수 (KLL)')], max_length=20, verbose_name='종류'),
+        ),
+    ]
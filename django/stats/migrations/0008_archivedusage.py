@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0007_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField(verbose_name='사용 기록 데이터')),
+                ('item_rows', models.IntegerField(default=0, verbose_name='아이템 사용 기록 수')),
+                ('skill_rows', models.IntegerField(default=0, verbose_name='스킬 사용 기록 수')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('player_stats', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archived_usage', to='stats.playerstats')),
+            ],
+            options={
+                'verbose_name': '보관된 사용 기록',
+                'verbose_name_plural': '보관된 사용 기록',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0008_archivedusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackedUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_counts', models.BinaryField(verbose_name='아이템 사용 횟수 벡터')),
+                ('item_last_used', models.BinaryField(verbose_name='아이템 마지막 사용 벡터')),
+                ('skill_counts', models.BinaryField(verbose_name='스킬 사용 횟수 벡터')),
+                ('skill_last_used', models.BinaryField(verbose_name='스킬 마지막 사용 벡터')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('player_stats', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='packed_usage', to='stats.playerstats')),
+            ],
+            options={
+                'verbose_name': '사용량 벡터',
+                'verbose_name_plural': '사용량 벡터',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0009_packedusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='작업 이름')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100, verbose_name='실행 중인 프로세스')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='잠금 만료')),
+                ('next_run_at', models.DateTimeField(blank=True, null=True, verbose_name='다음 실행 예정')),
+                ('watermark', models.DateTimeField(blank=True, null=True, verbose_name='증분 처리 기준 시각')),
+                ('data_version', models.CharField(blank=True, default='', max_length=32, verbose_name='마지막 실행 데이터 버전')),
+                ('last_status', models.CharField(blank=True, default='', max_length=20, verbose_name='마지막 결과')),
+                ('last_started_at', models.DateTimeField(blank=True, null=True)),
+                ('last_finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_duration', models.FloatField(default=0, verbose_name='마지막 실행 시간(초)')),
+                ('last_lag', models.FloatField(default=0, verbose_name='예정 대비 지연(초)')),
+                ('last_processed', models.BigIntegerField(blank=True, null=True, verbose_name='마지막 처리 건수')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='마지막 오류')),
+                ('runs', models.IntegerField(default=0, verbose_name='실행 횟수')),
+                ('skips', models.IntegerField(default=0, verbose_name='건너뜀 횟수')),
+                ('failures', models.IntegerField(default=0, verbose_name='실패 횟수')),
+            ],
+            options={
+                'verbose_name': '주기 작업 상태',
+                'verbose_name_plural': '주기 작업 상태',
+            },
+        ),
+    ]
@@ -30,6 +30,13 @@ class GameUser(models.Model):
             models.Index(fields = ['tier']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 저장 전 값 (분위수 스케치 증분 갱신용, stats/quantiles.py)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f'{self.nickname} ({self.tier})'
 
@@ -99,6 +106,13 @@ class PlayerStats(models.Model):
         self.calculate_win_rate()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 저장 전 값 (분위수 스케치 증분 갱신용, stats/quantiles.py)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f'{self.user.nickname}의 통계'
 
@@ -138,4 +152,157 @@ class SkillUsage(models.Model):
         ]
 
     def __str__(self):
-        return f'{self.player_stats.user.nickname} - {self.skill.name} ({self.usage_count}회)'
\ No newline at end of file
+        return f'{self.player_stats.user.nickname} - {self.skill.name} ({self.usage_count}회)'
+
+class LeaderboardSnapshot(models.Model):
+    """일별 랭킹 스냅샷 (하루 한 행, 압축된 바이너리 배열)"""
+    snapshot_date = models.DateField(unique=True, verbose_name='스냅샷 날짜')
+    user_count = models.IntegerField(default=0, verbose_name='유저 수')
+    user_ids = models.BinaryField(verbose_name='유저 ID 배열')
+    scores = models.BinaryField(verbose_name='랭킹 점수 배열')
+    tiers = models.BinaryField(verbose_name='티어 코드 배열')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-snapshot_date']
+        verbose_name = '랭킹 스냅샷'
+        verbose_name_plural = '랭킹 스냅샷'
+
+    def __str__(self):
+        return f'{self.snapshot_date} 랭킹 스냅샷 ({self.user_count}명)'
+
+
+class ItemUsageRollup(models.Model):
+    """티어별 아이템 사용량 집계 (롤업 테이블)"""
+    tier = models.CharField(max_length = 20, choices=GameUser.TIER_CHOICES, verbose_name = '티어')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='rollups')
+    total_usage = models.BigIntegerField(default = 0, verbose_name = '총 사용 횟수')
+    user_count = models.IntegerField(default = 0, verbose_name = '사용 유저 수')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '아이템 사용 롤업'
+        verbose_name_plural = '아이템 사용 롤업'
+        unique_together = ['tier', 'item']
+        indexes = [
+            models.Index(fields = ['tier', '-total_usage']),
+        ]
+
+    def __str__(self):
+        return f'{self.tier} - {self.item.name} ({self.total_usage}회)'
+
+class SkillUsageRollup(models.Model):
+    """티어별 스킬 사용량 집계 (롤업 테이블)"""
+    tier = models.CharField(max_length = 20, choices=GameUser.TIER_CHOICES, verbose_name = '티어')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='rollups')
+    total_usage = models.BigIntegerField(default = 0, verbose_name = '총 사용 횟수')
+    user_count = models.IntegerField(default = 0, verbose_name = '사용 유저 수')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '스킬 사용 롤업'
+        verbose_name_plural = '스킬 사용 롤업'
+        unique_together = ['tier', 'skill']
+        indexes = [
+            models.Index(fields = ['tier', '-total_usage']),
+        ]
+
+    def __str__(self):
+        return f'{self.tier} - {self.skill.name} ({self.total_usage}회)'
+
+class StatSketch(models.Model):
+    """스트리밍 요약(스케치) 저장 — 종류 + 키마다 한 행, 압축된 바이너리"""
+    KIND_CHOICES = [
+        ('topk', 'Top-K (Space-Saving)'),
+        ('kll', '분위수 (KLL)'),
+    ]
+
+    kind = models.CharField(max_length = 20, choices=KIND_CHOICES, verbose_name = '종류')
+    key = models.CharField(max_length = 100, verbose_name = '키')
+    data = models.BinaryField(verbose_name = '스케치 데이터')
+    total = models.BigIntegerField(default = 0, verbose_name = '관측 합계')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '통계 스케치'
+        verbose_name_plural = '통계 스케치'
+        unique_together = ['kind', 'key']
+
+    def __str__(self):
+        return f'{self.kind}:{self.key}'
+
+class DataVersion(models.Model):
+    """데이터셋(사용 기록, 유저)이 바뀔 때마다 증가하는 버전 — 파생 캐시 무효화 기준"""
+    name = models.CharField(max_length = 50, unique=True, verbose_name = '데이터셋')
+    version = models.BigIntegerField(default = 0, verbose_name = '버전')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '데이터 버전'
+        verbose_name_plural = '데이터 버전'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+
+class ArchivedUsage(models.Model):
+    """비활성 유저의 아이템/스킬 사용 기록 (콜드 스토리지, 유저당 한 행, 압축된 바이너리)"""
+    player_stats = models.OneToOneField(PlayerStats, on_delete=models.CASCADE, related_name='archived_usage')
+    data = models.BinaryField(verbose_name = '사용 기록 데이터')
+    item_rows = models.IntegerField(default = 0, verbose_name = '아이템 사용 기록 수')
+    skill_rows = models.IntegerField(default = 0, verbose_name = '스킬 사용 기록 수')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = '보관된 사용 기록'
+        verbose_name_plural = '보관된 사용 기록'
+
+    def __str__(self):
+        return f'{self.player_stats_id} 보관 (아이템 {self.item_rows}, 스킬 {self.skill_rows})'
+
+
+class PackedUsage(models.Model):
+    """플레이어별 아이템/스킬 사용량 벡터 (압축 저장 방식, stats/packed.py)
+
+    대상 id - 1 위치에 사용 횟수(uint32)와 마지막 사용 시각(epoch µs, int64)을 담은 고정 폭 배열.
+    """
+    player_stats = models.OneToOneField(PlayerStats, on_delete=models.CASCADE, related_name='packed_usage')
+    item_counts = models.BinaryField(verbose_name = '아이템 사용 횟수 벡터')
+    item_last_used = models.BinaryField(verbose_name = '아이템 마지막 사용 벡터')
+    skill_counts = models.BinaryField(verbose_name = '스킬 사용 횟수 벡터')
+    skill_last_used = models.BinaryField(verbose_name = '스킬 마지막 사용 벡터')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '사용량 벡터'
+        verbose_name_plural = '사용량 벡터'
+
+    def __str__(self):
+        return f'{self.player_stats_id} 사용량 벡터'
+
+
+class JobState(models.Model):
+    """주기 작업(스케줄러) 상태 — 작업당 한 행, 프로세스 간 잠금과 실행 지표 (stats/scheduler.py)"""
+    name = models.CharField(max_length = 100, unique=True, verbose_name = '작업 이름')
+    locked_by = models.CharField(max_length = 100, blank=True, default='', verbose_name = '실행 중인 프로세스')
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name = '잠금 만료')
+    next_run_at = models.DateTimeField(null=True, blank=True, verbose_name = '다음 실행 예정')
+    watermark = models.DateTimeField(null=True, blank=True, verbose_name = '증분 처리 기준 시각')
+    data_version = models.CharField(max_length = 32, blank=True, default='', verbose_name = '마지막 실행 데이터 버전')
+    last_status = models.CharField(max_length = 20, blank=True, default='', verbose_name = '마지막 결과')
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_duration = models.FloatField(default = 0, verbose_name = '마지막 실행 시간(초)')
+    last_lag = models.FloatField(default = 0, verbose_name = '예정 대비 지연(초)')
+    last_processed = models.BigIntegerField(null=True, blank=True, verbose_name = '마지막 처리 건수')
+    last_error = models.TextField(blank=True, default='', verbose_name = '마지막 오류')
+    runs = models.IntegerField(default = 0, verbose_name = '실행 횟수')
+    skips = models.IntegerField(default = 0, verbose_name = '건너뜀 횟수')
+    failures = models.IntegerField(default = 0, verbose_name = '실패 횟수')
+
+    class Meta:
+        verbose_name = '주기 작업 상태'
+        verbose_name_plural = '주기 작업 상태'
+
+    def __str__(self):
+        return f'{self.name} ({self.last_status or "대기"})'
@@ -0,0 +1,331 @@
+"""티어 × 타입 × 아이템/스킬 OLAP 큐브 (모든 롤업 포함, 프로세스 메모리)
+
+사용 기록 테이블을 한 번 스캔해 대상(item/skill)마다 int64 배열 두 개를 만듭니다.
+- total[tier, type, object]: 사용 횟수 합계
+- users[tier, type, object]: 사용 유저 수
+각 축의 마지막 인덱스는 ALL이고 (tier ALL, type ALL, object ALL) 조합이 모두 미리 계산되어
+있으므로 인기 순위/티어 통계/대시보드 조각은 배열 조회로 끝납니다.
+대상별 셀은 그 대상의 타입 칸에만 값이 있고, 유저 수 롤업은 (유저, 타입) 중복을 제거해 계산합니다.
+
+데이터 버전(versions.token())이 바뀌면 새 큐브를 다 만든 뒤 참조를 바꾸므로
+읽는 쪽은 항상 완성된 큐브 하나만 봅니다. 재생성은 REBUILD_INTERVAL에 한 번으로 제한하고,
+그 사이 오래된 큐브 대신 SQL 경로를 쓰도록 None을 돌려줍니다.
+SHARED_SNAPSHOT_DIR가 설정되어 있으면 만든 큐브를 공유 스냅샷으로 내보내고, 다른 워커는
+같은 버전의 스냅샷을 매핑해 쓰므로 스캔은 버전당 한 프로세스에서만 일어납니다 (stats/shared.py).
+"""
+import threading
+import time
+
+import numpy as np
+from django.db import connection
+
+from . import packed, sharding, shared, versions
+from .aggregation import ENTITIES, UsageQuery, run
+from .models import GameUser, Item, Skill
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+TYPES = {
+    'item': [code for code, _ in Item.ITEM_TYPE_CHOICES],
+    'skill': [code for code, _ in Skill.SKILL_TYPE_CHOICES],
+}
+REBUILD_INTERVAL = 5.0
+
+
+class EntityCube:
+    """한 대상(item/skill)의 큐브"""
+
+    def __init__(self, entity, details, total, users):
+        self.entity = entity
+        self.types = TYPES[entity]
+        # 대상 코드 = details 순서 (id 오름차순)
+        self.details = details
+        self.ids = np.array([row['id'] for row in details], dtype=np.int64)
+        type_column = ENTITIES[entity][3]
+        self.object_types = np.array(
+            [self._type_code(row[type_column]) for row in details], dtype=np.int64)
+        self.total = total
+        self.users = users
+
+    def _type_code(self, type_value):
+        return self.types.index(type_value) if type_value in self.types else len(self.types)
+
+    @staticmethod
+    def has_tier(tier):
+        return not tier or tier == 'ALL' or tier in TIERS
+
+    def _tier_code(self, tier):
+        return TIERS.index(tier) if tier and tier != 'ALL' else len(TIERS)
+
+    def cell(self, tier=None, type_value=None, object_id=None):
+        """(합계, 유저 수) — 인자가 None이면 그 축은 ALL"""
+        if not self.has_tier(tier):
+            return 0, 0
+        t, y = self._tier_code(tier), self._type_code(type_value) if type_value else len(self.types)
+        o = len(self.ids)
+        if object_id is not None:
+            o = int(np.searchsorted(self.ids, object_id))
+            if o >= len(self.ids) or self.ids[o] != object_id:
+                return 0, 0
+        return int(self.total[t, y, o]), int(self.users[t, y, o])
+
+    def popular(self, tier=None, type_value=None, limit=10):
+        """queries.popular_items/skills와 같은 결과 (사용 기록 없는 대상은 티어 전체일 때만 NULL로 포함)"""
+        if not self.has_tier(tier):
+            # SQL 경로처럼 알 수 없는 티어는 빈 결과
+            return []
+        t = self._tier_code(tier)
+        y = len(self.types)
+        candidates = np.arange(len(self.ids))
+        if type_value:
+            if type_value not in self.types:
+                return []
+            candidates = candidates[self.object_types == self.types.index(type_value)]
+        totals = self.total[t, y, candidates]
+        used = self.users[t, y, candidates] > 0
+        if t != len(TIERS):
+            candidates, totals, used = candidates[used], totals[used], used[used]
+
+        # 합계 내림차순, 사용 기록 없음(NULL)은 마지막, 동점은 id 오름차순
+        order = np.lexsort((self.ids[candidates], -totals, ~used))[:limit]
+        return [
+            {**self.details[code], 'total_usage': int(total) if is_used else None}
+            for code, total, is_used in zip(candidates[order], totals[order], used[order])
+        ]
+
+    def slice(self, tier=None, type_value=None):
+        """대시보드 조각: 선택한 (티어, 타입)의 합계와 한 단계 아래 분해"""
+        t = self._tier_code(tier)
+        y = self._type_code(type_value) if type_value else len(self.types)
+        objects = np.arange(len(self.ids))
+        if type_value:
+            objects = objects[self.object_types == y]
+        o = len(self.ids)
+        return {
+            'tier': TIERS[t] if t < len(TIERS) else 'ALL',
+            'type': self.types[y] if y < len(self.types) else 'ALL',
+            'total_usage': int(self.total[t, y, o]),
+            'users': int(self.users[t, y, o]),
+            'by_tier': {tier_code: {'total_usage': int(self.total[i, y, o]), 'users': int(self.users[i, y, o])}
+                        for i, tier_code in enumerate(TIERS)},
+            'by_type': {code: {'total_usage': int(self.total[t, i, o]), 'users': int(self.users[t, i, o])}
+                        for i, code in enumerate(self.types)},
+            'objects': [
+                {'id': int(self.ids[code]), 'name': self.details[code]['name'],
+                 'total_usage': int(self.total[t, y, code]), 'users': int(self.users[t, y, code])}
+                for code in objects
+            ],
+        }
+
+
+class Cube:
+    def __init__(self, token, entities, tier_rows):
+        self.token = token
+        self.entities = entities
+        # tier → (유저 수, 레벨 합, 랭킹 점수 합)
+        self.tier_rows = tier_rows
+        self.built_at = time.monotonic()
+
+    def __getitem__(self, entity):
+        return self.entities[entity]
+
+    def tier_stats(self, tier=None):
+        """UserViewSet.tier_stats와 같은 응답"""
+        data = {}
+        for code in TIERS:
+            count, level_sum, score_sum = self.tier_rows.get(code, (0, 0, 0))
+            if tier and code != tier:
+                count = 0
+            data[code] = {
+                'count': count,
+                'avg_level': level_sum / count if count else 0,
+                'avg_ranking_score': score_sum / count if count else 0,
+            }
+        return data
+
+
+# ---------------------------------------------------------------- 생성
+
+def _details(entity):
+    table, _, _, _, columns = ENTITIES[entity]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _scan(entity, ids):
+    """사용 기록 한 번 스캔 (+ 사용량 벡터) → (티어 코드, 유저, 대상 코드, 사용 횟수) 배열"""
+    _, usage_table, column, _, _ = ENTITIES[entity]
+    sql = f"""
+        SELECT u.tier, usage.player_stats_id, usage.{column}, usage.usage_count
+        FROM {usage_table} usage
+        INNER JOIN {sharding.hub_table('stats_playerstats')} ps ON usage.player_stats_id = ps.id
+        INNER JOIN {sharding.hub_table('stats_gameuser')} u ON ps.user_id = u.id
+    """
+    tier_index = {code: i for i, code in enumerate(TIERS)}
+    tiers, players, objects, counts = [], [], [], []
+    for tier, player_stats_id, object_id, usage_count in sharding.stream(sql):
+        tiers.append(tier_index.get(tier, -1))
+        players.append(player_stats_id)
+        objects.append(object_id)
+        counts.append(usage_count)
+
+    # 사용량 벡터로 저장된 유저도 같은 모양의 배열로 (모르는 티어 코드는 -1로 맞춤)
+    packed_tiers, packed_players, packed_objects, packed_counts = packed.entries(entity)
+    packed_tiers = np.where(packed_tiers < len(TIERS), packed_tiers, -1)
+
+    tiers = np.concatenate([np.array(tiers, dtype=np.int64), packed_tiers])
+    players = np.concatenate([np.array(players, dtype=np.int64), packed_players])
+    object_ids = np.concatenate([np.array(objects, dtype=np.int64), packed_objects])
+    counts = np.concatenate([np.array(counts, dtype=np.int64), packed_counts])
+    # 모르는 티어/카탈로그에 없는 대상 제외
+    objects = np.minimum(np.searchsorted(ids, object_ids), max(len(ids) - 1, 0))
+    known = (tiers >= 0) & (ids[objects] == object_ids) if len(ids) else np.zeros(len(tiers), dtype=bool)
+    return tiers[known], players[known], objects[known], counts[known]
+
+
+def build_entity(entity):
+    details = _details(entity)
+    ids = np.array([row['id'] for row in details], dtype=np.int64)
+    cube = EntityCube(entity, details, None, None)
+    tiers, players, objects, counts = _scan(entity, ids)
+    types = cube.object_types[objects]
+
+    T, Y, O = len(TIERS), len(cube.types), len(ids)
+    shape = (T + 1, Y + 1, O + 1)
+    base = (tiers * (Y + 1) + types) * (O + 1) + objects
+    total = np.bincount(base, weights=counts, minlength=np.prod(shape)).astype(np.int64).reshape(shape)
+    # (유저, 대상)은 유니크라 대상별 행 수 = 유저 수
+    users = np.bincount(base, minlength=np.prod(shape)).astype(np.int64).reshape(shape)
+
+    # 타입 ALL: 대상은 타입이 하나뿐이라 단순 합
+    total[:, Y, :] = total[:, :Y, :].sum(axis=1)
+    users[:, Y, :] = users[:, :Y, :].sum(axis=1)
+    # 대상 ALL: 합계는 단순 합, 유저 수는 (유저, 타입) / 유저 중복 제거
+    total[:, :, O] = total[:, :, :O].sum(axis=2)
+    users[:, :, O] = 0
+    if players.size:
+        _, first = np.unique(players * (Y + 1) + types, return_index=True)
+        np.add.at(users, (tiers[first], types[first], O), 1)
+        _, first = np.unique(players, return_index=True)
+        np.add.at(users, (tiers[first], Y, O), 1)
+    # 티어 ALL: 유저는 티어가 하나뿐이라 단순 합
+    total[T] = total[:T].sum(axis=0)
+    users[T] = users[:T].sum(axis=0)
+
+    cube.total, cube.users = total, users
+    return cube
+
+
+def _tier_rows():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT tier, COUNT(*), SUM(level), SUM(ranking_score) FROM stats_gameuser GROUP BY tier'
+        )
+        return {tier: (count, level_sum or 0, score_sum or 0) for tier, count, level_sum, score_sum in cursor.fetchall()}
+
+
+def build():
+    """데이터 한 번 스캔으로 큐브 생성 (토큰은 스캔 전에 읽어 스캔 중 변경은 다음 재생성에 반영)"""
+    token = versions.token(fresh=True)
+    return Cube(token, {entity: build_entity(entity) for entity in ENTITIES}, _tier_rows())
+
+
+# ---------------------------------------------------------------- 조회
+
+_current = None
+_build_lock = threading.Lock()
+
+
+def reload():
+    """강제 재생성 후 교체"""
+    global _current
+    with _build_lock:
+        _current = build()
+    return _current
+
+
+def get_cube():
+    """현재 데이터 버전의 큐브 (없거나 오래되었는데 재생성할 수 없으면 None → SQL 경로)"""
+    global _current
+    cube = _current
+    token = versions.token()
+    if cube is not None and cube.token == token:
+        return cube
+    # 다른 프로세스가 같은 버전을 내보냈으면 스캔 없이 매핑
+    cube = shared.load_cube(token)
+    if cube is not None:
+        _current = cube
+        return cube
+    if _current is not None and time.monotonic() - _current.built_at < REBUILD_INTERVAL:
+        return None
+    # 다른 스레드가 만드는 중이면 기다리지 않고 SQL 경로로
+    if not _build_lock.acquire(blocking=False):
+        return None
+    try:
+        if _current is None or _current.token != token:
+            _current = build()
+            if shared.enabled():
+                shared.publish(_current)
+        return _current if _current.token == versions.token() else None
+    finally:
+        _build_lock.release()
+
+
+def clear():
+    global _current
+    with _build_lock:
+        _current = None
+
+
+# ---------------------------------------------------------------- 정합성 검사
+
+def check_consistency(cube=None):
+    """큐브와 SQL 경로(집계 엔진) 비교 → 불일치 설명 리스트 (비어 있으면 일치)"""
+    cube = cube or build()
+    problems = []
+
+    def compare(label, expected, actual):
+        if expected != actual:
+            problems.append(f'{label}: SQL={expected!r} 큐브={actual!r}')
+
+    for entity in ENTITIES:
+        entity_cube = cube[entity]
+        type_name = ENTITIES[entity][3]
+        everything = len(entity_cube.ids) or 1
+        for tier in [None] + TIERS:
+            tiers = (tier,) if tier else ()
+            for type_value in [None] + entity_cube.types:
+                types = (type_value,) if type_value else ()
+                sql_rows = run(UsageQuery(entity, tiers=tiers, types=types, limit=everything))
+                compare(f'{entity} 인기 {tier or "ALL"}/{type_value or "ALL"}',
+                        [(row['id'], row['total_usage']) for row in sql_rows],
+                        [(row['id'], row['total_usage']) for row in entity_cube.popular(tier, type_value, everything)])
+
+                sql_users = {row['id']: row['users'] for row in
+                             run(UsageQuery(entity, tiers=tiers, types=types, metric='users', limit=everything))}
+                cube_users = {int(object_id): entity_cube.cell(tier, type_value, int(object_id))[1]
+                              for object_id in sql_users}
+                compare(f'{entity} 유저 수 {tier or "ALL"}/{type_value or "ALL"}', sql_users, cube_users)
+
+            # 대상 ALL 롤업 (타입별 / 전체)
+            for metric, index in (('total_usage', 0), ('users', 1)):
+                by_type = {row[type_name]: row[metric] for row in
+                           run(UsageQuery(entity, tiers=tiers, metric=metric, group_by=('type',), limit=everything))}
+                compare(f'{entity} 타입 롤업 {metric} {tier or "ALL"}', by_type,
+                        {code: entity_cube.cell(tier, code)[index] for code in by_type})
+
+        for metric, index in (('total_usage', 0), ('users', 1)):
+            by_tier = {row['tier']: row[metric] for row in
+                       run(UsageQuery(entity, metric=metric, group_by=('tier',), limit=len(TIERS)))}
+            compare(f'{entity} 티어 롤업 {metric}', by_tier,
+                    {tier: entity_cube.cell(tier)[index] for tier in by_tier})
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT tier, COUNT(*), AVG(level), AVG(ranking_score) FROM stats_gameuser GROUP BY tier')
+        expected = {tier: (count, round(level, 6), round(score, 6)) for tier, count, level, score in cursor.fetchall()}
+    stats = cube.tier_stats()
+    compare('티어 통계', expected, {
+        tier: (row['count'], round(row['avg_level'], 6), round(row['avg_ranking_score'], 6))
+        for tier, row in stats.items() if row['count']
+    })
+    return problems
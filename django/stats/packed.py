@@ -0,0 +1,415 @@
+"""플레이어별 사용량 벡터 저장 방식 (settings.USAGE_STORAGE = 'packed')
+
+아이템/스킬 카탈로그는 작은데(수십 개) 행 방식은 유저당 (대상 수)만큼 ItemUsage/SkillUsage 행과
+인덱스 항목 두 개씩을 씁니다. 벡터 방식은 유저당 PackedUsage 한 행에 대상별 고정 폭 배열을 둡니다.
+- 위치 = 대상 id - 1 (삭제된 대상 칸은 비어 있을 뿐 위치가 밀리지 않음, 새 대상은 배열 끝에 추가)
+- 사용 횟수 uint32, 마지막 사용 시각 epoch µs int64 (0이면 사용 기록 없음)
+- 배열 길이는 저장 당시 카탈로그의 최대 id, 짧은 배열(이후 추가된 대상)은 읽을 때 0으로 채움
+
+집계는 모든 벡터를 (유저 수 × 대상 수) 행렬로 쌓아 NumPy로 한 번에 합산합니다.
+OLAP 큐브 스캔, 영향 분석과 인기 아이템/스킬 SQL 경로, 집계 엔진(/api/stats/usage/, 상위 랭커 사용 통계)은
+두 방식의 데이터를 함께 읽으므로 전환 중(일부만 벡터로 옮긴 상태)에도 결과가 같습니다. 전환은 pack_usage 커맨드(pack_players/unpack_players).
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from . import sharding, sketches, versions
+from .aggregation import ENTITIES, MAX_LIMIT, UsageQuery, run_rows
+from .archive import EPOCH, insert_usages, take_usages, to_micros
+from .ingest import USAGE_TABLES
+from .models import GameUser, ItemUsage, PackedUsage, PlayerStats, SkillUsage
+
+COUNT_DTYPE = np.dtype('<u4')
+TIME_DTYPE = np.dtype('<i8')
+# entity → (사용 횟수 필드, 마지막 사용 필드)
+FIELDS = {'item': ('item_counts', 'item_last_used'), 'skill': ('skill_counts', 'skill_last_used')}
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+
+
+def enabled():
+    return settings.USAGE_STORAGE == 'packed'
+
+
+# ---------------------------------------------------------------- 인코딩
+
+def catalog_width(entity):
+    """벡터 폭 = 카탈로그의 최대 id (모든 유저 벡터를 같은 길이로 맞춰 한 번에 읽기 위함)"""
+    return max(sketches.catalog(entity), default=0)
+
+
+def encode_vector(rows, width=0):
+    """[(대상 id, 사용 횟수, last_used)] → (사용 횟수 bytes, 마지막 사용 bytes), 최소 width 칸"""
+    width = max(width, max((object_id for object_id, _, _ in rows), default=0))
+    counts = np.zeros(width, dtype=COUNT_DTYPE)
+    times = np.zeros(width, dtype=TIME_DTYPE)
+    for object_id, count, last_used in rows:
+        counts[object_id - 1] += count
+        times[object_id - 1] = max(times[object_id - 1], to_micros(last_used))
+    return counts.tobytes(), times.tobytes()
+
+
+def decode_vector(counts, times):
+    """encode_vector의 역변환 (대상 id 순)"""
+    counts = np.frombuffer(bytes(counts), dtype=COUNT_DTYPE)
+    times = np.frombuffer(bytes(times), dtype=TIME_DTYPE)
+    return [
+        (int(slot) + 1, int(counts[slot]), EPOCH + timedelta(microseconds=int(times[slot])))
+        for slot in np.flatnonzero(times)
+    ]
+
+
+def encode_usages(usages):
+    """{entity: [(대상 id, 사용 횟수, last_used)]} → PackedUsage 필드 dict"""
+    fields = {}
+    for entity, (counts_field, times_field) in FIELDS.items():
+        fields[counts_field], fields[times_field] = encode_vector(usages.get(entity, []), catalog_width(entity))
+    return fields
+
+
+def decode_usages(packed):
+    """PackedUsage → {entity: [(대상 id, 사용 횟수, last_used)]}"""
+    return {
+        entity: decode_vector(getattr(packed, counts_field), getattr(packed, times_field))
+        for entity, (counts_field, times_field) in FIELDS.items()
+    }
+
+
+def _padded(blob, dtype, width):
+    values = np.zeros(width, dtype=dtype)
+    stored = np.frombuffer(bytes(blob), dtype=dtype)
+    values[:len(stored)] = stored
+    return values
+
+
+# ---------------------------------------------------------------- 쓰기
+
+def increment(entity, merged, now=None):
+    """사용량 증가 적재 (ingest_usage의 벡터 방식) — merged: {(player_stats_id, 대상 id): 증가량}
+
+    한 유저의 사용 기록은 행과 벡터 중 한쪽에만 두므로, 아직 남은 행이 있으면 같은 트랜잭션에서 먼저
+    벡터로 옮깁니다 (보관된 유저는 ingest_usage가 미리 복원).
+    읽고-고쳐-쓰기를 한 트랜잭션에서 하므로 동시에 같은 유저를 쓰면 한쪽은 잠금 오류로 재시도합니다.
+    """
+    counts_field, times_field = FIELDS[entity]
+    now = now or timezone.now()
+    stamp = to_micros(now)
+    by_player = {}
+    for (player_stats_id, object_id), delta in merged.items():
+        by_player.setdefault(player_stats_id, []).append((object_id, delta))
+
+    with sharding.atomic({'default'} | set(sharding.group_by_shard(by_player))):
+        pack_players(list(by_player))
+        existing = PackedUsage.objects.in_bulk(list(by_player), field_name='player_stats_id')
+        created, updated = [], []
+        for player_stats_id, rows in by_player.items():
+            packed = existing.get(player_stats_id)
+            if packed is None:
+                packed = PackedUsage(player_stats_id=player_stats_id, **encode_usages({}))
+                created.append(packed)
+            else:
+                updated.append(packed)
+            width = max(len(bytes(getattr(packed, counts_field))) // COUNT_DTYPE.itemsize,
+                        max(object_id for object_id, _ in rows), catalog_width(entity))
+            counts = _padded(getattr(packed, counts_field), COUNT_DTYPE, width)
+            times = _padded(getattr(packed, times_field), TIME_DTYPE, width)
+            for object_id, delta in rows:
+                counts[object_id - 1] += delta
+                times[object_id - 1] = stamp
+            setattr(packed, counts_field, counts.tobytes())
+            setattr(packed, times_field, times.tobytes())
+            packed.updated_at = now
+        PackedUsage.objects.bulk_create(created)
+        PackedUsage.objects.bulk_update(updated, [counts_field, times_field, 'updated_at'])
+
+
+def candidates(limit, after_id=0, to='packed'):
+    """전환할 player_stats_id (id 순, after_id 이후) — 보관된 유저는 제외
+
+    packed 쪽은 이미 벡터가 있는 유저도 포함 (남은 행이 있으면 벡터에 합치고, 없으면 pack_players가 건너뜀)
+    """
+    if to == 'packed':
+        queryset = PlayerStats.objects.filter(archived_usage__isnull=True)
+    else:
+        queryset = PlayerStats.objects.filter(packed_usage__isnull=False)
+    return list(queryset.filter(id__gt=after_id).order_by('id').values_list('id', flat=True)[:limit])
+
+
+def pack_players(stats_ids):
+    """사용 기록 행 → 벡터 (이미 벡터가 있으면 합침) → 옮긴 행 수
+
+    트랜잭션 안에서 지운 행을 그대로 옮기므로 그 사이 들어온 증가분도 빠지지 않음.
+    행이 없는 유저는 건너뜀 (벡터를 만들지 않음)
+    """
+    with sharding.atomic({'default'} | set(sharding.group_by_shard(stats_ids))):
+        usages = {
+            stats_id: entities for stats_id, entities in take_usages(stats_ids).items()
+            if any(entities.values())
+        }
+        existing = PackedUsage.objects.in_bulk(stats_ids, field_name='player_stats_id')
+        created, updated = [], []
+        for stats_id, entities in usages.items():
+            packed = existing.get(stats_id)
+            if packed is None:
+                created.append(PackedUsage(player_stats_id=stats_id, **encode_usages(entities)))
+                continue
+            previous = decode_usages(packed)
+            for field, value in encode_usages({
+                entity: rows + previous[entity] for entity, rows in entities.items()
+            }).items():
+                setattr(packed, field, value)
+            updated.append(packed)
+        PackedUsage.objects.bulk_create(created)
+        PackedUsage.objects.bulk_update(updated, [field for fields in FIELDS.values() for field in fields])
+    return sum(len(rows) for entities in usages.values() for rows in entities.values())
+
+
+def unpack_players(stats_ids):
+    """벡터 → 사용 기록 행 (이미 있는 행에는 합침) → 되돌린 행 수"""
+    packed = PackedUsage.objects.filter(player_stats_id__in=stats_ids)
+    usages = {row.player_stats_id: decode_usages(row) for row in packed}
+    with sharding.atomic({'default'} | set(sharding.group_by_shard(usages))):
+        insert_usages(usages, merge=True)
+        PackedUsage.objects.filter(player_stats_id__in=list(usages)).delete()
+    return sum(len(rows) for entities in usages.values() for rows in entities.values())
+
+
+def convert(to='packed', chunk_size=1000):
+    """모든 유저를 한 저장 방식으로 전환 — 청크마다 (청크 번호, 유저 수, 옮긴 행 수)를 yield
+
+    합계는 바뀌지 않으므로 Top-K 스케치/롤업은 그대로 두고 데이터 버전만 올립니다 (큐브/응답 캐시).
+    스케치/롤업 재생성도 두 방식을 함께 읽습니다.
+    """
+    convert_players = pack_players if to == 'packed' else unpack_players
+    after_id, chunk = 0, 0
+    try:
+        while True:
+            stats_ids = candidates(chunk_size, after_id, to)
+            if not stats_ids:
+                break
+            rows = convert_players(stats_ids)
+            chunk += 1
+            after_id = stats_ids[-1]
+            yield chunk, len(stats_ids), rows
+    finally:
+        if chunk:
+            versions.bump(versions.USAGE)
+
+
+# ---------------------------------------------------------------- 집계
+
+def _stack(blobs, dtype, width):
+    """blob들을 (blob 수 × width) 행렬로 — 모두 width 길이면(보통) frombuffer 한 번"""
+    if all(len(blob) == width * dtype.itemsize for blob in blobs):
+        return np.frombuffer(b''.join(blobs), dtype=dtype).reshape(len(blobs), width)
+    matrix = np.zeros((len(blobs), width), dtype=dtype)
+    for row, blob in enumerate(blobs):
+        values = np.frombuffer(blob, dtype=dtype)
+        matrix[row, :len(values)] = values
+    return matrix
+
+
+def matrix(entity, tiers=()):
+    """(player_stats_id 배열, 티어 코드 배열(모르는 티어 = len(TIERS)), 사용 횟수 행렬, 사용 여부 행렬)
+
+    행렬은 (유저 수 × 대상 칸 수), 칸 j = 대상 id j+1 — 쿼리 1번 (tiers가 있으면 그 티어 유저만)
+    """
+    conditions = [f"u.tier IN ({', '.join(['%s'] * len(tiers))})"] if tiers else []
+    return _matrix(entity, conditions, list(tiers))
+
+
+def _matrix(entity, conditions, params):
+    """matrix()와 같은 배열 — WHERE 조건(u: 유저, ps: 통계)을 만족하는 유저만"""
+    counts_field, times_field = FIELDS[entity]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT pu.player_stats_id, u.tier, pu.{counts_field}, pu.{times_field}
+            FROM stats_packedusage pu
+            INNER JOIN stats_playerstats ps ON pu.player_stats_id = ps.id
+            INNER JOIN stats_gameuser u ON ps.user_id = u.id
+            {where}
+        """, params)
+        rows = cursor.fetchall()
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros((0, 0), dtype=np.int64), np.zeros((0, 0), dtype=bool)
+
+    stats_ids, tier_codes, counts, times = zip(*rows)
+    tier_index = {code: i for i, code in enumerate(TIERS)}
+    tier_codes = np.array([tier_index.get(tier, len(TIERS)) for tier in tier_codes], dtype=np.int64)
+    width = max(len(blob) for blob in counts) // COUNT_DTYPE.itemsize
+    used = _stack(times, TIME_DTYPE, width) != 0
+    counts = _stack(counts, COUNT_DTYPE, width).astype(np.int64)
+    return np.array(stats_ids, dtype=np.int64), tier_codes, counts, used
+
+
+def entries(entity):
+    """사용 기록 행과 같은 모양의 배열 (티어 코드, player_stats_id, 대상 id, 사용 횟수) — 큐브 스캔용"""
+    stats_ids, tiers, counts, used = matrix(entity)
+    players, slots = np.nonzero(used)
+    return tiers[players], stats_ids[players], slots + 1, counts[players, slots]
+
+
+def tier_totals(entity):
+    """(합계, 사용 유저 수) 행렬 — 행: TIERS 순 + 모르는 티어 + ALL, 열: 대상 칸 (bincount 한 번씩)"""
+    _, tiers, counts, used = matrix(entity)
+    rows, width = len(TIERS) + 1, counts.shape[1]
+    keys = (tiers[:, None] * width + np.arange(width)).ravel()
+    total = np.bincount(keys, weights=counts.ravel(), minlength=rows * width).astype(np.int64).reshape(rows, width)
+    users = np.bincount(keys, weights=used.ravel(), minlength=rows * width).astype(np.int64).reshape(rows, width)
+    return np.vstack([total, total.sum(axis=0)]), np.vstack([users, users.sum(axis=0)])
+
+
+def totals(entity, tiers=()):
+    """대상 칸별 (합계, 사용 유저 수) 벡터 — tiers가 있으면 그 티어 유저만 읽어 합산"""
+    _, _, counts, used = matrix(entity, tiers)
+    return counts.sum(axis=0), used.sum(axis=0)
+
+
+def _user_conditions(query, alias):
+    """UsageQuery의 유저 필터 → (조건, 파라미터) — 집계 엔진과 같은 의미"""
+    conditions, params = [], []
+    if query.tiers:
+        conditions.append(f"{alias}.tier IN ({', '.join(['%s'] * len(query.tiers))})")
+        params += query.tiers
+    for value, condition in ((query.level_min, 'level >= %s'), (query.level_max, 'level <= %s'),
+                             (query.score_min, 'ranking_score >= %s'), (query.score_max, 'ranking_score <= %s')):
+        if value is not None:
+            conditions.append(f'{alias}.{condition}')
+            params.append(value)
+    return conditions, params
+
+
+def usage_partials(query):
+    """집계 엔진의 부분 집계와 같은 모양 {그룹 키: [합계, 유저 수]} — 사용량 벡터에서 (aggregation.run이 합침)
+
+    유저 필터는 SQL로(상위 N명은 다른 유저 필터 적용 후 랭킹 순), 그룹 합산은 NumPy로.
+    대상 테이블에 없는 대상과 모르는 티어는 행 방식의 조인처럼 빠집니다.
+    """
+    conditions, params = _user_conditions(query, 'u')
+    if query.top_count is not None:
+        top_conditions, params = _user_conditions(query, 'top')
+        top_where = f" WHERE {' AND '.join(top_conditions)}" if top_conditions else ''
+        conditions = [f'u.id IN (SELECT top.id FROM stats_gameuser top{top_where} '
+                      f'ORDER BY top.ranking_score DESC LIMIT %s)']
+        params.append(query.top_count)
+    if query.min_games is not None:
+        conditions.append('ps.total_games >= %s')
+        params.append(query.min_games)
+    _, tiers, counts, used = _matrix(query.entity, conditions, params)
+
+    # 대상 칸 → 타입 코드 (대상 테이블에 없거나 타입 필터에 안 맞으면 -1) — 정확한 집계라 캐시 대신 테이블에서
+    table, _, _, type_column, _ = ENTITIES[query.entity]
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT id, {type_column} FROM {table}')
+        object_types = cursor.fetchall()
+    type_values = sorted({type_value for _, type_value in object_types})
+    slot_types = np.full(counts.shape[1], -1, dtype=np.int64)
+    for object_id, type_value in object_types:
+        if object_id <= len(slot_types) and (not query.types or type_value in query.types):
+            slot_types[object_id - 1] = type_values.index(type_value)
+
+    players, slots = np.nonzero(used & (slot_types >= 0) & (tiers < len(TIERS))[:, None])
+    columns = {'object': slots + 1, 'tier': tiers[players], 'type': slot_types[slots]}
+    keys = np.stack([columns[group] for group in query.group_by], axis=1)
+    if not len(keys):
+        return {}
+    keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    total = np.bincount(inverse, weights=counts[players, slots], minlength=len(keys)).astype(np.int64)
+    if 'object' in query.group_by:
+        # (유저, 대상)별 칸 하나 = 사용자 한 명
+        users = np.bincount(inverse, minlength=len(keys))
+    else:
+        group_users = np.unique(np.stack([inverse, players], axis=1), axis=0)
+        users = np.bincount(group_users[:, 0], minlength=len(keys))
+
+    decode = {'object': int, 'tier': lambda code: TIERS[code], 'type': lambda code: type_values[code]}
+    return {
+        tuple(decode[group](value) for group, value in zip(query.group_by, key)): [int(total[i]), int(users[i])]
+        for i, key in enumerate(keys.tolist())
+    }
+
+
+def popular(entity, tier=None, type_value=None, limit=10):
+    """queries.popular_items/skills와 같은 결과 — 벡터 합계 + 남아 있는 사용 기록 행 합계
+
+    사용 기록 없는 대상은 티어 전체일 때만 NULL로 포함, 합계 내림차순(동점은 id 순).
+    """
+    table, _, _, type_column, columns = ENTITIES[entity]
+    tiers = (tier,) if tier and tier != 'ALL' else ()
+    types = (type_value,) if type_value else ()
+
+    total, users = totals(entity, tiers)
+    # 전환 중 남은 행 (대상 수는 카탈로그 크기라 MAX_LIMIT 안)
+    rows = {
+        result['id']: result['total_usage']
+        for result in run_rows(UsageQuery(entity, tiers=tiers, types=types, limit=MAX_LIMIT))
+        if result['total_usage'] is not None
+    }
+
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    params = []
+    if type_value:
+        sql += f' WHERE {type_column} = %s'
+        params.append(type_value)
+    with connection.cursor() as cursor:
+        cursor.execute(sql + ' ORDER BY id', params)
+        details = [dict(zip(columns, values)) for values in cursor.fetchall()]
+
+    results = []
+    for detail in details:
+        slot = detail['id'] - 1
+        in_vector = 0 <= slot < len(total) and users[slot] > 0
+        if not in_vector and detail['id'] not in rows:
+            if tiers:
+                continue
+            results.append({**detail, 'total_usage': None})
+            continue
+        vector_total = int(total[slot]) if in_vector else 0
+        results.append({**detail, 'total_usage': vector_total + rows.get(detail['id'], 0)})
+    results.sort(key=lambda result: (result['total_usage'] is None, -(result['total_usage'] or 0), result['id']))
+    return results[:limit]
+
+
+# ---------------------------------------------------------------- 응답
+
+def usage_objects(packed, items, skills):
+    """벡터를 저장하지 않은 ItemUsage/SkillUsage 객체로 (상세 응답용, 대상 id 순)
+
+    items/skills: {id: Item/Skill}
+    """
+    usages = decode_usages(packed)
+    return (
+        [ItemUsage(player_stats_id=packed.player_stats_id, item=items[object_id], usage_count=count,
+                   last_used=last_used)
+         for object_id, count, last_used in usages['item'] if object_id in items],
+        [SkillUsage(player_stats_id=packed.player_stats_id, skill=skills[object_id], usage_count=count,
+                    last_used=last_used)
+         for object_id, count, last_used in usages['skill'] if object_id in skills],
+    )
+
+
+def storage_bytes():
+    """저장 방식별 테이블+인덱스 크기(바이트) — {'rows': ..., 'packed': ...} (dbstat 미지원이면 None)
+
+    샤딩 중이면 사용 기록 행은 모든 샤드 합계.
+    """
+    row_tables = [table for table, _ in USAGE_TABLES.values()]
+
+    def size(alias_rows, tables):
+        return sum(value or 0 for rows in alias_rows for name, value in rows if name in tables)
+
+    sql = 'SELECT tbl_name, (SELECT SUM(pgsize) FROM dbstat WHERE dbstat.name = m.name) FROM sqlite_master m'
+    try:
+        usage = sharding.scatter(sql.replace('sqlite_master', 'main.sqlite_master'))
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            hub = cursor.fetchall()
+    except OperationalError:
+        return None
+    return {'rows': size(usage, row_tables), 'packed': size([hub], [PackedUsage._meta.db_table])}
@@ -0,0 +1,26 @@
+from django.core.paginator import Paginator
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+COUNT_CAP = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """대형 테이블용 페이지네이터
+
+    필터가 없으면 pk의 최소/최대값으로 전체 개수를 추정하고,
+    필터가 있으면 COUNT_CAP까지만 센다 (COUNT(*) 전체 스캔 방지).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            # MIN/MAX를 한 쿼리에 같이 쓰면 SQLite의 min/max 최적화가 꺼지므로 따로 조회
+            # 샤드에서 읽는 목록이면 같은 샤드에서
+            manager = queryset.model._default_manager.db_manager(queryset.db)
+            high = manager.aggregate(value=Max('pk'))['value']
+            if high is None:
+                return 0
+            return high - manager.aggregate(value=Min('pk'))['value'] + 1
+        return queryset.values('pk')[:COUNT_CAP].count()
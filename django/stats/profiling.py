@@ -0,0 +1,240 @@
+"""요청/커맨드 단위 CPU·메모리 프로파일링
+
+코드를 고치지 않고 느린 API나 커맨드의 시간/메모리가 어디에 쓰이는지 보기 위한 도구입니다.
+Profile 블록 안에서 cProfile(함수별 시간), tracemalloc(최대 메모리, 할당 위치), 모든 DB 연결의
+SQL(execute_wrapper)을 함께 기록해 PROFILE_DIR에 저장합니다.
+- <이름>.prof: pstats 원본 (python -m pstats, snakeviz 등으로 열기)
+- <이름>.json: 요약 (누적 시간 상위 함수, 할당 상위 위치, 쿼리 로그와 같은 SQL별 합계)
+API 요청은 X-Profile 헤더나 ?profile=1 (스태프 또는 INTERNAL_IPS 요청만, api/profiling.py),
+커맨드는 ProfiledCommand를 상속한 커맨드의 --profile 옵션으로 켭니다.
+cProfile은 현재 스레드만 측정하므로 스레드 풀에서 도는 작업은 대기 시간으로만 보입니다.
+tracemalloc은 실행을 수 배 느리게 하므로 실행시간은 참고용입니다. tracemalloc은 프로세스 전역이라
+프로파일이 겹치면 메모리 수치와 할당 위치에 다른 요청의 할당도 섞입니다.
+PROFILE_DIR에는 최근 PROFILE_KEEP개만 남깁니다.
+"""
+import cProfile
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TOP_QUERY_GROUPS = 30
+# 쿼리 로그에 남길 최대 개수와 SQL 길이 (대량 적재 커맨드는 수십만 건)
+MAX_QUERIES = 500
+MAX_SQL_LENGTH = 2000
+NAME_PATTERN = re.compile(r'^[\w.-]+$')
+# bulk_create의 VALUES (%s, ...), (%s, ...) 반복은 배치 크기와 무관하게 한 SQL로 묶음
+REPEATED_VALUES = re.compile(r'(\((?:%s, )*%s\))(?:, \1)+')
+
+
+# tracemalloc은 프로세스 전역 — 겹친 프로파일 중 먼저 끝난 쪽이 끄지 않도록 사용 수를 셈
+_tracing_lock = threading.Lock()
+_tracing = {'users': 0, 'started': False}
+
+
+def _acquire_tracing():
+    with _tracing_lock:
+        if _tracing['users'] == 0:
+            # 프로파일 밖에서 켠 tracemalloc은 끄지 않음
+            _tracing['started'] = not tracemalloc.is_tracing()
+            if _tracing['started']:
+                tracemalloc.start()
+        _tracing['users'] += 1
+
+
+def _release_tracing():
+    with _tracing_lock:
+        _tracing['users'] -= 1
+        if _tracing['users'] == 0 and _tracing['started']:
+            tracemalloc.stop()
+
+
+def normalize(sql):
+    return REPEATED_VALUES.sub(r'\1, ...', sql)
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def _location(filename, line):
+    """site-packages/프로젝트 경로 앞부분을 잘라 짧게"""
+    for marker in ('site-packages/', str(settings.BASE_DIR) + '/'):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f'{filename}:{line}'
+
+
+class Profile:
+    """with Profile('GET /api/...', kind='request') as profile: ... → profile.name, profile.summary"""
+
+    def __init__(self, label, kind='request'):
+        self.label = label
+        self.kind = kind
+        self.name = None
+        self.summary = None
+        self.queries = []
+        self.query_count = 0
+        self.query_groups = {}
+
+    def _record(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - start
+            sql = normalize(sql)
+            self.query_count += 1
+            group = self.query_groups.setdefault(sql, [0, 0.0])
+            group[0] += 1
+            group[1] += seconds
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql[:MAX_SQL_LENGTH],
+                    'params': repr(params)[:200],
+                    'many': many,
+                    'seconds': seconds,
+                })
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self._record))
+        _acquire_tracing()
+        tracemalloc.reset_peak()
+        self._memory_start = tracemalloc.get_traced_memory()[0]
+        self._profiler = cProfile.Profile()
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.disable()
+        elapsed = time.perf_counter() - self._start
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ])
+        finally:
+            _release_tracing()
+            self._stack.close()
+
+        self.summary = {
+            'label': self.label,
+            'kind': self.kind,
+            'created_at': timezone.now().isoformat(),
+            'elapsed': elapsed,
+            'peak_memory': peak - self._memory_start,
+            'retained_memory': current - self._memory_start,
+            'error': repr(exc) if exc is not None else '',
+            'functions': self._functions(),
+            'allocations': [
+                {'site': _location(stat.traceback[0].filename, stat.traceback[0].lineno),
+                 'size': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+            ],
+            'query_count': self.query_count,
+            'query_seconds': sum(seconds for _, seconds in self.query_groups.values()),
+            'query_groups': [
+                {'sql': sql[:MAX_SQL_LENGTH], 'count': count, 'seconds': seconds}
+                for sql, (count, seconds) in sorted(self.query_groups.items(), key=lambda item: -item[1][1])
+            ][:TOP_QUERY_GROUPS],
+            'queries': self.queries,
+        }
+        self.name = save(self._profiler, self.summary)
+        return False
+
+    def _functions(self):
+        """누적 시간 상위 함수 [{'function', 'calls', 'own', 'cumulative'}]"""
+        stats = pstats.Stats(self._profiler).stats
+        rows = sorted(stats.items(), key=lambda item: -item[1][3])[:TOP_FUNCTIONS]
+        return [
+            {'function': f'{function} ({_location(filename, line)})', 'calls': calls, 'own': own, 'cumulative': cumulative}
+            for (filename, line, function), (_, calls, own, cumulative, _) in rows
+        ]
+
+
+def save(profiler, summary):
+    """PROFILE_DIR에 <이름>.prof/.json 저장 → 이름 (오래된 프로파일은 정리)"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'{timezone.now():%Y%m%d_%H%M%S_%f}-{slugify(summary["label"])[:60] or summary["kind"]}'
+    profiler.dump_stats(directory / f'{name}.prof')
+    (directory / f'{name}.json').write_text(json.dumps({'name': name, **summary}, ensure_ascii=False, indent=2))
+    # 방금 저장한 프로파일은 남김
+    prune(max(settings.PROFILE_KEEP, 1))
+    return name
+
+
+def prune(keep=None):
+    """최근 keep개(기본값 PROFILE_KEEP)만 남기고 오래된 .prof/.json 삭제 → 삭제한 프로파일 수
+
+    이름이 저장 시각으로 시작하므로 이름 순 = 시간 순
+    """
+    keep = settings.PROFILE_KEEP if keep is None else keep
+    names = sorted({path.stem for pattern in ('*.json', '*.prof') for path in profile_dir().glob(pattern)})
+    old = names[:max(len(names) - keep, 0)]
+    for name in old:
+        for suffix in ('.prof', '.json'):
+            # 동시에 정리하는 다른 프로세스가 먼저 지웠을 수 있음
+            (profile_dir() / f'{name}{suffix}').unlink(missing_ok=True)
+    return len(old)
+
+
+def recent(limit=50):
+    """최근 프로파일 요약 (새것부터)"""
+    summaries = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True)[:limit]:
+        try:
+            summaries.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def prof_path(name):
+    """이름 → .prof 경로 (경로 조작 방지, 없으면 None)"""
+    if not NAME_PATTERN.match(name):
+        return None
+    path = profile_dir() / f'{name}.prof'
+    return path if path.is_file() else None
+
+
+class ProfiledCommand(BaseCommand):
+    """--profile 옵션을 붙여 커맨드 전체를 Profile 안에서 실행하는 BaseCommand"""
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument('--profile', action='store_true',
+                            help=f'cProfile/tracemalloc/SQL 로그를 PROFILE_DIR({settings.PROFILE_DIR})에 저장')
+        return parser
+
+    def execute(self, *args, **options):
+        if not options.get('profile'):
+            return super().execute(*args, **options)
+        command = self.__module__.rsplit('.', 1)[-1]
+        with Profile(f'{command} {" ".join(map(str, args))}'.strip(), kind='command') as profile:
+            output = super().execute(*args, **options)
+        summary = profile.summary
+        self.stdout.write(self.style.HTTP_INFO(
+            f'프로파일 저장: {profile_dir() / profile.name}.prof '
+            f'(실행시간 {summary["elapsed"]:.2f}초, 최대 메모리 {summary["peak_memory"] / 1024 / 1024:.1f}MB, '
+            f'쿼리 {summary["query_count"]:,}개 {summary["query_seconds"]:.2f}초)'
+        ))
+        return output
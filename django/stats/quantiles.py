@@ -0,0 +1,327 @@
+"""랭킹 점수 / 레벨 / 승률 분위수 스케치 (KLL)
+
+지표 x (전체 + 티어별)마다 KLL 스케치 두 개를 유지합니다.
+- inserted: 들어온 값, deleted: 빠진 값 (점수 변경 = 이전 값 삭제 + 새 값 추가)
+- 순위(rank) = inserted의 x 이하 개수 - deleted의 x 이하 개수
+
+KLL은 삭제를 지원하지 않으므로 이렇게 두 스케치의 차로 갱신을 표현하고,
+오차는 두 스케치 오차의 합입니다. 주기적으로 rebuild_quantiles()로 새로 만들면
+deleted가 비워져 오차가 다시 작아집니다.
+
+저장 키는 '{metric}:{tier}' (티어 전체는 'ALL'), StatSketch.kind = 'kll'.
+조회는 로드 시 정렬/누적 배열을 만들어 두므로 searchsorted 한 번(상수 시간)입니다.
+"""
+import math
+import random
+import struct
+import threading
+import zlib
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import GameUser, StatSketch
+from .sketches import cached
+
+DEFAULT_K = 200
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+
+# 지표 → (테이블 별칭.컬럼)
+METRICS = {
+    'ranking_score': 'u.ranking_score',
+    'level': 'u.level',
+    'win_rate': 'ps.win_rate',
+}
+
+_HEADER = struct.Struct('<IQI')
+
+
+class KLLSketch:
+    """KLL 분위수 스케치 (Karnin, Lang, Liberty 2016)
+
+    레벨 h의 원소는 가중치 2^h를 가집니다. 레벨이 용량을 넘으면 정렬 후
+    짝수/홀수 위치 중 하나를 무작위로 골라 다음 레벨로 올립니다.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self):
+        return sum(len(items) for items in self.levels)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value):
+        self.levels[0].append(float(value))
+        self.n += 1
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        while self._size() >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        for level, items in enumerate(self.levels):
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items.sort()
+            # 홀수 개면 하나는 현재 레벨에 남김
+            keep = [items.pop()] if len(items) % 2 else []
+            offset = self._rng.randint(0, 1)
+            self.levels[level + 1].extend(items[offset::2])
+            self.levels[level] = keep
+            return
+
+    def is_exact(self):
+        return len(self.levels) == 1
+
+    def rank_error(self):
+        """정규화 순위 오차 (99% 신뢰, DataSketches KLL 근사식)"""
+        return 0.0 if self.is_exact() else 2.296 / self.k ** 0.9445
+
+    def sorted_view(self):
+        """(정렬된 값, 누적 가중치) 배열"""
+        values = np.concatenate([np.asarray(items, dtype=np.float64) for items in self.levels]) if self.n else np.empty(0)
+        weights = np.concatenate([np.full(len(items), 1 << level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)]) if self.n else np.empty(0, dtype=np.int64)
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def to_bytes(self):
+        header = _HEADER.pack(self.k, self.n, len(self.levels))
+        lengths = struct.pack(f'<{len(self.levels)}I', *(len(items) for items in self.levels))
+        values = np.concatenate([np.asarray(items, dtype='<f8') for items in self.levels]) if self.n else np.empty(0, '<f8')
+        return header + zlib.compress(lengths + values.tobytes(), 6)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        blob = bytes(blob)
+        k, n, level_count = _HEADER.unpack_from(blob)
+        body = zlib.decompress(blob[_HEADER.size:])
+        lengths = struct.unpack_from(f'<{level_count}I', body)
+        values = np.frombuffer(body, dtype='<f8', offset=4 * level_count)
+        sketch = cls(k, seed=n)
+        sketch.n = n
+        sketch.levels, start = [], 0
+        for length in lengths:
+            sketch.levels.append(values[start:start + length].tolist())
+            start += length
+        return sketch
+
+
+class QuantileSummary:
+    """inserted - deleted 스케치 쌍 → 분위수 / 순위 조회"""
+
+    def __init__(self, inserted, deleted):
+        self.inserted = inserted
+        self.deleted = deleted
+        self.count = inserted.n - deleted.n
+
+        values, cumulative = inserted.sorted_view()
+        deleted_values, deleted_cumulative = deleted.sorted_view()
+        if deleted_values.size:
+            index = np.searchsorted(deleted_values, values, side='right')
+            removed = np.where(index > 0, deleted_cumulative[np.maximum(index - 1, 0)], 0)
+            cumulative = np.maximum.accumulate(np.maximum(cumulative - removed, 0))
+        self._values = values
+        # 총합이 정확한 개수와 같도록 보정
+        scale = self.count / cumulative[-1] if cumulative.size and cumulative[-1] else 0.0
+        self._cumulative = cumulative * scale
+
+    def rank_error(self):
+        if self.count <= 0:
+            return 0.0
+        spread = self.inserted.n * self.inserted.rank_error() + self.deleted.n * self.deleted.rank_error()
+        return spread / self.count
+
+    def quantile(self, q):
+        """q (0~1) 분위수 값"""
+        if not self._values.size or self.count <= 0:
+            return None
+        q = min(max(q, 0.0), 1.0)
+        # 누적 개수가 q * count 이상인 첫 값 (삭제로 개수가 0이 된 값은 건너뜀)
+        index = int(np.searchsorted(self._cumulative, max(q * self.count, 1e-9), side='left'))
+        return float(self._values[min(index, self._values.size - 1)])
+
+    def rank(self, value):
+        """value 이하 비율 (0~1)"""
+        if not self._values.size or self.count <= 0:
+            return None
+        index = int(np.searchsorted(self._values, value, side='right'))
+        return float(self._cumulative[index - 1] / self.count) if index else 0.0
+
+
+def sketch_key(metric, tier=None):
+    return f'{metric}:{tier or "ALL"}'
+
+
+def _pair_to_bytes(inserted, deleted):
+    first = inserted.to_bytes()
+    return struct.pack('<I', len(first)) + first + deleted.to_bytes()
+
+
+def _pair_from_bytes(blob):
+    blob = bytes(blob)
+    (length,) = struct.unpack_from('<I', blob)
+    return KLLSketch.from_bytes(blob[4:4 + length]), KLLSketch.from_bytes(blob[4 + length:])
+
+
+# ---------------------------------------------------------------- 조회
+
+def _load(key):
+    blob = StatSketch.objects.filter(kind='kll', key=key).values_list('data', flat=True).first()
+    return QuantileSummary(*_pair_from_bytes(blob)) if blob is not None else None
+
+
+def get_summary(metric, tier=None):
+    """저장된 스케치 요약 (없으면 None, 프로세스 캐시)"""
+    key = sketch_key(metric, None if tier == 'ALL' else tier)
+    return cached(('kll', key), lambda: _load(key))
+
+
+# ---------------------------------------------------------------- 재생성 / 증분 갱신
+
+def _all_keys():
+    return [sketch_key(metric, tier) for metric in METRICS for tier in [None] + TIERS]
+
+
+def rebuild_quantiles(k=DEFAULT_K):
+    """유저/통계 테이블 한 번 스캔으로 모든 분위수 스케치 재생성 → 스케치 개수"""
+    sketches = {key: KLLSketch(k) for key in _all_keys()}
+    columns = ', '.join(METRICS.values())
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT u.tier, {columns}
+            FROM stats_gameuser u
+            LEFT JOIN stats_playerstats ps ON ps.user_id = u.id
+        """)
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for tier, *values in rows:
+                for metric, value in zip(METRICS, values):
+                    if value is None:
+                        continue
+                    sketches[sketch_key(metric)].update(value)
+                    if tier in TIERS:
+                        sketches[sketch_key(metric, tier)].update(value)
+
+    with transaction.atomic():
+        StatSketch.objects.filter(kind='kll').delete()
+        StatSketch.objects.bulk_create([
+            StatSketch(kind='kll', key=key, data=_pair_to_bytes(sketch, KLLSketch(k)), total=sketch.n)
+            for key, sketch in sketches.items()
+        ])
+    with _pending_lock:
+        _pending.clear()
+    return len(sketches)
+
+
+# key → (inserted, deleted) 아직 DB에 합치지 않은 변경
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _pending_pair(key):
+    pair = _pending.get(key)
+    if pair is None:
+        pair = _pending[key] = (KLLSketch(), KLLSketch())
+    return pair
+
+
+def record_change(metric, old_tier, old_value, new_tier, new_value):
+    """값 변경 기록 (생성은 old=None, 삭제는 new=None)"""
+    if old_tier == new_tier and old_value == new_value:
+        return
+    with _pending_lock:
+        for tier, value, side in ((old_tier, old_value, 1), (new_tier, new_value, 0)):
+            if value is None:
+                continue
+            for key in {sketch_key(metric), sketch_key(metric, tier if tier in TIERS else None)}:
+                _pending_pair(key)[side].update(value)
+    # 건수와 상관없이 커밋마다 병합 (다른 워커/프로세스가 바로 보도록, 트랜잭션 안 여러 건은 첫 flush가 모두 처리)
+    transaction.on_commit(flush)
+
+
+def flush():
+    """프로세스에 쌓인 변경을 저장된 스케치에 병합 (KLL은 병합 가능)"""
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+
+    with transaction.atomic():
+        # 쓰기 잠금 먼저 (동시 flush 간 갱신 손실 방지)
+        StatSketch.objects.filter(kind='kll', key__in=pending).update(updated_at=timezone.now())
+        stored = {row.key: row for row in StatSketch.objects.filter(kind='kll', key__in=pending)}
+        for key, (inserted, deleted) in pending.items():
+            row = stored.get(key)
+            if row is None:
+                # 아직 재생성 전이면 변경만으로 스케치를 만들지 않음
+                continue
+            base_inserted, base_deleted = _pair_from_bytes(row.data)
+            base_inserted.merge(inserted)
+            base_deleted.merge(deleted)
+            row.data = _pair_to_bytes(base_inserted, base_deleted)
+            row.total = base_inserted.n - base_deleted.n
+        StatSketch.objects.bulk_update(stored.values(), ['data', 'total'])
+    return len(pending)
+
+
+def track_user_save(sender, instance, created, **kwargs):
+    """GameUser post_save: 랭킹 점수/레벨 변경 기록"""
+    old = getattr(instance, '_loaded_values', None) or {}
+    if not created and not old:
+        return
+    for metric in ('ranking_score', 'level'):
+        if not created and metric not in old:
+            continue
+        record_change(metric, old.get('tier'), old.get(metric), instance.tier, getattr(instance, metric))
+    instance._loaded_values = {**old, 'tier': instance.tier,
+                               'ranking_score': instance.ranking_score, 'level': instance.level}
+
+
+def track_user_delete(sender, instance, **kwargs):
+    for metric in ('ranking_score', 'level'):
+        record_change(metric, instance.tier, getattr(instance, metric), None, None)
+
+
+def track_stats_save(sender, instance, created, **kwargs):
+    """PlayerStats post_save: 승률 변경 기록"""
+    old = getattr(instance, '_loaded_values', None) or {}
+    if not created and 'win_rate' not in old:
+        return
+    tier = _stats_tier(instance)
+    record_change('win_rate', tier, old.get('win_rate'), tier, instance.win_rate)
+    instance._loaded_values = {**old, 'win_rate': instance.win_rate}
+
+
+def track_stats_delete(sender, instance, **kwargs):
+    record_change('win_rate', _stats_tier(instance), instance.win_rate, None, None)
+
+
+def _stats_tier(instance):
+    """통계의 유저 티어 (select_related 되어 있으면 쿼리 없이)"""
+    if instance._meta.get_field('user').is_cached(instance):
+        return instance.user.tier
+    return GameUser.objects.filter(pk=instance.user_id).values_list('tier', flat=True).first()
@@ -0,0 +1,50 @@
+"""인기 아이템/스킬, 상위 랭커 사용 통계 조회
+
+API 뷰와 벤치마크 커맨드가 같은 쿼리를 쓰도록 뷰에서 분리했습니다.
+SQL 생성과 샤딩 처리는 집계 엔진(aggregation)이 맡고, 여기서는 기존 응답 형태만 맞춥니다.
+"""
+from . import packed
+from .aggregation import UsageQuery, run
+
+
+def _popular(entity, tier, type_value, limit):
+    if packed.enabled():
+        # 사용량 벡터 NumPy 합산 + 남은 사용 기록 행
+        return packed.popular(entity, tier, type_value, limit)
+    return run(UsageQuery(
+        entity,
+        tiers=(tier,) if tier and tier != 'ALL' else (),
+        types=(type_value,) if type_value else (),
+        limit=limit,
+    ))
+
+
+def _top_players(entity, top_count, limit):
+    rows = run(UsageQuery(entity, top_count=top_count, metric='users', limit=limit))
+    for row in rows:
+        row['usage_count'] = row.pop('users')
+    return rows
+
+
+def popular_items(tier=None, item_type=None, limit=10):
+    """인기 아이템 (사용 빈도 기준)"""
+    return _popular('item', tier, item_type, limit)
+
+
+def popular_skills(tier=None, skill_type=None, limit=10):
+    """인기 스킬 (사용 빈도 기준)"""
+    return _popular('skill', tier, skill_type, limit)
+
+
+def top_players_items(top_count, limit=20):
+    """랭킹 상위 top_count명이 사용하는 아이템 (사용 유저 수 기준)
+
+    상위 유저 서브쿼리(랭킹 인덱스 LIMIT)에서 출발해 조인하므로
+    작업량이 전체 사용 기록이 아닌 상위 유저 수에 비례합니다.
+    """
+    return _top_players('item', top_count, limit)
+
+
+def top_players_skills(top_count, limit=20):
+    """랭킹 상위 top_count명이 사용하는 스킬 (사용 유저 수 기준)"""
+    return _top_players('skill', top_count, limit)
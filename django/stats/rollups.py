@@ -0,0 +1,123 @@
+"""티어별 아이템/스킬 사용량 롤업 테이블 재계산"""
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import sharding
+from .models import ItemUsageRollup, JobState, SkillUsageRollup
+
+# entity → (롤업 테이블, 사용 기록 테이블, 대상 컬럼, 모델)
+ROLLUPS = {
+    'item': ('stats_itemusagerollup', 'stats_itemusage', 'item_id', ItemUsageRollup),
+    'skill': ('stats_skillusagerollup', 'stats_skillusage', 'skill_id', SkillUsageRollup),
+}
+
+
+def invalidate_incremental(sender=None, **kwargs):
+    """다음 롤업 작업(scheduler 'rollups')을 전체 재계산으로
+
+    증분 롤업은 since 이후 last_used/updated_at이 바뀐 행으로 대상을 찾으므로 삭제(유저 cascade, admin)나
+    예전 시각 그대로 복원한 행은 놓칩니다. GameUser/PlayerStats/ItemUsage/SkillUsage post_delete 수신자로도
+    연결합니다 (stats/apps.py).
+    """
+    JobState.objects.filter(name='rollups').update(watermark=None)
+
+
+@transaction.atomic
+def rebuild_rollups(entity, object_ids=None):
+    """사용 기록 테이블에서 롤업 재계산 (object_ids 지정 시 해당 아이템/스킬만)"""
+    rollup_table, usage_table, column, _ = ROLLUPS[entity]
+    where, params = '', [connection.ops.adapt_datetimefield_value(timezone.now())]
+    if object_ids is not None:
+        object_ids = list(object_ids)
+        if not object_ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(object_ids))
+        where = f'WHERE usage.{column} IN ({placeholders})'
+        params += object_ids
+
+    with connection.cursor() as cursor:
+        if object_ids is None:
+            cursor.execute(f'DELETE FROM {rollup_table}')
+        else:
+            cursor.execute(f'DELETE FROM {rollup_table} WHERE {column} IN ({placeholders})', object_ids)
+
+        if sharding.is_enabled():
+            count = _insert_sharded(cursor, entity, where, params)
+        else:
+            cursor.execute(f"""
+                INSERT INTO {rollup_table} (tier, {column}, total_usage, user_count, updated_at)
+                SELECT u.tier, usage.{column}, SUM(usage.usage_count), COUNT(*), %s
+                FROM {usage_table} usage
+                INNER JOIN stats_playerstats ps ON usage.player_stats_id = ps.id
+                INNER JOIN stats_gameuser u ON ps.user_id = u.id
+                {where}
+                GROUP BY u.tier, usage.{column}
+            """, params)
+            count = cursor.rowcount
+        return count + _merge_packed(cursor, entity, object_ids, params[0])
+
+
+def _merge_packed(cursor, entity, object_ids, now):
+    """사용량 벡터로 저장된 유저의 (티어, 대상) 합계를 롤업에 더함 (stats/packed.py)"""
+    # packed → archive → rollups 순환 import를 피해 함수 안에서 import
+    from . import packed, sketches
+    rollup_table, _, column, _ = ROLLUPS[entity]
+    total, users = packed.tier_totals(entity)
+    # 카탈로그에서 삭제된 대상 칸은 제외 (롤업은 대상 외래 키)
+    known = sketches.catalog(entity)
+    rows = [
+        (tier, slot + 1, int(total[i, slot]), int(users[i, slot]), now)
+        for i, tier in enumerate(packed.TIERS)
+        for slot in range(total.shape[1])
+        if users[i, slot] and slot + 1 in known and (object_ids is None or slot + 1 in object_ids)
+    ]
+    cursor.executemany(
+        f"INSERT INTO {rollup_table} (tier, {column}, total_usage, user_count, updated_at) VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT (tier, {column}) DO UPDATE SET total_usage = {rollup_table}.total_usage + excluded.total_usage, "
+        f"user_count = {rollup_table}.user_count + excluded.user_count",
+        rows,
+    )
+    return len(rows)
+
+
+def _insert_sharded(cursor, entity, where, params):
+    """샤드별 (티어, 대상) 부분 집계를 합쳐 허브의 롤업 테이블에 삽입"""
+    rollup_table, usage_table, column, _ = ROLLUPS[entity]
+    now, filter_params = params[0], params[1:]
+    partials = sharding.scatter(f"""
+        SELECT u.tier, usage.{column}, SUM(usage.usage_count), COUNT(*)
+        FROM {usage_table} usage
+        INNER JOIN {sharding.hub_table('stats_playerstats')} ps ON usage.player_stats_id = ps.id
+        INNER JOIN {sharding.hub_table('stats_gameuser')} u ON ps.user_id = u.id
+        {where}
+        GROUP BY u.tier, usage.{column}
+    """, filter_params)
+
+    totals = {}
+    for rows in partials:
+        for tier, object_id, total, count in rows:
+            current = totals.setdefault((tier, object_id), [0, 0])
+            current[0] += total or 0
+            current[1] += count
+
+    cursor.executemany(
+        f"INSERT INTO {rollup_table} (tier, {column}, total_usage, user_count, updated_at) VALUES (%s, %s, %s, %s, %s)",
+        [(tier, object_id, total, count, now) for (tier, object_id), (total, count) in totals.items()],
+    )
+    return len(totals)
+
+
+def rebuild_all_rollups():
+    return {entity: rebuild_rollups(entity) for entity in ROLLUPS}
+
+
+def read_rollup(entity, tier=None, limit=10):
+    """롤업 테이블에서 인기 순위 읽기 → [(object_id, total_usage)]"""
+    _, _, column, model = ROLLUPS[entity]
+    queryset = model.objects.all()
+    if tier and tier != 'ALL':
+        rows = queryset.filter(tier=tier).order_by('-total_usage').values_list(column, 'total_usage')
+    else:
+        rows = queryset.values(column).annotate(total=Sum('total_usage')).order_by('-total').values_list(column, 'total')
+    return list(rows[:limit])
@@ -0,0 +1,230 @@
+"""파생 데이터 주기 재계산 스케줄러 (run_scheduler 커맨드)
+
+롤업, Top-K/분위수 스케치, 랭킹 스냅샷, 공유 스냅샷, 응답 캐시 예열처럼 손으로 돌리던 커맨드를
+등록된 작업(Job)으로 두고 간격(+ 지터)마다 실행합니다.
+- 잠금: 작업마다 JobState 한 행, 조건부 UPDATE 한 번으로 잠금을 잡으므로 스케줄러를 여러
+  프로세스에서 띄워도 같은 작업이 겹쳐 돌지 않습니다. 죽은 프로세스의 잠금은 timeout 후 만료.
+- 건너뛰기: 작업이 지켜보는 데이터셋(versions)의 버전이 지난 실행 때와 같으면 실행하지 않음
+- 증분: incremental 작업은 지난 실행 시작 시각(watermark) 이후 바뀐 행만 처리
+  (커밋 지연으로 빠지는 행이 없도록 WATERMARK_OVERLAP만큼 겹쳐 읽음)
+- 지표: 실행 시간, 예정 대비 지연, 처리 건수, 실행/건너뜀/실패 횟수를 JobState에 기록
+작업 함수는 since(증분 기준 시각, 전체 실행이면 None)를 받아 처리 건수(또는 None)를 돌려줍니다.
+"""
+import os
+import random
+import socket
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import leaderboard, quantiles, sharding, shared, similarity, sketches, versions
+from .aggregation import ENTITIES
+from .models import JobState, PackedUsage
+from .rollups import rebuild_rollups
+
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+@dataclass
+class Job:
+    name: str
+    func: callable
+    # 실행 간격(초)과 지터(간격 대비 비율, 여러 프로세스/작업이 같은 순간에 몰리지 않도록)
+    interval: float
+    jitter: float = 0.1
+    # 이 데이터셋 버전이 그대로면 건너뜀 (비어 있으면 항상 실행)
+    datasets: tuple = ()
+    incremental: bool = False
+    # 잠금 유지 시간 (기본: 간격의 2배, 최소 60초)
+    timeout: float = None
+    description: str = ''
+
+    @property
+    def lock_seconds(self):
+        return self.timeout or max(self.interval * 2, 60.0)
+
+
+@dataclass
+class RunResult:
+    name: str
+    # 'ok' / 'skipped'(데이터 변경 없음) / 'locked'(다른 프로세스 실행 중) / 'error'
+    status: str
+    duration: float = 0.0
+    lag: float = 0.0
+    processed: int = None
+    incremental: bool = False
+    error: str = ''
+    extra: dict = field(default_factory=dict)
+
+
+JOBS = {}
+
+
+def register(name, interval, datasets=(), jitter=0.1, incremental=False, timeout=None, description=''):
+    """작업 등록 데코레이터 (같은 이름은 덮어씀)"""
+    def decorator(func):
+        JOBS[name] = Job(name, func, interval, jitter, tuple(datasets), incremental, timeout,
+                         description or (func.__doc__ or '').strip().splitlines()[0])
+        return func
+    return decorator
+
+
+def owner_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def data_version(datasets):
+    """지켜보는 데이터셋만의 버전 해시 (항상 DB에서 새로 읽음)"""
+    if not datasets:
+        return ''
+    return versions.digest(tuple(row for row in versions.token(fresh=True) if row[0] in datasets))
+
+
+# ---------------------------------------------------------------- 잠금
+
+def acquire(name, owner, seconds):
+    """만료되었거나 비어 있는 잠금만 잡음 (조건부 UPDATE 한 번) → 성공 여부"""
+    JobState.objects.get_or_create(name=name)
+    now = timezone.now()
+    return bool(
+        JobState.objects.filter(name=name)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now) | Q(locked_by=owner))
+        .update(locked_by=owner, locked_until=now + timedelta(seconds=seconds))
+    )
+
+
+def release(name, owner, **values):
+    """잠금 해제와 상태 기록을 UPDATE 한 번에 (잠금을 잃었으면 기록하지 않음)"""
+    return JobState.objects.filter(name=name, locked_by=owner).update(locked_by='', locked_until=None, **values)
+
+
+# ---------------------------------------------------------------- 실행
+
+def next_run(job, now):
+    return now + timedelta(seconds=job.interval * (1 + random.uniform(-job.jitter, job.jitter)))
+
+
+def run_job(job, owner=None, force=False, full=False):
+    """작업 한 번 실행 (force: 데이터 버전이 같아도 실행, full: 증분 작업도 전체 처리)"""
+    owner = owner or owner_name()
+    if not acquire(job.name, owner, job.lock_seconds):
+        return RunResult(job.name, 'locked')
+
+    state = JobState.objects.get(name=job.name)
+    started_at = timezone.now()
+    lag = max((started_at - state.next_run_at).total_seconds(), 0.0) if state.next_run_at else 0.0
+    version = data_version(job.datasets)
+    if job.datasets and not force and state.data_version == version:
+        release(job.name, owner, next_run_at=next_run(job, started_at), skips=F('skips') + 1, last_status='skipped')
+        return RunResult(job.name, 'skipped', lag=lag)
+
+    since = None
+    if job.incremental and not full and state.watermark is not None:
+        since = state.watermark - WATERMARK_OVERLAP
+    start = time.perf_counter()
+    try:
+        processed = job.func(since)
+    except Exception as e:
+        duration = time.perf_counter() - start
+        release(job.name, owner, next_run_at=next_run(job, timezone.now()), last_status='error',
+                last_started_at=started_at, last_finished_at=timezone.now(), last_duration=duration,
+                last_lag=lag, last_error=traceback.format_exc()[-2000:], failures=F('failures') + 1)
+        return RunResult(job.name, 'error', duration, lag, error=repr(e))
+
+    duration = time.perf_counter() - start
+    finished_at = timezone.now()
+    release(job.name, owner, next_run_at=next_run(job, finished_at), last_status='ok',
+            last_started_at=started_at, last_finished_at=finished_at, last_duration=duration, last_lag=lag,
+            last_processed=processed, last_error='', runs=F('runs') + 1, data_version=version,
+            watermark=started_at if job.incremental else None)
+    return RunResult(job.name, 'ok', duration, lag, processed, since is not None)
+
+
+def due_jobs(now=None):
+    """실행 예정 시각이 지난(또는 한 번도 실행하지 않은) 작업"""
+    now = now or timezone.now()
+    scheduled = dict(JobState.objects.filter(name__in=JOBS).values_list('name', 'next_run_at'))
+    return [job for name, job in JOBS.items() if scheduled.get(name) is None or scheduled[name] <= now]
+
+
+def run_due(owner=None, names=None):
+    """예정된 작업을 순서대로 실행 → RunResult 리스트"""
+    owner = owner or owner_name()
+    return [run_job(job, owner) for job in due_jobs() if names is None or job.name in names]
+
+
+def seconds_until_next(names=None, now=None):
+    """다음 예정 작업까지 남은 초 (등록된 작업 중 상태가 없으면 0)"""
+    now = now or timezone.now()
+    names = list(JOBS) if names is None else names
+    scheduled = dict(JobState.objects.filter(name__in=names).values_list('name', 'next_run_at'))
+    if any(scheduled.get(name) is None for name in names):
+        return 0.0
+    return max(min((moment - now).total_seconds() for moment in scheduled.values()), 0.0)
+
+
+# ---------------------------------------------------------------- 기본 작업
+
+def _touched_objects(entity, since):
+    """since 이후 사용 기록이 바뀌었거나 유저(티어)가 바뀐 대상 id — 샤드별 DISTINCT"""
+    _, usage_table, column, _, _ = ENTITIES[entity]
+    moment = sharding.connections['default'].ops.adapt_datetimefield_value(since)
+    partials = sharding.scatter(f"""
+        SELECT DISTINCT usage.{column}
+        FROM {usage_table} usage
+        INNER JOIN {sharding.hub_table('stats_playerstats')} ps ON usage.player_stats_id = ps.id
+        INNER JOIN {sharding.hub_table('stats_gameuser')} u ON ps.user_id = u.id
+        WHERE usage.last_used > %s OR u.updated_at > %s
+    """, [moment, moment])
+    return {object_id for rows in partials for (object_id,) in rows}
+
+
+@register('rollups', interval=300, datasets=(versions.USAGE, versions.USERS), incremental=True)
+def refresh_rollups(since):
+    """티어별 사용량 롤업 (증분: 바뀐 대상만 다시 계산)"""
+    # 사용량 벡터는 행 단위 시각이 없으므로 벡터가 바뀌었으면 전체
+    if since is not None and PackedUsage.objects.filter(updated_at__gt=since).exists():
+        since = None
+    return sum(
+        rebuild_rollups(entity, None if since is None else _touched_objects(entity, since))
+        for entity in ENTITIES
+    )
+
+
+@register('topk-sketches', interval=600, datasets=(versions.USAGE, versions.USERS))
+def refresh_topk(since):
+    """인기 아이템/스킬 Top-K 스케치 재생성 (적재 중 증분 갱신의 오차 정리)"""
+    return sum(sketches.rebuild_topk(entity) for entity in ENTITIES)
+
+
+@register('quantiles', interval=900, datasets=(versions.USERS, versions.STATS))
+def refresh_quantiles(since):
+    """점수/레벨/승률 분위수(KLL) 스케치 재생성"""
+    return quantiles.rebuild_quantiles()
+
+
+@register('leaderboard-snapshot', interval=3600, datasets=(versions.USERS,))
+def refresh_leaderboard_snapshot(since):
+    """오늘 날짜 랭킹 스냅샷 갱신 (순위 변동 API 기준)"""
+    return leaderboard.take_snapshot().user_count
+
+
+@register('shared-snapshot', interval=60, datasets=(versions.USAGE, versions.USERS, versions.STATS))
+def refresh_shared_snapshot(since):
+    """워커 공유 집계 스냅샷 내보내기 (SHARED_SNAPSHOT_DIR 설정 시)"""
+    if not shared.enabled():
+        return None
+    path = shared.publish()
+    return path.stat().st_size if path else None
+
+
+@register('similarity', interval=120, datasets=(versions.USAGE, versions.USERS, versions.STATS), incremental=True)
+def refresh_similarity(since):
+    """비슷한 플레이어 검색 인덱스 갱신 후 저장 (SIMILARITY_DIR 설정 시, 워커는 저장된 인덱스를 매핑)"""
+    if not similarity.enabled():
+        return None
+    return len(similarity.update(full=since is None))
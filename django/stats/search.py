@@ -0,0 +1,148 @@
+"""닉네임 검색 인덱스 (SQLite FTS5 trigram)
+
+stats_gameuser를 외부 콘텐츠 테이블로 하는 FTS5 trigram 인덱스를 만들고,
+INSERT/UPDATE/DELETE 트리거로 유저 쓰기(bulk_create 포함)와 동기화합니다.
+트리거는 테이블 재생성 마이그레이션에서 사라질 수 있으므로 post_migrate마다
+install_search_index()로 다시 확인합니다.
+"""
+from difflib import SequenceMatcher
+
+from django.db import connection
+
+from .models import GameUser
+
+FTS_TABLE = 'stats_gameuser_fts'
+MIN_TRIGRAM_LENGTH = 3
+
+# 매칭 종류별 기본 점수 (높을수록 상위)
+MATCH_SCORES = {'exact': 4, 'prefix': 3, 'substring': 2, 'fuzzy': 1}
+
+_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON stats_gameuser BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, nickname) VALUES (new.id, new.nickname);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON stats_gameuser BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nickname) VALUES ('delete', old.id, old.nickname);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF nickname ON stats_gameuser BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nickname) VALUES ('delete', old.id, old.nickname);
+            INSERT INTO {FTS_TABLE}(rowid, nickname) VALUES (new.id, new.nickname);
+        END
+    """,
+}
+
+
+def is_supported(conn=None):
+    """FTS5 인덱스 사용 가능 여부 (SQLite 전용)"""
+    return (conn or connection).vendor == 'sqlite'
+
+
+def install_search_index(conn=None, rebuild=False):
+    """FTS 테이블/트리거가 없으면 만들고, 새로 만든 경우 인덱스를 재구성"""
+    conn = conn or connection
+    if not is_supported(conn):
+        return False
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND name LIKE %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_%'],
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+        if FTS_TABLE not in existing:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"nickname, content='stats_gameuser', content_rowid='id', tokenize='trigram')"
+            )
+            rebuild = True
+
+        for name, sql in _TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(sql)
+                # 트리거가 없던 동안의 쓰기를 반영
+                rebuild = True
+
+        if rebuild:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return rebuild
+
+
+def _quote(term):
+    """FTS5 문자열 리터럴로 감싸기"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _trigrams(text):
+    return {text[i:i + MIN_TRIGRAM_LENGTH] for i in range(len(text) - MIN_TRIGRAM_LENGTH + 1)}
+
+
+def _fts_ids(match, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _classify(query, nickname):
+    """(매칭 종류, 점수) — 대소문자 무시"""
+    query_folded, nickname_folded = query.casefold(), nickname.casefold()
+    if nickname_folded == query_folded:
+        kind = 'exact'
+    elif nickname_folded.startswith(query_folded):
+        kind = 'prefix'
+    elif query_folded in nickname_folded:
+        kind = 'substring'
+    else:
+        kind = 'fuzzy'
+    similarity = SequenceMatcher(None, query_folded, nickname_folded).ratio()
+    return kind, MATCH_SCORES[kind] + similarity
+
+
+def search_user_ids(query, limit=20, fuzzy=True):
+    """닉네임 검색 → [(user_id, 매칭 종류, 점수)] (점수 내림차순)
+
+    - 접두어: nickname unique 인덱스 범위 스캔
+    - 부분 문자열: FTS5 trigram 구문 검색 (3글자 이상), 더 짧으면 LIKE (limit개까지)
+    - 오타 허용: 검색어 trigram OR 검색 후 bm25 상위 후보를 유사도로 재정렬
+    """
+    query = (query or '').strip()
+    if not query or limit <= 0:
+        return []
+
+    candidate_ids = list(
+        GameUser.objects.filter(nickname__gte=query, nickname__lt=query + '\U0010ffff')
+        .order_by('nickname').values_list('id', flat=True)[:limit]
+    )
+
+    if is_supported() and len(query) >= MIN_TRIGRAM_LENGTH:
+        candidate_ids += _fts_ids(_quote(query), limit)
+        if fuzzy and len(candidate_ids) < limit:
+            trigrams = _trigrams(query)
+            if len(trigrams) > 1:
+                candidate_ids += _fts_ids(' OR '.join(_quote(t) for t in sorted(trigrams)), limit * 5)
+    else:
+        # trigram이 없는 짧은 검색어(한글 1~2글자 등)나 FTS 미지원: LIKE 스캔, 랭킹 순으로 훑다가 limit개를 찾으면 멈춤
+        candidate_ids += list(
+            GameUser.objects.filter(nickname__icontains=query).values_list('id', flat=True)[:limit]
+        )
+
+    candidate_ids = list(dict.fromkeys(candidate_ids))
+    nicknames = dict(GameUser.objects.filter(id__in=candidate_ids).values_list('id', 'nickname'))
+
+    scored = []
+    for user_id, nickname in nicknames.items():
+        kind, score = _classify(query, nickname)
+        if kind == 'fuzzy' and (not fuzzy or score < MATCH_SCORES['fuzzy'] + 0.5):
+            continue
+        scored.append((user_id, kind, round(score, 4)))
+
+    scored.sort(key=lambda row: (-row[2], row[0]))
+    return scored[:limit]
@@ -0,0 +1,207 @@
+"""사용 기록 테이블(ItemUsage/SkillUsage) 해시 샤딩
+
+settings.USAGE_SHARDS > 0이면 사용 기록을 player_stats_id 해시로 usage_0 ~ usage_{N-1}
+SQLite 파일에 나눠 저장합니다. 유저/통계/아이템/스킬 테이블은 default(허브) DB에 남고,
+샤드 연결마다 허브 DB를 'hub' 스키마로 ATTACH 하므로 티어 필터 같은 조인은 샤드 안에서
+바로 실행됩니다. 집계는 샤드마다 스레드에서 부분 합계를 구한 뒤 파이썬에서 합칩니다.
+
+- 인스턴스 힌트가 있는 읽기/쓰기(save, player_stats.item_usages 등)는 라우터가 샤드를 고릅니다.
+- 샤드를 알 수 없는 ORM 쿼리(ItemUsage.objects.count() 등)는 빈 default를 읽는 대신
+  ShardRoutingError — using(shard_for(...)), 대량 쓰기는 bulk_create(), 집계는 scatter()/stream()을 사용하세요.
+- 샤드 간 외래 키는 SQLite가 검사할 수 없으므로 샤드 연결은 foreign_keys를 끕니다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SHARDED_MODELS = {'itemusage', 'skillusage'}
+SHARDED_TABLES = ['stats_itemusage', 'stats_skillusage']
+HUB_SCHEMA = 'hub'
+
+_MASK_64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def shard_count():
+    return getattr(settings, 'USAGE_SHARDS', 0)
+
+
+def is_enabled():
+    return shard_count() > 0
+
+
+def shard_aliases():
+    return [f'usage_{shard}' for shard in range(shard_count())]
+
+
+def shard_index(player_stats_id, shards=None):
+    """player_stats_id → 샤드 번호 (피보나치 해싱, 프로세스 간 고정)"""
+    shards = shard_count() if shards is None else shards
+    mixed = (int(player_stats_id) * _GOLDEN) & _MASK_64
+    return (mixed >> 32) % shards
+
+
+def shard_for(player_stats_id):
+    """player_stats_id가 저장되는 DB alias"""
+    if not is_enabled():
+        return 'default'
+    return f'usage_{shard_index(player_stats_id)}'
+
+
+def group_by_shard(player_stats_ids):
+    """{alias: [player_stats_id]}"""
+    groups = {}
+    for player_stats_id in player_stats_ids:
+        groups.setdefault(shard_for(player_stats_id), []).append(player_stats_id)
+    return groups
+
+
+def atomic(aliases):
+    """여러 DB에 걸친 트랜잭션 (alias 이름 순으로 열어 교착 방지, 2PC는 아님)"""
+    stack = ExitStack()
+    for alias in sorted(aliases):
+        stack.enter_context(transaction.atomic(using=alias))
+    return stack
+
+
+class ShardRoutingError(RuntimeError):
+    """샤딩 중 어느 샤드로 보낼지 알 수 없는 사용 기록 ORM 쿼리"""
+
+
+def _is_sharded(model):
+    return model._meta.app_label == 'stats' and model._meta.model_name in SHARDED_MODELS
+
+
+class UsageShardRouter:
+    """사용 기록 모델은 player_stats_id 기준 샤드로, 나머지는 default로"""
+
+    def _db_for(self, model, **hints):
+        if not is_enabled() or not _is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None:
+            if _is_sharded(type(instance)) and instance.player_stats_id:
+                return shard_for(instance.player_stats_id)
+            if type(instance).__name__ == 'PlayerStats' and instance.pk:
+                return shard_for(instance.pk)
+        # default로 보내면 빈 테이블을 읽어 조용히 0건이 되므로 막음
+        raise ShardRoutingError(
+            f'샤딩 중에는 샤드를 알 수 없는 {model.__name__} 쿼리를 실행할 수 없습니다 '
+            f'(using(sharding.shard_for(...)), sharding.scatter()/stream()/bulk_create() 사용).'
+        )
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 샤드 ↔ 허브 관계는 애플리케이션이 정합성을 보장
+        if obj1._meta.app_label == 'stats' and obj2._meta.app_label == 'stats':
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not db.startswith('usage_'):
+            return None
+        return app_label == 'stats' and model_name in SHARDED_MODELS
+
+
+@receiver(connection_created)
+def attach_hub(sender, connection, **kwargs):
+    """샤드 연결: 허브 DB ATTACH, 샤드 간 외래 키 검사 해제"""
+    if not connection.alias.startswith('usage_') or connection.vendor != 'sqlite':
+        return
+    hub = str(connections['default'].settings_dict['NAME'])
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA foreign_keys = OFF')
+        # 마이그레이션 전 샤드에 허브를 붙이면 이름 없는 테이블 참조가 허브의 사용 기록
+        # 테이블로 풀려 쓰기가 허브로 새므로, 사용 기록 테이블이 있을 때만 ATTACH
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (%s, %s)",
+            SHARDED_TABLES,
+        )
+        if cursor.fetchone()[0] == len(SHARDED_TABLES):
+            cursor.execute(f'ATTACH DATABASE %s AS {HUB_SCHEMA}', [hub])
+
+
+def hub_table(table):
+    """샤드 SQL에서 허브 테이블 참조 (샤딩 비활성 시 그대로)"""
+    return f'{HUB_SCHEMA}.{table}' if is_enabled() else table
+
+
+def _run_on(alias, sql, params):
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+    finally:
+        # 작업 스레드의 연결은 스레드와 함께 정리
+        connection.close()
+
+
+def scatter(sql, params=()):
+    """모든 샤드에서 같은 SQL을 병렬 실행 → 샤드별 결과 행 리스트
+
+    sqlite3는 쿼리 실행 중 GIL을 놓으므로 샤드 수만큼 동시에 실행됩니다.
+    샤딩 비활성 시 default에서 한 번 실행합니다.
+    """
+    if not is_enabled():
+        with connections['default'].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [cursor.fetchall()]
+
+    aliases = shard_aliases()
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return list(executor.map(lambda alias: _run_on(alias, sql, params), aliases))
+
+
+def stream(sql, params=(), chunk_size=10000):
+    """사용 기록을 샤드(또는 default)별로 청크 단위 스트리밍 (전체 결과를 메모리에 올리지 않음)"""
+    for alias in shard_aliases() or ['default']:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+
+
+def count(table):
+    """사용 기록 테이블 전체 행 수 (샤드 합계)"""
+    return sum(rows[0][0] for rows in scatter(f'SELECT COUNT(*) FROM {table}'))
+
+
+def merge_sums(partials):
+    """[(key, value)] 부분 합계들을 key별로 합산"""
+    totals = {}
+    for rows in partials:
+        for key, value in rows:
+            totals[key] = totals.get(key, 0) + (value or 0)
+    return totals
+
+
+def bulk_create(model, objs, batch_size=None):
+    """샤드별로 나눠 bulk_create (샤딩 비활성 시 일반 bulk_create)"""
+    if not is_enabled():
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+
+    groups = {}
+    for obj in objs:
+        groups.setdefault(shard_for(obj.player_stats_id), []).append(obj)
+    created = []
+    for alias, group in groups.items():
+        created += model.objects.using(alias).bulk_create(group, batch_size=batch_size)
+    return created
+
+
+def delete_sharded_usages(sender, instance, **kwargs):
+    """허브의 CASCADE는 샤드에 닿지 않으므로 통계 삭제 시 샤드의 사용 기록도 삭제 (post_delete)"""
+    alias = shard_for(instance.pk)
+    with connections[alias].cursor() as cursor:
+        for table in SHARDED_TABLES:
+            cursor.execute(f'DELETE FROM {table} WHERE player_stats_id = %s', [instance.pk])
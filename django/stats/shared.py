@@ -0,0 +1,251 @@
+"""여러 워커 프로세스가 함께 쓰는 읽기 전용 집계 스냅샷 (메모리 맵 파일)
+
+WSGI/ASGI 서버 워커마다 OLAP 큐브와 랭킹 스냅샷 배열을 따로 만들면 메모리와 예열 시간이
+워커 수만큼 늘어납니다. 한 프로세스가 뜨거운 집계를 파일 하나로 내보내고(publish),
+나머지는 그 파일을 mmap해 복사 없이 numpy 배열로 읽습니다.
+- 랭킹 스냅샷: 최근 LeaderboardSnapshot의 id/ranking_score/티어 배열과 조회용 보조 배열
+- OLAP 큐브: 대상(item/skill)별 total/users 배열(티어별 사용량 벡터 포함)과 티어 통계
+
+파일 형식: MAGIC(8) + 헤더 길이(uint64) + JSON 헤더 + 64바이트 정렬된 배열들.
+새 버전은 임시 파일에 다 쓴 뒤 os.replace로 이름을 붙이고, 마지막에 포인터 파일(current)을
+교체합니다. 읽는 쪽은 포인터가 바뀐 것을 보면 새 파일을 매핑해 참조를 바꾸므로 항상 완성된
+파일 하나만 보고, 이전 파일을 매핑 중인 배열은 파일이 지워져도 그대로 유효합니다.
+SHARED_SNAPSHOT_DIR가 비어 있으면 비활성 (각 프로세스가 직접 계산). /dev/shm 아래를 쓰면 디스크 없이 공유됩니다.
+"""
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from . import leaderboard, olap, versions
+from .models import LeaderboardSnapshot
+from .sketches import cached, forget
+
+MAGIC = b'GSSNAP01'
+_LENGTH = struct.Struct('<Q')
+ALIGN = 64
+POINTER = 'current'
+# 오래된 파일은 현재 + 직전 KEEP개만 남김 (직전 파일을 매핑 중인 워커가 있을 수 있음)
+KEEP = 2
+LEADERBOARD_SNAPSHOTS = 8
+
+
+def enabled():
+    return bool(settings.SHARED_SNAPSHOT_DIR)
+
+
+def _directory():
+    return Path(settings.SHARED_SNAPSHOT_DIR)
+
+
+class SharedSnapshot:
+    """매핑된 스냅샷 파일 하나 (배열은 mmap 위의 읽기 전용 뷰)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'스냅샷 파일 형식이 아닙니다: {self.path}')
+        (length,) = _LENGTH.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _LENGTH.size
+        header = json.loads(self._mmap[start:start + length])
+        self.token = header['token']
+        self.created_at = header['created_at']
+        self.meta = header['meta']
+        self._arrays = header['arrays']
+
+    def __contains__(self, name):
+        return name in self._arrays
+
+    def array(self, name):
+        spec = self._arrays[name]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+
+    @property
+    def nbytes(self):
+        return len(self._mmap)
+
+
+def write(path, arrays, meta, token):
+    """배열 dict + 메타데이터를 스냅샷 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+    arrays = {name: np.ascontiguousarray(values) for name, values in arrays.items()}
+    specs, offset = {}, 0
+    for name, values in arrays.items():
+        specs[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += -(-values.nbytes // ALIGN) * ALIGN
+
+    def encode(base):
+        header = {
+            'token': token,
+            'created_at': time.time(),
+            'meta': meta,
+            'arrays': {name: {**spec, 'offset': spec['offset'] + base} for name, spec in specs.items()},
+        }
+        return json.dumps(header, ensure_ascii=False).encode()
+
+    # 헤더 길이가 배열 시작 위치에 따라 바뀔 수 있어 두 번 계산
+    base = 0
+    for _ in range(2):
+        header = encode(base)
+        base = -(-(len(MAGIC) + _LENGTH.size + len(header)) // ALIGN) * ALIGN
+    header = encode(base)
+
+    path = Path(path)
+    temp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(temp, 'wb') as f:
+        f.write(MAGIC + _LENGTH.pack(len(header)) + header)
+        for name, values in arrays.items():
+            f.seek(base + specs[name]['offset'])
+            f.write(values.tobytes())
+        f.truncate(max(f.tell(), base + offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    return path
+
+
+# ---------------------------------------------------------------- 내보내기
+
+def _cube_arrays(cube):
+    arrays, meta = {}, {'entities': {}, 'tiers': []}
+    for entity, entity_cube in cube.entities.items():
+        arrays[f'cube.{entity}.total'] = entity_cube.total
+        arrays[f'cube.{entity}.users'] = entity_cube.users
+        meta['entities'][entity] = entity_cube.details
+    meta['tiers'] = sorted(cube.tier_rows)
+    arrays['cube.tier_rows'] = np.array([cube.tier_rows[tier] for tier in meta['tiers']],
+                                        dtype=np.int64).reshape(-1, 3)
+    return arrays, meta
+
+
+def _leaderboard_arrays():
+    arrays, meta = {}, []
+    rows = LeaderboardSnapshot.objects.order_by('-snapshot_date').values_list('pk', 'snapshot_date')
+    for pk, snapshot_date in rows[:LEADERBOARD_SNAPSHOTS]:
+        snapshot = leaderboard._load(pk)
+        prefix = f'leaderboard.{pk}'
+        for name, values in snapshot.arrays().items():
+            arrays[f'{prefix}.{name}'] = values
+        meta.append({'pk': pk, 'snapshot_date': snapshot_date.isoformat()})
+    return arrays, meta
+
+
+_publish_lock = threading.Lock()
+
+
+def publish(cube=None):
+    """큐브(없으면 새로 생성)와 최근 랭킹 스냅샷을 새 버전 파일로 내보내고 포인터 교체
+
+    다른 프로세스가 내보내는 중이면 기다리지 않고 None.
+    """
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    with _publish_lock, open(directory / '.lock', 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+
+        if cube is None:
+            cube = olap.build()
+        arrays, meta = _cube_arrays(cube)
+        leaderboard_arrays, meta['leaderboard'] = _leaderboard_arrays()
+        arrays.update(leaderboard_arrays)
+
+        token = versions.digest(cube.token)
+        path = write(directory / f'snapshot-{time.time_ns()}-{token}.bin', arrays, meta, token)
+
+        pointer = directory / f'.{POINTER}.{os.getpid()}.tmp'
+        pointer.write_text(path.name)
+        os.replace(pointer, directory / POINTER)
+
+        old = sorted(directory.glob('snapshot-*.bin'))[:-(KEEP + 1)]
+        for stale in old:
+            stale.unlink(missing_ok=True)
+    forget('shared-pointer')
+    return path
+
+
+# ---------------------------------------------------------------- 매핑
+
+_mapped = None
+_map_lock = threading.Lock()
+
+
+def _read_pointer():
+    try:
+        return (_directory() / POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def current():
+    """현재 버전 스냅샷 (포인터는 CACHE_SECONDS마다 확인, 바뀌었으면 새로 매핑)"""
+    global _mapped
+    if not enabled():
+        return None
+    name = cached('shared-pointer', _read_pointer)
+    if name is None:
+        return None
+    mapped = _mapped
+    if mapped is not None and mapped.path.name == name:
+        return mapped
+    with _map_lock:
+        if _mapped is None or _mapped.path.name != name:
+            try:
+                _mapped = SharedSnapshot(_directory() / name)
+            except (FileNotFoundError, ValueError):
+                # 포인터를 읽은 뒤 파일이 교체/삭제됨 → 다음 확인 때 다시
+                forget('shared-pointer')
+                return None
+        return _mapped
+
+
+def load_cube(token):
+    """token 버전의 큐브를 공유 배열로 구성 (없거나 버전이 다르면 None)"""
+    snapshot = current()
+    if snapshot is None or snapshot.token != versions.digest(token):
+        return None
+    meta = snapshot.meta
+    entities = {
+        entity: olap.EntityCube(entity, details,
+                                snapshot.array(f'cube.{entity}.total'), snapshot.array(f'cube.{entity}.users'))
+        for entity, details in meta['entities'].items()
+    }
+    tier_rows = {tier: tuple(int(value) for value in row)
+                 for tier, row in zip(meta['tiers'], snapshot.array('cube.tier_rows'))}
+    return olap.Cube(token, entities, tier_rows)
+
+
+def load_rank_snapshot(pk):
+    """LeaderboardSnapshot pk의 RankSnapshot을 공유 배열로 구성 (없으면 None)"""
+    snapshot = current()
+    if snapshot is None:
+        return None
+    for entry in snapshot.meta.get('leaderboard', []):
+        if entry['pk'] == pk:
+            prefix = f'leaderboard.{pk}'
+            return leaderboard.RankSnapshot.from_arrays(
+                date.fromisoformat(entry['snapshot_date']),
+                {name: snapshot.array(f'{prefix}.{name}') for name in leaderboard.RankSnapshot.ARRAYS},
+            )
+    return None
+
+
+def clear():
+    """매핑 해제 (테스트/설정 변경용, 이미 받은 배열은 계속 유효)"""
+    global _mapped
+    with _map_lock:
+        _mapped = None
+    forget('shared-pointer')
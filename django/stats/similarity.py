@@ -0,0 +1,459 @@
+"""비슷한 플레이어 검색 (벡터화된 최근접 이웃, 프로세스 메모리 / 선택적 메모리 맵)
+
+유저마다 float32 특징 벡터 하나를 만들어 (유저 수 × 차원) 행렬로 들고 있고, 요청은 블록 단위
+행렬 곱과 argpartition으로 상위 k명을 찾습니다. 요청마다 SQL이나 유저 반복문은 없습니다.
+- 수치 특징: 레벨, 랭킹 점수, 승률(PlayerStats.win_rate) — 전체 유저 기준 z-점수 × NUMERIC_WEIGHT
+- 사용 프로필: 아이템/스킬별 사용 비율(유저의 사용 횟수 합 = 1) × USAGE_WEIGHT,
+  칸 = (대상 id - 1) % 폭, 폭은 카탈로그 최대 id(MAX_USAGE_DIMS까지, 넘으면 접어 넣음)
+  행 방식과 사용량 벡터(packed) 방식을 함께 읽고, 보관된(비활성) 유저의 사용 프로필은 0
+- 행은 (티어 코드, id) 순이라 티어마다 연속 구간 → 티어 안 검색은 그 구간만 곱함
+- cosine: 코사인 유사도(클수록 비슷), l2: 유클리드 거리(작을수록 비슷, |a-b|² = |a|² - 2a·b + |b|²로
+  같은 행렬 곱 재사용), 여러 질의를 한 번에 넘기면 블록마다 (질의 × 블록) 곱 한 번
+
+데이터 버전이 바뀌면 증분 갱신(refresh)합니다. 유저 목록과 수치 열은 쿼리 한 번으로 다시 읽고
+(z-점수 기준이 모든 유저에 걸려 있음), 사용 프로필은 마지막 갱신 이후 사용 기록/사용량 벡터/보관이
+바뀐 유저와 새 유저만 다시 계산해 나머지는 이전 행렬에서 복사합니다. 사용 기록 삭제(복원 등)는
+증분으로 잡히지 않으므로 FULL_REBUILD_SECONDS마다 전체 재생성합니다. 갱신 중에는 이전 인덱스로 응답합니다.
+SIMILARITY_DIR가 설정되어 있으면 인덱스를 .npy 파일로 저장하고, 다른 워커는 같은 버전을
+np.load(mmap_mode='r')로 매핑해 씁니다 (스케줄러 similarity 작업이 미리 갱신).
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import packed, sharding, versions
+from .aggregation import ENTITIES
+from .models import ArchivedUsage, GameUser, PackedUsage
+from .sketches import cached, forget
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+UNKNOWN_TIER = len(TIERS)
+NUMERIC_FIELDS = ('level', 'ranking_score', 'win_rate')
+NUMERIC_WEIGHT = 1.0
+# 사용 비율 벡터는 원소 합이 1이라 z-점수보다 훨씬 작음 → 수치 특징과 비슷한 영향이 되도록
+USAGE_WEIGHT = 3.0
+MAX_USAGE_DIMS = 32
+METRICS = ('cosine', 'l2')
+MAX_K = 100
+# 블록 하나의 (질의 × 행) 점수 행렬이 캐시/메모리에 맞도록
+BLOCK_ROWS = 65536
+EPSILON = 1e-12
+REFRESH_INTERVAL = 5.0
+FULL_REBUILD_SECONDS = 3600
+# 바뀐 유저가 이 비율을 넘으면 증분 대신 전체 재생성
+REBUILD_FRACTION = 0.25
+# 갱신 시작 직전에 커밋된 쓰기를 놓치지 않도록 워터마크를 조금 겹침
+OVERLAP = timedelta(seconds=5)
+CHUNK_SIZE = 500
+ARRAYS = ('ids', 'tiers', 'stats_ids', 'matrix', 'norms')
+POINTER = 'current'
+KEEP = 2
+
+
+class SimilarityIndex:
+    """특징 행렬 하나 (행 = 유저, (티어 코드, id) 순)"""
+
+    def __init__(self, token, ids, tiers, stats_ids, matrix, widths, center, scale,
+                 synced_at, full_at, norms=None):
+        self.token = token
+        self.ids = ids
+        self.tiers = tiers
+        # 유저별 player_stats_id (전적 없으면 0) — 증분 갱신 때 사용 기록과 행을 잇는 키
+        self.stats_ids = stats_ids
+        self.matrix = matrix
+        if norms is None:
+            norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix, dtype=np.float64)).astype(np.float32)
+        self.norms = norms
+        # 대상별 사용 프로필 칸 수 (열 순서: 수치 특징, item, skill)
+        self.widths = widths
+        self.center = center
+        self.scale = scale
+        self.synced_at = synced_at
+        self.full_at = full_at
+        self.loaded_at = time.monotonic()
+        self._order = np.argsort(ids, kind='stable')
+        self._sorted_ids = ids[self._order]
+        self._bounds = np.searchsorted(tiers, np.arange(UNKNOWN_TIER + 2))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dims(self):
+        return self.matrix.shape[1]
+
+    def positions(self, user_ids):
+        """유저 id 배열 → 행 위치 배열 (없으면 -1)"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(user_ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self._sorted_ids, user_ids), len(self.ids) - 1)
+        return np.where(self._sorted_ids[found] == user_ids, self._order[found], -1)
+
+    def position(self, user_id):
+        position = int(self.positions([user_id])[0])
+        return None if position < 0 else position
+
+    def tier_of(self, position):
+        code = int(self.tiers[position])
+        return TIERS[code] if code < UNKNOWN_TIER else None
+
+    def bounds(self, tier=None):
+        """검색할 행 구간 (tier가 None이면 전체)"""
+        if tier is None:
+            return 0, len(self.ids)
+        code = TIERS.index(tier)
+        return int(self._bounds[code]), int(self._bounds[code + 1])
+
+    def search(self, queries, k=10, metric='cosine', tier=None, exclude=None):
+        """질의 벡터 여러 개를 한 번에 → (행 위치 (q × k), 점수 (q × k))
+
+        cosine은 유사도 내림차순, l2는 거리 오름차순(동점은 위치 순). exclude는 질의마다 결과에서 뺄
+        행 위치(자기 자신, 없으면 -1)이고, 뺀 자리나 구간이 k보다 작아 빈 자리는 위치 -1입니다.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        count = len(queries)
+        start, stop = self.bounds(tier)
+        k = max(0, min(k, stop - start))
+        rows = np.arange(count)[:, None]
+        if metric == 'cosine':
+            queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), EPSILON)
+        exclude = None if exclude is None else np.asarray(exclude, dtype=np.int64)
+
+        best_positions = np.empty((count, 0), dtype=np.int64)
+        best_scores = np.empty((count, 0), dtype=np.float32)
+        for block_start in range(start, stop if k else start, BLOCK_ROWS):
+            block_stop = min(block_start + BLOCK_ROWS, stop)
+            scores = queries @ self.matrix[block_start:block_stop].T
+            norms = self.norms[block_start:block_stop]
+            if metric == 'cosine':
+                scores /= np.maximum(norms, EPSILON)
+            else:
+                # 클수록 가까움: 2a·b - |b|² = |a|² - |a-b|²
+                scores *= 2
+                scores -= norms * norms
+            if exclude is not None:
+                inside = np.nonzero((exclude >= block_start) & (exclude < block_stop))[0]
+                scores[inside, exclude[inside] - block_start] = -np.inf
+
+            take = min(k, block_stop - block_start)
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_scores = np.concatenate([best_scores, scores[rows, top]], axis=1)
+            best_positions = np.concatenate([best_positions, top + block_start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores, best_positions = best_scores[rows, keep], best_positions[rows, keep]
+
+        order = np.lexsort((best_positions, -best_scores), axis=1)
+        best_scores, best_positions = best_scores[rows, order], best_positions[rows, order]
+        best_positions[np.isneginf(best_scores)] = -1
+        if metric == 'l2':
+            squared = np.einsum('ij,ij->i', queries, queries)[:, None]
+            best_scores = np.sqrt(np.maximum(squared - best_scores, 0))
+        return best_positions, best_scores
+
+    def similar(self, user_id, k=10, metric='cosine', tier=None):
+        """유저 한 명과 비슷한 유저 [(유저 id, 점수)] (인덱스에 없으면 None)"""
+        position = self.position(user_id)
+        if position is None:
+            return None
+        positions, scores = self.search(self.matrix[position], k, metric, tier, exclude=[position])
+        return [
+            (int(self.ids[row]), float(score))
+            for row, score in zip(positions[0], scores[0]) if row >= 0
+        ]
+
+    def meta(self):
+        return {
+            'token': versions.digest(self.token) if self.token is not None else None,
+            'widths': self.widths,
+            'center': self.center.tolist(),
+            'scale': self.scale.tolist(),
+            'synced_at': self.synced_at.isoformat(),
+            'full_at': self.full_at.isoformat(),
+        }
+
+
+# ---------------------------------------------------------------- 생성
+
+def _load_users():
+    """(유저 id, 티어 코드, player_stats_id, 수치 특징 (n × 3)) — (티어, id) 순, 쿼리 1번"""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT u.id, u.tier, COALESCE(ps.id, 0), u.level, u.ranking_score, COALESCE(ps.win_rate, 0)
+            FROM stats_gameuser u
+            LEFT JOIN stats_playerstats ps ON ps.user_id = u.id
+        """)
+        rows = cursor.fetchall()
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty.astype(np.int8), empty, np.zeros((0, len(NUMERIC_FIELDS)))
+
+    ids, tiers, stats_ids, *numeric = zip(*rows)
+    tier_index = {code: i for i, code in enumerate(TIERS)}
+    ids = np.array(ids, dtype=np.int64)
+    tiers = np.array([tier_index.get(tier, UNKNOWN_TIER) for tier in tiers], dtype=np.int8)
+    order = np.lexsort((ids, tiers))
+    raw = np.column_stack([np.array(values, dtype=np.float64) for values in numeric])
+    return ids[order], tiers[order], np.array(stats_ids, dtype=np.int64)[order], raw[order]
+
+
+def _width(entity):
+    return min(max(packed.catalog_width(entity), 1), MAX_USAGE_DIMS)
+
+
+def _usage_entries(entity, stats_ids=None):
+    """(player_stats_id, 대상 id, 사용 횟수) 배열 — 행 방식 + 사용량 벡터, stats_ids가 있으면 그 유저만"""
+    _, usage_table, column, _, _ = ENTITIES[entity]
+    counts_field = packed.FIELDS[entity][0]
+    sql = f'SELECT player_stats_id, {column}, usage_count FROM {usage_table}'
+    if stats_ids is None:
+        rows = list(sharding.stream(sql))
+        _, packed_players, packed_objects, packed_counts = packed.entries(entity)
+    else:
+        rows, vectors = [], []
+        stats_ids = [int(stats_id) for stats_id in stats_ids]
+        for start in range(0, len(stats_ids), CHUNK_SIZE):
+            chunk = stats_ids[start:start + CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            for partial in sharding.scatter(f'{sql} WHERE player_stats_id IN ({placeholders})', chunk):
+                rows += partial
+            vectors += PackedUsage.objects.filter(player_stats_id__in=chunk).values_list('player_stats_id',
+                                                                                        counts_field)
+        packed_players, packed_objects, packed_counts = [], [], []
+        for stats_id, blob in vectors:
+            counts = np.frombuffer(bytes(blob), dtype=packed.COUNT_DTYPE)
+            slots = np.nonzero(counts)[0]
+            packed_players.append(np.full(len(slots), stats_id, dtype=np.int64))
+            packed_objects.append(slots + 1)
+            packed_counts.append(counts[slots])
+        packed_players, packed_objects, packed_counts = (
+            np.concatenate(parts).astype(np.int64) if parts else np.zeros(0, dtype=np.int64)
+            for parts in (packed_players, packed_objects, packed_counts)
+        )
+
+    players, objects, counts = (
+        np.array(values, dtype=np.int64) for values in (zip(*rows) if rows else ((), (), ()))
+    )
+    return (np.concatenate([players, packed_players]), np.concatenate([objects, packed_objects]),
+            np.concatenate([counts, packed_counts]))
+
+
+def _usage_block(entries, stats_ids, width):
+    """사용 기록 → stats_ids 순서의 (유저 수 × width) 사용 비율 × USAGE_WEIGHT"""
+    players, objects, counts = entries
+    order = np.argsort(stats_ids)
+    rows = np.minimum(np.searchsorted(stats_ids, players, sorter=order), max(len(stats_ids) - 1, 0))
+    rows = order[rows] if len(stats_ids) else rows
+    known = (objects >= 1) & (stats_ids[rows] == players) if len(stats_ids) else np.zeros(len(players), bool)
+    keys = rows[known] * width + (objects[known] - 1) % width
+    block = np.bincount(keys, weights=counts[known], minlength=len(stats_ids) * width).reshape(-1, width)
+    totals = block.sum(axis=1, keepdims=True)
+    return (block / np.maximum(totals, 1) * USAGE_WEIGHT).astype(np.float32)
+
+
+def _assemble(token, ids, tiers, stats_ids, raw, usage, widths, synced_at, full_at):
+    center = raw.mean(axis=0) if len(raw) else np.zeros(len(NUMERIC_FIELDS))
+    scale = raw.std(axis=0) if len(raw) else np.ones(len(NUMERIC_FIELDS))
+    scale = np.where(scale > 0, scale, 1.0)
+    numeric = ((raw - center) / scale * NUMERIC_WEIGHT).astype(np.float32)
+    matrix = np.ascontiguousarray(np.hstack([numeric, usage]), dtype=np.float32)
+    return SimilarityIndex(token, ids, tiers, stats_ids, matrix, widths, center, scale, synced_at, full_at)
+
+
+def build():
+    """전체 스캔으로 인덱스 생성 (토큰/시각은 읽기 전에 기록해 그 사이 변경은 다음 갱신에 반영)"""
+    token = versions.token(fresh=True)
+    synced_at = timezone.now()
+    ids, tiers, stats_ids, raw = _load_users()
+    widths = {entity: _width(entity) for entity in ENTITIES}
+    usage = np.hstack([
+        _usage_block(_usage_entries(entity), stats_ids, widths[entity]) for entity in ENTITIES
+    ]) if len(ids) else np.zeros((0, sum(widths.values())), dtype=np.float32)
+    return _assemble(token, ids, tiers, stats_ids, raw, usage, widths, synced_at, synced_at)
+
+
+def changed_players(since):
+    """since 이후 사용 기록/사용량 벡터/보관 상태가 바뀐 player_stats_id 집합"""
+    moment = connection.ops.adapt_datetimefield_value(since)
+    changed = set()
+    for _, usage_table, _, _, _ in ENTITIES.values():
+        partials = sharding.scatter(
+            f'SELECT DISTINCT player_stats_id FROM {usage_table} WHERE last_used > %s', [moment])
+        changed.update(stats_id for rows in partials for (stats_id,) in rows)
+    changed.update(PackedUsage.objects.filter(updated_at__gt=since).values_list('player_stats_id', flat=True))
+    changed.update(ArchivedUsage.objects.filter(archived_at__gt=since).values_list('player_stats_id', flat=True))
+    return changed
+
+
+def refresh(index, since=None):
+    """index를 현재 데이터로 갱신한 새 인덱스 (index는 그대로, 바뀐 유저가 많으면 전체 재생성)"""
+    if (timezone.now() - index.full_at).total_seconds() > FULL_REBUILD_SECONDS:
+        return build()
+    widths = {entity: _width(entity) for entity in ENTITIES}
+    if any(widths[entity] != index.widths.get(entity) for entity in ENTITIES):
+        return build()
+
+    since = index.synced_at - OVERLAP if since is None else since
+    token = versions.token(fresh=True)
+    synced_at = timezone.now()
+    ids, tiers, stats_ids, raw = _load_users()
+    numeric = len(NUMERIC_FIELDS)
+    old = index.positions(ids)
+    found = old >= 0
+
+    stale = ~found | np.isin(stats_ids, np.fromiter(changed_players(since), dtype=np.int64))
+    if stale.sum() > REBUILD_FRACTION * max(len(ids), 1):
+        return build()
+
+    usage = np.zeros((len(ids), index.dims - numeric), dtype=np.float32)
+    usage[found] = index.matrix[old[found], numeric:]
+    stale_rows = np.nonzero(stale & (stats_ids > 0))[0]
+    # 전적이 지워진 유저
+    usage[stats_ids == 0] = 0
+    if len(stale_rows):
+        offset = 0
+        for entity in ENTITIES:
+            width = widths[entity]
+            usage[stale_rows, offset:offset + width] = _usage_block(
+                _usage_entries(entity, stats_ids[stale_rows]), stats_ids[stale_rows], width)
+            offset += width
+    return _assemble(token, ids, tiers, stats_ids, raw, usage, widths, synced_at, index.full_at)
+
+
+# ---------------------------------------------------------------- 저장 (SIMILARITY_DIR)
+
+def enabled():
+    return bool(settings.SIMILARITY_DIR)
+
+
+def _directory():
+    return Path(settings.SIMILARITY_DIR)
+
+
+def save(index, directory=None):
+    """인덱스를 새 버전 디렉터리(.npy 배열 + meta.json)로 저장하고 포인터 교체 → 경로"""
+    directory = Path(directory or _directory())
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f'index-{time.time_ns()}-{index.meta()["token"] or "none"}'
+    temp = directory / f'.{name}.{os.getpid()}.tmp'
+    temp.mkdir()
+    for array in ARRAYS:
+        np.save(temp / f'{array}.npy', np.ascontiguousarray(getattr(index, array)))
+    (temp / 'meta.json').write_text(json.dumps(index.meta()))
+    os.replace(temp, directory / name)
+
+    pointer = directory / f'.{POINTER}.{os.getpid()}.tmp'
+    pointer.write_text(name)
+    os.replace(pointer, directory / POINTER)
+    # 직전 버전을 매핑 중인 워커가 있을 수 있어 KEEP개는 남김 (지워도 매핑된 배열은 유효)
+    for stale in sorted(directory.glob('index-*'))[:-(KEEP + 1)]:
+        shutil.rmtree(stale, ignore_errors=True)
+    forget('similarity-pointer')
+    return directory / name
+
+
+def open_index(path, token=None, mmap=True):
+    """저장된 인덱스 열기 (mmap이면 배열은 복사 없이 읽기 전용 매핑)"""
+    path = Path(path)
+    meta = json.loads((path / 'meta.json').read_text())
+    arrays = {array: np.load(path / f'{array}.npy', mmap_mode='r' if mmap else None) for array in ARRAYS}
+    return SimilarityIndex(
+        token, arrays['ids'], arrays['tiers'], arrays['stats_ids'], arrays['matrix'], meta['widths'],
+        np.array(meta['center']), np.array(meta['scale']),
+        datetime.fromisoformat(meta['synced_at']), datetime.fromisoformat(meta['full_at']),
+        norms=arrays['norms'],
+    )
+
+
+def _read_pointer():
+    try:
+        return (_directory() / POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def load(token=None):
+    """저장된 인덱스 — token이 있으면 그 버전일 때만 (없거나 다르면 None)"""
+    if not enabled():
+        return None
+    name = cached('similarity-pointer', _read_pointer)
+    if name is None or (token is not None and not name.endswith(f'-{versions.digest(token)}')):
+        return None
+    try:
+        return open_index(_directory() / name, token)
+    except (FileNotFoundError, ValueError):
+        # 포인터를 읽은 뒤 교체/삭제됨 → 다음 확인 때 다시
+        forget('similarity-pointer')
+        return None
+
+
+# ---------------------------------------------------------------- 조회
+
+_current = None
+_build_lock = threading.Lock()
+
+
+def _update(full=False):
+    """(잠금 안에서) 현재 인덱스를 갱신/생성하고 SIMILARITY_DIR가 있으면 저장"""
+    global _current
+    base = None if full else (_current or load())
+    _current = build() if base is None else refresh(base)
+    if enabled():
+        save(_current)
+    return _current
+
+
+def update(full=False):
+    """강제 갱신 (스케줄러/커맨드용, 다른 스레드가 갱신 중이면 기다림)"""
+    with _build_lock:
+        return _update(full)
+
+
+def reload():
+    """강제 전체 재생성 후 교체"""
+    return update(full=True)
+
+
+def get_index():
+    """현재 데이터 버전의 인덱스
+
+    오래되었으면 증분 갱신하되 REFRESH_INTERVAL 안이거나 다른 스레드가 갱신 중이면 이전 인덱스를
+    그대로 돌려줍니다. 처음 한 번은 만들어질 때까지 기다립니다.
+    """
+    global _current
+    index = _current
+    token = versions.token()
+    if index is not None and index.token == token:
+        return index
+    # 다른 프로세스(스케줄러)가 같은 버전을 저장했으면 매핑
+    stored = load(token)
+    if stored is not None:
+        _current = stored
+        return stored
+    if index is not None and time.monotonic() - index.loaded_at < REFRESH_INTERVAL:
+        return index
+    if not _build_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _current is None or _current.token != token:
+            _update()
+        return _current
+    finally:
+        _build_lock.release()
+
+
+def clear():
+    global _current
+    with _build_lock:
+        _current = None
+    forget('similarity-pointer')
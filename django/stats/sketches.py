@@ -0,0 +1,265 @@
+"""인기 아이템/스킬 Top-K 스케치 (Space-Saving)
+
+(대상, 티어, 타입) 조합마다 용량 K의 Space-Saving 요약을 유지합니다.
+- 추정값은 실제 사용량 이상이고, 추정값 - error는 실제 사용량 이하입니다.
+- 요약에 없는 대상의 실제 사용량은 요약의 최소 카운터 이하입니다.
+- 용량이 대상 종류 수 이상이면 결과는 정확합니다 (error = 0).
+
+키 형식은 '{entity}:{tier}:{type}'이고 티어/타입 전체는 'ALL'입니다.
+읽기는 프로세스 캐시(CACHE_SECONDS)에서 처리하므로 DB 왕복 없이 마이크로초 단위로 응답합니다.
+"""
+import heapq
+import struct
+import threading
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import sharding
+from .leaderboard import decode_array, encode_array
+from .models import GameUser, Item, Skill, StatSketch
+
+DEFAULT_CAPACITY = 64
+CACHE_SECONDS = 1.0
+
+TIERS = [code for code, _ in GameUser.TIER_CHOICES]
+
+# entity → (대상 테이블, 사용 기록 테이블, 대상 컬럼, 타입 컬럼, 모델, 응답 컬럼)
+ENTITIES = {
+    'item': ('stats_item', 'stats_itemusage', 'item_id', 'item_type', Item,
+             ['id', 'name', 'item_type', 'description', 'price']),
+    'skill': ('stats_skill', 'stats_skillusage', 'skill_id', 'skill_type', Skill,
+              ['id', 'name', 'skill_type', 'description', 'cooldown']),
+}
+
+# 헤더: 용량 + 관측 합계
+_HEADER = struct.Struct('<IQ')
+
+
+class SpaceSaving:
+    """가중치 Space-Saving 요약 (Metwally et al.)"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.total = 0
+        # key → [추정값, 최대 과대 추정]
+        self.counters = {}
+
+    def update(self, key, weight=1):
+        if weight <= 0:
+            raise ValueError('Space-Saving은 양수 가중치만 지원합니다.')
+        self.total += weight
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [weight, 0]
+        else:
+            # 최소 카운터를 새 키에 넘김 (용량이 작아 선형 탐색으로 충분)
+            victim = min(self.counters, key=lambda k: self.counters[k][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[key] = [floor + weight, floor]
+
+    def top(self, n):
+        """[(key, 추정값, error)] 추정값 내림차순 (동점은 key 순)"""
+        return heapq.nsmallest(n, ((key, c[0], c[1]) for key, c in self.counters.items()),
+                               key=lambda row: (-row[1], row[0]))
+
+    def floor(self):
+        """요약에 없는 대상의 실제 사용량 상한"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(c[0] for c in self.counters.values())
+
+    def to_bytes(self):
+        keys = sorted(self.counters)
+        return b''.join([
+            _HEADER.pack(self.capacity, self.total),
+            _frame(encode_array(keys, delta=True)),
+            _frame(encode_array([self.counters[k][0] for k in keys])),
+            _frame(encode_array([self.counters[k][1] for k in keys])),
+        ])
+
+    @classmethod
+    def from_bytes(cls, blob):
+        blob = bytes(blob)
+        capacity, total = _HEADER.unpack_from(blob)
+        offset = _HEADER.size
+        arrays = []
+        for delta in (True, False, False):
+            part, offset = _unframe(blob, offset)
+            arrays.append(decode_array(part, delta=delta))
+        sketch = cls(capacity)
+        sketch.total = total
+        sketch.counters = {int(k): [int(c), int(e)] for k, c, e in zip(*arrays)}
+        return sketch
+
+
+def _frame(data):
+    return struct.pack('<I', len(data)) + data
+
+
+def _unframe(blob, offset):
+    (length,) = struct.unpack_from('<I', blob, offset)
+    start = offset + 4
+    return blob[start:start + length], start + length
+
+
+def topk_key(entity, tier=None, type_value=None):
+    return f'{entity}:{tier or "ALL"}:{type_value or "ALL"}'
+
+
+def _keys_for(entity, tier, type_value):
+    """사용 기록 한 건이 갱신하는 스케치 키 (최대 4개)"""
+    return list(dict.fromkeys(topk_key(entity, t, v) for t in (tier, None) for v in (type_value, None)))
+
+
+# ---------------------------------------------------------------- 읽기 (프로세스 캐시)
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def forget(name):
+    with _cache_lock:
+        _cache.pop(name, None)
+
+
+def cached(name, loader):
+    """CACHE_SECONDS 동안 유효한 프로세스 캐시 (quantiles 모듈과 공용)"""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(name)
+    if entry is not None and now - entry[0] < CACHE_SECONDS:
+        return entry[1]
+    value = loader()
+    with _cache_lock:
+        _cache[name] = (now, value)
+    return value
+
+
+def _load_topk(key):
+    row = StatSketch.objects.filter(kind='topk', key=key).values_list('data', flat=True).first()
+    return SpaceSaving.from_bytes(row) if row is not None else None
+
+
+def get_topk(entity, tier=None, type_value=None):
+    key = topk_key(entity, None if tier == 'ALL' else tier, type_value)
+    return cached(('topk', key), lambda: _load_topk(key))
+
+
+def catalog(entity):
+    """id → 응답용 아이템/스킬 정보 (작은 테이블이라 통째로 캐시)"""
+    *_, model, columns = ENTITIES[entity]
+    return cached(('catalog', entity), lambda: {row['id']: row for row in model.objects.values(*columns)})
+
+
+def approx_popular(entity, tier=None, type_value=None, limit=10):
+    """스케치 기반 인기 순위 (없으면 None)
+
+    total_usage는 추정값, error는 최대 과대 추정량입니다 (실제 ≥ total_usage - error).
+    """
+    sketch = get_topk(entity, tier, type_value)
+    if sketch is None:
+        return None
+    objects = catalog(entity)
+    results = []
+    for object_id, estimate, error in sketch.top(limit):
+        row = objects.get(object_id)
+        if row is not None:
+            results.append({**row, 'total_usage': estimate, 'error': error})
+    return results
+
+
+# ---------------------------------------------------------------- 쓰기
+
+def _all_keys(entity):
+    _, _, _, type_column, model, _ = ENTITIES[entity]
+    types = [code for code, _ in model._meta.get_field(type_column).choices]
+    return [topk_key(entity, tier, value) for tier in [None] + TIERS for value in [None] + types]
+
+
+def _remember(sketches):
+    with _cache_lock:
+        for key, sketch in sketches.items():
+            _cache[('topk', key)] = (time.monotonic(), sketch)
+
+
+def observe(entity, events):
+    """사용량 증가 반영 — events: [(티어, 타입, 대상 id, 증가량)]
+
+    먼저 해당 행을 UPDATE 해서 쓰기 잠금을 잡은 뒤 읽고 고쳐 쓰므로
+    동시에 적재하는 프로세스끼리 갱신을 잃지 않습니다. 스케치는 rebuild_topk()로
+    한 번 만든 뒤 증분 반영해야 전체 사용량을 나타냅니다.
+    """
+    events = [event for event in events if event[3] > 0]
+    if not events:
+        return 0
+    keys = sorted({key for tier, value, _, _ in events for key in _keys_for(entity, tier, value)})
+
+    with transaction.atomic():
+        StatSketch.objects.filter(kind='topk', key__in=keys).update(updated_at=timezone.now())
+        stored = dict(StatSketch.objects.filter(kind='topk', key__in=keys).values_list('key', 'data'))
+        sketches = {key: SpaceSaving.from_bytes(stored[key]) if key in stored else SpaceSaving() for key in keys}
+        for tier, value, object_id, weight in events:
+            for key in _keys_for(entity, tier, value):
+                sketches[key].update(object_id, weight)
+        rows = StatSketch.objects.filter(kind='topk', key__in=stored).only('id', 'key')
+        for row in rows:
+            row.data, row.total = sketches[row.key].to_bytes(), sketches[row.key].total
+        StatSketch.objects.bulk_update(rows, ['data', 'total'])
+        StatSketch.objects.bulk_create([
+            StatSketch(kind='topk', key=key, data=sketch.to_bytes(), total=sketch.total)
+            for key, sketch in sketches.items() if key not in stored
+        ])
+    _remember(sketches)
+    return len(events)
+
+
+def rebuild_topk(entity, capacity=DEFAULT_CAPACITY):
+    """사용 기록 테이블 한 번 스캔으로 모든 Top-K 스케치 재생성 → 스케치 개수"""
+    table, usage_table, column, type_column, _, _ = ENTITIES[entity]
+    sql = f"""
+        SELECT u.tier, t.{type_column}, usage.{column}, usage.usage_count
+        FROM {usage_table} usage
+        INNER JOIN {sharding.hub_table('stats_playerstats')} ps ON usage.player_stats_id = ps.id
+        INNER JOIN {sharding.hub_table('stats_gameuser')} u ON ps.user_id = u.id
+        INNER JOIN {sharding.hub_table(table)} t ON usage.{column} = t.id
+        WHERE usage.usage_count > 0
+    """
+    sketches = {key: SpaceSaving(capacity) for key in _all_keys(entity)}
+    for tier, value, object_id, usage_count in sharding.stream(sql):
+        for key in _keys_for(entity, tier, value):
+            sketches[key].update(object_id, usage_count)
+
+    # 사용량 벡터로 저장된 유저 (stats/packed.py, packed → archive → sketches 순환 import 회피)
+    from . import packed
+    tiers, _, object_ids, counts = packed.entries(entity)
+    values = catalog(entity)
+    for tier_code, object_id, usage_count in zip(tiers.tolist(), object_ids.tolist(), counts.tolist()):
+        if usage_count > 0 and object_id in values:
+            tier = packed.TIERS[tier_code] if tier_code < len(packed.TIERS) else None
+            for key in _keys_for(entity, tier, values[object_id][type_column]):
+                sketches[key].update(object_id, usage_count)
+
+    with transaction.atomic():
+        StatSketch.objects.filter(kind='topk', key__startswith=f'{entity}:').delete()
+        StatSketch.objects.bulk_create([
+            StatSketch(kind='topk', key=key, data=sketch.to_bytes(), total=sketch.total)
+            for key, sketch in sketches.items()
+        ])
+    _remember(sketches)
+    return len(sketches)
+
+
+def sketch_sizes(kind='topk'):
+    """키별 저장 크기 (바이트)"""
+    rows = StatSketch.objects.filter(kind=kind).values_list('key', 'data')
+    return {key: len(bytes(data)) for key, data in rows}
+
@@ -1,3 +1,944 @@
-from django.test import TestCase
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (aggregation, archive, datasets, impact, leaderboard, olap, packed, quantiles, scheduler, sharding,
+               shared, similarity, sketches, versions)
+from .ingest import ingest_item_usage
+from .models import ArchivedUsage, GameUser, Item, ItemUsage, JobState, PackedUsage, PlayerStats, Skill, SkillUsage
+from .queries import popular_items, top_players_items
+from .rollups import read_rollup, rebuild_rollups
+from .search import search_user_ids
+
+
+class EncodeArrayTests(SimpleTestCase):
+    def test_round_trip(self):
+        for values, delta in (([], False), ([3, 1, 2], False), ([10, 900, 70000, 70001], True), ([-5, 2 ** 40], False)):
+            with self.subTest(values=values, delta=delta):
+                decoded = leaderboard.decode_array(leaderboard.encode_array(values, delta=delta), delta=delta)
+                self.assertEqual(decoded.tolist(), values)
+
+    def test_rank_lookup(self):
+        snapshot = leaderboard.RankSnapshot(
+            timezone.localdate(),
+            np.array([7, 3, 9, 1]),
+            np.array([400, 300, 200, 100]),
+            np.array([1, 0, 1, 0]),
+        )
+        self.assertEqual(snapshot.ranks_for([9, 1, 42]).tolist(), [3, 4, 0])
+        self.assertEqual(snapshot.ranks_for([9, 3], tier=leaderboard.TIER_CODES[1]).tolist(), [2, 0])
+
+
+class SearchIndexTests(TestCase):
+    def test_index_follows_writes(self):
+        user = GameUser.objects.create(nickname='Starlight77', level=1, tier='BRONZE', ranking_score=0)
+        self.assertEqual([row[:2] for row in search_user_ids('light', fuzzy=False)], [(user.id, 'substring')])
+
+        user.nickname = 'Moonbeam77'
+        user.save()
+        self.assertEqual(search_user_ids('light', fuzzy=False), [])
+        self.assertEqual([row[0] for row in search_user_ids('beam')], [user.id])
+
+        user.delete()
+        self.assertEqual(search_user_ids('beam'), [])
+
+    def test_prefix_substring_and_fuzzy_matches(self):
+        ids = {
+            nickname: GameUser.objects.create(nickname=nickname, level=1, tier='BRONZE', ranking_score=0).id
+            for nickname in ['Shadow', 'Shadowfax', 'NightShade', 'Shadw', '윤9성', '김윤9', '윤8']
+        }
+        results = search_user_ids('shadow')
+        kinds = {user_id: kind for user_id, kind, _ in results}
+        self.assertEqual(results[0][:2], (ids['Shadow'], 'exact'))
+        self.assertEqual(kinds[ids['Shadowfax']], 'prefix')
+        self.assertEqual(kinds[ids['Shadw']], 'fuzzy')
+        self.assertNotIn(ids['Shadw'], [row[0] for row in search_user_ids('shadow', fuzzy=False)])
+
+        self.assertEqual([row[:2] for row in search_user_ids('ade', fuzzy=False)], [(ids['NightShade'], 'substring')])
+        # trigram보다 짧은 검색어도 부분 문자열로
+        self.assertEqual(sorted(row[:2] for row in search_user_ids('윤9')),
+                         sorted([(ids['윤9성'], 'prefix'), (ids['김윤9'], 'substring')]))
+        self.assertEqual(len(search_user_ids('윤', limit=2)), 2)
+
+
+class ShardingTests(SimpleTestCase):
+    def test_shard_index_is_stable_and_balanced(self):
+        counts = [0] * 4
+        for player_stats_id in range(1, 4001):
+            counts[sharding.shard_index(player_stats_id, shards=4)] += 1
+        self.assertEqual(sharding.shard_index(12345, shards=4), sharding.shard_index(12345, shards=4))
+        self.assertLess(max(counts) - min(counts), 200)
+
+    def test_merge_sums(self):
+        partials = [[(1, 10), (2, 5)], [(1, 3), (3, None)], []]
+        self.assertEqual(sharding.merge_sums(partials), {1: 13, 2: 5, 3: 0})
+
+
+class MultiShardTests(TransactionTestCase):
+    """샤드 2개(임시 파일)에서 쓰기 라우팅, scatter() 합산, reshard_usage"""
+
+    SHARDS = 2
+    TOTALS_SQL = 'SELECT item_id, SUM(usage_count) FROM stats_itemusage GROUP BY item_id'
+    aliases = [f'usage_{shard}' for shard in range(SHARDS)]
+
+    @classmethod
+    def setUpClass(cls):
+        # 샤드 연결은 설정에 없으므로 클래스 시작 때 등록 (러너가 테스트 DB를 만들지 않도록 databases도 여기서)
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        for alias in cls.aliases:
+            connections.settings[alias] = {
+                **connections.settings['default'], 'NAME': str(Path(directory.name) / f'{alias}.sqlite3'),
+            }
+            cls.addClassCleanup(cls.remove_connection, alias)
+        cls.databases = {'default', *cls.aliases}
+        super().setUpClass()
+
+    def setUp(self):
+        items = [Item.objects.create(name=f'샤드 아이템{i}', item_type='WEAPON') for i in range(3)]
+        self.stats = []
+        for i in range(12):
+            user = GameUser.objects.create(nickname=f'shard{i}', level=1, tier=['GOLD', 'SILVER'][i % 2],
+                                           ranking_score=i)
+            self.stats.append(PlayerStats.objects.create(user=user))
+        # 샤딩 전: 모두 default에
+        ItemUsage.objects.bulk_create([
+            ItemUsage(player_stats=stats, item=item, usage_count=i + j + 1)
+            for i, stats in enumerate(self.stats) for j, item in enumerate(items) if (i + j) % 3
+        ])
+        self.item = items[0]
+        self.baseline = sharding.merge_sums(sharding.scatter(self.TOTALS_SQL))
+        self.tier_sql = (
+            f'SELECT u.tier, SUM(iu.usage_count) FROM stats_itemusage iu '
+            f'JOIN {{playerstats}} ps ON ps.id = iu.player_stats_id JOIN {{gameuser}} u ON u.id = ps.user_id '
+            f'GROUP BY u.tier'
+        )
+        self.tier_baseline = sharding.merge_sums(sharding.scatter(
+            self.tier_sql.format(playerstats='stats_playerstats', gameuser='stats_gameuser')))
+
+        settings = override_settings(USAGE_SHARDS=self.SHARDS)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    @staticmethod
+    def remove_connection(alias):
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    def shard_rows(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT player_stats_id FROM stats_itemusage')
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_reshard_then_route_and_scatter(self):
+        call_command('reshard_usage', stdout=StringIO())
+
+        # 모든 행이 제 샤드로 옮겨졌고 default는 비어 있음
+        self.assertEqual(self.shard_rows('default'), [])
+        for alias in self.aliases:
+            rows = self.shard_rows(alias)
+            self.assertTrue(rows)
+            self.assertEqual({sharding.shard_for(stats_id) for stats_id in rows}, {alias})
+
+        # 샤드별 부분 합계를 합치면 샤딩 전과 같음 (허브 테이블 조인 포함)
+        self.assertEqual(sharding.merge_sums(sharding.scatter(self.TOTALS_SQL)), self.baseline)
+        self.assertEqual(sharding.merge_sums(sharding.scatter(self.tier_sql.format(
+            playerstats=sharding.hub_table('stats_playerstats'), gameuser=sharding.hub_table('stats_gameuser'),
+        ))), self.tier_baseline)
+
+        # 인스턴스 힌트가 있는 쓰기/읽기는 player_stats의 샤드로
+        stats = self.stats[0]
+        stats.item_usages.filter(item=self.item).delete()
+        ItemUsage(player_stats=stats, item=self.item, usage_count=7).save()
+        self.assertIn(stats.pk, self.shard_rows(sharding.shard_for(stats.pk)))
+        self.assertEqual(stats.item_usages.get(item=self.item).usage_count, 7)
+
+        # 샤드를 알 수 없는 쿼리는 빈 default를 읽지 않고 실패
+        with self.assertRaises(sharding.ShardRoutingError):
+            ItemUsage.objects.count()
+        self.assertEqual(sharding.count('stats_itemusage'), sum(len(self.shard_rows(alias)) for alias in self.aliases))
+
+        # 관리자: 사용 기록 목록은 샤드 하나씩, 통계 인라인은 통계의 샤드에서
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        alias = sharding.shard_for(stats.pk)
+        response = self.client.get(reverse('admin:stats_itemusage_changelist'), {'shard': alias})
+        self.assertEqual(response.status_code, 200)
+        rows = response.context['cl'].result_list
+        self.assertEqual(sorted(row.player_stats_id for row in rows), sorted(self.shard_rows(alias)))
+        response = self.client.get(reverse('admin:stats_playerstats_change', args=[stats.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.item.name)
+
+
+class SpaceSavingTests(SimpleTestCase):
+    def test_error_bounds_hold(self):
+        rng = random.Random(7)
+        sketch = sketches.SpaceSaving(capacity=20)
+        truth = {}
+        for _ in range(5000):
+            key = int(rng.paretovariate(1.2)) % 200
+            weight = rng.randint(1, 5)
+            truth[key] = truth.get(key, 0) + weight
+            sketch.update(key, weight)
+
+        for key, estimate, error in sketch.top(20):
+            self.assertGreaterEqual(estimate, truth[key])
+            self.assertLessEqual(estimate - error, truth[key])
+        missing = set(truth) - set(sketch.counters)
+        self.assertTrue(all(truth[key] <= sketch.floor() for key in missing))
+        # 상위 3개는 정확한 상위 3개와 일치
+        exact = sorted(truth, key=lambda key: -truth[key])[:3]
+        self.assertEqual([key for key, _, _ in sketch.top(3)], exact)
+
+    def test_round_trip(self):
+        sketch = sketches.SpaceSaving(capacity=4)
+        for key, weight in ((5, 3), (9, 1), (5, 2), (1, 7), (2, 1), (3, 4)):
+            sketch.update(key, weight)
+        restored = sketches.SpaceSaving.from_bytes(sketch.to_bytes())
+        self.assertEqual((restored.capacity, restored.total, restored.counters),
+                         (sketch.capacity, sketch.total, sketch.counters))
+
+
+class KLLSketchTests(SimpleTestCase):
+    def test_quantiles_within_rank_error(self):
+        values = np.random.default_rng(7).gamma(2.0, 1000.0, size=50000)
+        sketch = quantiles.KLLSketch(seed=1)
+        for value in values:
+            sketch.update(value)
+        summary = quantiles.QuantileSummary(sketch, quantiles.KLLSketch())
+        ordered = np.sort(values)
+
+        self.assertFalse(sketch.is_exact())
+        for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+            true_rank = np.searchsorted(ordered, summary.quantile(q), side='right') / values.size
+            self.assertLessEqual(abs(true_rank - q), summary.rank_error() + 1e-3)
+            self.assertAlmostEqual(summary.rank(ordered[int(q * values.size)]), q, delta=summary.rank_error() + 1e-3)
+
+    def test_merge_and_round_trip(self):
+        left, right = quantiles.KLLSketch(k=50, seed=1), quantiles.KLLSketch(k=50, seed=2)
+        for value in range(5000):
+            (left if value % 2 else right).update(value)
+        left.merge(right)
+        restored = quantiles.KLLSketch.from_bytes(left.to_bytes())
+
+        self.assertEqual(restored.n, 5000)
+        median = quantiles.QuantileSummary(restored, quantiles.KLLSketch()).quantile(0.5)
+        self.assertAlmostEqual(median, 2500, delta=5000 * restored.rank_error())
+
+    def test_deletes_subtract(self):
+        inserted, deleted = quantiles.KLLSketch(), quantiles.KLLSketch()
+        for value in range(100):
+            inserted.update(value)
+        for value in range(50):
+            deleted.update(value)
+        summary = quantiles.QuantileSummary(inserted, deleted)
+
+        self.assertEqual(summary.count, 50)
+        self.assertEqual(summary.quantile(0.0), 50)
+        self.assertEqual(summary.rank(49), 0.0)
+        self.assertEqual(summary.rank(74), 0.5)
+
+
+class QuantileTrackingTests(TestCase):
+    def test_saves_are_merged_on_flush(self):
+        users = [GameUser.objects.create(nickname=f'kll{i}', level=i + 1, tier='GOLD', ranking_score=i * 10)
+                 for i in range(10)]
+        quantiles.rebuild_quantiles()
+
+        user = GameUser.objects.get(pk=users[0].pk)
+        user.ranking_score = 1000
+        user.tier = 'DIAMOND'
+        user.save()
+        GameUser.objects.get(pk=users[1].pk).delete()
+        quantiles.flush()
+        sketches.clear_cache()
+
+        everyone = quantiles.get_summary('ranking_score')
+        self.assertEqual(everyone.count, 9)
+        self.assertEqual(everyone.quantile(1.0), 1000)
+        self.assertEqual(everyone.quantile(0.0), 20)
+        self.assertEqual(quantiles.get_summary('ranking_score', 'GOLD').count, 8)
+        self.assertEqual(quantiles.get_summary('ranking_score', 'DIAMOND').quantile(0.5), 1000)
+
+    def test_small_changes_flush_on_commit(self):
+        users = [GameUser.objects.create(nickname=f'kll{i}', level=1, tier='GOLD', ranking_score=i) for i in range(5)]
+        quantiles.rebuild_quantiles()
+        sketches.clear_cache()
+
+        # 버퍼가 작아도 커밋되면 저장된 스케치에 병합
+        with self.captureOnCommitCallbacks(execute=True):
+            users[0].ranking_score = 500
+            users[0].save()
+        sketches.clear_cache()
+        self.assertEqual(quantiles.get_summary('ranking_score').quantile(1.0), 500)
+
+
+class AggregationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sword = Item.objects.create(name='검', item_type='WEAPON')
+        shield = Item.objects.create(name='방패', item_type='ARMOR')
+        cls.unused = Item.objects.create(name='미사용', item_type='ARMOR')
+        usages = {'GOLD': [(sword, 10), (shield, 30)], 'DIAMOND': [(sword, 20)], 'BRONZE': [(sword, 5)]}
+        for i, (tier, rows) in enumerate(usages.items()):
+            user = GameUser.objects.create(nickname=f'agg{i}', level=10 * (i + 1), tier=tier, ranking_score=i)
+            stats = PlayerStats.objects.create(user=user, total_games=100 * i)
+            for item, count in rows:
+                ItemUsage.objects.create(player_stats=stats, item=item, usage_count=count)
+        cls.sword, cls.shield = sword, shield
+
+    def run_query(self, **kwargs):
+        return aggregation.run(aggregation.UsageQuery('item', **kwargs))
+
+    def test_metrics(self):
+        rows = self.run_query(metric='avg_per_user', tiers=('GOLD', 'DIAMOND'))
+        self.assertEqual([(row['id'], row['avg_per_user']) for row in rows], [(self.shield.id, 30), (self.sword.id, 15)])
+
+        rows = self.run_query(metric='tier_share', group_by=('tier', 'object'), tiers=('GOLD',))
+        self.assertEqual([(row['id'], row['tier_share']) for row in rows], [(self.shield.id, 0.75), (self.sword.id, 0.25)])
+
+        rows = self.run_query(metric='users', group_by=('type',), order_by='type', level_min=20, min_games=100)
+        self.assertEqual(rows, [{'item_type': 'WEAPON', 'users': 2}])
+
+        rows = self.run_query(top_count=1, group_by=('tier',))
+        self.assertEqual(rows, [{'tier': 'BRONZE', 'total_usage': 5}])
+
+    def test_unfiltered_popular_includes_unused(self):
+        rows = popular_items(limit=10)
+        self.assertEqual([(row['id'], row['total_usage']) for row in rows],
+                         [(self.sword.id, 35), (self.shield.id, 30), (self.unused.id, None)])
+        self.assertEqual(len(popular_items(tier='GOLD')), 2)
+
+    def test_compiled_sql_is_cached_per_shape(self):
+        first = aggregation.compiled_sql(aggregation.UsageQuery('item', tiers=('GOLD',), level_min=1))
+        second = aggregation.compiled_sql(aggregation.UsageQuery('item', tiers=('SILVER',), level_min=50))
+        self.assertIs(first, second)
+        # 필요 없는 조인 생략
+        by_tier = aggregation.compiled_sql(aggregation.UsageQuery('item', group_by=('tier',)))
+        self.assertNotIn('stats_item t', by_tier)
+        by_type = aggregation.compiled_sql(aggregation.UsageQuery('item', group_by=('type',)))
+        self.assertNotIn('stats_gameuser', by_type)
+        self.assertNotIn('stats_playerstats', by_type)
+        with self.assertRaises(aggregation.AggregationError):
+            aggregation.UsageQuery('item', metric='median')
+
+
+class OlapCubeTests(TestCase):
+    def setUp(self):
+        olap.clear()
+        sketches.clear_cache()
+        self.item = Item.objects.create(name='지팡이', item_type='WEAPON')
+        Item.objects.create(name='반지', item_type='ACCESSORY')
+        self.stats = []
+        for i, tier in enumerate(['GOLD', 'GOLD', 'MASTER']):
+            user = GameUser.objects.create(nickname=f'cube{i}', level=5 * (i + 1), tier=tier, ranking_score=i)
+            self.stats.append(PlayerStats.objects.create(user=user))
+        ingest_item_usage([(stats.id, self.item.id, 10) for stats in self.stats])
+
+    def test_cube_matches_sql(self):
+        cube = olap.get_cube()
+        self.assertEqual(olap.check_consistency(cube), [])
+        self.assertEqual(cube['item'].popular(), popular_items())
+        self.assertEqual(cube['item'].cell('GOLD', 'WEAPON'), (20, 2))
+        self.assertEqual(cube['item'].cell(), (30, 3))
+        self.assertEqual(cube.tier_stats()['GOLD']['avg_level'], 7.5)
+
+    def test_reloads_when_data_version_changes(self):
+        cube = olap.get_cube()
+        self.assertIs(olap.get_cube(), cube)
+
+        ingest_item_usage([(self.stats[2].id, self.item.id, 5)])
+        # 재생성 간격 안에서는 오래된 큐브 대신 SQL 경로
+        self.assertIsNone(olap.get_cube())
+        cube.built_at -= olap.REBUILD_INTERVAL
+        reloaded = olap.get_cube()
+        self.assertIsNot(reloaded, cube)
+        self.assertEqual(reloaded['item'].cell('MASTER'), (15, 1))
+
+
+class SharedSnapshotTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(SHARED_SNAPSHOT_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for module in (olap, shared, leaderboard, sketches):
+            self.addCleanup(getattr(module, 'clear', None) or module.clear_cache)
+
+        self.item = Item.objects.create(name='공유 검', item_type='WEAPON')
+        self.stats = []
+        for i, tier in enumerate(['GOLD', 'SILVER', 'GOLD']):
+            user = GameUser.objects.create(nickname=f'shared{i}', level=i + 1, tier=tier, ranking_score=10 * i)
+            self.stats.append(PlayerStats.objects.create(user=user))
+        ingest_item_usage([(stats.id, self.item.id, 2) for stats in self.stats])
+        leaderboard.take_snapshot()
+        self.forget_process_state()
+
+    def forget_process_state(self):
+        """다른 워커 프로세스처럼 프로세스 캐시 없이 시작"""
+        olap.clear()
+        leaderboard.clear_cache()
+        sketches.clear_cache()
+        shared.clear()
+
+    def test_workers_map_published_cube(self):
+        built = olap.get_cube()
+        self.assertIsNotNone(shared.current())
+
+        self.forget_process_state()
+        with self.assertNumQueries(1):
+            cube = olap.get_cube()
+        self.assertFalse(cube['item'].total.flags.writeable)
+        self.assertTrue(np.array_equal(cube['item'].users, built['item'].users))
+        self.assertEqual(cube['item'].popular(), built['item'].popular())
+        self.assertEqual(cube.tier_stats(), built.tier_stats())
+
+    def test_rank_snapshot_served_from_shared_file(self):
+        shared.publish()
+        expected = leaderboard.get_snapshot()
+        self.forget_process_state()
+        snapshot = leaderboard.get_snapshot()
+        self.assertFalse(snapshot.ids.flags.writeable)
+        self.assertEqual(snapshot.snapshot_date, expected.snapshot_date)
+        self.assertEqual(snapshot.ranks_for(expected.ids, 'GOLD').tolist(),
+                         expected.ranks_for(expected.ids, 'GOLD').tolist())
+
+    def test_new_version_swaps_without_breaking_old_readers(self):
+        old = olap.get_cube()
+        old_path = shared.current().path
+
+        ingest_item_usage([(self.stats[0].id, self.item.id, 5)])
+        old.built_at -= olap.REBUILD_INTERVAL
+        self.assertEqual(olap.get_cube()['item'].cell('GOLD'), (9, 2))
+        self.assertNotEqual(shared.current().path, old_path)
+
+        # 이전 버전을 매핑한 워커는 교체 전 배열을 그대로 읽음
+        self.forget_process_state()
+        self.assertEqual(shared.load_cube(old.token), None)
+        self.assertEqual(olap.get_cube()['item'].cell('GOLD'), (9, 2))
+        self.assertEqual(old['item'].cell('GOLD'), (4, 2))
+
+
+class ImpactTests(TestCase):
+    def test_user_and_non_user_win_rates(self):
+        impact.clear_cache()
+        sword = Item.objects.create(name='영향 검', item_type='WEAPON')
+        # (티어, 레벨, 승리, 게임 수, 검 사용 횟수)
+        players = [('GOLD', 10, 6, 10, 1), ('GOLD', 30, 30, 40, 3), ('GOLD', 20, 2, 10, None),
+                   ('GOLD', 20, 0, 0, None), ('SILVER', 5, 1, 10, 2)]
+        for i, (tier, level, wins, games, count) in enumerate(players):
+            user = GameUser.objects.create(nickname=f'impact{i}', level=level, tier=tier)
+            stats = PlayerStats.objects.create(user=user, wins=wins, total_games=games)
+            if count:
+                ItemUsage.objects.create(player_stats=stats, item=sword, usage_count=count)
+
+        gold = impact.get_table('item').rows('GOLD')
+        row = gold['results'][0]
+        self.assertEqual(gold['baseline_users'], 4)
+        self.assertEqual(gold['baseline_win_rate'], 63.3333)
+        self.assertEqual((row['users'], row['total_usage']), (2, 4))
+        self.assertEqual(row['avg_win_rate'], 67.5)
+        self.assertEqual(row['weighted_win_rate'], 72.0)
+        self.assertEqual(row['non_user_avg_win_rate'], 20.0)
+        self.assertEqual(row['usage_weighted_level'], 25.0)
+        self.assertEqual(row['lift'], 1.1368)
+
+        everyone = impact.get_table('item').rows()['results'][0]
+        self.assertEqual(everyone['users'], 3)
+        self.assertEqual(everyone['weighted_win_rate'], 61.6667)
+
+        # 데이터가 바뀌면 다시 계산
+        table = impact.get_table('item')
+        PlayerStats.objects.filter(user__nickname='impact0').get().save()
+        sketches.clear_cache()
+        self.assertIsNot(impact.get_table('item'), table)
+
+
+class IngestTests(TestCase):
+    def test_ingest_updates_usage_and_sketches(self):
+        user = GameUser.objects.create(nickname='ingest', level=10, tier='GOLD', ranking_score=100)
+        stats = PlayerStats.objects.create(user=user)
+        item = Item.objects.create(name='단검', item_type='WEAPON')
+
+        self.assertEqual(ingest_item_usage([(stats.id, item.id, 3), (stats.id, item.id, 4)]), 1)
+        ingest_item_usage([(stats.id, item.id, 5)])
+
+        self.assertEqual(ItemUsage.objects.get(player_stats=stats, item=item).usage_count, 12)
+        sketches.clear_cache()
+        for tier, item_type in (('GOLD', 'WEAPON'), ('GOLD', None), (None, 'WEAPON'), (None, None)):
+            self.assertEqual(sketches.approx_popular('item', tier, item_type)[0]['total_usage'], 12)
+        self.assertIsNone(sketches.approx_popular('item', 'BRONZE', 'WEAPON'))
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.addCleanup(sketches.clear_cache)
+        self.sword = Item.objects.create(name='보관 검', item_type='WEAPON')
+        self.shield = Item.objects.create(name='보관 방패', item_type='ARMOR')
+        self.skill = Skill.objects.create(name='보관 스킬', skill_type='ACTIVE')
+        self.users = []
+        for i in range(3):
+            user = GameUser.objects.create(nickname=f'archive{i}', level=10, tier='GOLD', ranking_score=i)
+            stats = PlayerStats.objects.create(user=user)
+            ItemUsage.objects.create(player_stats=stats, item=self.sword, usage_count=10 * (i + 1))
+            ItemUsage.objects.create(player_stats=stats, item=self.shield, usage_count=1)
+            SkillUsage.objects.create(player_stats=stats, skill=self.skill, usage_count=i + 1)
+            self.users.append(user)
+
+        # 앞의 두 명은 오래 전 활동, 그중 두 번째는 최근에 쓴 사용 기록이 남아 있음
+        old = timezone.now() - timedelta(days=200)
+        inactive = [user.pk for user in self.users[:2]]
+        GameUser.objects.filter(pk__in=inactive).update(updated_at=old)
+        ItemUsage.objects.filter(player_stats__user_id__in=inactive).update(last_used=old)
+        SkillUsage.objects.filter(player_stats__user_id__in=inactive).update(last_used=old)
+        ItemUsage.objects.filter(player_stats__user=self.users[1], item=self.shield).update(last_used=timezone.now())
+
+    def test_encode_round_trip(self):
+        moment = timezone.now().replace(microsecond=123456)
+        usages = {'item': [(7, 3, moment), (2, 1, moment - timedelta(days=3))], 'skill': []}
+        decoded = archive.decode_usages(archive.encode_usages(usages))
+        self.assertEqual(decoded, {'item': sorted(usages['item']), 'skill': []})
+
+    def test_archive_moves_only_fully_inactive_players(self):
+        chunks = list(archive.archive_inactive(days=90, chunk_size=1))
+        self.assertEqual([chunk[1:] for chunk in chunks], [(1, 1, 3), (1, 0, 0)])
+
+        stats = self.users[0].stats
+        self.assertFalse(ItemUsage.objects.filter(player_stats=stats).exists())
+        self.assertEqual(ArchivedUsage.objects.get().player_stats, stats)
+        self.assertTrue(ItemUsage.objects.filter(player_stats=self.users[1].stats).exists())
+        rows = popular_items()
+        self.assertEqual([(row['id'], row['total_usage']) for row in rows], [(self.sword.id, 50), (self.shield.id, 2)])
+
+    def test_detail_rehydrates_archived_usage(self):
+        list(archive.archive_inactive(days=90))
+        user = self.users[0]
+        batch = self.client.get(reverse('user-batch'), {'ids': str(user.pk)}).json()['results'][0]
+        self.assertTrue(ArchivedUsage.objects.exists())
+
+        detail = self.client.get(reverse('user-detail', kwargs={'pk': user.pk})).json()
+        self.assertFalse(ArchivedUsage.objects.exists())
+        self.assertEqual(ItemUsage.objects.filter(player_stats=user.stats).count(), 2)
+        self.assertEqual(sorted(usage['usage_count'] for usage in detail['stats']['item_usages']), [1, 10])
+        self.assertEqual(
+            sorted((usage['usage_count'], usage['last_used']) for usage in batch['stats']['item_usages']),
+            sorted((usage['usage_count'], usage['last_used']) for usage in detail['stats']['item_usages']),
+        )
+
+    def test_ingest_rehydrates_archived_player_first(self):
+        list(archive.archive_inactive(days=90))
+        user = self.users[0]
+        stale = ArchivedUsage.objects.get()
+        ingest_item_usage([(user.stats.id, self.sword.id, 1)])
+        self.assertFalse(ArchivedUsage.objects.exists())
+        self.assertEqual(ItemUsage.objects.get(player_stats=user.stats, item=self.sword).usage_count, 11)
+
+        detail = self.client.get(reverse('user-detail', kwargs={'pk': user.pk})).json()
+        self.assertEqual(sorted(usage['usage_count'] for usage in detail['stats']['item_usages']), [1, 11])
+
+        # 이미 복원된 보관 행을 다시 복원해도 두 번 더해지지 않음
+        self.assertEqual(archive.rehydrate(stale), 0)
+        self.assertEqual(ItemUsage.objects.get(player_stats=user.stats, item=self.sword).usage_count, 11)
+
+    def test_archive_keeps_players_used_after_candidate_check(self):
+        user = self.users[0]
+        cutoff = timezone.now() - timedelta(days=90)
+        real_take = archive.take_usages
+
+        def take_after_increment(stats_ids):
+            # 후보 확인과 트랜잭션 사이에 들어온 사용 기록
+            ingest_item_usage([(user.stats.id, self.sword.id, 1)])
+            return real_take(stats_ids)
+
+        with mock.patch.object(archive, 'take_usages', take_after_increment):
+            self.assertEqual(archive.archive_players([user.stats.id], cutoff), (0, 0))
+        self.assertFalse(ArchivedUsage.objects.exists())
+        self.assertEqual(ItemUsage.objects.get(player_stats=user.stats, item=self.sword).usage_count, 11)
+        self.assertEqual(ItemUsage.objects.filter(player_stats=user.stats).count(), 2)
+
+
+class PackedUsageTests(TestCase):
+    def setUp(self):
+        self.addCleanup(sketches.clear_cache)
+        self.items = [Item.objects.create(name=f'벡터 아이템{i}', item_type=item_type)
+                      for i, item_type in enumerate(['WEAPON', 'ARMOR', 'WEAPON'])]
+        self.skill = Skill.objects.create(name='벡터 스킬', skill_type='ACTIVE')
+        self.stats = []
+        for i, tier in enumerate(['GOLD', 'SILVER', 'GOLD']):
+            user = GameUser.objects.create(nickname=f'packed{i}', level=10, tier=tier, ranking_score=i)
+            stats = PlayerStats.objects.create(user=user)
+            for item, count in zip(self.items, [3 * i + 1, 0, i * 2]):
+                if i or count:
+                    ItemUsage.objects.create(player_stats=stats, item=item, usage_count=count)
+            SkillUsage.objects.create(player_stats=stats, skill=self.skill, usage_count=i + 1)
+            self.stats.append(stats)
+
+    def snapshot(self):
+        """저장 방식과 무관해야 하는 집계 결과"""
+        sketches.clear_cache()
+        olap_cube = olap.build_entity('item')
+        sketches.rebuild_topk('item')
+        rebuild_rollups('item')
+        return {
+            'cube': [olap_cube.popular(tier) for tier in (None, 'GOLD', 'SILVER')],
+            'users': olap_cube.cell(),
+            'popular': [popular_items(tier) for tier in (None, 'GOLD', 'BRONZE')],
+            'topk': sketches.approx_popular('item', 'GOLD', 'WEAPON'),
+            'rollup': sorted(read_rollup('item', 'GOLD')),
+        }
+
+    def test_vector_round_trip(self):
+        moment = timezone.now()
+        rows = [(3, 7, moment), (1, 0, moment - timedelta(days=1))]
+        counts, times = packed.encode_vector(rows)
+        self.assertEqual(len(counts), 3 * packed.COUNT_DTYPE.itemsize)
+        self.assertEqual(len(packed.encode_vector(rows, width=5)[0]), 5 * packed.COUNT_DTYPE.itemsize)
+        # 사용 횟수 0인 행도 유지
+        self.assertEqual(packed.decode_vector(counts, times), sorted(rows))
+
+    def test_pack_keeps_aggregates_and_round_trips(self):
+        before = self.snapshot()
+        rows = sorted(ItemUsage.objects.values_list('player_stats_id', 'item_id', 'usage_count', 'last_used'))
+
+        self.assertEqual(sum(moved for _, _, moved in packed.convert('packed', chunk_size=2)), 10)
+        self.assertFalse(ItemUsage.objects.exists())
+        self.assertEqual(PackedUsage.objects.count(), 3)
+        with override_settings(USAGE_STORAGE='packed'):
+            self.assertEqual(self.snapshot(), before)
+
+        list(packed.convert('rows'))
+        self.assertFalse(PackedUsage.objects.exists())
+        self.assertEqual(sorted(ItemUsage.objects.values_list(
+            'player_stats_id', 'item_id', 'usage_count', 'last_used')), rows)
+
+    def aggregates(self):
+        """집계 엔진/상위 랭커/영향 분석 — 저장 방식과 무관해야 함"""
+        queries = [
+            aggregation.UsageQuery('item'),
+            aggregation.UsageQuery('item', group_by=('tier',), metric='users'),
+            aggregation.UsageQuery('item', group_by=('type', 'tier'), metric='avg_per_user', order_by='tier'),
+            aggregation.UsageQuery('item', tiers=('GOLD',), types=('WEAPON',), metric='tier_share'),
+            aggregation.UsageQuery('item', top_count=2, min_games=0, level_min=5, metric='users'),
+            aggregation.UsageQuery('skill', group_by=('tier', 'object'), score_max=1),
+        ]
+        return {
+            'usage': [aggregation.run(query) for query in queries],
+            'top_players': top_players_items(2),
+            'impact': impact.build('item').rows(min_users=1),
+        }
+
+    def test_aggregation_engine_reads_vectors(self):
+        before = self.aggregates()
+        with override_settings(USAGE_STORAGE='packed'):
+            # 전환 중 (첫 유저만 벡터) / 전환 후
+            packed.pack_players([self.stats[0].id])
+            self.assertEqual(self.aggregates(), before)
+            list(packed.convert('packed'))
+            self.assertFalse(ItemUsage.objects.exists())
+            self.assertEqual(self.aggregates(), before)
+
+    @override_settings(USAGE_STORAGE='packed')
+    def test_ingest_before_conversion_keeps_one_layout(self):
+        # 변환 전 적재: 남은 행은 벡터로 옮긴 뒤 더하고, 보관된 유저는 복원해서 벡터로
+        archive.archive_players([self.stats[2].id], timezone.now() + timedelta(days=1))
+        ingest_item_usage([(self.stats[1].id, self.items[0].id, 2), (self.stats[2].id, self.items[0].id, 3)])
+
+        self.assertFalse(ItemUsage.objects.filter(player_stats__in=self.stats[1:]).exists())
+        self.assertFalse(SkillUsage.objects.filter(player_stats__in=self.stats[1:]).exists())
+        self.assertFalse(ArchivedUsage.objects.exists())
+        users = {row['id']: row['users'] for row in aggregation.run(aggregation.UsageQuery('item', metric='users'))}
+        self.assertEqual(users[self.items[0].id], 3)
+        totals = {row['id']: row['total_usage'] for row in aggregation.run(aggregation.UsageQuery('item'))}
+        self.assertEqual(totals[self.items[0].id], 1 + 4 + 2 + 7 + 3)
+        silver = impact.build('item').rows('SILVER', min_users=1)
+        self.assertEqual(silver['baseline_users'], 1)
+        self.assertEqual({row['id']: row['users'] for row in silver['results']}[self.items[0].id], 1)
+
+        detail = self.client.get(reverse('user-detail', kwargs={'pk': self.stats[1].user_id})).json()
+        self.assertEqual({usage['item']['id']: usage['usage_count'] for usage in detail['stats']['item_usages']},
+                         {self.items[0].id: 6, self.items[1].id: 0, self.items[2].id: 2})
+
+        # 행과 벡터가 함께 남은 유저(이전 버전)도 변환하면 벡터 하나로 합쳐짐
+        PackedUsage.objects.create(player_stats=self.stats[0], **packed.encode_usages({
+            'item': [(self.items[2].id, 5, timezone.now())]}))
+        list(packed.convert('packed'))
+        self.assertFalse(ItemUsage.objects.exists())
+        totals = {row['id']: row['total_usage'] for row in aggregation.run(aggregation.UsageQuery('item'))}
+        self.assertEqual(totals[self.items[2].id], 5 + 2 + 4)
+
+    @override_settings(USAGE_STORAGE='packed')
+    def test_ingest_and_detail_in_packed_mode(self):
+        list(packed.convert('packed'))
+        stats = self.stats[1]
+        detail_before = self.client.get(reverse('user-detail', kwargs={'pk': stats.user_id})).json()
+
+        ingest_item_usage([(stats.id, self.items[1].id, 5), (self.stats[0].id, self.items[2].id, 2)])
+        self.assertFalse(ItemUsage.objects.exists())
+        self.assertEqual(packed.tier_totals('item')[0][packed.TIERS.index('GOLD'), self.items[2].id - 1], 6)
+
+        detail = self.client.get(reverse('user-detail', kwargs={'pk': stats.user_id})).json()
+        batch = self.client.get(reverse('user-batch'), {'ids': str(stats.user_id)}).json()['results'][0]
+        self.assertEqual(detail, batch)
+        self.assertEqual(detail.keys(), detail_before.keys())
+        self.assertEqual([(usage['item']['id'], usage['usage_count']) for usage in detail['stats']['item_usages']],
+                         [(self.items[0].id, 4), (self.items[1].id, 5), (self.items[2].id, 2)])
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.job = scheduler.Job('test-job', lambda since: self.calls.append(since) or 7, interval=60,
+                                 datasets=(versions.USERS,))
+
+    def test_lock_prevents_overlap(self):
+        self.assertTrue(scheduler.acquire('test-job', 'other', 60))
+        self.assertEqual(scheduler.run_job(self.job, 'me').status, 'locked')
+        self.assertEqual(self.calls, [])
+
+        # 잠금이 만료되면 다른 프로세스가 가져감
+        JobState.objects.filter(name='test-job').update(locked_until=timezone.now() - timedelta(seconds=1))
+        result = scheduler.run_job(self.job, 'me')
+        self.assertEqual((result.status, result.processed), ('ok', 7))
+        state = JobState.objects.get(name='test-job')
+        self.assertEqual((state.locked_by, state.locked_until, state.runs, state.last_processed), ('', None, 1, 7))
+        self.assertGreater(state.next_run_at, timezone.now() + timedelta(seconds=50))
+
+    def test_skips_when_data_unchanged(self):
+        self.assertEqual(scheduler.run_job(self.job, 'me').status, 'ok')
+        self.assertEqual(scheduler.run_job(self.job, 'me').status, 'skipped')
+        self.assertEqual(scheduler.run_job(self.job, 'me', force=True).status, 'ok')
+        versions.bump(versions.USERS)
+        self.assertEqual(scheduler.run_job(self.job, 'me').status, 'ok')
+        # 지켜보지 않는 데이터셋 변경은 무시
+        versions.bump(versions.USAGE)
+        self.assertEqual(scheduler.run_job(self.job, 'me').status, 'skipped')
+
+        state = JobState.objects.get(name='test-job')
+        self.assertEqual((state.runs, state.skips, state.failures), (3, 2, 0))
+        self.assertEqual(self.calls, [None, None, None])
+
+    def test_failure_is_recorded(self):
+        job = scheduler.Job('broken', lambda since: 1 / 0, interval=60)
+        result = scheduler.run_job(job, 'me')
+        self.assertEqual(result.status, 'error')
+        state = JobState.objects.get(name='broken')
+        self.assertEqual((state.failures, state.last_status, state.locked_by), (1, 'error', ''))
+        self.assertIn('ZeroDivisionError', state.last_error)
+
+    def test_incremental_rollups(self):
+        old = timezone.now() - timedelta(days=1)
+        items = [Item.objects.create(name=f'롤업 아이템{i}', item_type='WEAPON') for i in range(2)]
+        user = GameUser.objects.create(nickname='rollup', level=10, tier='GOLD', ranking_score=1)
+        stats = PlayerStats.objects.create(user=user)
+        for item in items:
+            ItemUsage.objects.create(player_stats=stats, item=item, usage_count=3)
+        ItemUsage.objects.update(last_used=old)
+        GameUser.objects.update(updated_at=old)
+
+        job = scheduler.JOBS['rollups']
+        first = scheduler.run_job(job, 'me')
+        self.assertEqual((first.status, first.incremental, first.processed), ('ok', False, 2))
+        watermark = JobState.objects.get(name='rollups').watermark
+        self.assertIsNotNone(watermark)
+
+        ingest_item_usage([(stats.id, items[1].id, 5)])
+        second = scheduler.run_job(job, 'me')
+        # 바뀐 아이템 하나만 다시 계산
+        self.assertEqual((second.status, second.incremental, second.processed), ('ok', True, 1))
+        self.assertEqual(read_rollup('item', 'GOLD'), [(items[1].id, 8), (items[0].id, 3)])
+        self.assertGreater(JobState.objects.get(name='rollups').watermark, watermark)
+
+    def test_rollups_run_full_after_delete(self):
+        item = Item.objects.create(name='삭제 롤업 아이템', item_type='WEAPON')
+        for i in range(2):
+            user = GameUser.objects.create(nickname=f'rollup-delete{i}', level=10, tier='GOLD', ranking_score=i)
+            ItemUsage.objects.create(player_stats=PlayerStats.objects.create(user=user), item=item, usage_count=4)
+        job = scheduler.JOBS['rollups']
+        scheduler.run_job(job, 'me')
+        self.assertEqual(read_rollup('item', 'GOLD'), [(item.id, 8)])
+
+        # 삭제된 행은 since 이후 바뀐 행으로 잡히지 않으므로 다음 실행은 전체
+        user.delete()
+        self.assertIsNone(JobState.objects.get(name='rollups').watermark)
+        result = scheduler.run_job(job, 'me')
+        self.assertEqual((result.status, result.incremental), ('ok', False))
+        self.assertEqual(read_rollup('item', 'GOLD'), [(item.id, 4)])
+
+
+class SimilarityTests(TestCase):
+    def setUp(self):
+        similarity.clear()
+        sketches.clear_cache()
+        self.addCleanup(similarity.clear)
+        self.items = [Item.objects.create(name=f'유사 아이템{i}', item_type='WEAPON') for i in range(3)]
+        self.stats = {}
+        old = timezone.now() - timedelta(days=1)
+        for name, tier, level, score, win_rate, counts in [
+            ('a', 'GOLD', 10, 100, 50.0, (5, 5, 0)),
+            ('b', 'GOLD', 11, 110, 52.0, (6, 4, 0)),
+            ('c', 'GOLD', 50, 900, 70.0, (0, 0, 10)),
+            ('d', 'SILVER', 10, 100, 50.0, (5, 5, 0)),
+            ('e', 'SILVER', 30, 400, 40.0, (0, 3, 3)),
+        ]:
+            user = GameUser.objects.create(nickname=f'similar-{name}', level=level, tier=tier, ranking_score=score)
+            self.stats[name] = PlayerStats.objects.create(user=user, win_rate=win_rate)
+            for item, count in zip(self.items, counts):
+                if count:
+                    ItemUsage.objects.create(player_stats=self.stats[name], item=item, usage_count=count)
+        ItemUsage.objects.update(last_used=old)
+
+    def user_id(self, name):
+        return self.stats[name].user_id
+
+    def test_blocked_search_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        rows = 500
+        ids = rng.permutation(rows).astype(np.int64) + 1
+        tiers = np.sort(rng.integers(0, len(similarity.TIERS), rows)).astype(np.int8)
+        now = timezone.now()
+        index = similarity.SimilarityIndex(None, ids, tiers, ids, rng.normal(size=(rows, 8)).astype(np.float32),
+                                           {}, np.zeros(3), np.ones(3), now, now)
+        own = np.array([3, 100, 499])
+        queries = index.matrix[own].astype(np.float64)
+
+        # 블록 경계에서 합치는 경로까지
+        with mock.patch.object(similarity, 'BLOCK_ROWS', 64):
+            for metric in similarity.METRICS:
+                for tier in (None, 'GOLD'):
+                    positions, scores = index.search(queries, 7, metric, tier, exclude=own)
+                    start, stop = index.bounds(tier)
+                    for query, position, got, got_scores in zip(queries, own, positions, scores):
+                        candidates = np.array([row for row in range(start, stop) if row != position])
+                        block = index.matrix[candidates].astype(np.float64)
+                        if metric == 'cosine':
+                            values = -(block @ query) / (np.linalg.norm(block, axis=1) * np.linalg.norm(query))
+                        else:
+                            values = np.linalg.norm(block - query, axis=1)
+                        best = np.argsort(values, kind='stable')[:7]
+                        self.assertEqual(got.tolist(), candidates[best].tolist(), (metric, tier))
+                        np.testing.assert_allclose(np.abs(got_scores), np.abs(values[best]), rtol=1e-4)
+
+    def test_similar_players_and_tier_partition(self):
+        index = similarity.get_index()
+        self.assertEqual(len(index), 5)
+        self.assertIs(similarity.get_index(), index)
+
+        neighbours = index.similar(self.user_id('a'), k=10)
+        self.assertEqual([user_id for user_id, _ in neighbours][:2], [self.user_id('d'), self.user_id('b')])
+        self.assertAlmostEqual(neighbours[0][1], 1.0, places=5)
+        self.assertNotIn(self.user_id('a'), [user_id for user_id, _ in neighbours])
+        self.assertEqual(len(neighbours), 4)
+
+        gold = index.similar(self.user_id('a'), k=10, metric='l2', tier='GOLD')
+        self.assertEqual([user_id for user_id, _ in gold], [self.user_id('b'), self.user_id('c')])
+        self.assertLess(gold[0][1], gold[1][1])
+        self.assertIsNone(index.similar(0))
+
+        response = self.client.get(reverse('user-similar', kwargs={'pk': self.user_id('a')}), {'k': 1, 'tier': 'same'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tier'], 'GOLD')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.user_id('b')])
+        self.assertIn('similarity', response.data['results'][0])
+
+    def test_incremental_refresh_matches_full_build(self):
+        index = similarity.build()
+        ingest_item_usage([(self.stats['c'].id, self.items[0].id, 20)])
+        user = GameUser.objects.create(nickname='similar-f', level=20, tier='GOLD', ranking_score=300)
+        stats = PlayerStats.objects.create(user=user, win_rate=55.0)
+        ItemUsage.objects.create(player_stats=stats, item=self.items[2], usage_count=4)
+        self.stats['b'].user.delete()
+
+        with mock.patch.object(similarity, 'REBUILD_FRACTION', 1.0), \
+                mock.patch.object(similarity, '_usage_entries', wraps=similarity._usage_entries) as entries:
+            refreshed = similarity.refresh(index)
+        # 사용 기록이 바뀐 유저와 새 유저만 다시 읽음
+        for call in entries.call_args_list:
+            self.assertEqual(sorted(call.args[1].tolist()), sorted([self.stats['c'].id, stats.id]))
+
+        full = similarity.build()
+        self.assertEqual(refreshed.ids.tolist(), full.ids.tolist())
+        self.assertNotIn(self.user_id('b'), refreshed.ids.tolist())
+        np.testing.assert_allclose(refreshed.matrix, full.matrix, rtol=1e-6)
+        self.assertEqual(refreshed.full_at, index.full_at)
+
+    def test_saved_index_is_memory_mapped(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(SIMILARITY_DIR=directory.name):
+            built = similarity.get_index()
+            similarity.clear()
+            sketches.clear_cache()
+            # 다른 워커: 데이터 버전 확인만 하고 저장된 배열을 매핑
+            with self.assertNumQueries(1):
+                index = similarity.get_index()
+            self.assertIsNot(index, built)
+            self.assertFalse(index.matrix.flags.writeable)
+            self.assertEqual(index.similar(self.user_id('a')), built.similar(self.user_id('a')))
+            self.assertIsNone(similarity.load(((versions.USAGE, 0, None),)))
+
+
+
+class DatasetTests(TestCase):
+    USERS = 30
+
+    @classmethod
+    def setUpClass(cls):
+        # 데이터셋 적재는 트랜잭션 밖에서 (TestCase의 클래스 트랜잭션보다 먼저)
+        cls.directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(DATASET_DIR=cls.directory))
+        cls.dataset = cls.enterClassContext(datasets.loaded(cls.USERS, seed=3))
+        super().setUpClass()
+
+    def test_build_manifest_and_load(self):
+        manifest = self.dataset.manifest
+        self.assertEqual(manifest['users'], self.USERS)
+        self.assertEqual(manifest['schema_version'], datasets.schema_version())
+        self.assertEqual(manifest['rows']['stats_gameuser'], self.USERS)
+        self.assertEqual(self.dataset.problems(verify=True), [])
+
+        # 적재한 작업 DB가 데이터셋과 같은 행
+        self.assertEqual(GameUser.objects.count(), self.USERS)
+        self.assertEqual(ItemUsage.objects.count(), manifest['rows']['stats_itemusage'])
+        with self.assertRaises(RuntimeError):
+            datasets.load(self.dataset)
+
+    def test_cached_dataset_is_reused(self):
+        with mock.patch.object(datasets, 'build') as build:
+            dataset = datasets.get(self.USERS, seed=3, verify=True)
+        build.assert_not_called()
+        self.assertEqual(dataset.content_hash, self.dataset.content_hash)
+        self.assertEqual([found.name for found in datasets.available()], [self.dataset.name])
+
+    def test_tampered_or_stale_dataset_is_rejected(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        copy = datasets.Dataset(Path(directory.name) / self.dataset.name, self.dataset.manifest)
+        shutil.copytree(self.dataset.path, copy.path)
+        path = copy.file('default')
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        # 크기가 같으면 평소에는 통과, verify에서만 내용 해시로 잡힘
+        self.assertEqual(copy.problems(), [])
+        self.assertIn('db.sqlite3 내용 해시 불일치', copy.problems(verify=True))
+
+        with mock.patch.object(datasets, 'schema_version', return_value='changed'), \
+                mock.patch.object(datasets, 'build') as build:
+            self.assertIn('스키마 버전 불일치 (마이그레이션이 바뀜)', self.dataset.problems())
+            datasets.get(self.USERS, seed=3)
+        build.assert_called_once_with(self.USERS, 3, mock.ANY)
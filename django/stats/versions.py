@@ -0,0 +1,59 @@
+"""데이터 버전 — 파생 캐시(OLAP 큐브 등)가 원본 변경을 알아채는 기준
+
+데이터셋 이름마다 DataVersion 한 행을 두고 쓰기 경로에서 bump() 합니다.
+- 사용 기록: ItemUsage/SkillUsage 신호, ingest_usage(), 대량 생성/초기화
+- 유저: GameUser 신호, 대량 생성/초기화
+- 전적: PlayerStats 신호, 대량 생성/초기화
+token()은 모든 행의 (버전, 갱신 시각)이라 테스트 롤백 등으로 버전 숫자가 되돌아가도 구분됩니다.
+"""
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+from .sketches import cached, forget
+
+USAGE = 'usage'
+USERS = 'users'
+STATS = 'stats'
+
+
+def bump(*names):
+    """데이터셋 버전 증가 (없으면 생성)"""
+    now = timezone.now()
+    for name in names:
+        if not DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now):
+            DataVersion.objects.get_or_create(name=name, defaults={'version': 1})
+    # 이 프로세스는 바로 새 버전을 보도록
+    forget('versions')
+
+
+def token(fresh=False):
+    """현재 데이터 버전 토큰 (프로세스 캐시, CACHE_SECONDS 동안 재사용)"""
+    if fresh:
+        forget('versions')
+    return cached('versions', lambda: tuple(
+        DataVersion.objects.order_by('name').values_list('name', 'version', 'updated_at')
+    ))
+
+
+def digest(value=None):
+    """토큰의 짧은 해시 (캐시 키, 공유 스냅샷 파일 버전용)"""
+    value = token() if value is None else value
+    return hashlib.md5(repr(value).encode()).hexdigest()[:12]
+
+
+def bump_usage(sender, **kwargs):
+    """ItemUsage/SkillUsage post_save/post_delete"""
+    bump(USAGE)
+
+
+def bump_users(sender, **kwargs):
+    """GameUser post_save/post_delete (티어가 바뀌면 사용 기록 집계도 바뀜)"""
+    bump(USERS)
+
+
+def bump_stats(sender, **kwargs):
+    """PlayerStats post_save/post_delete (승률 영향 분석)"""
+    bump(STATS)
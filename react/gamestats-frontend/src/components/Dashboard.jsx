@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getTierStats, getTopRankers } from '../services/api';
+import { getTierStats, getTopRankers, isCanceled } from '../services/api';
 import { PieChart, Pie, Cell, ResponsiveContainer, Legend, Tooltip } from 'recharts';
 
 const Dashboard = () => {
@@ -8,22 +8,26 @@ const Dashboard = () => {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
+        // 화면을 떠나면 진행 중 요청 취소, 오래된 캐시를 먼저 보여준 뒤 재검증 결과로 교체
+        const controller = new AbortController();
         const fetchData = async () => {
             try{
                 const [tierRes, rankerRes] = await Promise.all([
-                    getTierStats(),
-                    getTopRankers(10)
+                    getTierStats({signal: controller.signal, onUpdate: (res) => setTierStats(res.data)}),
+                    getTopRankers(10, 'ALL', {signal: controller.signal, onUpdate: (res) => setTopRankers(res.data)})
                 ]);
                 setTierStats(tierRes.data);
                 setTopRankers(rankerRes.data);
                 setLoading(false);
             }
             catch (error){
+                if (isCanceled(error)) return;
                 console.error('데이터 로딩 실패:', error);
                 setLoading(false);
             }
         };
         fetchData();
+        return () => controller.abort();
     }, []);
 
     if(loading){
@@ -1,5 +1,5 @@
 import React, {useEffect, useState} from 'react';
-import { getPopularItems, getTopPlayerItems } from '../services/api';
+import { getPopularItems, getTopPlayerItems, isCanceled } from '../services/api';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
 const ItemAnalysis = () => {
@@ -13,6 +13,8 @@ const ItemAnalysis = () => {
     const tiers = ['ALL', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'DIAMOND', 'MASTER', 'GRANDMASTER'];
 
     useEffect(() => {
+        // 필터가 바뀌면 이전 필터의 요청 취소
+        const controller = new AbortController();
         const fetchData = async() =>{
             setLoading(true);
             try{
@@ -21,8 +23,8 @@ const ItemAnalysis = () => {
                 if(tier !== 'ALL') params.tier = tier;
 
                 const [popularRes, topPlayerRes] = await Promise.all([
-                   getPopularItems(params),
-                   getTopPlayerItems(10) 
+                   getPopularItems(params, {signal: controller.signal, onUpdate: (res) => setPopularItems(res.data)}),
+                   getTopPlayerItems(10, {signal: controller.signal, onUpdate: (res) => setTopPlayerItems(res.data.items)})
                 ]);
 
                 setPopularItems(popularRes.data);
@@ -31,11 +33,13 @@ const ItemAnalysis = () => {
 
             }
             catch(error){
+                if (isCanceled(error)) return;
                 console.error('아이템 데이터 로딩 실패:', error);
                 setLoading(false);
             }
         };
         fetchData();
+        return () => controller.abort();
     }, [itemType, tier]);
 
     if (loading){
@@ -1,5 +1,5 @@
 import React, {useEffect, useState} from 'react';
-import { getTopRankers } from '../services/api';
+import { applyLeaderboardDiff, getTopRankers, isCanceled, subscribeLeaderboard } from '../services/api';
 
 const RankingTable = () => {
     const [users, setUsers] = useState([]);
@@ -10,19 +10,38 @@ const RankingTable = () => {
     const tiers = ['ALL', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'DIAMOND', 'MASTER', 'GRANDMASTER'];
 
     useEffect(() => {
+        // 필터가 바뀌면 이전 필터의 요청 취소
+        const controller = new AbortController();
         const fetchRankers = async () => {
             setLoading(true);
             try{
-                const response = await getTopRankers(limit, selectedTier);
+                const response = await getTopRankers(limit, selectedTier, {
+                    signal: controller.signal,
+                    onUpdate: (res) => setUsers(res.data),
+                });
                 setUsers(response.data);
                 setLoading(false);
             }
             catch(error){
+                if (isCanceled(error)) return;
                 console.error('랭킹 데이터 로딩 실패:', error);
                 setLoading(false);
             }
         };
         fetchRankers();
+        // 이후 변화는 SSE diff로 반영 (top_rankers 전체를 다시 받지 않음)
+        const unsubscribe = subscribeLeaderboard(limit, selectedTier, {
+            onSnapshot: (rows) => {
+                controller.abort();
+                setUsers(rows);
+                setLoading(false);
+            },
+            onDiff: (diff) => setUsers((current) => applyLeaderboardDiff(current, diff)),
+        });
+        return () => {
+            controller.abort();
+            unsubscribe();
+        };
     }, [limit, selectedTier]);
 
     // 티어 필터링
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { getPopularSkills, getTopPlayerSkills } from '../services/api';
+import { getPopularSkills, getTopPlayerSkills, isCanceled } from '../services/api';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell} from 'recharts';
 
 const SkillAnalysis = () => {
@@ -13,6 +13,8 @@ const SkillAnalysis = () => {
     const tiers = ['ALL', 'BRONZE', 'SILVER', 'GOLD', 'PLATINUM', 'DIAMOND', 'MASTER', 'GRANDMASTER'];
 
     useEffect(() => {
+        // 필터가 바뀌면 이전 필터의 요청 취소
+        const controller = new AbortController();
         const fetchData = async () =>{
             setLoading(true);
             try{
@@ -21,8 +23,8 @@ const SkillAnalysis = () => {
                 if(tier !== 'ALL') params.tier = tier;
 
                 const [popularRes, topPlayerRes] = await Promise.all([
-                    getPopularSkills(params),
-                    getTopPlayerSkills(10)
+                    getPopularSkills(params, {signal: controller.signal, onUpdate: (res) => setPopularSkills(res.data)}),
+                    getTopPlayerSkills(10, {signal: controller.signal, onUpdate: (res) => setTopPlayerSkills(res.data.skills)})
                 ]);
                 
                 setPopularSkills(popularRes.data);
@@ -30,11 +32,13 @@ const SkillAnalysis = () => {
                 setLoading(false);
             }
             catch (error) {
+                if (isCanceled(error)) return;
                 console.error('스킬 데이터 로딩 실패:', error);
                 setLoading(false);
             }
         };
         fetchData();
+        return () => controller.abort();
     }, [skillType, tier]);
 
     if(loading){
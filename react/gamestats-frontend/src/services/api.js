@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { cachedGet } from './requestCache';
 
 const API_BASE_URL = 'http://127.0.0.1:8000/api';
 
@@ -9,46 +10,149 @@ const api = axios.create({
     },
 });
 
+// GET은 requestCache를 거침 (URL별 캐시, 진행 중 요청 합치기, stale-while-revalidate, ETag)
+// options: { signal, onUpdate, force } — 필터가 바뀌면 signal로 취소, onUpdate로 재검증된 응답 수신
+const get = (url, options = {}) => cachedGet(api, url, options);
+
 // 유저 관련 API
-export const getUsers = (page = 1) => api.get(`/users/?page=${page}`);
-export const getUserDetail = (id) => api.get(`/users/${id}/`);
-export const getTopRankers = (limit = 100, tier = 'ALL') =>{
+export const getUsers = (page = 1, options) => get(`/users/?page=${page}`, options);
+export const getUserDetail = (id, options) => get(`/users/${id}/`, options);
+// 여러 유저 상세 한 번에 (긴 목록은 URL 길이 제한을 피해 POST)
+export const getUsersBatch = (ids, options = {}) =>
+    ids.length > 100
+        ? api.post('/users/batch/', { ids }, { signal: options.signal })
+        : get('/users/batch/', { ...options, params: { ids: ids.join(',') } });
+export const searchUsers = (q, limit = 20, options = {}) =>
+    get('/users/search/', { ...options, params: { q, limit } });
+export const getTopRankers = (limit = 100, tier = 'ALL', options) =>{
     let url = `/users/top_rankers/?limit=${limit}`;
     if(tier && tier !== 'ALL'){
         url += `&tier=${tier}`;
     }
-    return api.get(url);
+    return get(url, options);
+};
+export const getTierStats = (options) => get('/users/tier_stats/', options);
+export const getRankChanges = (limit = 100, tier = 'ALL', days = 1, offset = 0, options) => {
+    let url = `/users/rank_changes/?limit=${limit}&days=${days}&offset=${offset}`;
+    if(tier && tier !== 'ALL'){
+        url += `&tier=${tier}`;
+    }
+    return get(url, options);
+};
+export const getRankMovers = (days = 1, direction = 'up', limit = 20, options) =>
+    get(`/users/rank_movers/?days=${days}&direction=${direction}&limit=${limit}`, options);
+// 비슷한 플레이어 (metric: cosine | l2, tier: ALL | same | 티어 코드)
+export const getSimilarUsers = (id, {k = 10, metric = 'cosine', tier = 'ALL'} = {}, options = {}) =>
+    get(`/users/${id}/similar/`, { ...options, params: { k, metric, tier } });
+
+// 실시간 랭킹 (SSE, ASGI 서버에서만) — 접속 시 snapshot(상위 N 전체), 이후 diff만 수신
+// 끊기면 EventSource가 Last-Event-ID로 재접속해 놓친 diff를 이어 받음, 반환값을 호출하면 구독 해제
+export const subscribeLeaderboard = (limit = 100, tier = 'ALL', {onSnapshot, onDiff, onClose} = {}) => {
+    if (typeof EventSource === 'undefined') return () => {};
+    let url = `${API_BASE_URL}/live/leaderboard/?limit=${limit}`;
+    if (tier && tier !== 'ALL') {
+        url += `&tier=${tier}`;
+    }
+    const source = new EventSource(url);
+    source.addEventListener('snapshot', (e) => onSnapshot?.(JSON.parse(e.data).users));
+    source.addEventListener('diff', (e) => onDiff?.(JSON.parse(e.data)));
+    // WSGI 서버(501) 등으로 재접속을 포기한 경우
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) onClose?.();
+    };
+    return () => source.close();
+};
+
+// diff(entered/exited/moved/updated)를 순위(rank) 순 유저 목록에 반영
+export const applyLeaderboardDiff = (users, diff) => {
+    const exited = new Set(diff.exited);
+    const byId = new Map(users.filter((user) => !exited.has(user.id)).map((user) => [user.id, {...user}]));
+    diff.updated.forEach((row) => {
+        const user = byId.get(row.id);
+        if (user) Object.assign(user, row);
+    });
+    diff.moved.forEach(([id, rank]) => {
+        const user = byId.get(id);
+        if (user) user.rank = rank;
+    });
+    diff.entered.forEach((row) => byId.set(row.id, row));
+    return [...byId.values()].sort((a, b) => a.rank - b.rank);
 };
-export const getTierStats = () => api.get('/users/tier_stats/');
 
 // 아이템 관련 API
-export const getItems = () => api.get('/items/');
-export const getPopularItems = (params = {}) => {
+export const getItems = (options) => get('/items/', options);
+export const getPopularItems = (params = {}, options) => {
 
-    const { type, tier, limit = 10 } = params;
+    const { type, tier, limit = 10, approx } = params;
     let url = `/items/popular_items/?limit=${limit}`;
     if (type) url += `&type=${type}`;
     if (tier) url += `&tier=${tier}`;
-    return api.get(url);
+    // 근사 모드 (Top-K 스케치, total_usage는 추정값 + error)
+    if (approx) url += `&approx=1`;
+    return get(url, options);
 
 };
 
+// 아이템 사용자 vs 미사용자 승률 / lift (tier별)
+export const getItemImpact = (params = {}, options) => {
+
+    const {tier, minUsers = 30, orderBy = '-lift', limit = 20} = params;
+    let url = `/items/impact/?min_users=${minUsers}&order_by=${orderBy}&limit=${limit}`;
+    if (tier) url += `&tier=${tier}`;
+    return get(url, options);
+};
+
 // 스킬 관련 API
-export const getSkills = () => api.get('/skills/');
-export const getPopularSkills = (params = {}) => {
+export const getSkills = (options) => get('/skills/', options);
+export const getPopularSkills = (params = {}, options) => {
 
-    const {type, tier, limit = 10} = params;
+    const {type, tier, limit = 10, approx} = params;
     let url = `/skills/popular_skills/?limit=${limit}`;
     if (type) url += `&type=${type}`;
     if (tier) url += `&tier=${tier}`;
-    return api.get(url);
+    if (approx) url += `&approx=1`;
+    return get(url, options);
+
+};
+
+export const getSkillImpact = (params = {}, options) => {
 
+    const {tier, minUsers = 30, orderBy = '-lift', limit = 20} = params;
+    let url = `/skills/impact/?min_users=${minUsers}&order_by=${orderBy}&limit=${limit}`;
+    if (tier) url += `&tier=${tier}`;
+    return get(url, options);
 };
 
 // 통계 관련 API
-export const getTopPlayerItems = (topPercent = 10) =>
-    api.get(`/stats/top_players_items/?top_percent=${topPercent}`);
-export const getTopPlayerSkills = (topPercent = 10) =>
-    api.get(`/stats/top_players_skills/?top_percent=${topPercent}`);
+export const getTopPlayerItems = (topPercent = 10, options) =>
+    get(`/stats/top_players_items/?top_percent=${topPercent}`, options);
+export const getTopPlayerSkills = (topPercent = 10, options) =>
+    get(`/stats/top_players_skills/?top_percent=${topPercent}`, options);
+// 사용량 다차원 집계 — tier/type/groupBy는 배열, metric: total_usage | users | avg_per_user | tier_share
+export const getUsage = (params = {}, options) => {
+
+    const {entity = 'item', tier = [], type = [], groupBy = [], ...rest} = params;
+    const query = new URLSearchParams({entity});
+    if (tier.length) query.append('tier', tier.join(','));
+    if (type.length) query.append('type', type.join(','));
+    if (groupBy.length) query.append('group_by', groupBy.join(','));
+    // level_min, level_max, score_min, score_max, min_games, top_count, metric, order_by, limit
+    Object.entries(rest).forEach(([key, value]) => {
+        if (value !== undefined && value !== null && value !== '') query.append(key, value);
+    });
+    return get(`/stats/usage/?${query.toString()}`, options);
+};
+// 분위수(q: 0~1 목록)와 백분위(value 목록) — metric: ranking_score | level | win_rate
+export const getPercentiles = (params = {}, options) => {
+
+    const {metric = 'ranking_score', tier, q = [], value = []} = params;
+    let url = `/stats/percentiles/?metric=${metric}`;
+    if (tier) url += `&tier=${tier}`;
+    if (q.length) url += `&q=${q.join(',')}`;
+    if (value.length) url += `&value=${value.join(',')}`;
+    return get(url, options);
+};
+
+export { clearRequestCache, isCanceled } from './requestCache';
 
 export default api;
\ No newline at end of file
@@ -0,0 +1,178 @@
+import axios from 'axios';
+
+// GET 응답 캐시 (URL 키)
+// - 메모리 + sessionStorage: 탭 이동/새로고침 후에도 같은 URL은 다시 받지 않음
+// - FRESH_MS 안의 응답은 요청 없이 사용, STALE_MS 안이면 캐시를 먼저 돌려주고 백그라운드에서 재검증(onUpdate로 새 응답 전달)
+// - 같은 URL의 진행 중 요청은 하나로 합침, 기다리는 쪽이 모두 취소(signal)하면 실제 요청도 취소
+// - 서버가 ETag를 주면 재검증 때 If-None-Match를 보내 304면 본문 없이 캐시 재사용
+const FRESH_MS = 30 * 1000;
+const STALE_MS = 10 * 60 * 1000;
+const MAX_MEMORY_ENTRIES = 200;
+const STORAGE_PREFIX = 'gamestats:api:';
+
+const memory = new Map();
+const inflight = new Map();
+
+const readStorage = (key) => {
+    try {
+        const raw = window.sessionStorage.getItem(STORAGE_PREFIX + key);
+        return raw ? JSON.parse(raw) : null;
+    } catch {
+        return null;
+    }
+};
+
+const writeStorage = (key, entry) => {
+    const raw = JSON.stringify(entry);
+    try {
+        window.sessionStorage.setItem(STORAGE_PREFIX + key, raw);
+    } catch {
+        // 용량 초과: 이 캐시 항목만 비우고 한 번 더 시도 (실패하면 메모리에만 보관)
+        clearStorage();
+        try {
+            window.sessionStorage.setItem(STORAGE_PREFIX + key, raw);
+        } catch {
+            // 무시
+        }
+    }
+};
+
+const clearStorage = () => {
+    try {
+        Object.keys(window.sessionStorage)
+            .filter((key) => key.startsWith(STORAGE_PREFIX))
+            .forEach((key) => window.sessionStorage.removeItem(key));
+    } catch {
+        // sessionStorage 사용 불가 (프라이빗 모드 등)
+    }
+};
+
+const read = (key) => {
+    let entry = memory.get(key);
+    if (!entry) {
+        entry = readStorage(key);
+        if (!entry) return null;
+    }
+    // 최근 사용 순서 유지 (LRU)
+    memory.delete(key);
+    memory.set(key, entry);
+    return entry;
+};
+
+const write = (key, data, etag) => {
+    const entry = { data, etag: etag || null, storedAt: Date.now() };
+    memory.delete(key);
+    memory.set(key, entry);
+    if (memory.size > MAX_MEMORY_ENTRIES) {
+        memory.delete(memory.keys().next().value);
+    }
+    writeStorage(key, entry);
+    return entry;
+};
+
+const toResponse = (entry, cached, stale = false) => ({
+    data: entry.data,
+    status: 200,
+    headers: entry.etag ? { etag: entry.etag } : {},
+    cached,
+    stale,
+});
+
+// 같은 키의 요청은 하나만 보내고 결과를 공유
+const sharedRequest = (client, key, config) => {
+    let request = inflight.get(key);
+    if (request) return request;
+
+    const cached = read(key);
+    const controller = new AbortController();
+    const headers = { ...config.headers };
+    if (cached?.etag) headers['If-None-Match'] = cached.etag;
+
+    request = { controller, waiters: 0, settled: false };
+    request.promise = client
+        .get(config.url, {
+            ...config,
+            headers,
+            signal: controller.signal,
+            validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+        })
+        .then((response) => {
+            if (response.status === 304 && cached) {
+                return { entry: write(key, cached.data, cached.etag), changed: false };
+            }
+            return { entry: write(key, response.data, response.headers.etag), changed: true };
+        })
+        .finally(() => {
+            request.settled = true;
+            inflight.delete(key);
+        });
+    inflight.set(key, request);
+    return request;
+};
+
+// 요청을 기다리는 쪽 하나 추가 (signal이 취소되면 빠지고, 아무도 안 남으면 실제 요청 취소)
+const join = (request, signal) => {
+    request.waiters += 1;
+    let released = false;
+    const release = () => {
+        if (released) return;
+        released = true;
+        request.waiters -= 1;
+        if (request.waiters === 0 && !request.settled) request.controller.abort();
+    };
+    if (!signal) {
+        return request.promise.finally(release);
+    }
+    return new Promise((resolve, reject) => {
+        const onAbort = () => {
+            release();
+            reject(new axios.CanceledError());
+        };
+        if (signal.aborted) {
+            onAbort();
+            return;
+        }
+        signal.addEventListener('abort', onAbort, { once: true });
+        request.promise
+            .then(resolve, reject)
+            .finally(() => {
+                signal.removeEventListener('abort', onAbort);
+                release();
+            });
+    });
+};
+
+/**
+ * 캐시를 거치는 GET
+ * options.signal: 필터가 바뀌면 abort (AbortController)
+ * options.onUpdate: 오래된 캐시를 먼저 받은 뒤 재검증 결과가 바뀌었을 때 새 응답으로 호출
+ * options.force: 캐시를 쓰지 않고 재검증 (ETag가 있으면 조건부 요청)
+ */
+export const cachedGet = (client, url, options = {}) => {
+    const { signal, onUpdate, force = false, ...config } = options;
+    const key = client.getUri({ url, params: config.params });
+    const cached = force ? null : read(key);
+    const age = cached ? Date.now() - cached.storedAt : Infinity;
+
+    if (age < FRESH_MS) {
+        return Promise.resolve(toResponse(cached, true));
+    }
+    const request = sharedRequest(client, key, { ...config, url });
+    if (age < STALE_MS) {
+        // 오래된 캐시를 바로 돌려주고 백그라운드 재검증
+        join(request, null)
+            .then(({ entry, changed }) => {
+                if (changed && onUpdate && !signal?.aborted) onUpdate(toResponse(entry, false));
+            })
+            .catch(() => {});
+        return Promise.resolve(toResponse(cached, true, true));
+    }
+    return join(request, signal).then(({ entry }) => toResponse(entry, false));
+};
+
+export const isCanceled = (error) => axios.isCancel(error);
+
+export const clearRequestCache = () => {
+    memory.clear();
+    clearStorage();
+};